@@ -0,0 +1,116 @@
+# Copyright 2023 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compares latency and peak memory of `AttnProcessor`, `AttnProcessor2_0` and `ChunkedAttnProcessor` on a single
+`Attention` layer for increasing sequence lengths.
+
+Each measurement runs in a fresh subprocess and reports the increase of the peak resident set size over the memory
+held before the first forward pass (peak allocated memory on CUDA).
+
+Usage:
+    python benchmarks/benchmark_attention.py --sequence_lengths 1024 4096 16384 --device cpu
+"""
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+
+import torch
+
+from diffusers.models.attention_processor import (
+    Attention,
+    AttnProcessor,
+    AttnProcessor2_0,
+    ChunkedAttnProcessor,
+)
+
+
+PROCESSORS = {
+    "AttnProcessor": AttnProcessor,
+    "AttnProcessor2_0": AttnProcessor2_0,
+    "ChunkedAttnProcessor": ChunkedAttnProcessor,
+}
+
+
+def _peak_memory_mb(device):
+    if device.type == "cuda":
+        return torch.cuda.max_memory_allocated(device) / 2**20
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 2**20 if sys.platform == "darwin" else max_rss / 2**10
+
+
+def _measure(processor_name, sequence_length, args, queue):
+    device = torch.device(args.device)
+    dtype = torch.float16 if args.fp16 else torch.float32
+    torch.manual_seed(0)
+
+    attn = Attention(query_dim=args.heads * args.dim_head, heads=args.heads, dim_head=args.dim_head)
+    attn.set_processor(PROCESSORS[processor_name]())
+    attn = attn.to(device, dtype)
+    hidden_states = torch.randn(
+        args.batch_size, sequence_length, args.heads * args.dim_head, device=device, dtype=dtype
+    )
+
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+        torch.cuda.reset_peak_memory_stats(device)
+    baseline_memory = _peak_memory_mb(device)
+
+    with torch.no_grad():
+        attn(hidden_states)
+
+        start = time.perf_counter()
+        for _ in range(args.num_runs):
+            attn(hidden_states)
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+        latency = (time.perf_counter() - start) / args.num_runs * 1000
+
+    queue.put((latency, _peak_memory_mb(device) - baseline_memory))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sequence_lengths", type=int, nargs="+", default=[1024, 4096, 8192])
+    parser.add_argument("--processors", type=str, nargs="+", default=list(PROCESSORS), choices=list(PROCESSORS))
+    parser.add_argument("--batch_size", type=int, default=1)
+    parser.add_argument("--heads", type=int, default=8)
+    parser.add_argument("--dim_head", type=int, default=40)
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--fp16", action="store_true")
+    parser.add_argument("--num_runs", type=int, default=3)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'processor':>20} | {'seq len':>7} | {'ms / call':>9} | {'peak memory increase (MB)':>25}")
+    for sequence_length in args.sequence_lengths:
+        for processor_name in args.processors:
+            queue = context.Queue()
+            process = context.Process(target=_measure, args=(processor_name, sequence_length, args, queue))
+            process.start()
+            process.join()
+            if process.exitcode != 0:
+                print(
+                    f"{processor_name:>20} | {sequence_length:>7} | {'failed (exit code ' + str(process.exitcode) + ')'}"
+                )
+                continue
+
+            latency, peak_memory = queue.get()
+            print(f"{processor_name:>20} | {sequence_length:>7} | {latency:>9.1f} | {peak_memory:>25.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# Copyright 2023 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measures the throughput of `EMAModel.step` for the per-parameter loop, the multi-tensor `foreach` update, sparse
+updates with `update_every` and EMA weights offloaded to the CPU.
+
+Usage:
+    python benchmarks/benchmark_ema.py --block_out_channels 320 640 1280 1280 --device cuda
+"""
+import argparse
+import time
+
+import torch
+
+from diffusers import UNet2DConditionModel
+from diffusers.training_utils import EMAModel
+
+
+def _synchronize(device):
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+
+
+def get_unet(block_out_channels, device):
+    num_blocks = len(block_out_channels)
+    unet = UNet2DConditionModel(
+        block_out_channels=block_out_channels,
+        layers_per_block=2,
+        down_block_types=("CrossAttnDownBlock2D",) * (num_blocks - 1) + ("DownBlock2D",),
+        up_block_types=("UpBlock2D",) + ("CrossAttnUpBlock2D",) * (num_blocks - 1),
+        cross_attention_dim=block_out_channels[-1],
+        attention_head_dim=8,
+        norm_num_groups=min(32, block_out_channels[0]),
+    )
+    return unet.to(device)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--block_out_channels", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--num_warmup", type=int, default=3)
+    parser.add_argument("--num_steps", type=int, default=20)
+    args = parser.parse_args()
+
+    device = torch.device(args.device)
+    unet = get_unet(tuple(args.block_out_channels), device)
+    num_params = sum(p.numel() for p in unet.parameters())
+    print(f"UNet with {num_params / 1e6:.1f}M parameters in {len(list(unet.parameters()))} tensors on {device}")
+
+    modes = {
+        "loop": {},
+        "foreach": {"foreach": True},
+        "foreach, update_every=4": {"foreach": True, "update_every": 4},
+        "foreach, EMA on cpu": {"foreach": True, "offload": True},
+    }
+
+    print(f"{'mode':>25} | {'ms / step':>9} | {'steps / s':>9}")
+    for mode, kwargs in modes.items():
+        offload = kwargs.pop("offload", False)
+        ema = EMAModel(unet.parameters(), **kwargs)
+        if offload:
+            ema.to("cpu")
+            if device.type == "cuda":
+                ema.pin_memory()
+
+        for _ in range(args.num_warmup):
+            ema.step(unet.parameters())
+        _synchronize(device)
+
+        start = time.perf_counter()
+        for _ in range(args.num_steps):
+            ema.step(unet.parameters())
+        _synchronize(device)
+        step_ms = (time.perf_counter() - start) / args.num_steps * 1000
+
+        print(f"{mode:>25} | {step_ms:>9.3f} | {1000 / step_ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
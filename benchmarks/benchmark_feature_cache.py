@@ -0,0 +1,104 @@
+# Copyright 2023 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measures the speedup and the quality loss of `StableDiffusionControlNetPipeline.enable_feature_cache` for several
+cache intervals.
+
+Every configuration generates the same images from the same seeds as the pipeline without cache. The quality loss is
+reported as the mean absolute error and the PSNR of the generated images against the images without cache.
+
+Usage:
+    python benchmarks/benchmark_feature_cache.py --model_id runwayml/stable-diffusion-v1-5 \
+        --controlnet_id lllyasviel/sd-controlnet-canny --cache_intervals 2 3 5 --cache_block_ids 0 1
+"""
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from diffusers import ControlNetModel, StableDiffusionControlNetPipeline
+
+
+def _generate(pipe, args, control_image):
+    generator = torch.Generator("cpu").manual_seed(0)
+    if pipe.device.type == "cuda":
+        torch.cuda.synchronize(pipe.device)
+    start = time.perf_counter()
+    images = pipe(
+        [args.prompt] * args.batch_size,
+        control_image,
+        num_inference_steps=args.num_inference_steps,
+        generator=generator,
+        output_type="np",
+    ).images
+    if pipe.device.type == "cuda":
+        torch.cuda.synchronize(pipe.device)
+    return images, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model_id", type=str, default="runwayml/stable-diffusion-v1-5")
+    parser.add_argument("--controlnet_id", type=str, default="lllyasviel/sd-controlnet-canny")
+    parser.add_argument("--prompt", type=str, default="a car driving down a city street at dusk")
+    parser.add_argument("--cache_intervals", type=int, nargs="+", default=[2, 3, 5])
+    parser.add_argument("--cache_block_ids", type=int, nargs="+", default=[0])
+    parser.add_argument("--controlnet_cache_interval", type=int, default=None)
+    parser.add_argument("--num_inference_steps", type=int, default=50)
+    parser.add_argument("--batch_size", type=int, default=1)
+    parser.add_argument("--resolution", type=int, default=512)
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--fp16", action="store_true")
+    args = parser.parse_args()
+
+    dtype = torch.float16 if args.fp16 else torch.float32
+    controlnet = ControlNetModel.from_pretrained(args.controlnet_id, torch_dtype=dtype)
+    pipe = StableDiffusionControlNetPipeline.from_pretrained(
+        args.model_id, controlnet=controlnet, safety_checker=None, torch_dtype=dtype
+    )
+    pipe.to(args.device)
+    pipe.set_progress_bar_config(disable=True)
+
+    # a fixed random conditioning image keeps the benchmark self-contained
+    generator = torch.Generator("cpu").manual_seed(0)
+    control_image = torch.rand((1, 3, args.resolution, args.resolution), generator=generator)
+
+    # warmup
+    _generate(pipe, argparse.Namespace(**{**vars(args), "num_inference_steps": 2}), control_image)
+    reference, reference_latency = _generate(pipe, args, control_image)
+
+    print(f"{'interval':>8} | {'block':>5} | {'latency (s)':>11} | {'speedup':>7} | {'MAE':>7} | {'PSNR (dB)':>9}")
+    print(f"{'-':>8} | {'-':>5} | {reference_latency:>11.2f} | {1.0:>7.2f} | {0.0:>7.4f} | {'inf':>9}")
+    for cache_block_id in args.cache_block_ids:
+        for cache_interval in args.cache_intervals:
+            pipe.enable_feature_cache(
+                cache_interval=cache_interval,
+                cache_block_id=cache_block_id,
+                controlnet_cache_interval=args.controlnet_cache_interval,
+            )
+            images, latency = _generate(pipe, args, control_image)
+
+            mae = np.abs(images - reference).mean()
+            mse = np.square(images - reference).mean()
+            psnr = 10 * np.log10(1.0 / mse) if mse > 0 else float("inf")
+            print(
+                f"{cache_interval:>8} | {cache_block_id:>5} | {latency:>11.2f} | {reference_latency / latency:>7.2f} |"
+                f" {mae:>7.4f} | {psnr:>9.2f}"
+            )
+    pipe.disable_feature_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Copyright 2023 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Profiles the import time of `diffusers` with `python -X importtime`.
+
+Every statement runs `--num_runs` times in a fresh interpreter. The script reports the median import time of the
+statement and the modules with the largest cumulative import time of the last run.
+
+It doubles as an import-time regression check. It exits with an error if the median time of a statement exceeds
+`--max_seconds`, or if a statement imports one of the `--forbidden_modules`.
+
+Usage:
+    python benchmarks/benchmark_import_time.py
+    python benchmarks/benchmark_import_time.py --statements "import diffusers" --max_seconds 1.0 \
+        --forbidden_modules torch transformers
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+
+DEFAULT_STATEMENTS = [
+    "import diffusers",
+    "from diffusers import DDPMScheduler",
+    "from diffusers import StableDiffusionPipeline",
+]
+
+
+def _profile(statement):
+    # `-X importtime` writes one line per imported module: "import time: self [us] | cumulative | imported package"
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement], capture_output=True, text=True, check=True
+    ).stderr
+
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative_time, name = line[len("import time:") :].split("|")
+        modules.append(
+            (name.strip(), int(self_time) / 1e6, int(cumulative_time) / 1e6, len(name) - len(name.lstrip()))
+        )
+
+    # the top level imports are the least indented lines
+    indent = min(module[3] for module in modules)
+    total_time = sum(cumulative_time for _, _, cumulative_time, level in modules if level == indent)
+    return total_time, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--statements", type=str, nargs="+", default=DEFAULT_STATEMENTS)
+    parser.add_argument("--num_runs", type=int, default=5)
+    parser.add_argument("--top_k", type=int, default=15)
+    parser.add_argument("--max_seconds", type=float, default=None)
+    parser.add_argument("--forbidden_modules", type=str, nargs="*", default=[])
+    args = parser.parse_args()
+
+    failures = []
+    for statement in args.statements:
+        times = []
+        for _ in range(args.num_runs):
+            total_time, modules = _profile(statement)
+            times.append(total_time)
+        median_time = statistics.median(times)
+
+        print(f"\n{statement!r}: {median_time:.3f}s (median of {args.num_runs} runs)")
+        print(f"{'module':>60} | {'self (s)':>8} | {'cumulative (s)':>14}")
+        for name, self_time, cumulative_time, _ in sorted(modules, key=lambda module: -module[2])[: args.top_k]:
+            print(f"{name:>60} | {self_time:>8.3f} | {cumulative_time:>14.3f}")
+
+        if args.max_seconds is not None and median_time > args.max_seconds:
+            failures.append(f"{statement!r} took {median_time:.3f}s, more than {args.max_seconds}s")
+        imported = {name for name, *_ in modules}
+        for module in args.forbidden_modules:
+            if module in imported:
+                failures.append(f"{statement!r} imports {module}")
+
+    if failures:
+        raise SystemExit("Import time regressions:\n" + "\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# Copyright 2023 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compares serving several LoRAs from one `UNet2DConditionModel` by fusing and unfusing them with serving them as batched
+LoRA layers (`load_batched_lora_weights`).
+
+It reports the latency of switching the adapter of the model, and the throughput of a UNet forward pass over a batch
+whose samples use different adapters: the fused LoRAs need one switch and one forward pass per adapter of the batch,
+the batched LoRA layers a single forward pass. The base model without LoRA is the reference. The UNet has the Stable
+Diffusion layout and random weights, the LoRAs random factors of rank `--rank` for all its linear and convolutional
+layers.
+
+Usage:
+    python benchmarks/benchmark_lora_adapters.py --num_adapters 4 --batch_size 8 --rank 16 --device cuda --fp16
+"""
+import argparse
+import time
+
+import torch
+
+from diffusers import UNet2DConditionModel
+from diffusers.models.lora import LoRACompatibleConv, LoRACompatibleLinear, LoRAConv2dLayer, LoRALinearLayer
+
+
+def _random_lora_state_dict(model, rank):
+    state_dict = {}
+    for name, module in model.named_modules():
+        if isinstance(module, LoRACompatibleLinear):
+            lora_layer = LoRALinearLayer(module.in_features, module.out_features, rank=rank)
+        elif isinstance(module, LoRACompatibleConv):
+            lora_layer = LoRAConv2dLayer(
+                module.in_channels,
+                module.out_channels,
+                rank=rank,
+                kernel_size=module.kernel_size,
+                stride=module.stride,
+                padding=module.padding,
+            )
+        else:
+            continue
+
+        with torch.no_grad():
+            lora_layer.up.weight.normal_(std=1 / rank)
+        state_dict.update({f"{name}.lora.{k}": v for k, v in lora_layer.state_dict().items()})
+    return state_dict
+
+
+def _timeit(fn, device, num_runs):
+    fn()
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+    start = time.perf_counter()
+    for _ in range(num_runs):
+        fn()
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+    return (time.perf_counter() - start) / num_runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num_adapters", type=int, default=4)
+    parser.add_argument("--rank", type=int, default=16)
+    parser.add_argument("--batch_size", type=int, default=8)
+    parser.add_argument("--sample_size", type=int, default=64)
+    parser.add_argument("--block_out_channels", type=int, nargs="+", default=[320, 640, 1280, 1280])
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--fp16", action="store_true")
+    parser.add_argument("--num_runs", type=int, default=3)
+    args = parser.parse_args()
+
+    device = torch.device(args.device)
+    dtype = torch.float16 if args.fp16 else torch.float32
+    torch.manual_seed(0)
+
+    num_blocks = len(args.block_out_channels)
+    model = UNet2DConditionModel(
+        sample_size=args.sample_size,
+        block_out_channels=args.block_out_channels,
+        down_block_types=("CrossAttnDownBlock2D",) * (num_blocks - 1) + ("DownBlock2D",),
+        up_block_types=("UpBlock2D",) + ("CrossAttnUpBlock2D",) * (num_blocks - 1),
+        cross_attention_dim=768,
+    )
+    adapters = {f"adapter_{i}": _random_lora_state_dict(model, args.rank) for i in range(args.num_adapters)}
+    model = model.to(device, dtype)
+
+    sample = torch.randn(args.batch_size, 4, args.sample_size, args.sample_size, device=device, dtype=dtype)
+    timestep = torch.tensor([999], device=device)
+    encoder_hidden_states = torch.randn(args.batch_size, 77, 768, device=device, dtype=dtype)
+    # the samples of the batch cycle through the adapters
+    adapter_names = [f"adapter_{i % args.num_adapters}" for i in range(args.batch_size)]
+
+    def forward(rows=slice(None)):
+        with torch.no_grad():
+            model(sample[rows], timestep, encoder_hidden_states=encoder_hidden_states[rows])
+
+    base_latency = _timeit(forward, device, args.num_runs)
+
+    # fused LoRAs: keep the LoRA layers of every adapter around and fuse the active one into the base weights
+    lora_layers = {}
+    for adapter_name, state_dict in adapters.items():
+        model.load_attn_procs(dict(state_dict))
+        for module in model.modules():
+            if isinstance(module, (LoRACompatibleConv, LoRACompatibleLinear)) and module.lora_layer is not None:
+                lora_layers.setdefault(module, {})[adapter_name] = module.lora_layer
+                module.set_lora_layer(None)
+
+    def fuse(adapter_name):
+        model.unfuse_lora()
+        for module, layers in lora_layers.items():
+            module.set_lora_layer(layers[adapter_name])
+        model.fuse_lora()
+
+    switch = iter(range(10**9))
+    fused_switch_latency = _timeit(
+        lambda: fuse(f"adapter_{next(switch) % args.num_adapters}"), device, args.num_runs * args.num_adapters
+    )
+
+    def fused_mixed_batch():
+        for i in range(min(args.num_adapters, args.batch_size)):
+            fuse(f"adapter_{i}")
+            forward(slice(i, None, args.num_adapters))
+
+    fused_latency = _timeit(fused_mixed_batch, device, args.num_runs)
+    model.unfuse_lora()
+    for module in lora_layers:
+        module.set_lora_layer(None)
+
+    # batched LoRAs: the stacked factors of all the adapters stay next to the base weights
+    model.load_batched_lora_weights(adapters)
+    model.set_batched_lora_adapters(adapter_names)
+    batched_latency = _timeit(forward, device, args.num_runs)
+
+    def rotate(shift):
+        # a new batch of requests with another mix of adapters
+        shift = shift % args.batch_size
+        model.set_batched_lora_adapters(adapter_names[shift:] + adapter_names[:shift])
+
+    switch = iter(range(10**9))
+    batched_switch_latency = _timeit(lambda: rotate(next(switch)), device, args.num_runs * args.num_adapters)
+
+    print(f"{args.num_adapters} adapters of rank {args.rank}, batch size {args.batch_size}")
+    print(f"{'mode':>20} | {'adapter switch (ms)':>19} | {'mixed batch (ms)':>16} | {'samples / s':>11}")
+    for mode, switch_latency, latency in (
+        ("base model", float("nan"), base_latency),
+        ("fused LoRA", fused_switch_latency, fused_latency),
+        ("batched LoRA", batched_switch_latency, batched_latency),
+    ):
+        print(
+            f"{mode:>20} | {switch_latency * 1000:>19.2f} | {latency * 1000:>16.1f} |"
+            f" {args.batch_size / latency:>11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# Copyright 2023 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compares the load time and the memory of `UNet2DConditionModel.from_pretrained` with and without `mmap=True`.
+
+Each measurement runs in a fresh subprocess, loads the model and reads every weight once. It reports the increase of
+the peak resident set size and of the anonymous (process-private) memory over the memory held before loading. With
+`mmap=True` and a `torch_dtype` matching the checkpoint, the weights stay file-backed pages of the page cache that
+are shared by all the processes loading the same checkpoint. Without `--pretrained_model_name_or_path`, a randomly initialized UNet with the Stable Diffusion layout is
+saved to a temporary directory first.
+
+Usage:
+    python benchmarks/benchmark_model_loading.py --pretrained_model_name_or_path runwayml/stable-diffusion-v1-5 \
+        --subfolder unet --torch_dtype float16 --variant fp16
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import torch
+
+from diffusers import UNet2DConditionModel
+
+
+def _peak_rss_mb():
+    # ru_maxrss survives `exec`, so a spawned process would report the peak of its parent. The high water mark of
+    # /proc/self/status belongs to the address space of the process itself.
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 2**10
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 2**20 if sys.platform == "darwin" else max_rss / 2**10
+
+
+def _anonymous_memory_mb():
+    # memory that is private to the process, as opposed to file-backed pages that stay in the page cache and are shared
+    # by all the processes mapping the same checkpoint
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        return float("nan")
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Anonymous:"):
+                return int(line.split()[1]) / 2**10
+    return float("nan")
+
+
+def _measure(mmap, args, queue):
+    torch_dtype = getattr(torch, args.torch_dtype)
+    baseline_memory = _peak_rss_mb()
+    baseline_anonymous_memory = _anonymous_memory_mb()
+
+    start = time.perf_counter()
+    model = UNet2DConditionModel.from_pretrained(
+        args.pretrained_model_name_or_path,
+        subfolder=args.subfolder,
+        variant=args.variant,
+        torch_dtype=torch_dtype,
+        mmap=mmap,
+    )
+    # read every weight once, like the first forward pass would
+    with torch.no_grad():
+        for param in model.parameters():
+            param.abs().max()
+    latency = time.perf_counter() - start
+
+    model_size = sum(p.numel() * p.element_size() for p in model.parameters()) / 2**20
+    queue.put(
+        (
+            latency,
+            _peak_rss_mb() - baseline_memory,
+            _anonymous_memory_mb() - baseline_anonymous_memory,
+            model_size,
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pretrained_model_name_or_path", type=str, default=None)
+    parser.add_argument("--subfolder", type=str, default=None)
+    parser.add_argument("--variant", type=str, default=None)
+    parser.add_argument("--torch_dtype", type=str, default="float32", choices=["float32", "float16", "bfloat16"])
+    parser.add_argument("--num_runs", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        if args.pretrained_model_name_or_path is None:
+            model = UNet2DConditionModel(cross_attention_dim=768).to(getattr(torch, args.torch_dtype))
+            model.save_pretrained(tmpdirname, variant=args.variant)
+            del model
+            args.pretrained_model_name_or_path = tmpdirname
+            args.subfolder = None
+
+        context = multiprocessing.get_context("spawn")
+        print(
+            f"{'mmap':>5} | {'load + read time (s)':>20} | {'peak RSS increase (MB)':>22} |"
+            f" {'private memory (MB)':>19} | {'model size (MB)':>15}"
+        )
+        # the first run also warms up the page cache, so that both modes read the checkpoint from memory
+        for run in range(args.num_runs):
+            for mmap in (False, True):
+                queue = context.Queue()
+                process = context.Process(target=_measure, args=(mmap, args, queue))
+                process.start()
+                process.join()
+                if process.exitcode != 0:
+                    print(f"{str(mmap):>5} | {'failed (exit code ' + str(process.exitcode) + ')'}")
+                    continue
+
+                latency, peak_memory, private_memory, model_size = queue.get()
+                print(
+                    f"{str(mmap):>5} | {latency:>20.2f} | {peak_memory:>22.1f} | {private_memory:>19.1f} |"
+                    f" {model_size:>15.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Copyright 2023 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compares the latency of a `MultiControlNetModel` forward pass in its `"sequential"`, `"batched"` and `"parallel"`
+execution modes for an increasing number of ControlNets.
+
+The ControlNets have the Stable Diffusion layout and random weights. The batch holds the unconditional and the
+conditional sample of classifier-free guidance.
+
+Usage:
+    python benchmarks/benchmark_multicontrolnet.py --num_controlnets 1 2 3 4 --device cuda --fp16
+"""
+import argparse
+import time
+
+import torch
+
+from diffusers import ControlNetModel
+from diffusers.pipelines.controlnet.multicontrolnet import MultiControlNetModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num_controlnets", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--modes", type=str, nargs="+", default=["sequential", "batched", "parallel"])
+    parser.add_argument("--batch_size", type=int, default=2)
+    parser.add_argument("--sample_size", type=int, default=64)
+    parser.add_argument("--block_out_channels", type=int, nargs="+", default=[320, 640, 1280, 1280])
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--fp16", action="store_true")
+    parser.add_argument("--num_runs", type=int, default=3)
+    args = parser.parse_args()
+
+    device = torch.device(args.device)
+    dtype = torch.float16 if args.fp16 else torch.float32
+    num_blocks = len(args.block_out_channels)
+
+    sample = torch.randn(args.batch_size, 4, args.sample_size, args.sample_size, device=device, dtype=dtype)
+    encoder_hidden_states = torch.randn(args.batch_size, 77, 768, device=device, dtype=dtype)
+    timestep = torch.tensor(999, device=device)
+
+    print(f"{'controlnets':>11} | {'mode':>10} | {'ms / step':>9}")
+    for num_controlnets in args.num_controlnets:
+        torch.manual_seed(0)
+        controlnets = [
+            ControlNetModel(
+                block_out_channels=args.block_out_channels,
+                down_block_types=("CrossAttnDownBlock2D",) * (num_blocks - 1) + ("DownBlock2D",),
+                cross_attention_dim=768,
+            )
+            for _ in range(num_controlnets)
+        ]
+        model = MultiControlNetModel(controlnets).to(device, dtype).eval()
+        images = [
+            torch.randn(args.batch_size, 3, args.sample_size * 8, args.sample_size * 8, device=device, dtype=dtype)
+            for _ in range(num_controlnets)
+        ]
+
+        for mode in args.modes:
+            model.set_execution_mode(mode)
+
+            def step():
+                with torch.no_grad():
+                    model(sample, timestep, encoder_hidden_states, images, [1.0] * num_controlnets, return_dict=False)
+
+            step()
+            if device.type == "cuda":
+                torch.cuda.synchronize(device)
+            start = time.perf_counter()
+            for _ in range(args.num_runs):
+                step()
+            if device.type == "cuda":
+                torch.cuda.synchronize(device)
+            latency = (time.perf_counter() - start) / args.num_runs * 1000
+
+            print(f"{num_controlnets:>11} | {mode:>10} | {latency:>9.1f}")
+
+        model.set_execution_mode("sequential")
+
+
+if __name__ == "__main__":
+    main()
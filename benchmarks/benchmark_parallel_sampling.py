@@ -0,0 +1,103 @@
+# Copyright 2023 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measures the latency of the parallel (ParaDiGMS) sampling of the text-to-video and ControlNet pipelines against
+sequential sampling, for several window sizes.
+
+Every configuration generates from the same seed as sequential sampling with `DDIMParallelScheduler`. The quality
+loss is reported as the mean absolute error of the output against the sequential output. Parallel sampling only pays
+off when the device has spare batch capacity, a window of `parallel` timesteps costs a single batched model call.
+
+Usage:
+    python benchmarks/benchmark_parallel_sampling.py --pipeline text_to_video --parallel 4 8 16
+    python benchmarks/benchmark_parallel_sampling.py --pipeline controlnet --model_id runwayml/stable-diffusion-v1-5 \
+        --controlnet_id lllyasviel/sd-controlnet-canny --parallel 4 8
+"""
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from diffusers import (
+    ControlNetModel,
+    DDIMParallelScheduler,
+    StableDiffusionControlNetPipeline,
+    TextToVideoSDPipeline,
+)
+
+
+def _generate(pipe, args, **kwargs):
+    generator = torch.Generator("cpu").manual_seed(0)
+    if pipe.device.type == "cuda":
+        torch.cuda.synchronize(pipe.device)
+    start = time.perf_counter()
+    output = pipe(
+        args.prompt, num_inference_steps=args.num_inference_steps, generator=generator, output_type="np", **kwargs
+    )[0]
+    if pipe.device.type == "cuda":
+        torch.cuda.synchronize(pipe.device)
+    return np.asarray(output), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pipeline", type=str, choices=["text_to_video", "controlnet"], default="text_to_video")
+    parser.add_argument("--model_id", type=str, default=None)
+    parser.add_argument("--controlnet_id", type=str, default="lllyasviel/sd-controlnet-canny")
+    parser.add_argument("--prompt", type=str, default="a car driving down a city street at dusk")
+    parser.add_argument("--parallel", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--num_inference_steps", type=int, default=50)
+    parser.add_argument("--num_frames", type=int, default=16)
+    parser.add_argument("--resolution", type=int, default=512)
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--fp16", action="store_true")
+    args = parser.parse_args()
+
+    dtype = torch.float16 if args.fp16 else torch.float32
+    if args.pipeline == "text_to_video":
+        pipe = TextToVideoSDPipeline.from_pretrained(
+            args.model_id or "damo-vilab/text-to-video-ms-1.7b", torch_dtype=dtype
+        )
+        call_kwargs = {"num_frames": args.num_frames}
+    else:
+        controlnet = ControlNetModel.from_pretrained(args.controlnet_id, torch_dtype=dtype)
+        pipe = StableDiffusionControlNetPipeline.from_pretrained(
+            args.model_id or "runwayml/stable-diffusion-v1-5",
+            controlnet=controlnet,
+            safety_checker=None,
+            torch_dtype=dtype,
+        )
+        # a fixed random conditioning image keeps the benchmark self-contained
+        generator = torch.Generator("cpu").manual_seed(0)
+        call_kwargs = {"image": torch.rand((1, 3, args.resolution, args.resolution), generator=generator)}
+    pipe.scheduler = DDIMParallelScheduler.from_config(pipe.scheduler.config)
+    pipe.to(args.device)
+    pipe.set_progress_bar_config(disable=True)
+
+    # warmup
+    _generate(pipe, argparse.Namespace(**{**vars(args), "num_inference_steps": 2}), **call_kwargs)
+    reference, reference_latency = _generate(pipe, args, **call_kwargs)
+
+    print(f"{'parallel':>8} | {'latency (s)':>11} | {'speedup':>7} | {'MAE':>7}")
+    print(f"{'-':>8} | {reference_latency:>11.2f} | {1.0:>7.2f} | {0.0:>7.4f}")
+    for parallel in args.parallel:
+        output, latency = _generate(pipe, args, parallel=parallel, tolerance=args.tolerance, **call_kwargs)
+        mae = np.abs(output - reference).mean()
+        print(f"{parallel:>8} | {latency:>11.2f} | {reference_latency / latency:>7.2f} | {mae:>7.4f}")
+
+
+if __name__ == "__main__":
+    main()
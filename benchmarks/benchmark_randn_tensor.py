@@ -0,0 +1,76 @@
+# Copyright 2023 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compares per-sample seeded noise generation with a list of `torch.Generator`s (`randn_tensor`) against the vectorized
+counter-based `seeded_randn_tensor`.
+
+Usage:
+    python benchmarks/benchmark_randn_tensor.py --batch_sizes 1 8 32 128 --device cpu
+"""
+import argparse
+import time
+
+import torch
+
+from diffusers.utils.torch_utils import randn_tensor, seeded_randn_tensor
+
+
+def _synchronize(device):
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+
+
+def _time(fn, device, num_warmup, num_runs):
+    for _ in range(num_warmup):
+        fn()
+    _synchronize(device)
+    start = time.perf_counter()
+    for _ in range(num_runs):
+        fn()
+    _synchronize(device)
+    return (time.perf_counter() - start) / num_runs * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch_sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--sample_shape", type=int, nargs="+", default=[4, 64, 64])
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--num_warmup", type=int, default=3)
+    parser.add_argument("--num_runs", type=int, default=10)
+    args = parser.parse_args()
+
+    device = torch.device(args.device)
+    print(f"{'batch size':>10} | {'generator list (ms)':>19} | {'seeded (ms)':>11} | {'speedup':>7}")
+    for batch_size in args.batch_sizes:
+        shape = (batch_size, *args.sample_shape)
+        seeds = list(range(batch_size))
+
+        def generator_list():
+            generator = [torch.Generator(device).manual_seed(seed) for seed in seeds]
+            return randn_tensor(shape, generator=generator, device=device)
+
+        def seeded():
+            return seeded_randn_tensor(shape, seeds=seeds, device=device)
+
+        generator_list_ms = _time(generator_list, device, args.num_warmup, args.num_runs)
+        seeded_ms = _time(seeded, device, args.num_warmup, args.num_runs)
+        print(
+            f"{batch_size:>10} | {generator_list_ms:>19.3f} | {seeded_ms:>11.3f} |"
+            f" {generator_list_ms / seeded_ms:>6.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# Copyright 2023 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measures the memory traffic of the temporal blocks of the video UNets over several frame counts.
+
+For every block and frame count, the benchmark reports the median wall time, the memory allocated by one forward pass
+in units of the activation size, and every allocation of at least the size of the activation, whatever operator made
+it (layout changes, temporaries of the normalizations, outputs of the activations and convolutions, ...). The number of
+these allocations is the number of full activation copies made by the block.
+
+Running the benchmark on two commits compares the layouts of their temporal blocks.
+
+Usage:
+    python benchmarks/benchmark_temporal_layout.py --num_frames 8 16 32 64 --channels 320 --resolution 32
+"""
+import argparse
+import json
+import statistics
+import time
+
+import torch
+
+from diffusers.models.resnet import TemporalConvLayer
+from diffusers.models.transformer_temporal import TransformerTemporalModel
+
+
+def _blocks(channels):
+    return {
+        "TransformerTemporalModel": TransformerTemporalModel(
+            num_attention_heads=8, attention_head_dim=channels // 8, in_channels=channels, norm_num_groups=32
+        ),
+        "TemporalConvLayer": TemporalConvLayer(channels, channels, norm_num_groups=32),
+    }
+
+
+def _measure(block, hidden_states, num_frames, num_runs, activation):
+    if hidden_states.device.type == "cuda":
+        torch.cuda.synchronize()
+
+    times = []
+    for _ in range(num_runs):
+        start = time.perf_counter()
+        block(hidden_states, num_frames=num_frames)
+        if hidden_states.device.type == "cuda":
+            torch.cuda.synchronize()
+        times.append(time.perf_counter() - start)
+
+    activities = [torch.profiler.ProfilerActivity.CPU]
+    if hidden_states.device.type == "cuda":
+        activities.append(torch.profiler.ProfilerActivity.CUDA)
+    with torch.profiler.profile(activities=activities, profile_memory=True) as prof:
+        block(hidden_states, num_frames=num_frames)
+
+    allocated = 0
+    full_copies = []
+    for event in prof.events():
+        # the allocations are attributed to the innermost operator, e.g. `aten::empty` called by `aten::new_empty`
+        size = event.self_cpu_memory_usage + getattr(event, "self_device_memory_usage", 0)
+        if event.name == "[memory]" or size <= 0:
+            continue
+        allocated += size
+        if size >= activation:
+            full_copies.append(size)
+
+    return statistics.median(times), allocated, full_copies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num_frames", type=int, nargs="+", default=[8, 16, 32, 64])
+    parser.add_argument("--batch_size", type=int, default=1)
+    parser.add_argument("--channels", type=int, default=320)
+    parser.add_argument("--resolution", type=int, default=32, help="Height and width of the latent activations.")
+    parser.add_argument("--num_runs", type=int, default=5)
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--fp16", action="store_true")
+    parser.add_argument("--output", type=str, default=None, help="Writes the results to this JSON file.")
+    args = parser.parse_args()
+
+    dtype = torch.float16 if args.fp16 else torch.float32
+    blocks = {name: block.to(args.device, dtype).eval() for name, block in _blocks(args.channels).items()}
+
+    results = []
+    print(
+        f"{'block':>24} | {'frames':>6} | {'activation (MB)':>15} | {'time (ms)':>9} | {'allocated (MB)':>14} |"
+        f" {'copies':>6} | {'full copies (MB)':>16} | {'full copies':>11}"
+    )
+    for name, block in blocks.items():
+        for num_frames in args.num_frames:
+            generator = torch.Generator("cpu").manual_seed(0)
+            shape = (args.batch_size * num_frames, args.channels, args.resolution, args.resolution)
+            hidden_states = torch.randn(shape, generator=generator).to(args.device, dtype)
+            activation = hidden_states.numel() * hidden_states.element_size()
+
+            with torch.no_grad():
+                # warmup
+                block(hidden_states, num_frames=num_frames)
+                wall_time, allocated, full_copies = _measure(
+                    block, hidden_states, num_frames, args.num_runs, activation
+                )
+
+            results.append(
+                {
+                    "block": name,
+                    "num_frames": num_frames,
+                    "activation_mb": activation / 2**20,
+                    "wall_time_median": wall_time,
+                    "allocated_mb": allocated / 2**20,
+                    "full_copies_mb": sum(full_copies) / 2**20,
+                    "num_full_copies": len(full_copies),
+                }
+            )
+            print(
+                f"{name:>24} | {num_frames:>6} | {activation / 2**20:>15.1f} | {wall_time * 1e3:>9.2f} |"
+                f" {allocated / 2**20:>14.1f} | {allocated / activation:>6.1f} | {sum(full_copies) / 2**20:>16.1f} |"
+                f" {len(full_copies):>11}"
+            )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Copyright 2023 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measures tiled `AutoencoderKL.decode` latency for different `tile_batch_size` values, on a randomly initialized VAE.
+
+Usage:
+    python benchmarks/benchmark_vae_tiling.py --latent_size 128 256 --num_frames 4 --device cuda
+"""
+import argparse
+import time
+
+import torch
+
+from diffusers import AutoencoderKL
+
+
+def _synchronize(device):
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--block_out_channels", type=int, nargs="+", default=[32, 64, 64, 64])
+    parser.add_argument("--sample_size", type=int, default=256, help="The tile size in pixels.")
+    parser.add_argument("--latent_size", type=int, nargs=2, default=[64, 96])
+    parser.add_argument("--num_frames", type=int, default=1, help="Decode video latents with this many frames.")
+    parser.add_argument("--tile_batch_sizes", type=int, nargs="+", default=[1, 4, 0], help="0 batches all tiles.")
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--num_runs", type=int, default=3)
+    args = parser.parse_args()
+
+    device = torch.device(args.device)
+    num_blocks = len(args.block_out_channels)
+    vae = AutoencoderKL(
+        block_out_channels=args.block_out_channels,
+        down_block_types=["DownEncoderBlock2D"] * num_blocks,
+        up_block_types=["UpDecoderBlock2D"] * num_blocks,
+        latent_channels=4,
+        norm_num_groups=min(32, args.block_out_channels[0]),
+        sample_size=args.sample_size,
+    )
+    vae = vae.to(device).eval()
+
+    latents = torch.randn(1, 4, args.num_frames, *args.latent_size, device=device)
+    if args.num_frames == 1:
+        latents = latents[:, :, 0]
+
+    print(f"{'tile batch size':>15} | {'ms / decode':>11} | {'peak memory (MB)':>16}")
+    for tile_batch_size in args.tile_batch_sizes:
+        vae.enable_tiling(tile_batch_size=tile_batch_size or None)
+        with torch.no_grad():
+            vae.decode(latents)
+            _synchronize(device)
+            if device.type == "cuda":
+                torch.cuda.reset_peak_memory_stats(device)
+
+            start = time.perf_counter()
+            for _ in range(args.num_runs):
+                vae.decode(latents)
+            _synchronize(device)
+            decode_ms = (time.perf_counter() - start) / args.num_runs * 1000
+
+        peak_memory = torch.cuda.max_memory_allocated(device) / 2**20 if device.type == "cuda" else float("nan")
+        print(f"{tile_batch_size or 'all':>15} | {decode_ms:>11.1f} | {peak_memory:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -584,6 +584,44 @@ class ExamplesTestsAccelerate(unittest.TestCase):
             self.assertTrue(os.path.isfile(os.path.join(tmpdir, "unet", "diffusion_pytorch_model.safetensors")))
             self.assertTrue(os.path.isfile(os.path.join(tmpdir, "scheduler", "scheduler_config.json")))
 
+    def test_text_to_image_cached_latents(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cached_latents_dir = os.path.join(tmpdir, "latents")
+            precompute_args = f"""
+                examples/text_to_image/precompute_latents.py
+                --pretrained_model_name_or_path hf-internal-testing/tiny-stable-diffusion-pipe
+                --dataset_name hf-internal-testing/dummy_image_text_data
+                --resolution 64
+                --center_crop
+                --batch_size 2
+                --shard_size 2
+                --dtype float32
+                --output_dir {cached_latents_dir}
+                """.split()
+
+            run_command(["python"] + precompute_args)
+            self.assertTrue(os.path.isfile(os.path.join(cached_latents_dir, "latents_cache_index.json")))
+
+            test_args = f"""
+                examples/text_to_image/train_text_to_image.py
+                --pretrained_model_name_or_path hf-internal-testing/tiny-stable-diffusion-pipe
+                --use_cached_latents
+                --cached_latents_dir {cached_latents_dir}
+                --train_batch_size 1
+                --gradient_accumulation_steps 1
+                --max_train_steps 2
+                --learning_rate 5.0e-04
+                --scale_lr
+                --lr_scheduler constant
+                --lr_warmup_steps 0
+                --output_dir {tmpdir}
+                """.split()
+
+            run_command(self._launch_args + test_args)
+            # save_pretrained smoke test
+            self.assertTrue(os.path.isfile(os.path.join(tmpdir, "unet", "diffusion_pytorch_model.safetensors")))
+            self.assertTrue(os.path.isfile(os.path.join(tmpdir, "vae", "diffusion_pytorch_model.safetensors")))
+
     def test_text_to_image_checkpointing(self):
         pretrained_model_name_or_path = "hf-internal-testing/tiny-stable-diffusion-pipe"
         prompt = "a prompt"
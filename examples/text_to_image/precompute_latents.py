@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+# coding=utf-8
+# Copyright 2023 The HuggingFace Inc. team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Runs the VAE and the text encoder once over a text-to-image dataset and stores the latent distribution parameters
+(`latent_mean`, `latent_logvar`) and the text encoder hidden states (`prompt_embeds`) as memory-mapped shards. Pass
+the output directory to `train_text_to_image.py --use_cached_latents --cached_latents_dir <output_dir>` to train
+without loading the VAE or the text encoder.
+"""
+
+import argparse
+import logging
+import os
+
+import numpy as np
+import torch
+from datasets import load_dataset
+from torchvision import transforms
+from tqdm.auto import tqdm
+from transformers import CLIPTextModel, CLIPTokenizer
+
+from diffusers import AutoencoderKL
+from diffusers.training_utils import LatentsCacheWriter
+from diffusers.utils import check_min_version
+
+
+# Will error if the minimal version of diffusers is not installed. Remove at your own risks.
+check_min_version("0.24.0.dev0")
+
+logger = logging.getLogger(__name__)
+
+DATASET_NAME_MAPPING = {
+    "lambdalabs/pokemon-blip-captions": ("image", "text"),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--pretrained_model_name_or_path",
+        type=str,
+        default=None,
+        required=True,
+        help="Path to pretrained model or model identifier from huggingface.co/models.",
+    )
+    parser.add_argument(
+        "--revision",
+        type=str,
+        default=None,
+        required=False,
+        help="Revision of pretrained model identifier from huggingface.co/models.",
+    )
+    parser.add_argument(
+        "--dataset_name",
+        type=str,
+        default=None,
+        help=(
+            "The name of the Dataset (from the HuggingFace hub) to encode (could be your own, possibly private,"
+            " dataset). It can also be a path pointing to a local copy of a dataset in your filesystem,"
+            " or to a folder containing files that 🤗 Datasets can understand."
+        ),
+    )
+    parser.add_argument(
+        "--dataset_config_name",
+        type=str,
+        default=None,
+        help="The config of the Dataset, leave as None if there's only one config.",
+    )
+    parser.add_argument(
+        "--train_data_dir",
+        type=str,
+        default=None,
+        help=(
+            "A folder containing the training data. Folder contents must follow the structure described in"
+            " https://huggingface.co/docs/datasets/image_dataset#imagefolder. In particular, a `metadata.jsonl` file"
+            " must exist to provide the captions for the images. Ignored if `dataset_name` is specified."
+        ),
+    )
+    parser.add_argument(
+        "--image_column",
+        type=str,
+        default=None,
+        help=(
+            "The column of the dataset containing an image. Defaults to the image column of the known datasets, or to"
+            " the first column."
+        ),
+    )
+    parser.add_argument(
+        "--caption_column",
+        type=str,
+        default=None,
+        help=(
+            "The column of the dataset containing a caption or a list of captions. The first caption is used. Defaults"
+            " to the caption column of the known datasets, or to the second column."
+        ),
+    )
+    parser.add_argument(
+        "--max_train_samples",
+        type=int,
+        default=None,
+        help="For debugging purposes, truncate the number of encoded examples to this value if set.",
+    )
+    parser.add_argument(
+        "--output_dir",
+        type=str,
+        required=True,
+        help="The output directory where the latent shards and the index file will be written.",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        default=None,
+        help="The directory where the downloaded models and datasets will be stored.",
+    )
+    parser.add_argument(
+        "--resolution",
+        type=int,
+        default=512,
+        help="The resolution for input images, all the images will be resized to this resolution.",
+    )
+    parser.add_argument(
+        "--center_crop",
+        default=False,
+        action="store_true",
+        help=(
+            "Whether to center crop the input images to the resolution. If not set, the images will be randomly"
+            " cropped. The crop is drawn once, when the latents are computed."
+        ),
+    )
+    parser.add_argument("--batch_size", type=int, default=16, help="Batch size for the VAE and the text encoder.")
+    parser.add_argument("--shard_size", type=int, default=4096, help="Number of samples per shard.")
+    parser.add_argument(
+        "--dataloader_num_workers",
+        type=int,
+        default=0,
+        help="Number of subprocesses to use for loading and decoding the images.",
+    )
+    parser.add_argument(
+        "--dtype",
+        type=str,
+        default="float16",
+        choices=["float16", "bfloat16", "float32"],
+        help="The dtype the VAE and the text encoder are run in. The outputs are stored as float16 or float32.",
+    )
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+
+    args = parser.parse_args()
+
+    if args.dataset_name is None and args.train_data_dir is None:
+        raise ValueError("Need either a dataset name or a training folder.")
+
+    return args
+
+
+@torch.no_grad()
+def main():
+    args = parse_args()
+    logging.basicConfig(
+        format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+        datefmt="%m/%d/%Y %H:%M:%S",
+        level=logging.INFO,
+    )
+
+    dtype = getattr(torch, args.dtype)
+    # numpy has no bfloat16, so bfloat16 outputs are stored as float32
+    storage_dtype = np.float32 if dtype != torch.float16 else np.float16
+
+    tokenizer = CLIPTokenizer.from_pretrained(
+        args.pretrained_model_name_or_path, subfolder="tokenizer", revision=args.revision
+    )
+    text_encoder = CLIPTextModel.from_pretrained(
+        args.pretrained_model_name_or_path, subfolder="text_encoder", revision=args.revision
+    )
+    vae = AutoencoderKL.from_pretrained(args.pretrained_model_name_or_path, subfolder="vae", revision=args.revision)
+    text_encoder.to(args.device, dtype=dtype).eval()
+    vae.to(args.device, dtype=dtype).eval()
+
+    if args.dataset_name is not None:
+        dataset = load_dataset(
+            args.dataset_name,
+            args.dataset_config_name,
+            cache_dir=args.cache_dir,
+            data_dir=args.train_data_dir,
+        )
+    else:
+        dataset = load_dataset(
+            "imagefolder",
+            data_files={"train": os.path.join(args.train_data_dir, "**")},
+            cache_dir=args.cache_dir,
+        )
+
+    dataset_columns = DATASET_NAME_MAPPING.get(args.dataset_name, None)
+    column_names = dataset["train"].column_names
+    if args.image_column is None:
+        image_column = dataset_columns[0] if dataset_columns is not None else column_names[0]
+    else:
+        image_column = args.image_column
+        if image_column not in column_names:
+            raise ValueError(
+                f"--image_column' value '{args.image_column}' needs to be one of: {', '.join(column_names)}"
+            )
+    if args.caption_column is None:
+        caption_column = dataset_columns[1] if dataset_columns is not None else column_names[1]
+    else:
+        caption_column = args.caption_column
+        if caption_column not in column_names:
+            raise ValueError(
+                f"--caption_column' value '{args.caption_column}' needs to be one of: {', '.join(column_names)}"
+            )
+
+    image_transforms = transforms.Compose(
+        [
+            transforms.Resize(args.resolution, interpolation=transforms.InterpolationMode.BILINEAR),
+            transforms.CenterCrop(args.resolution) if args.center_crop else transforms.RandomCrop(args.resolution),
+            transforms.ToTensor(),
+            transforms.Normalize([0.5], [0.5]),
+        ]
+    )
+
+    def preprocess(examples):
+        captions = [caption if isinstance(caption, str) else caption[0] for caption in examples[caption_column]]
+        examples["pixel_values"] = [image_transforms(image.convert("RGB")) for image in examples[image_column]]
+        examples["input_ids"] = tokenizer(
+            captions, max_length=tokenizer.model_max_length, padding="max_length", truncation=True, return_tensors="pt"
+        ).input_ids
+        return examples
+
+    def collate_fn(examples):
+        pixel_values = torch.stack([example["pixel_values"] for example in examples])
+        input_ids = torch.stack([example["input_ids"] for example in examples])
+        return {"pixel_values": pixel_values, "input_ids": input_ids}
+
+    train_dataset = dataset["train"]
+    if args.max_train_samples is not None:
+        train_dataset = train_dataset.select(range(min(args.max_train_samples, len(train_dataset))))
+    train_dataset = train_dataset.with_transform(preprocess)
+
+    # keep the dataset order so that sample `i` of the cache corresponds to sample `i` of the dataset
+    dataloader = torch.utils.data.DataLoader(
+        train_dataset,
+        batch_size=args.batch_size,
+        shuffle=False,
+        collate_fn=collate_fn,
+        num_workers=args.dataloader_num_workers,
+    )
+
+    metadata = {
+        "pretrained_model_name_or_path": args.pretrained_model_name_or_path,
+        "revision": args.revision,
+        "resolution": args.resolution,
+        "scaling_factor": vae.config.scaling_factor,
+    }
+    with LatentsCacheWriter(args.output_dir, shard_size=args.shard_size, metadata=metadata) as writer:
+        for batch in tqdm(dataloader, desc="Encoding"):
+            latent_dist = vae.encode(batch["pixel_values"].to(args.device, dtype=dtype)).latent_dist
+            prompt_embeds = text_encoder(batch["input_ids"].to(args.device))[0]
+
+            writer.add(
+                latent_mean=latent_dist.mean.float().cpu().numpy().astype(storage_dtype),
+                latent_logvar=latent_dist.logvar.float().cpu().numpy().astype(storage_dtype),
+                prompt_embeds=prompt_embeds.float().cpu().numpy().astype(storage_dtype),
+            )
+
+    logger.info(f"Wrote {len(train_dataset)} encoded samples to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
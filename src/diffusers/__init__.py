@@ -148,6 +148,7 @@ else:
             "LCMScheduler",
             "PNDMScheduler",
             "RePaintScheduler",
+            "SchedulerBatchState",
             "SchedulerMixin",
             "ScoreSdeVeScheduler",
             "UnCLIPScheduler",
@@ -513,6 +514,7 @@ if TYPE_CHECKING or DIFFUSERS_SLOW_IMPORT:
             LCMScheduler,
             PNDMScheduler,
             RePaintScheduler,
+            SchedulerBatchState,
             SchedulerMixin,
             ScoreSdeVeScheduler,
             UnCLIPScheduler,
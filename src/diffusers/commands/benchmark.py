@@ -0,0 +1,574 @@
+# Copyright 2023 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Usage example:
+    diffusers-cli benchmark --suites models schedulers --batch_sizes 1 2 --resolutions 64 128 --output new.json
+    diffusers-cli benchmark --filter "unet_2d" --attention_processors AttnProcessor AttnProcessor2_0
+    diffusers-cli benchmark --output new.json --baseline old.json
+    diffusers-cli benchmark --compare old.json new.json --threshold 0.05
+"""
+
+import gc
+import itertools
+import json
+import platform
+import re
+import statistics
+import sys
+import time
+from argparse import ArgumentParser, Namespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .. import __version__
+from ..utils import logging
+from . import BaseDiffusersCLICommand
+
+
+logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
+
+# maps the metrics compared between two runs to the absolute increase below which they are considered noise, a larger
+# value is worse for all of them
+COMPARED_METRICS = {"wall_time_median": 1e-4, "peak_rss_increase_mb": 1.0, "allocated_mb": 0.1}
+
+
+def benchmark_command_factory(args: Namespace):
+    return BenchmarkCommand(args)
+
+
+def _reset_peak_rss():
+    # on Linux, writing 5 to clear_refs resets the peak resident set size of the process
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _get_rss() -> Tuple[Optional[int], int]:
+    # returns the current and the peak resident set size of the process in bytes
+    try:
+        with open("/proc/self/status") as f:
+            status = f.read()
+        return tuple(int(re.search(rf"{field}:\s+(\d+) kB", status).group(1)) * 1024 for field in ("VmRSS", "VmHWM"))
+    except (OSError, AttributeError):
+        # the peak over the lifetime of the process, in bytes on macOS and in kilobytes elsewhere
+        import resource
+
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return None, peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def _tiny_unet_2d(sample_size):
+    from ..models import UNet2DConditionModel
+
+    return UNet2DConditionModel(
+        block_out_channels=(32, 64),
+        layers_per_block=2,
+        sample_size=sample_size,
+        in_channels=4,
+        out_channels=4,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"),
+        up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+        cross_attention_dim=32,
+    )
+
+
+def _tiny_unet_3d(sample_size):
+    from ..models import UNet3DConditionModel
+
+    return UNet3DConditionModel(
+        block_out_channels=(32, 64),
+        layers_per_block=1,
+        sample_size=sample_size,
+        in_channels=4,
+        out_channels=4,
+        down_block_types=("CrossAttnDownBlock3D", "DownBlock3D"),
+        up_block_types=("UpBlock3D", "CrossAttnUpBlock3D"),
+        cross_attention_dim=32,
+        attention_head_dim=8,
+    )
+
+
+def _tiny_vae():
+    from ..models import AutoencoderKL
+
+    # four blocks downsample by 8, like the VAE of Stable Diffusion
+    return AutoencoderKL(
+        block_out_channels=(32, 32, 64, 64),
+        in_channels=3,
+        out_channels=3,
+        down_block_types=("DownEncoderBlock2D",) * 4,
+        up_block_types=("UpDecoderBlock2D",) * 4,
+        latent_channels=4,
+    )
+
+
+def _set_attention_processor(model, attention_processor):
+    if attention_processor == "default":
+        return
+    from ..models import attention_processor as attention_processor_module
+
+    model.set_attn_processor(getattr(attention_processor_module, attention_processor)())
+
+
+def _randn(*shape):
+    import torch
+
+    return torch.randn(shape, generator=torch.Generator().manual_seed(0))
+
+
+def _unet_2d_condition(batch_size, resolution, attention_processor, **kwargs):
+    unet = _tiny_unet_2d(resolution // 8).eval()
+    _set_attention_processor(unet, attention_processor)
+    sample = _randn(batch_size, 4, resolution // 8, resolution // 8)
+    encoder_hidden_states = _randn(batch_size, 77, 32)
+    return lambda: unet(sample, 10, encoder_hidden_states)
+
+
+def _unet_3d_condition(batch_size, resolution, num_frames, attention_processor, **kwargs):
+    unet = _tiny_unet_3d(resolution // 8).eval()
+    _set_attention_processor(unet, attention_processor)
+    sample = _randn(batch_size, 4, num_frames, resolution // 8, resolution // 8)
+    encoder_hidden_states = _randn(batch_size, 77, 32)
+    return lambda: unet(sample, 10, encoder_hidden_states)
+
+
+def _vae_decode(batch_size, resolution, **kwargs):
+    vae = _tiny_vae().eval()
+    latents = _randn(batch_size, 4, resolution // 8, resolution // 8)
+    return lambda: vae.decode(latents)
+
+
+def _scheduler_step(scheduler, batch_size, resolution, num_inference_steps, **kwargs):
+    from .. import schedulers
+
+    scheduler = getattr(schedulers, scheduler)(**SCHEDULERS[scheduler])
+    sample = _randn(batch_size, 4, resolution // 8, resolution // 8)
+    model_output = _randn(batch_size, 4, resolution // 8, resolution // 8)
+
+    def step():
+        # a fresh loop every run, the schedulers keep state across the steps of a loop
+        scheduler.set_timesteps(num_inference_steps)
+        latents = sample
+        for t in scheduler.timesteps:
+            # the scaled input would be passed to the model, which is replaced by a fixed output here
+            scheduler.scale_model_input(latents, t)
+            latents = scheduler.step(model_output, t, latents).prev_sample
+
+    return step
+
+
+def _stable_diffusion_pipeline(batch_size, resolution, attention_processor, num_inference_steps, **kwargs):
+    import torch
+
+    from ..pipelines import StableDiffusionPipeline
+    from ..schedulers import DDIMScheduler
+
+    pipe = StableDiffusionPipeline(
+        vae=_tiny_vae(),
+        text_encoder=None,
+        tokenizer=None,
+        unet=_tiny_unet_2d(resolution // 8),
+        scheduler=DDIMScheduler(clip_sample=False, steps_offset=1),
+        safety_checker=None,
+        feature_extractor=None,
+        requires_safety_checker=False,
+    )
+    _set_attention_processor(pipe.unet, attention_processor)
+    pipe.set_progress_bar_config(disable=True)
+    # precomputed prompt embeddings skip the text encoder, which would need a tokenizer from the Hub
+    prompt_embeds = _randn(batch_size, 77, 32)
+    negative_prompt_embeds = _randn(batch_size, 77, 32)
+    return lambda: pipe(
+        prompt_embeds=prompt_embeds,
+        negative_prompt_embeds=negative_prompt_embeds,
+        height=resolution,
+        width=resolution,
+        num_inference_steps=num_inference_steps,
+        generator=torch.Generator().manual_seed(0),
+        output_type="np",
+    )
+
+
+def _text_to_video_pipeline(batch_size, resolution, num_frames, attention_processor, num_inference_steps, **kwargs):
+    import torch
+
+    from ..pipelines import TextToVideoSDPipeline
+    from ..schedulers import DDIMScheduler
+
+    pipe = TextToVideoSDPipeline(
+        vae=_tiny_vae(),
+        text_encoder=None,
+        tokenizer=None,
+        unet=_tiny_unet_3d(resolution // 8),
+        scheduler=DDIMScheduler(clip_sample=False, steps_offset=1),
+    )
+    _set_attention_processor(pipe.unet, attention_processor)
+    pipe.set_progress_bar_config(disable=True)
+    prompt_embeds = _randn(batch_size, 77, 32)
+    negative_prompt_embeds = _randn(batch_size, 77, 32)
+    return lambda: pipe(
+        prompt_embeds=prompt_embeds,
+        negative_prompt_embeds=negative_prompt_embeds,
+        height=resolution,
+        width=resolution,
+        num_frames=num_frames,
+        num_inference_steps=num_inference_steps,
+        generator=torch.Generator().manual_seed(0),
+        output_type="pt",
+    )
+
+
+# maps the schedulers to the config they are benchmarked with
+SCHEDULERS = {
+    "DDIMScheduler": {},
+    "DDPMScheduler": {},
+    "DPMSolverMultistepScheduler": {},
+    "EulerAncestralDiscreteScheduler": {},
+    "EulerDiscreteScheduler": {},
+    "LCMScheduler": {},
+    # like Stable Diffusion, which also works with few inference steps
+    "PNDMScheduler": {"skip_prk_steps": True},
+    "UniPCMultistepScheduler": {},
+}
+
+# maps the name of every benchmark to its suite, the function building the callable to time and the axes of the grid
+# of parameters it runs on
+BENCHMARKS = {
+    "unet_2d_condition": ("models", _unet_2d_condition, ["batch_size", "resolution", "attention_processor"]),
+    "unet_3d_condition": (
+        "models",
+        _unet_3d_condition,
+        ["batch_size", "resolution", "num_frames", "attention_processor"],
+    ),
+    "vae_decode": ("models", _vae_decode, ["batch_size", "resolution"]),
+    **{
+        f"scheduler_step[{scheduler}]": (
+            "schedulers",
+            lambda scheduler=scheduler, **kwargs: _scheduler_step(scheduler, **kwargs),
+            ["batch_size", "resolution", "num_inference_steps"],
+        )
+        for scheduler in SCHEDULERS
+    },
+    "stable_diffusion_pipeline": (
+        "pipelines",
+        _stable_diffusion_pipeline,
+        ["batch_size", "resolution", "attention_processor", "num_inference_steps"],
+    ),
+    "text_to_video_pipeline": (
+        "pipelines",
+        _text_to_video_pipeline,
+        ["batch_size", "resolution", "num_frames", "attention_processor", "num_inference_steps"],
+    ),
+}
+
+
+def measure(fn: Callable[[], Any], num_runs: int = 5, num_warmup_runs: int = 1, profile_memory: bool = True):
+    r"""
+    Measures the wall time, the peak resident set size and the allocations of `fn`.
+
+    Args:
+        fn (`Callable`):
+            The function to measure, called without arguments.
+        num_runs (`int`, *optional*, defaults to 5):
+            The number of timed calls.
+        num_warmup_runs (`int`, *optional*, defaults to 1):
+            The number of calls before the timed ones.
+        profile_memory (`bool`, *optional*, defaults to `True`):
+            Whether to count the allocations of one more call with the PyTorch profiler.
+
+    Returns:
+        `Dict[str, float]`: The statistics of the wall time in seconds, the peak resident set size of the process
+        during the timed calls and its increase over the resident set size before them in MB and, if
+        `profile_memory`, the number and the size in MB of the CPU allocations of a single call.
+    """
+    import torch
+
+    with torch.inference_mode():
+        for _ in range(num_warmup_runs):
+            fn()
+
+        _reset_peak_rss()
+        rss, _ = _get_rss()
+        times = []
+        for _ in range(num_runs):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        _, peak_rss = _get_rss()
+
+        metrics = {
+            "wall_time_median": statistics.median(times),
+            "wall_time_mean": statistics.mean(times),
+            "wall_time_min": min(times),
+            "wall_time_stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+            "peak_rss_mb": peak_rss / 2**20,
+            # the memory the calls need on top of the memory of the process before them, like the model weights
+            "peak_rss_increase_mb": (peak_rss - rss) / 2**20 if rss is not None else float("nan"),
+        }
+
+        if profile_memory:
+            with torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU], profile_memory=True) as prof:
+                fn()
+            # the allocations are attributed to the operator that requested them
+            allocations = [event.self_cpu_memory_usage for event in prof.events() if event.name != "[memory]"]
+            allocations = [size for size in allocations if size > 0]
+            metrics["num_allocations"] = len(allocations)
+            metrics["allocated_mb"] = sum(allocations) / 2**20
+
+    return metrics
+
+
+def run_benchmarks(
+    suites: Optional[List[str]] = None,
+    name_filter: Optional[str] = None,
+    batch_sizes: List[int] = [1],
+    resolutions: List[int] = [64],
+    num_frames: List[int] = [8],
+    attention_processors: List[str] = ["default"],
+    num_inference_steps: int = 10,
+    num_runs: int = 5,
+    num_warmup_runs: int = 1,
+    profile_memory: bool = True,
+) -> Dict[str, Any]:
+    r"""
+    Runs the benchmarks on the grid of the given parameters, on CPU with tiny randomly initialized models.
+
+    Args:
+        suites (`List[str]`, *optional*):
+            The suites to run among `"models"`, `"schedulers"` and `"pipelines"`. All of them by default.
+        name_filter (`str`, *optional*):
+            A regular expression, only the benchmarks whose name matches it are run.
+        batch_sizes, resolutions, num_frames, attention_processors (`List`):
+            The values of the grid. A benchmark only runs over the parameters it depends on. The resolution is in
+            pixels and the attention processors are class names of `diffusers.models.attention_processor`, `"default"`
+            keeps the processors of the model.
+        num_inference_steps (`int`, *optional*, defaults to 10):
+            The number of denoising steps of the scheduler and pipeline benchmarks.
+        num_runs, num_warmup_runs, profile_memory:
+            See [`~commands.benchmark.measure`].
+
+    Returns:
+        `Dict[str, Any]`: The environment under `"metadata"` and the metrics of every benchmark under `"results"`,
+        keyed by benchmark name and parameters.
+    """
+    import torch
+
+    grid = {
+        "batch_size": batch_sizes,
+        "resolution": resolutions,
+        "num_frames": num_frames,
+        "attention_processor": attention_processors,
+        "num_inference_steps": [num_inference_steps],
+    }
+
+    results = {}
+    for benchmark, (suite, builder, axes) in BENCHMARKS.items():
+        if suites is not None and suite not in suites:
+            continue
+        if name_filter is not None and re.search(name_filter, benchmark) is None:
+            continue
+
+        for values in itertools.product(*[grid[axis] for axis in axes]):
+            params = dict(zip(axes, values))
+            name = f"{benchmark}({', '.join(f'{key}={value}' for key, value in params.items())})"
+            logger.info(f"Running {name}")
+
+            # release the models of the previous benchmark first
+            gc.collect()
+            torch.manual_seed(0)
+            fn = builder(**params)
+            metrics = measure(fn, num_runs=num_runs, num_warmup_runs=num_warmup_runs, profile_memory=profile_memory)
+            results[name] = {"benchmark": benchmark, "suite": suite, "params": params, **metrics}
+            del fn
+
+    metadata = {
+        "diffusers_version": __version__,
+        "torch_version": torch.__version__,
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "num_threads": torch.get_num_threads(),
+        "num_runs": num_runs,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    return {"metadata": metadata, "results": results}
+
+
+def compare_benchmarks(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1):
+    r"""
+    Compares the metrics of two runs of [`~commands.benchmark.run_benchmarks`].
+
+    Args:
+        baseline (`Dict[str, Any]`):
+            The reference run.
+        current (`Dict[str, Any]`):
+            The run to check.
+        threshold (`float`, *optional*, defaults to 0.1):
+            The relative increase of a metric above which it's flagged as a regression. Increases below the noise
+            floor of a metric in `COMPARED_METRICS` are never flagged.
+
+    Returns:
+        `List[Dict[str, Any]]`: One row per benchmark of both runs and metric, with the baseline and the current value,
+        their ratio and whether it's a regression.
+    """
+    rows = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        for metric in COMPARED_METRICS:
+            if metric not in result or metric not in baseline["results"][name]:
+                continue
+            old, new = baseline["results"][name][metric], result[metric]
+            ratio = new / old if old > 0 else (1.0 if new == 0 else float("inf"))
+            rows.append(
+                {
+                    "name": name,
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "ratio": ratio,
+                    "regression": ratio > 1 + threshold and new - old > COMPARED_METRICS[metric],
+                }
+            )
+    return rows
+
+
+class BenchmarkCommand(BaseDiffusersCLICommand):
+    @staticmethod
+    def register_subcommand(parser: ArgumentParser):
+        benchmark_parser = parser.add_parser("benchmark")
+        benchmark_parser.add_argument(
+            "--suites",
+            type=str,
+            nargs="+",
+            choices=["models", "schedulers", "pipelines"],
+            default=None,
+            help="The suites to run, all of them by default.",
+        )
+        benchmark_parser.add_argument(
+            "--filter", type=str, default=None, help="Only runs the benchmarks whose name matches this regex."
+        )
+        benchmark_parser.add_argument("--batch_sizes", type=int, nargs="+", default=[1])
+        benchmark_parser.add_argument("--resolutions", type=int, nargs="+", default=[64], help="In pixels.")
+        benchmark_parser.add_argument("--num_frames", type=int, nargs="+", default=[8])
+        benchmark_parser.add_argument(
+            "--attention_processors",
+            type=str,
+            nargs="+",
+            default=["default"],
+            help="Class names of `diffusers.models.attention_processor`, `default` keeps the processors of the model.",
+        )
+        benchmark_parser.add_argument("--num_inference_steps", type=int, default=10)
+        benchmark_parser.add_argument("--num_runs", type=int, default=5)
+        benchmark_parser.add_argument("--num_warmup_runs", type=int, default=1)
+        benchmark_parser.add_argument(
+            "--num_threads", type=int, default=None, help="The number of intra-op threads of PyTorch."
+        )
+        benchmark_parser.add_argument(
+            "--no_profile_memory", action="store_true", help="Skips counting the allocations, which is slow."
+        )
+        benchmark_parser.add_argument("--output", type=str, default=None, help="The JSON file to write to.")
+        benchmark_parser.add_argument(
+            "--baseline", type=str, default=None, help="A JSON file of a previous run to compare to."
+        )
+        benchmark_parser.add_argument(
+            "--compare",
+            type=str,
+            nargs=2,
+            default=None,
+            metavar=("BASELINE", "CURRENT"),
+            help="Compares two JSON files of previous runs instead of running the benchmarks.",
+        )
+        benchmark_parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.1,
+            help="The relative increase of a metric above which it's flagged as a regression.",
+        )
+        benchmark_parser.set_defaults(func=benchmark_command_factory)
+
+    def __init__(self, args: Namespace):
+        self.args = args
+
+    def run(self):
+        args = self.args
+        if args.compare is not None:
+            baseline, current = [self._load(path) for path in args.compare]
+        else:
+            if args.num_threads is not None:
+                import torch
+
+                torch.set_num_threads(args.num_threads)
+            current = run_benchmarks(
+                suites=args.suites,
+                name_filter=args.filter,
+                batch_sizes=args.batch_sizes,
+                resolutions=args.resolutions,
+                num_frames=args.num_frames,
+                attention_processors=args.attention_processors,
+                num_inference_steps=args.num_inference_steps,
+                num_runs=args.num_runs,
+                num_warmup_runs=args.num_warmup_runs,
+                profile_memory=not args.no_profile_memory,
+            )
+            self._print_results(current)
+            if args.output is not None:
+                with open(args.output, "w") as f:
+                    json.dump(current, f, indent=2)
+            if args.baseline is None:
+                return
+            baseline = self._load(args.baseline)
+
+        rows = compare_benchmarks(baseline, current, threshold=args.threshold)
+        self._print_comparison(rows)
+        regressions = [row for row in rows if row["regression"]]
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}.")
+            sys.exit(1)
+
+    @staticmethod
+    def _load(path):
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def _print_results(results):
+        width = max([len(name) for name in results["results"]] + [9])
+        print(
+            f"{'benchmark':<{width}} | {'median (s)':>10} | {'stdev (s)':>9} | {'peak RSS (MB)':>13} |"
+            f" {'RSS increase (MB)':>17} | {'allocs':>8} | {'alloc (MB)':>10}"
+        )
+        for name, result in results["results"].items():
+            allocations = (
+                f"{result['num_allocations']:>8} | {result['allocated_mb']:>10.2f}"
+                if "allocated_mb" in result
+                else f"{'-':>8} | {'-':>10}"
+            )
+            print(
+                f"{name:<{width}} | {result['wall_time_median']:>10.4f} | {result['wall_time_stdev']:>9.4f} |"
+                f" {result['peak_rss_mb']:>13.1f} | {result['peak_rss_increase_mb']:>17.1f} | {allocations}"
+            )
+
+    @staticmethod
+    def _print_comparison(rows):
+        width = max([len(row["name"]) for row in rows] + [9])
+        print(f"\n{'benchmark':<{width}} | {'metric':<20} | {'baseline':>10} | {'current':>10} | {'ratio':>6} |")
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(
+                f"{row['name']:<{width}} | {row['metric']:<20} | {row['baseline']:>10.4f} | {row['current']:>10.4f} |"
+                f" {row['ratio']:>6.2f} | {flag}"
+            )
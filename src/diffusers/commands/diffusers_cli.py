@@ -15,6 +15,7 @@
 
 from argparse import ArgumentParser
 
+from .benchmark import BenchmarkCommand
 from .env import EnvironmentCommand
 from .fp16_safetensors import FP16SafetensorsCommand
 
@@ -26,6 +27,7 @@ def main():
     # Register commands
     EnvironmentCommand.register_subcommand(commands_parser)
     FP16SafetensorsCommand.register_subcommand(commands_parser)
+    BenchmarkCommand.register_subcommand(commands_parser)
 
     # Let's go
     args = parser.parse_args()
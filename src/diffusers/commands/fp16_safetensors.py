@@ -23,7 +23,6 @@ from argparse import ArgumentParser, Namespace
 from importlib import import_module
 
 import huggingface_hub
-import torch
 from huggingface_hub import hf_hub_download
 from packaging import version
 
@@ -78,6 +77,8 @@ class FP16SafetensorsCommand(BaseDiffusersCLICommand):
         self.use_auth_token = use_auth_token
 
     def run(self):
+        import torch
+
         if version.parse(huggingface_hub.__version__) < version.parse("0.9.0"):
             raise ImportError(
                 "The huggingface_hub version must be >= 0.9.0 to use this command. Please update your huggingface_hub"
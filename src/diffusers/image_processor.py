@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import warnings
+from collections.abc import Sequence
 from typing import List, Optional, Tuple, Union
 
 import numpy as np
@@ -22,6 +23,7 @@ from PIL import Image
 
 from .configuration_utils import ConfigMixin, register_to_config
 from .utils import CONFIG_NAME, PIL_INTERPOLATION, deprecate
+from .utils.torch_utils import tensor_to_numpy
 
 
 PipelineImageInput = Union[
@@ -34,6 +36,42 @@ PipelineImageInput = Union[
 ]
 
 
+class LazyPILFrames(Sequence):
+    """
+    A sequence of `PIL.Image.Image` video frames backed by a single `uint8` NumPy array. Frames are only converted to
+    PIL images when they are accessed.
+
+    Args:
+        frames (`np.ndarray`):
+            A `uint8` array of shape `(num_frames, height, width, channels)`.
+    """
+
+    def __init__(self, frames: np.ndarray):
+        self.frames = frames
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[PIL.Image.Image, "LazyPILFrames"]:
+        if isinstance(index, slice):
+            return LazyPILFrames(self.frames[index])
+
+        frame = self.frames[index]
+        if frame.shape[-1] == 1:
+            # special case for grayscale (single channel) images
+            return Image.fromarray(frame.squeeze(-1), mode="L")
+        return Image.fromarray(frame)
+
+    def __array__(self, dtype=None) -> np.ndarray:
+        return self.frames if dtype is None else self.frames.astype(dtype)
+
+    def __repr__(self) -> str:
+        num_frames, height, width, channels = self.frames.shape
+        return (
+            f"{self.__class__.__name__}(num_frames={num_frames}, height={height}, width={width}, channels={channels})"
+        )
+
+
 class VaeImageProcessor(ConfigMixin):
     """
     Image processor for VAE.
@@ -397,6 +435,65 @@ class VaeImageProcessor(ConfigMixin):
         if output_type == "pil":
             return self.numpy_to_pil(image)
 
+    def postprocess_video(
+        self,
+        video: torch.FloatTensor,
+        output_type: str = "np",
+        do_denormalize: Optional[bool] = None,
+    ) -> Union[np.ndarray, List[LazyPILFrames], torch.FloatTensor]:
+        """
+        Postprocess a batch of videos from tensor to `output_type` in a single vectorized pass. Denormalization and
+        quantization happen on the device of `video` and the result is copied to the host with a single transfer.
+
+        Args:
+            video (`torch.FloatTensor`):
+                The video input, should be a pytorch tensor with shape `B x C x F x H x W`.
+            output_type (`str`, *optional*, defaults to `np`):
+                The output type of the video, can be one of `pil`, `np`, `pt`, `latent`.
+            do_denormalize (`bool`, *optional*, defaults to `None`):
+                Whether to denormalize the video to [0,1]. If `None`, will use the value of `do_normalize` in the
+                `VaeImageProcessor` config.
+
+        Returns:
+            `np.ndarray`, `List[LazyPILFrames]` or `torch.FloatTensor`:
+                The postprocessed video. For `np`, a float32 array of shape `B x F x H x W x C`. For `pil`, one
+                [`~image_processor.LazyPILFrames`] per video.
+        """
+        if not isinstance(video, torch.Tensor) or video.ndim != 5:
+            raise ValueError(
+                f"Input for video postprocessing should be a 5-D pytorch tensor of shape `B x C x F x H x W` but is {type(video)}"
+                f"{' of shape ' + str(tuple(video.shape)) if isinstance(video, torch.Tensor) else ''}."
+            )
+        if output_type not in ["latent", "pt", "np", "pil"]:
+            deprecation_message = (
+                f"the output_type {output_type} is outdated and has been set to `np`. Please make sure to set it to one of these instead: "
+                "`pil`, `np`, `pt`, `latent`"
+            )
+            deprecate("Unsupported output_type", "1.0.0", deprecation_message, standard_warn=False)
+            output_type = "np"
+
+        if output_type == "latent":
+            return video
+
+        if do_denormalize is None:
+            do_denormalize = self.config.do_normalize
+
+        if do_denormalize:
+            video = self.denormalize(video)
+
+        if output_type == "pt":
+            return video
+
+        # B x C x F x H x W -> B x F x H x W x C
+        video = video.permute(0, 2, 3, 4, 1)
+
+        if output_type == "np":
+            return tensor_to_numpy(video.float())
+
+        # quantize on device so that only uint8 data is copied to the host
+        video = tensor_to_numpy((video.float() * 255).round_().to(torch.uint8))
+        return [LazyPILFrames(frames) for frames in video]
+
 
 class VaeImageProcessorLDM3D(VaeImageProcessor):
     """
@@ -1228,6 +1228,99 @@ class LoraLoaderMixin:
         # Safe to call the following regardless of LoRA.
         self._remove_text_encoder_monkey_patch()
 
+    def load_batched_lora_weights(self, adapters: Dict[str, Union[str, Dict[str, torch.Tensor]]], **kwargs):
+        """
+        Load the UNet LoRA layers of several adapters side by side, so that every image of a batch can use a different
+        adapter without fusing or unfusing any weight. Select the adapters with
+        [`~loaders.LoraLoaderMixin.set_batched_lora_adapters`]. The text encoder LoRA layers are not loaded.
+
+        See [`~loaders.UNet2DConditionLoadersMixin.load_batched_lora_weights`] for more details.
+
+        Parameters:
+            adapters (`Dict[str, Union[str, Dict[str, torch.Tensor]]]`):
+                Maps the adapter names to a model id on the Hub, a directory containing the LoRA weights or a LoRA
+                state dict.
+            kwargs (`dict`, *optional*):
+                See [`~loaders.LoraLoaderMixin.lora_state_dict`].
+
+        Example:
+
+        ```py
+        from diffusers import DiffusionPipeline
+        import torch
+
+        pipeline = DiffusionPipeline.from_pretrained(
+            "stabilityai/stable-diffusion-xl-base-1.0", torch_dtype=torch.float16
+        ).to("cuda")
+        pipeline.load_batched_lora_weights(
+            {
+                "pixel": "nerijs/pixel-art-xl",
+                "toy": "CiroN2022/toy-face",
+            },
+        )
+        pipeline.set_batched_lora_adapters(["pixel", "toy", None])
+        images = pipeline(["a cat", "a dog", "a bird"]).images
+        ```
+        """
+        low_cpu_mem_usage = kwargs.pop("low_cpu_mem_usage", _LOW_CPU_MEM_USAGE_DEFAULT)
+
+        state_dicts, network_alphas = {}, {}
+        for adapter_name, pretrained_model_name_or_path_or_dict in adapters.items():
+            state_dict, alphas = self.lora_state_dict(pretrained_model_name_or_path_or_dict, **kwargs)
+
+            is_correct_format = all("lora" in key for key in state_dict.keys())
+            if not is_correct_format:
+                raise ValueError("Invalid LoRA checkpoint.")
+
+            keys = list(state_dict.keys())
+            if all(key.startswith(self.unet_name) or key.startswith(self.text_encoder_name) for key in keys):
+                if any(key.startswith(self.text_encoder_name) for key in keys):
+                    logger.warning(
+                        f"The text encoder LoRA layers of the adapter {adapter_name} are ignored by batched LoRA"
+                        " inference."
+                    )
+                state_dict = {
+                    k.replace(f"{self.unet_name}.", ""): v
+                    for k, v in state_dict.items()
+                    if k.startswith(self.unet_name)
+                }
+                if alphas is not None:
+                    alphas = {
+                        k.replace(f"{self.unet_name}.", ""): v
+                        for k, v in alphas.items()
+                        if k.startswith(self.unet_name)
+                    }
+
+            state_dicts[adapter_name] = state_dict
+            network_alphas[adapter_name] = alphas
+
+        unet = getattr(self, self.unet_name) if not hasattr(self, "unet") else self.unet
+        unet.load_batched_lora_weights(
+            state_dicts, network_alphas=network_alphas, low_cpu_mem_usage=low_cpu_mem_usage, _pipeline=self
+        )
+
+    def set_batched_lora_adapters(
+        self, adapter_names: Optional[List[Optional[str]]], do_classifier_free_guidance: bool = True
+    ):
+        """
+        Set the adapter of every image of the batch loaded with [`~loaders.LoraLoaderMixin.load_batched_lora_weights`].
+
+        Parameters:
+            adapter_names (`List[Optional[str]]`, *optional*):
+                One adapter name per generated image, in the order of the prompts and, with `num_images_per_prompt >
+                1`, of the images of every prompt. `None` generates an image without LoRA. Passing `None` instead of a
+                list disables all the adapters.
+            do_classifier_free_guidance (`bool`, *optional*, defaults to `True`):
+                Whether the pipeline will be called with classifier-free guidance, which doubles the batch passed to the
+                UNet.
+        """
+        if adapter_names is not None and do_classifier_free_guidance:
+            # the unconditional and the conditional batch are concatenated
+            adapter_names = list(adapter_names) * 2
+
+        unet = getattr(self, self.unet_name) if not hasattr(self, "unet") else self.unet
+        unet.set_batched_lora_adapters(adapter_names)
+
     def fuse_lora(
         self,
         fuse_unet: bool = True,
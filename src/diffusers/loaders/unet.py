@@ -534,6 +534,107 @@ class UNet2DConditionLoadersMixin:
             if isinstance(module, BaseTunerLayer):
                 module.unmerge()
 
+    def load_batched_lora_weights(
+        self,
+        adapters: Dict[str, Union[str, Dict[str, torch.Tensor]]],
+        network_alphas: Optional[Dict[str, Dict[str, float]]] = None,
+        **kwargs,
+    ):
+        r"""
+        Load several LoRAs side by side so that every sample of a batch can use a different one. The low-rank factors
+        of the adapters are stacked in [`~models.lora.BatchedLoRALinearLayer`]s and
+        [`~models.lora.BatchedLoRAConv2dLayer`]s and applied with batched matrix multiplications, so switching adapters
+        doesn't fuse or unfuse any weight. Use [`~loaders.UNet2DConditionLoadersMixin.set_batched_lora_adapters`] to
+        pick the adapter of every sample. Any LoRA layer loaded before is replaced.
+
+        Parameters:
+            adapters (`Dict[str, Union[str, Dict[str, torch.Tensor]]]`):
+                Maps the adapter names to the LoRA weights, see
+                [`~loaders.UNet2DConditionLoadersMixin.load_attn_procs`].
+            network_alphas (`Dict[str, Dict[str, float]]`, *optional*):
+                Maps the adapter names to their network alphas.
+            kwargs (`dict`, *optional*):
+                See [`~loaders.UNet2DConditionLoadersMixin.load_attn_procs`].
+
+        Example:
+
+        ```py
+        pipeline.unet.load_batched_lora_weights({"pixel": "path/to/pixel-lora", "toy": "path/to/toy-lora"})
+        # the UNet sees the unconditional and the conditional half of the batch with classifier-free guidance
+        pipeline.unet.set_batched_lora_adapters(["pixel", "toy", None] * 2)
+        images = pipeline(["a cat", "a dog", "a bird"]).images
+        ```
+        """
+        if USE_PEFT_BACKEND:
+            raise ValueError("Batched LoRA inference is only supported without the PEFT backend.")
+
+        from ..models.lora import (
+            BatchedLoRAConv2dLayer,
+            BatchedLoRALinearLayer,
+            LoRACompatibleConv,
+            LoRACompatibleLinear,
+        )
+
+        network_alphas = network_alphas or {}
+        lora_modules = [
+            module for module in self.modules() if isinstance(module, (LoRACompatibleConv, LoRACompatibleLinear))
+        ]
+        for module in lora_modules:
+            module.set_lora_layer(None)
+
+        lora_layers = defaultdict(list)
+        for adapter_name, pretrained_model_name_or_path_or_dict in adapters.items():
+            if isinstance(pretrained_model_name_or_path_or_dict, dict):
+                # `load_attn_procs` empties the state dict
+                pretrained_model_name_or_path_or_dict = dict(pretrained_model_name_or_path_or_dict)
+            self.load_attn_procs(
+                pretrained_model_name_or_path_or_dict, network_alphas=network_alphas.get(adapter_name), **kwargs
+            )
+            for module in lora_modules:
+                lora_layers[module].append(module.lora_layer)
+                module.set_lora_layer(None)
+
+        for module, layers in lora_layers.items():
+            if all(layer is None for layer in layers):
+                continue
+            if isinstance(module, LoRACompatibleConv):
+                module.set_lora_layer(BatchedLoRAConv2dLayer.from_lora_layers(layers))
+            else:
+                module.set_lora_layer(BatchedLoRALinearLayer.from_lora_layers(layers))
+
+        self.batched_lora_adapters = list(adapters.keys())
+
+    def set_batched_lora_adapters(self, adapter_names: Optional[List[Optional[str]]]):
+        r"""
+        Set the adapter of every sample of the batch loaded with
+        [`~loaders.UNet2DConditionLoadersMixin.load_batched_lora_weights`].
+
+        Parameters:
+            adapter_names (`List[Optional[str]]`, *optional*):
+                One adapter name per sample of the batch passed to the UNet, `None` runs a sample without LoRA. Video
+                models may fold the frames into the batch dimension of their layers, which then reuse the adapter of
+                the sample for all its frames. Passing `None` instead of a list disables all the adapters.
+        """
+        from ..models.lora import BatchedLoRAConv2dLayer, BatchedLoRALinearLayer
+
+        adapter_indices = None
+        if adapter_names is not None:
+            batched_lora_adapters = getattr(self, "batched_lora_adapters", [])
+            unknown_adapters = {name for name in adapter_names if name is not None} - set(batched_lora_adapters)
+            if len(unknown_adapters) > 0:
+                raise ValueError(
+                    f"Adapters {sorted(unknown_adapters)} are not loaded, the loaded batched LoRA adapters are"
+                    f" {batched_lora_adapters}."
+                )
+            adapter_indices = torch.tensor(
+                [-1 if name is None else batched_lora_adapters.index(name) for name in adapter_names],
+                device=self.device,
+            )
+
+        for module in self.modules():
+            if isinstance(module, (BatchedLoRALinearLayer, BatchedLoRAConv2dLayer)):
+                module.adapter_indices = adapter_indices
+
     def set_adapters(
         self,
         adapter_names: Union[List[str], str],
@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from importlib import import_module
-from typing import Callable, Optional, Union
+from typing import Callable, Optional, Tuple, Union
 
 import torch
 import torch.nn.functional as F
@@ -507,7 +507,8 @@ class Attention(nn.Module):
             hidden_states (`torch.Tensor`):
                 The hidden states of the query.
             encoder_hidden_states (`torch.Tensor`, *optional*):
-                The hidden states of the encoder.
+                The hidden states of the encoder. Video models can pass one row per sample for `hidden_states` with
+                one row per frame, the keys and values are then computed once per sample and shared by its frames.
             attention_mask (`torch.Tensor`, *optional*):
                 The attention mask to use. If `None`, no mask is applied.
             **cross_attention_kwargs:
@@ -516,6 +517,15 @@ class Attention(nn.Module):
         Returns:
             `torch.Tensor`: The output of the attention layer.
         """
+        if (
+            encoder_hidden_states is not None
+            and encoder_hidden_states.ndim == 3
+            and encoder_hidden_states.shape[0] != hidden_states.shape[0]
+        ):
+            return self._forward_frame_shared(
+                hidden_states, encoder_hidden_states, attention_mask, **cross_attention_kwargs
+            )
+
         # The `Attention` class can call different attention processors / attention functions
         # here we simply pass along all tensors to the selected processor class
         # For standard processors that are defined here, `**cross_attention_kwargs` is empty
@@ -527,6 +537,54 @@ class Attention(nn.Module):
             **cross_attention_kwargs,
         )
 
+    def _forward_frame_shared(
+        self,
+        hidden_states: torch.FloatTensor,
+        encoder_hidden_states: torch.FloatTensor,
+        attention_mask: Optional[torch.FloatTensor] = None,
+        **cross_attention_kwargs,
+    ) -> torch.Tensor:
+        # `encoder_hidden_states` hold one row per sample while `hidden_states` hold one row per frame of a sample,
+        # as passed by the video UNets. The frames of a sample are adjacent in the batch and attend to the same keys
+        # and values, so they are folded into the sequence dimension to project the keys and values once per sample.
+        batch_size = encoder_hidden_states.shape[0]
+        if hidden_states.shape[0] % batch_size != 0:
+            raise ValueError(
+                f"The batch size {hidden_states.shape[0]} of `hidden_states` is not a multiple of the batch size"
+                f" {batch_size} of `encoder_hidden_states`."
+            )
+        num_frames = hidden_states.shape[0] // batch_size
+
+        can_fold = (
+            hidden_states.ndim == 3
+            # the norms and the added keys and values of the hidden states are computed per frame
+            and self.group_norm is None
+            and self.spatial_norm is None
+            and self.added_kv_proj_dim is None
+            and (attention_mask is None or attention_mask.shape[0] == batch_size)
+        )
+        if not can_fold:
+            encoder_hidden_states = encoder_hidden_states.repeat_interleave(num_frames, dim=0)
+            if attention_mask is not None and attention_mask.shape[0] == batch_size:
+                attention_mask = attention_mask.repeat_interleave(num_frames, dim=0)
+            return self.processor(
+                self,
+                hidden_states,
+                encoder_hidden_states=encoder_hidden_states,
+                attention_mask=attention_mask,
+                **cross_attention_kwargs,
+            )
+
+        _, sequence_length, channels = hidden_states.shape
+        hidden_states = self.processor(
+            self,
+            hidden_states.reshape(batch_size, num_frames * sequence_length, channels),
+            encoder_hidden_states=encoder_hidden_states,
+            attention_mask=attention_mask,
+            **cross_attention_kwargs,
+        )
+        return hidden_states.reshape(batch_size * num_frames, sequence_length, -1)
+
     def batch_to_head_dim(self, tensor: torch.Tensor) -> torch.Tensor:
         r"""
         Reshape the tensor from `[batch_size, seq_len, dim]` to `[batch_size // heads, seq_len, dim * heads]`. `heads`
@@ -1660,6 +1718,197 @@ class SlicedAttnAddedKVProcessor:
         return hidden_states
 
 
+class ChunkedAttnProcessor:
+    r"""
+    Processor for implementing memory-efficient attention by chunking the query and key sequences and combining the
+    per-chunk results with an online softmax (https://arxiv.org/abs/2112.05682). Only a `query_chunk_size x
+    key_chunk_size` block of the attention score matrix is materialized at a time, so peak memory is bounded
+    independently of the sequence length. Works on any device and does not require xFormers or PyTorch 2.0.
+
+    Args:
+        query_chunk_size (`int`, *optional*):
+            The number of query tokens processed at once. If `None`, it is chosen so that a score block holds at most
+            `max_chunk_elements` elements.
+        key_chunk_size (`int`, *optional*):
+            The number of key tokens processed at once. If `None`, defaults to `min(key_length, 4096)`.
+        max_chunk_elements (`int`, *optional*, defaults to `2**24`):
+            Upper bound on the number of elements of a single score block (summed over batch and heads) when the chunk
+            sizes are chosen automatically.
+    """
+
+    def __init__(
+        self,
+        query_chunk_size: Optional[int] = None,
+        key_chunk_size: Optional[int] = None,
+        max_chunk_elements: int = 2**24,
+    ):
+        self.query_chunk_size = query_chunk_size
+        self.key_chunk_size = key_chunk_size
+        self.max_chunk_elements = max_chunk_elements
+
+    def get_chunk_sizes(self, batch_size: int, query_length: int, key_length: int) -> Tuple[int, int]:
+        r"""
+        Returns the `(query_chunk_size, key_chunk_size)` used for a `batch_size x query_length x key_length` score
+        matrix.
+        """
+        key_chunk_size = self.key_chunk_size or min(key_length, 4096)
+        key_chunk_size = min(key_chunk_size, key_length)
+
+        query_chunk_size = self.query_chunk_size
+        if query_chunk_size is None:
+            query_chunk_size = max(1, self.max_chunk_elements // (batch_size * key_chunk_size))
+        query_chunk_size = min(query_chunk_size, query_length)
+
+        return query_chunk_size, key_chunk_size
+
+    def __call__(
+        self,
+        attn: Attention,
+        hidden_states: torch.FloatTensor,
+        encoder_hidden_states: Optional[torch.FloatTensor] = None,
+        attention_mask: Optional[torch.FloatTensor] = None,
+        temb: Optional[torch.FloatTensor] = None,
+        scale: float = 1.0,
+    ) -> torch.Tensor:
+        residual = hidden_states
+
+        args = () if USE_PEFT_BACKEND else (scale,)
+
+        if attn.spatial_norm is not None:
+            hidden_states = attn.spatial_norm(hidden_states, temb)
+
+        input_ndim = hidden_states.ndim
+
+        if input_ndim == 4:
+            batch_size, channel, height, width = hidden_states.shape
+            hidden_states = hidden_states.view(batch_size, channel, height * width).transpose(1, 2)
+
+        batch_size, sequence_length, _ = (
+            hidden_states.shape if encoder_hidden_states is None else encoder_hidden_states.shape
+        )
+        attention_mask = attn.prepare_attention_mask(attention_mask, sequence_length, batch_size)
+
+        if attn.group_norm is not None:
+            hidden_states = attn.group_norm(hidden_states.transpose(1, 2)).transpose(1, 2)
+
+        query = attn.to_q(hidden_states, *args)
+
+        if encoder_hidden_states is None:
+            encoder_hidden_states = hidden_states
+        elif attn.norm_cross:
+            encoder_hidden_states = attn.norm_encoder_hidden_states(encoder_hidden_states)
+
+        key = attn.to_k(encoder_hidden_states, *args)
+        value = attn.to_v(encoder_hidden_states, *args)
+
+        query = attn.head_to_batch_dim(query)
+        key = attn.head_to_batch_dim(key)
+        value = attn.head_to_batch_dim(value)
+
+        hidden_states = self.chunked_attention(attn, query, key, value, attention_mask)
+        hidden_states = attn.batch_to_head_dim(hidden_states)
+
+        # linear proj
+        hidden_states = attn.to_out[0](hidden_states, *args)
+        # dropout
+        hidden_states = attn.to_out[1](hidden_states)
+
+        if input_ndim == 4:
+            hidden_states = hidden_states.transpose(-1, -2).reshape(batch_size, channel, height, width)
+
+        if attn.residual_connection:
+            hidden_states = hidden_states + residual
+
+        hidden_states = hidden_states / attn.rescale_output_factor
+
+        return hidden_states
+
+    def chunked_attention(
+        self,
+        attn: Attention,
+        query: torch.Tensor,
+        key: torch.Tensor,
+        value: torch.Tensor,
+        attention_mask: Optional[torch.Tensor] = None,
+    ) -> torch.Tensor:
+        r"""
+        Computes `softmax(query @ key^T * scale + attention_mask) @ value` chunk by chunk for `(batch * heads, length,
+        head_dim)` inputs.
+        """
+        batch_size_attention, query_tokens, _ = query.shape
+        key_tokens = key.shape[1]
+        query_chunk_size, key_chunk_size = self.get_chunk_sizes(batch_size_attention, query_tokens, key_tokens)
+
+        dtype = query.dtype
+        if attn.upcast_attention:
+            query = query.float()
+            key = key.float()
+        score_dtype = torch.float32 if attn.upcast_softmax else query.dtype
+        # starting from the lowest finite value instead of -inf keeps fully masked rows free of NaNs
+        min_value = torch.finfo(score_dtype).min
+
+        hidden_states = torch.empty(
+            (batch_size_attention, query_tokens, value.shape[-1]), device=query.device, dtype=dtype
+        )
+
+        for query_start in range(0, query_tokens, query_chunk_size):
+            query_end = min(query_start + query_chunk_size, query_tokens)
+            query_chunk = query[:, query_start:query_end]
+
+            running_max = None
+            running_sum = None
+            accumulator = None
+
+            for key_start in range(0, key_tokens, key_chunk_size):
+                key_end = min(key_start + key_chunk_size, key_tokens)
+
+                if attention_mask is None:
+                    baddbmm_input = torch.empty(
+                        query_chunk.shape[0],
+                        query_chunk.shape[1],
+                        key_end - key_start,
+                        dtype=query_chunk.dtype,
+                        device=query_chunk.device,
+                    )
+                    beta = 0
+                else:
+                    mask_chunk = attention_mask[..., key_start:key_end]
+                    if mask_chunk.shape[-2] != 1:
+                        mask_chunk = mask_chunk[..., query_start:query_end, :]
+                    baddbmm_input = mask_chunk
+                    beta = 1
+
+                scores = torch.baddbmm(
+                    baddbmm_input,
+                    query_chunk,
+                    key[:, key_start:key_end].transpose(-1, -2),
+                    beta=beta,
+                    alpha=attn.scale,
+                )
+                del baddbmm_input
+                scores = scores.to(score_dtype)
+                value_chunk = value[:, key_start:key_end].to(score_dtype)
+
+                chunk_max = scores.amax(dim=-1, keepdim=True).clamp_min(min_value)
+                if running_max is None:
+                    running_max = chunk_max
+                    scores = torch.exp(scores - running_max)
+                    running_sum = scores.sum(dim=-1, keepdim=True)
+                    accumulator = torch.bmm(scores, value_chunk)
+                else:
+                    new_max = torch.maximum(running_max, chunk_max)
+                    correction = torch.exp(running_max - new_max)
+                    running_max = new_max
+                    scores = torch.exp(scores - running_max)
+                    running_sum = running_sum * correction + scores.sum(dim=-1, keepdim=True)
+                    accumulator = torch.baddbmm(accumulator * correction, scores, value_chunk)
+                del scores
+
+            hidden_states[:, query_start:query_end] = (accumulator / running_sum).to(dtype)
+
+        return hidden_states
+
+
 class SpatialNorm(nn.Module):
     """
     Spatially conditioned normalization as defined in https://arxiv.org/abs/2209.09002.
@@ -2239,6 +2488,7 @@ CROSS_ATTENTION_PROCESSORS = (
     AttnProcessor2_0,
     XFormersAttnProcessor,
     SlicedAttnProcessor,
+    ChunkedAttnProcessor,
     LoRAAttnProcessor,
     LoRAAttnProcessor2_0,
     LoRAXFormersAttnProcessor,
@@ -2251,6 +2501,7 @@ AttentionProcessor = Union[
     AttnProcessor2_0,
     XFormersAttnProcessor,
     SlicedAttnProcessor,
+    ChunkedAttnProcessor,
     AttnAddedKVProcessor,
     SlicedAttnAddedKVProcessor,
     AttnAddedKVProcessor2_0,
@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from dataclasses import dataclass
-from typing import Dict, Optional, Tuple, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import torch
 import torch.nn as nn
@@ -136,18 +136,25 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalVAEMixin):
         )
         self.tile_latent_min_size = int(sample_size / (2 ** (len(self.config.block_out_channels) - 1)))
         self.tile_overlap_factor = 0.25
+        self.tile_batch_size = 1
 
     def _set_gradient_checkpointing(self, module, value=False):
         if isinstance(module, (Encoder, Decoder)):
             module.gradient_checkpointing = value
 
-    def enable_tiling(self, use_tiling: bool = True):
+    def enable_tiling(self, use_tiling: bool = True, tile_batch_size: Optional[int] = 1):
         r"""
         Enable tiled VAE decoding. When this option is enabled, the VAE will split the input tensor into tiles to
         compute decoding and encoding in several steps. This is useful for saving a large amount of memory and to allow
         processing larger images.
+
+        Args:
+            tile_batch_size (`int`, *optional*, defaults to 1):
+                The number of tiles passed through the encoder or decoder in a single call. Larger values trade memory
+                for speed. If `None`, all tiles of the same size are processed at once.
         """
         self.use_tiling = use_tiling
+        self.tile_batch_size = tile_batch_size
 
     def disable_tiling(self):
         r"""
@@ -256,7 +263,9 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalVAEMixin):
         Encode a batch of images into latents.
 
         Args:
-            x (`torch.FloatTensor`): Input batch of images.
+            x (`torch.FloatTensor`):
+                Input batch of images, or of videos of shape `(batch_size, channels, num_frames, height, width)`. The
+                frames of a video are encoded like a batch of images.
             return_dict (`bool`, *optional*, defaults to `True`):
                 Whether to return a [`~models.autoencoder_kl.AutoencoderKLOutput`] instead of a plain tuple.
 
@@ -264,6 +273,15 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalVAEMixin):
                 The latent representations of the encoded images. If `return_dict` is True, a
                 [`~models.autoencoder_kl.AutoencoderKLOutput`] is returned, otherwise a plain `tuple` is returned.
         """
+        if x.ndim == 5:
+            batch_size, num_frames = x.shape[0], x.shape[2]
+            posterior = self.encode(x.transpose(1, 2).flatten(0, 1)).latent_dist
+            moments = posterior.parameters.unflatten(0, (batch_size, num_frames)).transpose(1, 2)
+            posterior = DiagonalGaussianDistribution(moments)
+            if not return_dict:
+                return (posterior,)
+            return AutoencoderKLOutput(latent_dist=posterior)
+
         if self.use_tiling and (x.shape[-1] > self.tile_sample_min_size or x.shape[-2] > self.tile_sample_min_size):
             return self.tiled_encode(x, return_dict=return_dict)
 
@@ -301,7 +319,9 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalVAEMixin):
         Decode a batch of images.
 
         Args:
-            z (`torch.FloatTensor`): Input batch of latent vectors.
+            z (`torch.FloatTensor`):
+                Input batch of latent vectors, or of video latents of shape `(batch_size, channels, num_frames, height,
+                width)`. The frames of a video are decoded like a batch of images.
             return_dict (`bool`, *optional*, defaults to `True`):
                 Whether to return a [`~models.vae.DecoderOutput`] instead of a plain tuple.
 
@@ -311,7 +331,11 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalVAEMixin):
                 returned.
 
         """
-        if self.use_slicing and z.shape[0] > 1:
+        if z.ndim == 5:
+            batch_size, num_frames = z.shape[0], z.shape[2]
+            decoded = self.decode(z.transpose(1, 2).flatten(0, 1)).sample
+            decoded = decoded.unflatten(0, (batch_size, num_frames)).transpose(1, 2)
+        elif self.use_slicing and z.shape[0] > 1:
             decoded_slices = [self._decode(z_slice).sample for z_slice in z.split(1)]
             decoded = torch.cat(decoded_slices)
         else:
@@ -324,16 +348,43 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalVAEMixin):
 
     def blend_v(self, a: torch.Tensor, b: torch.Tensor, blend_extent: int) -> torch.Tensor:
         blend_extent = min(a.shape[2], b.shape[2], blend_extent)
-        for y in range(blend_extent):
-            b[:, :, y, :] = a[:, :, -blend_extent + y, :] * (1 - y / blend_extent) + b[:, :, y, :] * (y / blend_extent)
+        if blend_extent == 0:
+            return b
+        # the ramp is built on the CPU, MPS doesn't support float64
+        weight = (torch.arange(blend_extent, dtype=torch.float64) / blend_extent).to(b.device, b.dtype)
+        weight = weight[:, None]
+        b[:, :, :blend_extent, :] = a[:, :, -blend_extent:, :] * (1 - weight) + b[:, :, :blend_extent, :] * weight
         return b
 
     def blend_h(self, a: torch.Tensor, b: torch.Tensor, blend_extent: int) -> torch.Tensor:
         blend_extent = min(a.shape[3], b.shape[3], blend_extent)
-        for x in range(blend_extent):
-            b[:, :, :, x] = a[:, :, :, -blend_extent + x] * (1 - x / blend_extent) + b[:, :, :, x] * (x / blend_extent)
+        if blend_extent == 0:
+            return b
+        # the ramp is built on the CPU, MPS doesn't support float64
+        weight = (torch.arange(blend_extent, dtype=torch.float64) / blend_extent).to(b.device, b.dtype)
+        b[:, :, :, :blend_extent] = a[:, :, :, -blend_extent:] * (1 - weight) + b[:, :, :, :blend_extent] * weight
         return b
 
+    def _forward_tiles(self, tiles: List[torch.Tensor], fn: Callable) -> List[torch.Tensor]:
+        # Tiles of the same size are concatenated along the batch dimension and passed through `fn`
+        # `tile_batch_size` tiles at a time, instead of calling `fn` once per tile.
+        outputs = [None] * len(tiles)
+        tiles_by_shape = {}
+        for idx, tile in enumerate(tiles):
+            tiles_by_shape.setdefault(tile.shape, []).append(idx)
+
+        for shape, indices in tiles_by_shape.items():
+            tile_batch_size = self.tile_batch_size or len(indices)
+            for start in range(0, len(indices), tile_batch_size):
+                batch_indices = indices[start : start + tile_batch_size]
+                if len(batch_indices) == 1:
+                    outputs[batch_indices[0]] = fn(tiles[batch_indices[0]])
+                    continue
+                batch_output = fn(torch.cat([tiles[idx] for idx in batch_indices]))
+                for idx, output in zip(batch_indices, batch_output.split(shape[0])):
+                    outputs[idx] = output
+        return outputs
+
     def tiled_encode(self, x: torch.FloatTensor, return_dict: bool = True) -> AutoencoderKLOutput:
         r"""Encode a batch of images using a tiled encoder.
 
@@ -358,15 +409,16 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalVAEMixin):
         row_limit = self.tile_latent_min_size - blend_extent
 
         # Split the image into 512x512 tiles and encode them separately.
-        rows = []
-        for i in range(0, x.shape[2], overlap_size):
-            row = []
-            for j in range(0, x.shape[3], overlap_size):
-                tile = x[:, :, i : i + self.tile_sample_min_size, j : j + self.tile_sample_min_size]
-                tile = self.encoder(tile)
-                tile = self.quant_conv(tile)
-                row.append(tile)
-            rows.append(row)
+        row_starts = range(0, x.shape[2], overlap_size)
+        col_starts = range(0, x.shape[3], overlap_size)
+        tiles = [
+            x[:, :, i : i + self.tile_sample_min_size, j : j + self.tile_sample_min_size]
+            for i in row_starts
+            for j in col_starts
+        ]
+        tiles = self._forward_tiles(tiles, lambda tile: self.quant_conv(self.encoder(tile)))
+        rows = [tiles[i : i + len(col_starts)] for i in range(0, len(tiles), len(col_starts))]
+
         result_rows = []
         for i, row in enumerate(rows):
             result_row = []
@@ -408,15 +460,16 @@ class AutoencoderKL(ModelMixin, ConfigMixin, FromOriginalVAEMixin):
 
         # Split z into overlapping 64x64 tiles and decode them separately.
         # The tiles have an overlap to avoid seams between tiles.
-        rows = []
-        for i in range(0, z.shape[2], overlap_size):
-            row = []
-            for j in range(0, z.shape[3], overlap_size):
-                tile = z[:, :, i : i + self.tile_latent_min_size, j : j + self.tile_latent_min_size]
-                tile = self.post_quant_conv(tile)
-                decoded = self.decoder(tile)
-                row.append(decoded)
-            rows.append(row)
+        row_starts = range(0, z.shape[2], overlap_size)
+        col_starts = range(0, z.shape[3], overlap_size)
+        tiles = [
+            z[:, :, i : i + self.tile_latent_min_size, j : j + self.tile_latent_min_size]
+            for i in row_starts
+            for j in col_starts
+        ]
+        tiles = self._forward_tiles(tiles, lambda tile: self.decoder(self.post_quant_conv(tile)))
+        rows = [tiles[i : i + len(col_starts)] for i in range(0, len(tiles), len(col_starts))]
+
         result_rows = []
         for i, row in enumerate(rows):
             result_row = []
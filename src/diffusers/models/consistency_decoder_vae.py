@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from dataclasses import dataclass
-from typing import Dict, Optional, Tuple, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import torch
 import torch.nn.functional as F
@@ -151,15 +151,22 @@ class ConsistencyDecoderVAE(ModelMixin, ConfigMixin):
 
         self.use_slicing = False
         self.use_tiling = False
+        self.tile_batch_size = 1
 
     # Copied from diffusers.models.autoencoder_kl.AutoencoderKL.enable_tiling
-    def enable_tiling(self, use_tiling: bool = True):
+    def enable_tiling(self, use_tiling: bool = True, tile_batch_size: Optional[int] = 1):
         r"""
         Enable tiled VAE decoding. When this option is enabled, the VAE will split the input tensor into tiles to
         compute decoding and encoding in several steps. This is useful for saving a large amount of memory and to allow
         processing larger images.
+
+        Args:
+            tile_batch_size (`int`, *optional*, defaults to 1):
+                The number of tiles passed through the encoder or decoder in a single call. Larger values trade memory
+                for speed. If `None`, all tiles of the same size are processed at once.
         """
         self.use_tiling = use_tiling
+        self.tile_batch_size = tile_batch_size
 
     # Copied from diffusers.models.autoencoder_kl.AutoencoderKL.disable_tiling
     def disable_tiling(self):
@@ -335,17 +342,45 @@ class ConsistencyDecoderVAE(ModelMixin, ConfigMixin):
     # Copied from diffusers.models.autoencoder_kl.AutoencoderKL.blend_v
     def blend_v(self, a: torch.Tensor, b: torch.Tensor, blend_extent: int) -> torch.Tensor:
         blend_extent = min(a.shape[2], b.shape[2], blend_extent)
-        for y in range(blend_extent):
-            b[:, :, y, :] = a[:, :, -blend_extent + y, :] * (1 - y / blend_extent) + b[:, :, y, :] * (y / blend_extent)
+        if blend_extent == 0:
+            return b
+        # the ramp is built on the CPU, MPS doesn't support float64
+        weight = (torch.arange(blend_extent, dtype=torch.float64) / blend_extent).to(b.device, b.dtype)
+        weight = weight[:, None]
+        b[:, :, :blend_extent, :] = a[:, :, -blend_extent:, :] * (1 - weight) + b[:, :, :blend_extent, :] * weight
         return b
 
     # Copied from diffusers.models.autoencoder_kl.AutoencoderKL.blend_h
     def blend_h(self, a: torch.Tensor, b: torch.Tensor, blend_extent: int) -> torch.Tensor:
         blend_extent = min(a.shape[3], b.shape[3], blend_extent)
-        for x in range(blend_extent):
-            b[:, :, :, x] = a[:, :, :, -blend_extent + x] * (1 - x / blend_extent) + b[:, :, :, x] * (x / blend_extent)
+        if blend_extent == 0:
+            return b
+        # the ramp is built on the CPU, MPS doesn't support float64
+        weight = (torch.arange(blend_extent, dtype=torch.float64) / blend_extent).to(b.device, b.dtype)
+        b[:, :, :, :blend_extent] = a[:, :, :, -blend_extent:] * (1 - weight) + b[:, :, :, :blend_extent] * weight
         return b
 
+    # Copied from diffusers.models.autoencoder_kl.AutoencoderKL._forward_tiles
+    def _forward_tiles(self, tiles: List[torch.Tensor], fn: Callable) -> List[torch.Tensor]:
+        # Tiles of the same size are concatenated along the batch dimension and passed through `fn`
+        # `tile_batch_size` tiles at a time, instead of calling `fn` once per tile.
+        outputs = [None] * len(tiles)
+        tiles_by_shape = {}
+        for idx, tile in enumerate(tiles):
+            tiles_by_shape.setdefault(tile.shape, []).append(idx)
+
+        for shape, indices in tiles_by_shape.items():
+            tile_batch_size = self.tile_batch_size or len(indices)
+            for start in range(0, len(indices), tile_batch_size):
+                batch_indices = indices[start : start + tile_batch_size]
+                if len(batch_indices) == 1:
+                    outputs[batch_indices[0]] = fn(tiles[batch_indices[0]])
+                    continue
+                batch_output = fn(torch.cat([tiles[idx] for idx in batch_indices]))
+                for idx, output in zip(batch_indices, batch_output.split(shape[0])):
+                    outputs[idx] = output
+        return outputs
+
     def tiled_encode(self, x: torch.FloatTensor, return_dict: bool = True) -> ConsistencyDecoderVAEOutput:
         r"""Encode a batch of images using a tiled encoder.
 
@@ -371,15 +406,16 @@ class ConsistencyDecoderVAE(ModelMixin, ConfigMixin):
         row_limit = self.tile_latent_min_size - blend_extent
 
         # Split the image into 512x512 tiles and encode them separately.
-        rows = []
-        for i in range(0, x.shape[2], overlap_size):
-            row = []
-            for j in range(0, x.shape[3], overlap_size):
-                tile = x[:, :, i : i + self.tile_sample_min_size, j : j + self.tile_sample_min_size]
-                tile = self.encoder(tile)
-                tile = self.quant_conv(tile)
-                row.append(tile)
-            rows.append(row)
+        row_starts = range(0, x.shape[2], overlap_size)
+        col_starts = range(0, x.shape[3], overlap_size)
+        tiles = [
+            x[:, :, i : i + self.tile_sample_min_size, j : j + self.tile_sample_min_size]
+            for i in row_starts
+            for j in col_starts
+        ]
+        tiles = self._forward_tiles(tiles, lambda tile: self.quant_conv(self.encoder(tile)))
+        rows = [tiles[i : i + len(col_starts)] for i in range(0, len(tiles), len(col_starts))]
+
         result_rows = []
         for i, row in enumerate(rows):
             result_row = []
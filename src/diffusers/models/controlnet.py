@@ -21,6 +21,7 @@ from torch.nn import functional as F
 from ..configuration_utils import ConfigMixin, register_to_config
 from ..loaders import FromOriginalControlnetMixin
 from ..utils import BaseOutput, logging
+from ..utils.accelerate_utils import apply_forward_hook
 from .attention_processor import (
     ADDED_KV_ATTENTION_PROCESSORS,
     CROSS_ATTENTION_PROCESSORS,
@@ -29,6 +30,7 @@ from .attention_processor import (
     AttnProcessor,
 )
 from .embeddings import TextImageProjection, TextImageTimeEmbedding, TextTimeEmbedding, TimestepEmbedding, Timesteps
+from .feature_cache import FeatureCache
 from .modeling_utils import ModelMixin
 from .unet_2d_blocks import (
     CrossAttnDownBlock2D,
@@ -424,6 +426,8 @@ class ControlNetModel(ModelMixin, ConfigMixin, FromOriginalControlnetMixin):
             upcast_attention=upcast_attention,
         )
 
+        self._residual_cache = None
+
     @classmethod
     def from_unet(
         cls,
@@ -642,6 +646,52 @@ class ControlNetModel(ModelMixin, ConfigMixin, FromOriginalControlnetMixin):
         if isinstance(module, (CrossAttnDownBlock2D, DownBlock2D)):
             module.gradient_checkpointing = value
 
+    def enable_residual_cache(self, cache_interval: int = 2):
+        r"""
+        Enables the reuse of the residuals of the ControlNet across denoising steps.
+
+        The residuals that the ControlNet adds to the UNet change slowly between adjacent denoising steps. They are
+        computed every `cache_interval` steps and reused for the steps in between, where the ControlNet isn't run. The
+        residuals are cached before `conditioning_scale` is applied, so the scale can still change at every step.
+
+        Args:
+            cache_interval (`int`, defaults to `2`):
+                The number of denoising steps that share the residuals, `1` recomputes them at every step. Larger
+                intervals are faster but lose more quality.
+        """
+        self._residual_cache = FeatureCache(cache_interval)
+
+    def disable_residual_cache(self):
+        """Disables the reuse of the residuals of the ControlNet."""
+        self._residual_cache = None
+
+    @apply_forward_hook
+    def embed_condition(self, controlnet_cond: torch.FloatTensor) -> torch.FloatTensor:
+        r"""
+        Computes the embeddings of the conditioning image that are added to the input of the ControlNet. They can be
+        passed as `controlnet_cond_embeds` to [`~ControlNetModel.forward`] to avoid recomputing them at every
+        denoising step. With model CPU offloading, the ControlNet is moved to the execution device as in its forward.
+
+        Args:
+            controlnet_cond (`torch.FloatTensor`):
+                The conditioning image of shape `(batch_size, channels, height, width)`.
+
+        Returns:
+            `torch.FloatTensor`: The conditioning embeddings, at the resolution of the latents.
+        """
+        # check channel order
+        channel_order = self.config.controlnet_conditioning_channel_order
+
+        if channel_order == "rgb":
+            # in rgb order by default
+            ...
+        elif channel_order == "bgr":
+            controlnet_cond = torch.flip(controlnet_cond, dims=[1])
+        else:
+            raise ValueError(f"unknown `controlnet_conditioning_channel_order`: {channel_order}")
+
+        return self.controlnet_cond_embedding(controlnet_cond)
+
     def forward(
         self,
         sample: torch.FloatTensor,
@@ -655,6 +705,7 @@ class ControlNetModel(ModelMixin, ConfigMixin, FromOriginalControlnetMixin):
         added_cond_kwargs: Optional[Dict[str, torch.Tensor]] = None,
         cross_attention_kwargs: Optional[Dict[str, Any]] = None,
         guess_mode: bool = False,
+        controlnet_cond_embeds: Optional[torch.FloatTensor] = None,
         return_dict: bool = True,
     ) -> Union[ControlNetOutput, Tuple[Tuple[torch.FloatTensor, ...], torch.FloatTensor]]:
         """
@@ -669,8 +720,9 @@ class ControlNetModel(ModelMixin, ConfigMixin, FromOriginalControlnetMixin):
                 The encoder hidden states.
             controlnet_cond (`torch.FloatTensor`):
                 The conditional input tensor of shape `(batch_size, sequence_length, hidden_size)`.
-            conditioning_scale (`float`, defaults to `1.0`):
-                The scale factor for ControlNet outputs.
+            conditioning_scale (`float` or `torch.FloatTensor`, defaults to `1.0`):
+                The scale factor for ControlNet outputs, or a tensor of shape `(batch_size, 1, 1, 1)` with one scale
+                per sample.
             class_labels (`torch.Tensor`, *optional*, defaults to `None`):
                 Optional class labels for conditioning. Their embeddings will be summed with the timestep embeddings.
             timestep_cond (`torch.Tensor`, *optional*, defaults to `None`):
@@ -688,6 +740,10 @@ class ControlNetModel(ModelMixin, ConfigMixin, FromOriginalControlnetMixin):
             guess_mode (`bool`, defaults to `False`):
                 In this mode, the ControlNet encoder tries its best to recognize the input content of the input even if
                 you remove all prompts. A `guidance_scale` between 3.0 and 5.0 is recommended.
+            controlnet_cond_embeds (`torch.FloatTensor`, *optional*):
+                The embeddings of `controlnet_cond` precomputed with [`~ControlNetModel.embed_condition`]. The
+                conditioning image doesn't change during sampling, so its embeddings can be reused for all the
+                denoising steps. `controlnet_cond` is ignored when they are passed.
             return_dict (`bool`, defaults to `True`):
                 Whether or not to return a [`~models.controlnet.ControlNetOutput`] instead of a plain tuple.
 
@@ -696,16 +752,11 @@ class ControlNetModel(ModelMixin, ConfigMixin, FromOriginalControlnetMixin):
                 If `return_dict` is `True`, a [`~models.controlnet.ControlNetOutput`] is returned, otherwise a tuple is
                 returned where the first element is the sample tensor.
         """
-        # check channel order
-        channel_order = self.config.controlnet_conditioning_channel_order
-
-        if channel_order == "rgb":
-            # in rgb order by default
-            ...
-        elif channel_order == "bgr":
-            controlnet_cond = torch.flip(controlnet_cond, dims=[1])
-        else:
-            raise ValueError(f"unknown `controlnet_conditioning_channel_order`: {channel_order}")
+        if self._residual_cache is not None and not self._residual_cache.should_refresh(timestep, sample):
+            down_block_res_samples, mid_block_res_sample = self._residual_cache.features
+            return self._scale_residuals(
+                down_block_res_samples, mid_block_res_sample, conditioning_scale, guess_mode, return_dict
+            )
 
         # prepare attention_mask
         if attention_mask is not None:
@@ -776,8 +827,9 @@ class ControlNetModel(ModelMixin, ConfigMixin, FromOriginalControlnetMixin):
         # 2. pre-process
         sample = self.conv_in(sample)
 
-        controlnet_cond = self.controlnet_cond_embedding(controlnet_cond)
-        sample = sample + controlnet_cond
+        if controlnet_cond_embeds is None:
+            controlnet_cond_embeds = self.embed_condition(controlnet_cond)
+        sample = sample + controlnet_cond_embeds
 
         # 3. down
         down_block_res_samples = (sample,)
@@ -817,12 +869,25 @@ class ControlNetModel(ModelMixin, ConfigMixin, FromOriginalControlnetMixin):
 
         mid_block_res_sample = self.controlnet_mid_block(sample)
 
+        if self._residual_cache is not None:
+            self._residual_cache.features = (down_block_res_samples, mid_block_res_sample)
+
+        return self._scale_residuals(
+            down_block_res_samples, mid_block_res_sample, conditioning_scale, guess_mode, return_dict
+        )
+
+    def _scale_residuals(
+        self, down_block_res_samples, mid_block_res_sample, conditioning_scale, guess_mode, return_dict
+    ):
         # 6. scaling
         if guess_mode and not self.config.global_pool_conditions:
-            scales = torch.logspace(-1, 0, len(down_block_res_samples) + 1, device=sample.device)  # 0.1 to 1.0
-            scales = scales * conditioning_scale
-            down_block_res_samples = [sample * scale for sample, scale in zip(down_block_res_samples, scales)]
-            mid_block_res_sample = mid_block_res_sample * scales[-1]  # last one
+            # 0.1 to 1.0
+            scales = torch.logspace(-1, 0, len(down_block_res_samples) + 1, device=mid_block_res_sample.device)
+            # `conditioning_scale` can be a tensor with one scale per sample
+            down_block_res_samples = [
+                sample * (scale * conditioning_scale) for sample, scale in zip(down_block_res_samples, scales)
+            ]
+            mid_block_res_sample = mid_block_res_sample * (scales[-1] * conditioning_scale)  # last one
         else:
             down_block_res_samples = [sample * conditioning_scale for sample in down_block_res_samples]
             mid_block_res_sample = mid_block_res_sample * conditioning_scale
@@ -0,0 +1,72 @@
+# Copyright 2023 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import Union
+
+import torch
+
+
+class FeatureCache:
+    r"""
+    Keeps features of a model across the steps of a denoising loop and recomputes them every `cache_interval` steps.
+
+    The cache counts the forward passes of the model it's attached to. A forward pass with a larger timestep than the
+    previous one, or with a sample of another shape, dtype or device, starts a new denoising loop and clears the cache.
+
+    Args:
+        cache_interval (`int`):
+            The features are recomputed at the first step of the denoising loop and then every `cache_interval` steps,
+            the steps in between reuse them. `1` recomputes them at every step.
+    """
+
+    def __init__(self, cache_interval: int):
+        if not isinstance(cache_interval, int) or cache_interval < 1:
+            raise ValueError(f"`cache_interval` has to be a positive integer, but is {cache_interval}.")
+
+        self.cache_interval = cache_interval
+        self.reset()
+
+    def reset(self):
+        """Clears the cached features and restarts the step count."""
+        self.features = None
+        self.step = 0
+        self._timestep = None
+        self._key = None
+
+    def should_refresh(self, timestep: Union[torch.Tensor, float, int], sample: torch.Tensor) -> bool:
+        r"""
+        Advances the cache by one step.
+
+        Args:
+            timestep (`torch.Tensor` or `float` or `int`):
+                The timestep of the forward pass.
+            sample (`torch.Tensor`):
+                The input of the forward pass.
+
+        Returns:
+            `bool`: Whether the features have to be recomputed, and stored in `features`, at this step.
+        """
+        # reading the timestep syncs with the device, but only once per denoising step
+        timestep = timestep.max().item() if torch.is_tensor(timestep) else timestep
+        key = (sample.shape, sample.dtype, sample.device)
+        if key != self._key or (self._timestep is not None and timestep > self._timestep):
+            self.reset()
+            self._key = key
+        self._timestep = timestep
+
+        refresh = self.features is None or self.step % self.cache_interval == 0
+        self.step += 1
+        return refresh
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(cache_interval={self.cache_interval}, step={self.step})"
@@ -21,7 +21,7 @@
 # ----------------------------------------------------------------#
 ###################################################################
 
-from typing import Optional, Tuple, Union
+from typing import List, Optional, Tuple, Union
 
 import torch
 import torch.nn.functional as F
@@ -287,6 +287,230 @@ class LoRAConv2dLayer(nn.Module):
         return up_hidden_states.to(orig_dtype)
 
 
+def _expand_adapter_indices(adapter_indices: torch.LongTensor, batch_size: int) -> torch.LongTensor:
+    if batch_size == adapter_indices.shape[0]:
+        return adapter_indices
+    if batch_size % adapter_indices.shape[0] != 0:
+        raise ValueError(
+            f"The batch size {batch_size} of the hidden states is not a multiple of the number of adapter indices"
+            f" {adapter_indices.shape[0]}."
+        )
+    # video and temporal layers fold the frames or the spatial positions into the batch dimension, sample by sample
+    return adapter_indices.repeat_interleave(batch_size // adapter_indices.shape[0])
+
+
+class BatchedLoRALinearLayer(nn.Module):
+    r"""
+    A linear layer that holds the stacked low-rank factors of several LoRAs and applies a different one to every
+    sample of a batch with batched matrix multiplications, without fusing any of them into the base weights.
+
+    The ranks of the adapters are zero-padded to the largest one. Use [`~BatchedLoRALinearLayer.from_lora_layers`] to
+    stack already loaded [`LoRALinearLayer`]s.
+
+    Parameters:
+        in_features (`int`):
+            Number of input features.
+        out_features (`int`):
+            Number of output features.
+        num_adapters (`int`):
+            The number of stacked adapters.
+        rank (`int`, `optional`, defaults to 4):
+            The largest rank of the stacked adapters.
+        device (`torch.device`, `optional`, defaults to `None`):
+            The device to use for the layer's weights.
+        dtype (`torch.dtype`, `optional`, defaults to `None`):
+            The dtype to use for the layer's weights.
+    """
+
+    def __init__(
+        self,
+        in_features: int,
+        out_features: int,
+        num_adapters: int,
+        rank: int = 4,
+        device: Optional[Union[torch.device, str]] = None,
+        dtype: Optional[torch.dtype] = None,
+    ):
+        super().__init__()
+
+        self.down = nn.Parameter(torch.zeros(num_adapters, rank, in_features, device=device, dtype=dtype))
+        self.up = nn.Parameter(torch.zeros(num_adapters, out_features, rank, device=device, dtype=dtype))
+        # `network_alpha / rank` of every adapter
+        self.register_buffer("scales", torch.ones(num_adapters, device=device, dtype=dtype))
+        self.num_adapters = num_adapters
+        self.rank = rank
+        self.out_features = out_features
+        self.in_features = in_features
+
+        # index of the adapter of every sample, -1 runs the sample without LoRA
+        self.adapter_indices = None
+
+    @classmethod
+    def from_lora_layers(cls, lora_layers: List[Optional[LoRALinearLayer]]) -> "BatchedLoRALinearLayer":
+        r"""
+        Stacks the factors of `lora_layers`, one per adapter. `None` entries stand for adapters that don't have LoRA
+        layers for this module.
+        """
+        reference = next(layer for layer in lora_layers if layer is not None)
+        weight = reference.down.weight
+        layer = cls(
+            reference.in_features,
+            reference.out_features,
+            num_adapters=len(lora_layers),
+            rank=max(lora_layer.rank for lora_layer in lora_layers if lora_layer is not None),
+            device=weight.device,
+            dtype=weight.dtype,
+        )
+        with torch.no_grad():
+            for i, lora_layer in enumerate(lora_layers):
+                if lora_layer is None:
+                    continue
+                layer.down[i, : lora_layer.rank] = lora_layer.down.weight
+                layer.up[i, :, : lora_layer.rank] = lora_layer.up.weight
+                if lora_layer.network_alpha is not None:
+                    layer.scales[i] = lora_layer.network_alpha / lora_layer.rank
+        return layer
+
+    def forward(self, hidden_states: torch.Tensor) -> torch.Tensor:
+        if self.adapter_indices is None:
+            # broadcasts against the output of the base layer
+            return torch.zeros((), device=hidden_states.device, dtype=hidden_states.dtype)
+
+        orig_dtype = hidden_states.dtype
+        dtype = self.down.dtype
+
+        batch_size = hidden_states.shape[0]
+        adapter_indices = _expand_adapter_indices(self.adapter_indices.to(hidden_states.device), batch_size)
+        use_lora = adapter_indices >= 0
+        adapter_indices = adapter_indices.clamp(min=0)
+
+        # (batch_size, sequence_length, in_features)
+        down_hidden_states = hidden_states.to(dtype).reshape(batch_size, -1, self.in_features)
+        down_hidden_states = torch.bmm(down_hidden_states, self.down[adapter_indices].transpose(1, 2))
+
+        up_weight = self.up[adapter_indices] * (self.scales[adapter_indices] * use_lora)[:, None, None]
+        up_hidden_states = torch.bmm(down_hidden_states, up_weight.transpose(1, 2))
+
+        return up_hidden_states.reshape(*hidden_states.shape[:-1], self.out_features).to(orig_dtype)
+
+
+class BatchedLoRAConv2dLayer(nn.Module):
+    r"""
+    A convolutional layer that holds the stacked low-rank factors of several LoRAs and applies a different one to
+    every sample of a batch, see [`BatchedLoRALinearLayer`]. The down projections of all the samples run as a single
+    grouped convolution.
+
+    Parameters:
+        in_features (`int`):
+            Number of input features.
+        out_features (`int`):
+            Number of output features.
+        num_adapters (`int`):
+            The number of stacked adapters.
+        rank (`int`, `optional`, defaults to 4):
+            The largest rank of the stacked adapters.
+        kernel_size (`int` or `tuple` of two `int`, `optional`, defaults to 1):
+            The kernel size of the convolution.
+        stride (`int` or `tuple` of two `int`, `optional`, defaults to 1):
+            The stride of the convolution.
+        padding (`int` or `tuple` of two `int` or `str`, `optional`, defaults to 0):
+            The padding of the convolution.
+        device (`torch.device`, `optional`, defaults to `None`):
+            The device to use for the layer's weights.
+        dtype (`torch.dtype`, `optional`, defaults to `None`):
+            The dtype to use for the layer's weights.
+    """
+
+    def __init__(
+        self,
+        in_features: int,
+        out_features: int,
+        num_adapters: int,
+        rank: int = 4,
+        kernel_size: Union[int, Tuple[int, int]] = (1, 1),
+        stride: Union[int, Tuple[int, int]] = (1, 1),
+        padding: Union[int, Tuple[int, int], str] = 0,
+        device: Optional[Union[torch.device, str]] = None,
+        dtype: Optional[torch.dtype] = None,
+    ):
+        super().__init__()
+
+        kernel_size = (kernel_size, kernel_size) if isinstance(kernel_size, int) else tuple(kernel_size)
+        self.down = nn.Parameter(
+            torch.zeros(num_adapters, rank, in_features, *kernel_size, device=device, dtype=dtype)
+        )
+        # the up projection of LoRA convolutions is always a 1x1 convolution
+        self.up = nn.Parameter(torch.zeros(num_adapters, out_features, rank, device=device, dtype=dtype))
+        self.register_buffer("scales", torch.ones(num_adapters, device=device, dtype=dtype))
+        self.num_adapters = num_adapters
+        self.rank = rank
+        self.stride = stride
+        self.padding = padding
+        self.out_features = out_features
+        self.in_features = in_features
+
+        self.adapter_indices = None
+
+    @classmethod
+    def from_lora_layers(cls, lora_layers: List[Optional[LoRAConv2dLayer]]) -> "BatchedLoRAConv2dLayer":
+        r"""
+        Stacks the factors of `lora_layers`, one per adapter. `None` entries stand for adapters that don't have LoRA
+        layers for this module.
+        """
+        reference = next(layer for layer in lora_layers if layer is not None)
+        weight = reference.down.weight
+        layer = cls(
+            reference.down.in_channels,
+            reference.up.out_channels,
+            num_adapters=len(lora_layers),
+            rank=max(lora_layer.rank for lora_layer in lora_layers if lora_layer is not None),
+            kernel_size=reference.down.kernel_size,
+            stride=reference.down.stride,
+            padding=reference.down.padding,
+            device=weight.device,
+            dtype=weight.dtype,
+        )
+        with torch.no_grad():
+            for i, lora_layer in enumerate(lora_layers):
+                if lora_layer is None:
+                    continue
+                layer.down[i, : lora_layer.rank] = lora_layer.down.weight
+                layer.up[i, :, : lora_layer.rank] = lora_layer.up.weight[:, :, 0, 0]
+                if lora_layer.network_alpha is not None:
+                    layer.scales[i] = lora_layer.network_alpha / lora_layer.rank
+        return layer
+
+    def forward(self, hidden_states: torch.Tensor) -> torch.Tensor:
+        if self.adapter_indices is None:
+            # broadcasts against the output of the base layer
+            return torch.zeros((), device=hidden_states.device, dtype=hidden_states.dtype)
+
+        orig_dtype = hidden_states.dtype
+        dtype = self.down.dtype
+
+        batch_size, _, height, width = hidden_states.shape
+        adapter_indices = _expand_adapter_indices(self.adapter_indices.to(hidden_states.device), batch_size)
+        use_lora = adapter_indices >= 0
+        adapter_indices = adapter_indices.clamp(min=0)
+
+        # fold the batch into the channels so that every sample is convolved with the factors of its own adapter
+        down_weight = self.down[adapter_indices].flatten(0, 1)
+        down_hidden_states = F.conv2d(
+            hidden_states.to(dtype).reshape(1, -1, height, width),
+            down_weight,
+            stride=self.stride,
+            padding=self.padding,
+            groups=batch_size,
+        )
+        output_size = down_hidden_states.shape[-2:]
+        down_hidden_states = down_hidden_states.reshape(batch_size, self.rank, -1)
+
+        up_weight = self.up[adapter_indices] * (self.scales[adapter_indices] * use_lora)[:, None, None]
+        up_hidden_states = torch.bmm(up_weight, down_hidden_states)
+
+        return up_hidden_states.reshape(batch_size, self.out_features, *output_size).to(orig_dtype)
+
+
 class LoRACompatibleConv(nn.Conv2d):
     """
     A convolutional layer that can be used with LoRA.
@@ -303,6 +527,9 @@ class LoRACompatibleConv(nn.Conv2d):
         if self.lora_layer is None:
             return
 
+        if isinstance(self.lora_layer, BatchedLoRAConv2dLayer):
+            raise ValueError("Batched LoRA layers can't be fused, since every sample can use a different adapter.")
+
         dtype, device = self.weight.data.dtype, self.weight.data.device
 
         w_orig = self.weight.data.float()
@@ -381,6 +608,9 @@ class LoRACompatibleLinear(nn.Linear):
         if self.lora_layer is None:
             return
 
+        if isinstance(self.lora_layer, BatchedLoRALinearLayer):
+            raise ValueError("Batched LoRA layers can't be fused, since every sample can use a different adapter.")
+
         dtype, device = self.weight.data.dtype, self.weight.data.device
 
         w_orig = self.weight.data.float()
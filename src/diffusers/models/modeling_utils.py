@@ -16,8 +16,11 @@
 
 import inspect
 import itertools
+import json
+import mmap as mmap_module
 import os
 import re
+import struct
 from collections import OrderedDict
 from functools import partial
 from typing import Any, Callable, List, Optional, Tuple, Union
@@ -100,13 +103,63 @@ def get_parameter_dtype(parameter: torch.nn.Module) -> torch.dtype:
         return first_tuple[1].dtype
 
 
-def load_state_dict(checkpoint_file: Union[str, os.PathLike], variant: Optional[str] = None):
+_SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+
+def _mmap_safetensors_file(checkpoint_file: Union[str, os.PathLike]) -> OrderedDict:
+    """
+    Returns the tensors of a safetensors file as views of a memory map of the file, without reading them.
+
+    The mapping is copy-on-write: pages are loaded from the page cache on first access, are shared with all the other
+    processes mapping the same file, and are only copied if a tensor is modified in place.
+    """
+    with open(checkpoint_file, "rb") as f:
+        (header_size,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_size))
+        buffer = mmap_module.mmap(f.fileno(), 0, access=mmap_module.ACCESS_COPY)
+
+    header.pop("__metadata__", None)
+    data_start = 8 + header_size
+    state_dict = OrderedDict()
+    for name, info in header.items():
+        if info["dtype"] not in _SAFETENSORS_DTYPES:
+            raise ValueError(f"Unsupported dtype {info['dtype']} for {name} in {checkpoint_file}.")
+        dtype = _SAFETENSORS_DTYPES[info["dtype"]]
+        start, end = info["data_offsets"]
+        if start == end:
+            state_dict[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        count = (end - start) // torch.empty((), dtype=dtype).element_size()
+        tensor = torch.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + start)
+        state_dict[name] = tensor.view(info["shape"])
+    return state_dict
+
+
+def load_state_dict(checkpoint_file: Union[str, os.PathLike], variant: Optional[str] = None, mmap: bool = False):
     """
     Reads a checkpoint file, returning properly formatted errors if they arise.
+
+    If `mmap` is `True`, the returned tensors are backed by a memory map of the checkpoint file instead of being read
+    into memory.
     """
     try:
         if os.path.basename(checkpoint_file) == _add_variant(WEIGHTS_NAME, variant):
+            if mmap and is_torch_version(">=", "2.1.0"):
+                return torch.load(checkpoint_file, map_location="cpu", mmap=True)
             return torch.load(checkpoint_file, map_location="cpu")
+        elif mmap:
+            return _mmap_safetensors_file(checkpoint_file)
         else:
             return safetensors.torch.load_file(checkpoint_file, device="cpu")
     except Exception as e:
@@ -614,6 +667,13 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
                 If set to `None`, the `safetensors` weights are downloaded if they're available **and** if the
                 `safetensors` library is installed. If set to `True`, the model is forcibly loaded from `safetensors`
                 weights. If set to `False`, `safetensors` weights are not loaded.
+            mmap (`bool`, *optional*, defaults to `False`):
+                Whether to memory-map the checkpoint instead of reading it. The weights are assigned to the model as
+                views of the file mapping and are only copied when they need to be cast to another dtype, so pass the
+                `torch_dtype` of the checkpoint to avoid any copy. Peak CPU memory stays close to the model size and
+                several processes loading the same checkpoint share the same pages of the OS page cache. Requires
+                `low_cpu_mem_usage=True` and `device_map=None`; `.bin` checkpoints are only memory-mapped with PyTorch
+                >= 2.1.
 
         <Tip>
 
@@ -659,6 +719,7 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
         low_cpu_mem_usage = kwargs.pop("low_cpu_mem_usage", _LOW_CPU_MEM_USAGE_DEFAULT)
         variant = kwargs.pop("variant", None)
         use_safetensors = kwargs.pop("use_safetensors", None)
+        mmap = kwargs.pop("mmap", False)
 
         allow_pickle = False
         if use_safetensors is None:
@@ -699,6 +760,12 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
                 " dispatching. Please make sure to set `low_cpu_mem_usage=True`."
             )
 
+        if mmap and (not low_cpu_mem_usage or device_map is not None):
+            raise ValueError(
+                "Memory-mapped loading assigns the checkpoint tensors to a model initialized on the meta device. Please"
+                " make sure to set `low_cpu_mem_usage=True` and `device_map=None` when passing `mmap=True`."
+            )
+
         # Load config if we don't provide a configuration
         config_path = pretrained_model_name_or_path
 
@@ -797,7 +864,7 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
                 # if device_map is None, load the state dict and move the params from meta device to the cpu
                 if device_map is None:
                     param_device = "cpu"
-                    state_dict = load_state_dict(model_file, variant=variant)
+                    state_dict = load_state_dict(model_file, variant=variant, mmap=mmap)
                     model._convert_deprecated_attention_blocks(state_dict)
                     # move the params from meta device to cpu
                     missing_keys = set(model.state_dict().keys()) - set(state_dict.keys())
@@ -146,3 +146,71 @@ class AdaGroupNorm(nn.Module):
         x = F.group_norm(x, self.num_groups, eps=self.eps)
         x = x * (1 + scale) + shift
         return x
+
+
+def group_norm_frames(
+    hidden_states: torch.Tensor, num_frames: int, norm: nn.GroupNorm, dims: Tuple[int, int, int, int, int]
+) -> torch.Tensor:
+    r"""
+    Applies `norm` to a video with the frames folded into the batch dimension, computing the statistics of every group
+    over all frames of a sample, and returns the result in another memory layout.
+
+    This matches `norm` applied to the `(batch_size, channels, num_frames, height, width)` view of the video followed by
+    `.permute(...).contiguous()`, but reads the input a few times and writes the output once, directly in the requested
+    layout, instead of materializing the permuted input and output. The variance is computed in float32 from the
+    deviations to the mean, so that it stays accurate for activations with a large offset.
+
+    Args:
+        hidden_states (`torch.Tensor`):
+            The video of shape `(batch_size * num_frames, channels, height, width)`.
+        num_frames (`int`):
+            The number of frames per sample.
+        norm (`nn.GroupNorm`):
+            The group norm to apply.
+        dims (`Tuple[int]`):
+            The order of the dimensions `(batch_size, num_frames, channels, height, width)` in the returned contiguous
+            tensor, for example `(0, 3, 4, 1, 2)` for `(batch_size, height, width, num_frames, channels)`.
+
+    Returns:
+        `torch.Tensor`: The normalized video of shape `[(batch_size, num_frames, channels, height, width)[d] for d in
+        dims]`.
+    """
+    batch_frames, channels, height, width = hidden_states.shape
+    batch_size = batch_frames // num_frames
+    video = hidden_states.reshape(batch_size, num_frames, channels, height, width)
+
+    requires_grad = hidden_states.requires_grad or (norm.affine and norm.weight.requires_grad)
+    if torch.is_grad_enabled() and requires_grad:
+        # writing into a preallocated output isn't differentiable
+        video = norm(video.permute(0, 2, 1, 3, 4)).permute(0, 2, 1, 3, 4)
+        return video.permute(dims).contiguous()
+
+    # the statistics are reductions over strided groups, `var_mean` is much slower on CPU
+    num_groups = norm.num_groups
+    groups = video.view(batch_size, num_frames, num_groups, -1)
+    num_elements = num_frames * groups.shape[-1]
+    mean = groups.sum(dim=(1, 3), keepdim=True, dtype=torch.float32) / num_elements
+
+    # E[x²] - E[x]² cancels catastrophically for activations with a large offset, so the variance is computed from the
+    # deviations to the mean. The mean is rounded to the input dtype, the remaining shift is corrected exactly. The
+    # deviations are written into the output, which is overwritten below, so that they don't allocate a temporary.
+    output = video.new_empty([video.shape[d] for d in dims])
+    deviations = torch.sub(groups, mean.to(groups.dtype), out=output.view(groups.shape))
+    shift = deviations.sum(dim=(1, 3), keepdim=True, dtype=torch.float32) / num_elements
+    mean_square = torch.linalg.vector_norm(deviations, dim=(1, 3), keepdim=True, dtype=torch.float32).square()
+    var = (mean_square / num_elements - shift.square()).clamp(min=0)
+    mean = mean.to(groups.dtype).float() + shift
+
+    scale = torch.rsqrt(var + norm.eps)
+    if norm.affine:
+        scale = scale * norm.weight.float().view(1, 1, num_groups, -1)
+        shift = norm.bias.float().view(1, 1, num_groups, -1) - mean * scale
+    else:
+        scale = scale.expand(batch_size, 1, num_groups, channels // num_groups)
+        shift = -mean * scale
+    scale = scale.reshape(batch_size, 1, channels, 1, 1).to(video.dtype)
+    shift = shift.reshape(batch_size, 1, channels, 1, 1).to(video.dtype)
+
+    inverse_dims = tuple(sorted(range(len(dims)), key=lambda d: dims[d]))
+    torch.addcmul(shift, video, scale, out=output.permute(inverse_dims))
+    return output
@@ -24,7 +24,7 @@ from ..utils import USE_PEFT_BACKEND
 from .activations import get_activation
 from .attention_processor import SpatialNorm
 from .lora import LoRACompatibleConv, LoRACompatibleLinear
-from .normalization import AdaGroupNorm
+from .normalization import AdaGroupNorm, group_norm_frames
 
 
 class Upsample1D(nn.Module):
@@ -698,6 +698,12 @@ class ResnetBlock2D(nn.Module):
     ) -> torch.FloatTensor:
         hidden_states = input_tensor
 
+        # video models pass one time embedding per sample for the frames folded into the batch dimension
+        repeat_temb = temb is not None and temb.shape[0] != hidden_states.shape[0]
+        if repeat_temb and (self.time_embedding_norm == "ada_group" or self.time_embedding_norm == "spatial"):
+            temb = temb.repeat_interleave(hidden_states.shape[0] // temb.shape[0], dim=0)
+            repeat_temb = False
+
         if self.time_embedding_norm == "ada_group" or self.time_embedding_norm == "spatial":
             hidden_states = self.norm1(hidden_states, temb)
         else:
@@ -743,6 +749,10 @@ class ResnetBlock2D(nn.Module):
                 else self.time_emb_proj(temb)[:, :, None, None]
             )
 
+        if repeat_temb:
+            # repeat after the projection, which then runs once per sample instead of once per frame
+            temb = temb.repeat_interleave(hidden_states.shape[0] // temb.shape[0], dim=0)
+
         if temb is not None and self.time_embedding_norm == "default":
             hidden_states = hidden_states + temb
 
@@ -1014,25 +1024,27 @@ class TemporalConvLayer(nn.Module):
         self.in_dim = in_dim
         self.out_dim = out_dim
 
-        # conv layers
+        # conv layers, the activations overwrite the outputs of the group norms, which their backward doesn't need
         self.conv1 = nn.Sequential(
-            nn.GroupNorm(norm_num_groups, in_dim), nn.SiLU(), nn.Conv3d(in_dim, out_dim, (3, 1, 1), padding=(1, 0, 0))
+            nn.GroupNorm(norm_num_groups, in_dim),
+            nn.SiLU(inplace=True),
+            nn.Conv3d(in_dim, out_dim, (3, 1, 1), padding=(1, 0, 0)),
         )
         self.conv2 = nn.Sequential(
             nn.GroupNorm(norm_num_groups, out_dim),
-            nn.SiLU(),
+            nn.SiLU(inplace=True),
             nn.Dropout(dropout),
             nn.Conv3d(out_dim, in_dim, (3, 1, 1), padding=(1, 0, 0)),
         )
         self.conv3 = nn.Sequential(
             nn.GroupNorm(norm_num_groups, out_dim),
-            nn.SiLU(),
+            nn.SiLU(inplace=True),
             nn.Dropout(dropout),
             nn.Conv3d(out_dim, in_dim, (3, 1, 1), padding=(1, 0, 0)),
         )
         self.conv4 = nn.Sequential(
             nn.GroupNorm(norm_num_groups, out_dim),
-            nn.SiLU(),
+            nn.SiLU(inplace=True),
             nn.Dropout(dropout),
             nn.Conv3d(out_dim, in_dim, (3, 1, 1), padding=(1, 0, 0)),
         )
@@ -1042,19 +1054,17 @@ class TemporalConvLayer(nn.Module):
         nn.init.zeros_(self.conv4[-1].bias)
 
     def forward(self, hidden_states: torch.Tensor, num_frames: int = 1) -> torch.Tensor:
-        hidden_states = (
-            hidden_states[None, :].reshape((-1, num_frames) + hidden_states.shape[1:]).permute(0, 2, 1, 3, 4)
-        )
+        batch_frames, channels, height, width = hidden_states.shape
+        identity = hidden_states.reshape((-1, num_frames) + hidden_states.shape[1:])
 
-        identity = hidden_states
-        hidden_states = self.conv1(hidden_states)
+        # normalize straight into the (batch_size, channels, num_frames, height, width) layout of the temporal convs
+        hidden_states = group_norm_frames(hidden_states, num_frames, self.conv1[0], dims=(0, 2, 1, 3, 4))
+        hidden_states = self.conv1[1:](hidden_states)
         hidden_states = self.conv2(hidden_states)
         hidden_states = self.conv3(hidden_states)
         hidden_states = self.conv4(hidden_states)
 
-        hidden_states = identity + hidden_states
+        # the sum takes the layout of its first operand, so adding the identity also restores the frame layout
+        hidden_states = identity + hidden_states.permute(0, 2, 1, 3, 4)
 
-        hidden_states = hidden_states.permute(0, 2, 1, 3, 4).reshape(
-            (hidden_states.shape[0] * hidden_states.shape[2], -1) + hidden_states.shape[3:]
-        )
-        return hidden_states
+        return hidden_states.reshape(batch_frames, channels, height, width)
@@ -21,6 +21,7 @@ from ..configuration_utils import ConfigMixin, register_to_config
 from ..utils import BaseOutput
 from .attention import BasicTransformerBlock
 from .modeling_utils import ModelMixin
+from .normalization import group_norm_frames
 
 
 @dataclass
@@ -161,11 +162,9 @@ class TransformerTemporalModel(ModelMixin, ConfigMixin):
 
         residual = hidden_states
 
-        hidden_states = hidden_states[None, :].reshape(batch_size, num_frames, channel, height, width)
-        hidden_states = hidden_states.permute(0, 2, 1, 3, 4)
-
-        hidden_states = self.norm(hidden_states)
-        hidden_states = hidden_states.permute(0, 3, 4, 2, 1).reshape(batch_size * height * width, num_frames, channel)
+        # normalize straight into the (batch_size, height, width, num_frames, channel) layout of the temporal attention
+        hidden_states = group_norm_frames(hidden_states, num_frames, self.norm, dims=(0, 3, 4, 1, 2))
+        hidden_states = hidden_states.reshape(batch_size * height * width, num_frames, channel)
 
         hidden_states = self.proj_in(hidden_states)
 
@@ -181,15 +180,11 @@ class TransformerTemporalModel(ModelMixin, ConfigMixin):
 
         # 3. Output
         hidden_states = self.proj_out(hidden_states)
-        hidden_states = (
-            hidden_states[None, None, :]
-            .reshape(batch_size, height, width, num_frames, channel)
-            .permute(0, 3, 4, 1, 2)
-            .contiguous()
-        )
-        hidden_states = hidden_states.reshape(batch_frames, channel, height, width)
+        hidden_states = hidden_states.reshape(batch_size, height, width, num_frames, channel).permute(0, 3, 4, 1, 2)
 
-        output = hidden_states + residual
+        # the sum takes the layout of its first operand, so adding the residual also restores the frame layout
+        output = residual.reshape(batch_size, num_frames, channel, height, width) + hidden_states
+        output = output.reshape(batch_frames, channel, height, width)
 
         if not return_dict:
             return (output,)
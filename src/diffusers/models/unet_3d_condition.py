@@ -597,9 +597,9 @@ class UNet3DConditionModel(ModelMixin, ConfigMixin, UNet2DConditionLoadersMixin)
         # there might be better ways to encapsulate this.
         t_emb = t_emb.to(dtype=self.dtype)
 
+        # `emb` and `encoder_hidden_states` keep one row per sample instead of being repeated for every frame, the
+        # resnets and the cross-attention layers share them across the frames of a sample
         emb = self.time_embedding(t_emb, timestep_cond)
-        emb = emb.repeat_interleave(repeats=num_frames, dim=0)
-        encoder_hidden_states = encoder_hidden_states.repeat_interleave(repeats=num_frames, dim=0)
 
         # 2. pre-process
         sample = sample.permute(0, 2, 1, 3, 4).reshape((sample.shape[0] * num_frames, -1) + sample.shape[3:])
@@ -14,7 +14,7 @@
 
 import inspect
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
 
 import numpy as np
 import torch
@@ -57,19 +57,225 @@ EXAMPLE_DOC_STRING = """
 """
 
 
+# Copied from diffusers.pipelines.stable_diffusion.pipeline_stable_diffusion_paradigms.parallel_denoise
+def parallel_denoise(
+    scheduler,
+    latents: torch.FloatTensor,
+    model_fn: Callable[[torch.FloatTensor, torch.Tensor, int], torch.FloatTensor],
+    parallel: int = 10,
+    tolerance: float = 0.1,
+    generator: Optional[Union[torch.Generator, List[torch.Generator]]] = None,
+    extra_step_kwargs: Optional[Dict[str, Any]] = None,
+    progress_bar=None,
+    callback: Optional[Callable[[int, int, torch.FloatTensor], None]] = None,
+    callback_steps: int = 1,
+    debug: bool = False,
+):
+    r"""
+    Runs the denoising loop of `scheduler` with the parallel sampling of [ParaDiGMS](https://arxiv.org/abs/2305.16317).
+
+    Picard iterations refine a window of `parallel` consecutive timesteps at once, with a single call of `model_fn`
+    for the whole window. The window then slides past the timesteps whose latents have converged.
+
+    Args:
+        scheduler ([`SchedulerMixin`]):
+            A scheduler with a `batch_step_no_noise` method, like [`DDPMParallelScheduler`] or
+            [`DDIMParallelScheduler`]. Its timesteps have to be set already.
+        latents (`torch.FloatTensor`):
+            The initial noisy latents of shape `(batch_size, ...)`.
+        model_fn (`Callable`):
+            Predicts the (guided) model output of a window. It's called with `model_fn(latents, timesteps,
+            step_index)`, where `latents` has shape `(parallel_len, batch_size, ...)`, `timesteps` holds the
+            `parallel_len` timesteps of the window and `step_index` is the index of the first one. It returns a tensor
+            of the same shape as `latents`.
+        parallel (`int`, *optional*, defaults to 10):
+            The number of timesteps evaluated in a single call of `model_fn`.
+        tolerance (`float`, *optional*, defaults to 0.1):
+            The error tolerance for sliding the window forward, as a ratio of the scheduler's noise magnitude.
+        generator (`torch.Generator` or `List[torch.Generator]`, *optional*):
+            The generator(s) for the pre-sampled noise of stochastic schedulers.
+        extra_step_kwargs (`Dict[str, Any]`, *optional*):
+            Extra kwargs of `scheduler.batch_step_no_noise`.
+        progress_bar (*optional*):
+            A progress bar over the timesteps, updated as the window slides.
+        callback (`Callable`, *optional*):
+            Called every `callback_steps` iterations with `callback(step: int, timestep: int, latents:
+            torch.FloatTensor)`, with the latents at the beginning of the window.
+        callback_steps (`int`, *optional*, defaults to 1):
+            The frequency at which the `callback` function is called.
+        debug (`bool`, *optional*, defaults to `False`):
+            Whether or not to evaluate `torch.cumsum` on the CPU, which is deterministic.
+
+    Returns:
+        `torch.FloatTensor`: The denoised latents.
+    """
+
+    def cumsum(input, dim):
+        if debug:
+            # cumsum_cuda_kernel does not have a deterministic implementation
+            # so perform cumsum on cpu for debugging purposes
+            return torch.cumsum(input.cpu().float(), dim=dim).to(input.device)
+        return torch.cumsum(input, dim=dim)
+
+    extra_step_kwargs = extra_step_kwargs or {}
+    timesteps = scheduler.timesteps
+    num_timesteps = len(timesteps)
+    batch_size = latents.shape[0]
+    parallel = min(parallel, num_timesteps)
+
+    begin_idx = 0
+    end_idx = parallel
+    latents_time_evolution_buffer = torch.stack([latents] * (num_timesteps + 1))
+
+    # We must make sure the noise of stochastic schedulers such as DDPM is sampled only once per timestep.
+    # Sampling inside the parallel denoising loop will mess this up, so we pre-sample the noise vectors outside the denoising loop.
+    noise_array = torch.zeros_like(latents_time_evolution_buffer)
+    for j in range(num_timesteps):
+        base_noise = randn_tensor(shape=latents.shape, generator=generator, device=latents.device, dtype=latents.dtype)
+        noise = (scheduler._get_variance(timesteps[j]) ** 0.5) * base_noise
+        noise_array[j] = noise.clone()
+
+    # We specify the error tolerance as a ratio of the scheduler's noise magnitude. We similarly compute the error tolerance
+    # outside of the denoising loop to avoid recomputing it at every step.
+    # We will be dividing the norm of the noise, so we store its inverse here to avoid a division at every step.
+    inverse_variance_norm = 1.0 / torch.tensor(
+        [scheduler._get_variance(timesteps[j]) for j in range(num_timesteps)] + [0]
+    ).to(noise_array.device)
+    latent_dim = noise_array[0, 0].numel()
+    inverse_variance_norm = inverse_variance_norm[:, None] / latent_dim
+
+    scaled_tolerance = tolerance**2
+
+    steps = 0
+    while begin_idx < num_timesteps:
+        # these have shape (parallel_dim, batch_size, ...)
+        # parallel_len is at most parallel, but could be less if we are at the end of the timesteps
+        # we are processing batch window of timesteps spanning [begin_idx, end_idx)
+        parallel_len = end_idx - begin_idx
+
+        block_latents = latents_time_evolution_buffer[begin_idx:end_idx]
+        block_t = timesteps[begin_idx:end_idx]
+        model_output = model_fn(block_latents, block_t, begin_idx)
+
+        block_latents_denoise = scheduler.batch_step_no_noise(
+            model_output=model_output.flatten(0, 1),
+            timesteps=block_t[:, None].repeat(1, batch_size).flatten(0, 1),
+            sample=block_latents.flatten(0, 1),
+            **extra_step_kwargs,
+        ).reshape(block_latents.shape)
+
+        # back to shape (parallel_dim, batch_size, ...)
+        # now we want to add the pre-sampled noise
+        # parallel sampling algorithm requires computing the cumulative drift from the beginning
+        # of the window, so we need to compute cumulative sum of the deltas and the pre-sampled noises.
+        delta = block_latents_denoise - block_latents
+        cumulative_delta = cumsum(delta, dim=0)
+        cumulative_noise = cumsum(noise_array[begin_idx:end_idx], dim=0)
+
+        # if we are using an ODE-like scheduler (like DDIM), we don't want to add noise
+        if scheduler._is_ode_scheduler:
+            cumulative_noise = 0
+
+        block_latents_new = latents_time_evolution_buffer[begin_idx][None,] + cumulative_delta + cumulative_noise
+        cur_error = torch.linalg.norm(
+            (block_latents_new - latents_time_evolution_buffer[begin_idx + 1 : end_idx + 1]).reshape(
+                parallel_len, batch_size, -1
+            ),
+            dim=-1,
+        ).pow(2)
+        error_ratio = cur_error * inverse_variance_norm[begin_idx + 1 : end_idx + 1]
+
+        # find the first index of the vector error_ratio that is greater than error tolerance
+        # we can shift the window for the next iteration up to this index
+        error_ratio = torch.nn.functional.pad(
+            error_ratio, (0, 0, 0, 1), value=1e9
+        )  # handle the case when everything is below ratio, by padding the end of parallel_len dimension
+        any_error_at_time = torch.max(error_ratio > scaled_tolerance, dim=1).values.int()
+        ind = torch.argmax(any_error_at_time).item()
+
+        # compute the new begin and end idxs for the window
+        new_begin_idx = begin_idx + min(1 + ind, parallel)
+        new_end_idx = min(new_begin_idx + parallel, num_timesteps)
+
+        # store the computed latents for the current window in the global buffer
+        latents_time_evolution_buffer[begin_idx + 1 : end_idx + 1] = block_latents_new
+        # initialize the new sliding window latents with the end of the current window,
+        # should be better than random initialization
+        latents_time_evolution_buffer[end_idx : new_end_idx + 1] = latents_time_evolution_buffer[end_idx][None,]
+
+        steps += 1
+
+        if progress_bar is not None:
+            progress_bar.update(new_begin_idx - begin_idx)
+        if callback is not None and steps % callback_steps == 0:
+            callback(begin_idx, timesteps[begin_idx], latents_time_evolution_buffer[begin_idx])
+
+        begin_idx = new_begin_idx
+        end_idx = new_end_idx
+
+    return latents_time_evolution_buffer[-1]
+
+
+def get_context_windows(num_frames: int, context_frames: int, context_overlap: int) -> List[List[int]]:
+    r"""
+    Splits `num_frames` frames into overlapping windows of `context_frames` consecutive frames.
+
+    Consecutive windows overlap by at least `context_overlap` frames. The last window is aligned to the last frame, so
+    all windows have the same length and every frame is covered.
+
+    Args:
+        num_frames (`int`):
+            The number of frames of the video.
+        context_frames (`int`):
+            The number of frames per window. Clipped to `num_frames`.
+        context_overlap (`int`):
+            The minimum number of frames shared by consecutive windows. Must be smaller than `context_frames`.
+
+    Returns:
+        `List[List[int]]`: The frame indices of every window.
+    """
+    if not 0 <= context_overlap < context_frames:
+        raise ValueError(
+            f"`context_overlap` has to be non-negative and smaller than `context_frames` ({context_frames}), but is"
+            f" {context_overlap}."
+        )
+    if context_frames >= num_frames:
+        return [list(range(num_frames))]
+
+    stride = context_frames - context_overlap
+    starts = list(range(0, num_frames - context_frames + 1, stride))
+    if starts[-1] != num_frames - context_frames:
+        starts.append(num_frames - context_frames)
+    return [list(range(start, start + context_frames)) for start in starts]
+
+
+def get_context_weights(context_frames: int, context_weighting: str = "pyramid") -> torch.Tensor:
+    r"""
+    Returns the weights of the frames of a window when fusing the predictions of overlapping windows.
+
+    Args:
+        context_frames (`int`):
+            The number of frames per window.
+        context_weighting (`str`, *optional*, defaults to `"pyramid"`):
+            `"pyramid"` weights the frames linearly by their distance to the border of the window, so that the
+            predictions fade across the overlaps. `"flat"` averages the predictions uniformly.
+
+    Returns:
+        `torch.Tensor`: The weights of shape `(context_frames,)`.
+    """
+    if context_weighting == "flat":
+        return torch.ones(context_frames)
+    if context_weighting == "pyramid":
+        positions = torch.arange(context_frames, dtype=torch.float32)
+        return torch.minimum(positions + 1, context_frames - positions)
+    raise ValueError(f"`context_weighting` has to be one of 'flat' or 'pyramid', but is {context_weighting}.")
+
+
 def tensor2vid(video: torch.Tensor, processor, output_type="np"):
     # Based on:
     # https://github.com/modelscope/modelscope/blob/1509fdb973e5871f37148a4b5e5964cafd43e64d/modelscope/pipelines/multi_modal/text_to_video_synthesis_pipeline.py#L78
 
-    batch_size, channels, num_frames, height, width = video.shape
-    outputs = []
-    for batch_idx in range(batch_size):
-        batch_vid = video[batch_idx].permute(1, 0, 2, 3)
-        batch_output = processor.postprocess(batch_vid, output_type)
-
-        outputs.append(batch_output)
-
-    return outputs
+    return processor.postprocess_video(video, output_type=output_type)
 
 
 @dataclass
@@ -228,22 +434,29 @@ class AnimateDiffPipeline(DiffusionPipeline, TextualInversionLoaderMixin, IPAdap
             else:
                 attention_mask = None
 
-            if clip_skip is None:
-                prompt_embeds = self.text_encoder(text_input_ids.to(device), attention_mask=attention_mask)
-                prompt_embeds = prompt_embeds[0]
-            else:
-                prompt_embeds = self.text_encoder(
-                    text_input_ids.to(device), attention_mask=attention_mask, output_hidden_states=True
-                )
-                # Access the `hidden_states` first, that contains a tuple of
-                # all the hidden states from the encoder layers. Then index into
-                # the tuple to access the hidden states from the desired layer.
-                prompt_embeds = prompt_embeds[-1][-(clip_skip + 1)]
-                # We also need to apply the final LayerNorm here to not mess with the
-                # representations. The `last_hidden_states` that we typically use for
-                # obtaining the final prompt representations passes through the LayerNorm
-                # layer.
-                prompt_embeds = self.text_encoder.text_model.final_layer_norm(prompt_embeds)
+            # reuse the text encoder outputs of previously seen prompts if `enable_prompt_embeds_cache` was called
+            cache_keys, prompt_embeds = self._lookup_prompt_embeds(
+                self.text_encoder, text_input_ids, clip_skip=clip_skip, lora_scale=lora_scale
+            )
+
+            if prompt_embeds is None:
+                if clip_skip is None:
+                    prompt_embeds = self.text_encoder(text_input_ids.to(device), attention_mask=attention_mask)
+                    prompt_embeds = prompt_embeds[0]
+                else:
+                    prompt_embeds = self.text_encoder(
+                        text_input_ids.to(device), attention_mask=attention_mask, output_hidden_states=True
+                    )
+                    # Access the `hidden_states` first, that contains a tuple of
+                    # all the hidden states from the encoder layers. Then index into
+                    # the tuple to access the hidden states from the desired layer.
+                    prompt_embeds = prompt_embeds[-1][-(clip_skip + 1)]
+                    # We also need to apply the final LayerNorm here to not mess with the
+                    # representations. The `last_hidden_states` that we typically use for
+                    # obtaining the final prompt representations passes through the LayerNorm
+                    # layer.
+                    prompt_embeds = self.text_encoder.text_model.final_layer_norm(prompt_embeds)
+                self._store_prompt_embeds(cache_keys, prompt_embeds)
 
         if self.text_encoder is not None:
             prompt_embeds_dtype = self.text_encoder.dtype
@@ -298,11 +511,17 @@ class AnimateDiffPipeline(DiffusionPipeline, TextualInversionLoaderMixin, IPAdap
             else:
                 attention_mask = None
 
-            negative_prompt_embeds = self.text_encoder(
-                uncond_input.input_ids.to(device),
-                attention_mask=attention_mask,
+            cache_keys, negative_prompt_embeds = self._lookup_prompt_embeds(
+                self.text_encoder, uncond_input.input_ids, lora_scale=lora_scale
             )
-            negative_prompt_embeds = negative_prompt_embeds[0]
+
+            if negative_prompt_embeds is None:
+                negative_prompt_embeds = self.text_encoder(
+                    uncond_input.input_ids.to(device),
+                    attention_mask=attention_mask,
+                )
+                negative_prompt_embeds = negative_prompt_embeds[0]
+                self._store_prompt_embeds(cache_keys, negative_prompt_embeds)
 
         if do_classifier_free_guidance:
             # duplicate unconditional embeddings for each generation per prompt, using mps friendly method
@@ -333,8 +552,14 @@ class AnimateDiffPipeline(DiffusionPipeline, TextualInversionLoaderMixin, IPAdap
         uncond_image_embeds = torch.zeros_like(image_embeds)
         return image_embeds, uncond_image_embeds
 
-    # Copied from diffusers.pipelines.text_to_video_synthesis/pipeline_text_to_video_synth.TextToVideoSDPipeline.decode_latents
-    def decode_latents(self, latents):
+    # Copied from diffusers.pipelines.text_to_video_synthesis.pipeline_text_to_video_synth.TextToVideoSDPipeline.decode_latents
+    def decode_latents(self, latents, decode_chunk_size: Optional[int] = None):
+        if decode_chunk_size is not None:
+            video = self.prepare_video_buffer(latents)
+            for _ in self.decode_latents_streaming(latents, decode_chunk_size=decode_chunk_size, output=video):
+                pass
+            return video
+
         latents = 1 / self.vae.config.scaling_factor * latents
 
         batch_size, channels, num_frames, height, width = latents.shape
@@ -357,6 +582,67 @@ class AnimateDiffPipeline(DiffusionPipeline, TextualInversionLoaderMixin, IPAdap
         video = video.float()
         return video
 
+    # Copied from diffusers.pipelines.text_to_video_synthesis.pipeline_text_to_video_synth.TextToVideoSDPipeline.prepare_video_buffer
+    def prepare_video_buffer(self, latents):
+        r"""
+        Allocates the float32 `(batch_size, channels, num_frames, height, width)` tensor that the decoded frames of
+        `latents` are written into by `decode_latents_streaming`.
+        """
+        batch_size, _, num_frames, height, width = latents.shape
+        shape = (
+            batch_size,
+            self.vae.config.out_channels,
+            num_frames,
+            height * self.vae_scale_factor,
+            width * self.vae_scale_factor,
+        )
+        return torch.empty(shape, dtype=torch.float32, device=latents.device)
+
+    # Copied from diffusers.pipelines.text_to_video_synthesis.pipeline_text_to_video_synth.TextToVideoSDPipeline.decode_latents_streaming
+    def decode_latents_streaming(
+        self,
+        latents: torch.FloatTensor,
+        decode_chunk_size: int = 8,
+        output: Optional[torch.FloatTensor] = None,
+    ) -> Iterator[torch.FloatTensor]:
+        r"""
+        Decodes video latents `decode_chunk_size` frames at a time so that the peak memory of the VAE decoder is
+        bounded by the chunk size instead of by the total number of frames.
+
+        Args:
+            latents (`torch.FloatTensor`):
+                Latents of shape `(batch_size, num_channels, num_frames, height, width)`.
+            decode_chunk_size (`int`, *optional*, defaults to 8):
+                The number of frames (per batch element) passed to the VAE decoder in a single call.
+            output (`torch.FloatTensor`, *optional*):
+                A preallocated buffer to write the decoded frames into. If not provided, one is created with
+                `prepare_video_buffer`.
+
+        Yields:
+            `torch.FloatTensor`:
+                The decoded frames of each chunk, in frame order, as a `(batch_size, channels, chunk_frames, height,
+                width)` view into `output`. Once the generator is exhausted `output` holds the complete video.
+        """
+        if decode_chunk_size < 1:
+            raise ValueError(f"`decode_chunk_size` has to be a positive integer but is {decode_chunk_size}.")
+
+        if output is None:
+            output = self.prepare_video_buffer(latents)
+
+        batch_size, channels, num_frames, height, width = latents.shape
+        for start in range(0, num_frames, decode_chunk_size):
+            end = min(start + decode_chunk_size, num_frames)
+            chunk = 1 / self.vae.config.scaling_factor * latents[:, :, start:end]
+            chunk = chunk.permute(0, 2, 1, 3, 4).reshape(batch_size * (end - start), channels, height, width)
+
+            image = self.vae.decode(chunk).sample
+            image = image.reshape((batch_size, end - start) + image.shape[1:]).permute(0, 2, 1, 3, 4)
+
+            # copying into the float32 buffer takes care of the upcast without an extra full-size temporary
+            frames = output[:, :, start:end]
+            frames.copy_(image)
+            yield frames
+
     # Copied from diffusers.pipelines.stable_diffusion.pipeline_stable_diffusion.StableDiffusionPipeline.enable_vae_slicing
     def enable_vae_slicing(self):
         r"""
@@ -418,6 +704,87 @@ class AnimateDiffPipeline(DiffusionPipeline, TextualInversionLoaderMixin, IPAdap
         """Disables the FreeU mechanism if enabled."""
         self.unet.disable_freeu()
 
+    def predict_noise_in_context_windows(
+        self,
+        latent_model_input: torch.FloatTensor,
+        timestep: Union[torch.Tensor, float, int],
+        encoder_hidden_states: torch.FloatTensor,
+        context_windows: List[List[int]],
+        context_weights: torch.Tensor,
+        context_batch_size: int = 1,
+        cross_attention_kwargs: Optional[Dict[str, Any]] = None,
+        added_cond_kwargs: Optional[Dict[str, torch.Tensor]] = None,
+    ) -> torch.FloatTensor:
+        r"""
+        Predicts the noise of a video of any length by running the UNet on overlapping windows of frames and fusing
+        the predictions of the frames covered by several windows with a weighted average.
+
+        Args:
+            latent_model_input (`torch.FloatTensor`):
+                The latents of shape `(batch_size, num_channels, num_frames, height, width)`.
+            timestep (`torch.Tensor` or `float` or `int`):
+                The timestep, or one timestep per sample of the batch.
+            encoder_hidden_states (`torch.FloatTensor`):
+                The text embeddings of every sample of the batch.
+            context_windows (`List[List[int]]`):
+                The frame indices of every window, all of the same length, as returned by `get_context_windows`.
+            context_weights (`torch.Tensor`):
+                The weights of the frames of a window, as returned by `get_context_weights`.
+            context_batch_size (`int`, *optional*, defaults to 1):
+                The number of windows denoised in a single UNet call.
+            cross_attention_kwargs (`dict`, *optional*):
+                Passed along to the UNet.
+            added_cond_kwargs (`dict`, *optional*):
+                Additional conditions of every sample of the batch, passed along to the UNet.
+
+        Returns:
+            `torch.FloatTensor`: The fused noise prediction of the same shape as `latent_model_input`.
+        """
+        batch_size, num_frames = latent_model_input.shape[0], latent_model_input.shape[2]
+        device = latent_model_input.device
+        context_weights = context_weights.to(device=device, dtype=torch.float32)
+
+        noise_pred = None
+        weight_sum = torch.zeros(num_frames, device=device)
+        for i in range(0, len(context_windows), context_batch_size):
+            windows = context_windows[i : i + context_batch_size]
+            frame_indices = torch.tensor(windows, device=device)
+
+            # the windows are stacked along the batch dimension, window by window
+            window_input = latent_model_input[:, :, frame_indices.flatten()]
+            window_input = window_input.unflatten(2, frame_indices.shape).movedim(2, 0).flatten(0, 1)
+            window_timestep = timestep
+            if torch.is_tensor(timestep) and timestep.ndim == 1:
+                window_timestep = timestep.repeat(len(windows))
+            window_added_cond_kwargs = None
+            if added_cond_kwargs is not None:
+                window_added_cond_kwargs = {
+                    k: v.repeat(len(windows), *[1] * (v.ndim - 1)) for k, v in added_cond_kwargs.items()
+                }
+
+            window_noise_pred = self.unet(
+                window_input,
+                window_timestep,
+                encoder_hidden_states=encoder_hidden_states.repeat(len(windows), 1, 1),
+                cross_attention_kwargs=cross_attention_kwargs,
+                added_cond_kwargs=window_added_cond_kwargs,
+            ).sample
+
+            if noise_pred is None:
+                noise_pred = torch.zeros(
+                    (batch_size, window_noise_pred.shape[1], num_frames) + window_noise_pred.shape[3:],
+                    device=device,
+                    dtype=torch.float32,
+                )
+            # accumulate the weighted predictions of every window at its frames
+            window_noise_pred = window_noise_pred.unflatten(0, (len(windows), batch_size)).movedim(0, 2).flatten(2, 3)
+            weights = context_weights.repeat(len(windows))
+            noise_pred.index_add_(2, frame_indices.flatten(), window_noise_pred.float() * weights[:, None, None])
+            weight_sum.index_add_(0, frame_indices.flatten(), weights)
+
+        noise_pred = noise_pred / weight_sum[:, None, None]
+        return noise_pred.to(latent_model_input.dtype)
+
     # Copied from diffusers.pipelines.stable_diffusion.pipeline_stable_diffusion.StableDiffusionPipeline.prepare_extra_step_kwargs
     def prepare_extra_step_kwargs(self, generator, eta):
         # prepare extra kwargs for the scheduler step, since not all schedulers have the same signature
@@ -538,6 +905,13 @@ class AnimateDiffPipeline(DiffusionPipeline, TextualInversionLoaderMixin, IPAdap
         callback_steps: Optional[int] = 1,
         cross_attention_kwargs: Optional[Dict[str, Any]] = None,
         clip_skip: Optional[int] = None,
+        decode_chunk_size: Optional[int] = None,
+        parallel: Optional[int] = None,
+        tolerance: float = 0.1,
+        context_frames: Optional[int] = None,
+        context_overlap: int = 4,
+        context_batch_size: int = 1,
+        context_weighting: str = "pyramid",
     ):
         r"""
         The call function to the pipeline for generation.
@@ -581,7 +955,8 @@ class AnimateDiffPipeline(DiffusionPipeline, TextualInversionLoaderMixin, IPAdap
             ip_adapter_image: (`PipelineImageInput`, *optional*): Optional image input to work with IP Adapters.
             output_type (`str`, *optional*, defaults to `"pil"`):
                 The output format of the generated video. Choose between `torch.FloatTensor`, `PIL.Image` or
-                `np.array`.
+                `np.array`. With `PIL.Image`, each video is returned as a [`~image_processor.LazyPILFrames`] that only
+                builds the PIL images when they are accessed.
             return_dict (`bool`, *optional*, defaults to `True`):
                 Whether or not to return a [`~pipelines.text_to_video_synthesis.TextToVideoSDPipelineOutput`] instead
                 of a plain tuple.
@@ -597,6 +972,32 @@ class AnimateDiffPipeline(DiffusionPipeline, TextualInversionLoaderMixin, IPAdap
             clip_skip (`int`, *optional*):
                 Number of layers to be skipped from CLIP while computing the prompt embeddings. A value of 1 means that
                 the output of the pre-final layer will be used for computing the prompt embeddings.
+            decode_chunk_size (`int`, *optional*):
+                The number of frames decoded by the VAE at a time. Decoding in chunks bounds the memory of the VAE
+                decoder at the expense of some speed. If not defined, all frames are decoded in a single call.
+            parallel (`int`, *optional*):
+                The number of timesteps to denoise in parallel with [ParaDiGMS](https://arxiv.org/abs/2305.16317)
+                sampling, which evaluates a window of `parallel` timesteps in a single UNet call. Requires a parallel
+                scheduler like [`DDPMParallelScheduler`] or [`DDIMParallelScheduler`]. If not defined, the timesteps are
+                denoised sequentially.
+            tolerance (`float`, *optional*, defaults to 0.1):
+                The error tolerance for sliding the window forward for parallel sampling, as a ratio of the scheduler's
+                noise magnitude. Lower tolerance usually leads to less or no degradation. Higher tolerance is faster but
+                can risk degradation of the video quality. Only used if `parallel` is defined.
+            context_frames (`int`, *optional*):
+                The number of frames denoised together. Videos longer than `context_frames` are denoised in
+                overlapping windows of `context_frames` frames whose predictions are fused at every step, so that the
+                memory and the cost of the temporal attention stay bounded for any `num_frames`. Usually the number of
+                frames the motion modules were trained on, e.g. 16. If not defined, all frames are denoised together.
+            context_overlap (`int`, *optional*, defaults to 4):
+                The minimum number of frames shared by consecutive windows. Only used if `context_frames` is defined.
+            context_batch_size (`int`, *optional*, defaults to 1):
+                The number of windows denoised in a single UNet call. Larger values are faster if the memory allows.
+                Only used if `context_frames` is defined.
+            context_weighting (`str`, *optional*, defaults to `"pyramid"`):
+                How the predictions of overlapping windows are fused. `"pyramid"` weights the frames of a window by
+                their distance to its border, `"flat"` averages the windows uniformly. Only used if `context_frames`
+                is defined.
         Examples:
 
         Returns:
@@ -614,6 +1015,13 @@ class AnimateDiffPipeline(DiffusionPipeline, TextualInversionLoaderMixin, IPAdap
         self.check_inputs(
             prompt, height, width, callback_steps, negative_prompt, prompt_embeds, negative_prompt_embeds
         )
+        if parallel is not None and not hasattr(self.scheduler, "batch_step_no_noise"):
+            raise ValueError(
+                "Parallel sampling requires a parallel scheduler like `DDPMParallelScheduler` or"
+                f" `DDIMParallelScheduler`, but the scheduler is {self.scheduler.__class__.__name__}."
+            )
+        if context_batch_size < 1:
+            raise ValueError(f"`context_batch_size` has to be a positive integer, but is {context_batch_size}.")
 
         # 2. Define call parameters
         if prompt is not None and isinstance(prompt, str):
@@ -678,42 +1086,110 @@ class AnimateDiffPipeline(DiffusionPipeline, TextualInversionLoaderMixin, IPAdap
         # 7 Add image embeds for IP-Adapter
         added_cond_kwargs = {"image_embeds": image_embeds} if ip_adapter_image is not None else None
 
-        # Denoising loop
-        num_warmup_steps = len(timesteps) - num_inference_steps * self.scheduler.order
-        with self.progress_bar(total=num_inference_steps) as progress_bar:
-            for i, t in enumerate(timesteps):
-                # expand the latents if we are doing classifier free guidance
-                latent_model_input = torch.cat([latents] * 2) if do_classifier_free_guidance else latents
-                latent_model_input = self.scheduler.scale_model_input(latent_model_input, t)
-
-                # predict the noise residual
-                noise_pred = self.unet(
+        # 8. Split long videos into overlapping windows of frames
+        context_windows = None
+        if context_frames is not None and context_frames < num_frames:
+            context_windows = get_context_windows(num_frames, context_frames, context_overlap)
+            context_weights = get_context_weights(context_frames, context_weighting)
+
+        def predict_noise(latent_model_input, t, encoder_hidden_states, added_cond_kwargs):
+            if context_windows is None:
+                return self.unet(
                     latent_model_input,
                     t,
-                    encoder_hidden_states=prompt_embeds,
+                    encoder_hidden_states=encoder_hidden_states,
                     cross_attention_kwargs=cross_attention_kwargs,
                     added_cond_kwargs=added_cond_kwargs,
                 ).sample
+            return self.predict_noise_in_context_windows(
+                latent_model_input,
+                t,
+                encoder_hidden_states,
+                context_windows,
+                context_weights,
+                context_batch_size=context_batch_size,
+                cross_attention_kwargs=cross_attention_kwargs,
+                added_cond_kwargs=added_cond_kwargs,
+            )
 
-                # perform guidance
+        # Denoising loop
+        if parallel is not None:
+
+            def model_fn(block_latents, block_t, step_index):
+                # evaluate all the timesteps of the window in a single UNet call
+                parallel_len, batch_size = block_latents.shape[:2]
+                block_prompt_embeds = torch.stack([prompt_embeds] * parallel_len)
+                t_vec = block_t[:, None].repeat(1, batch_size)
                 if do_classifier_free_guidance:
-                    noise_pred_uncond, noise_pred_text = noise_pred.chunk(2)
-                    noise_pred = noise_pred_uncond + guidance_scale * (noise_pred_text - noise_pred_uncond)
+                    t_vec = t_vec.repeat(1, 2)
 
-                # compute the previous noisy sample x_t -> x_t-1
-                latents = self.scheduler.step(noise_pred, t, latents, **extra_step_kwargs).prev_sample
+                latent_model_input = (
+                    torch.cat([block_latents] * 2, dim=1) if do_classifier_free_guidance else block_latents
+                )
+                latent_model_input = self.scheduler.scale_model_input(latent_model_input, t_vec)
 
-                # call the callback, if provided
-                if i == len(timesteps) - 1 or ((i + 1) > num_warmup_steps and (i + 1) % self.scheduler.order == 0):
-                    progress_bar.update()
-                    if callback is not None and i % callback_steps == 0:
-                        callback(i, t, latents)
+                block_added_cond_kwargs = None
+                if added_cond_kwargs is not None:
+                    block_added_cond_kwargs = {k: torch.cat([v] * parallel_len) for k, v in added_cond_kwargs.items()}
+
+                model_output = predict_noise(
+                    latent_model_input.flatten(0, 1),
+                    t_vec.flatten(0, 1),
+                    block_prompt_embeds.flatten(0, 1),
+                    block_added_cond_kwargs,
+                )
+
+                per_latent_shape = model_output.shape[1:]
+                if do_classifier_free_guidance:
+                    model_output = model_output.reshape(parallel_len, 2, batch_size, *per_latent_shape)
+                    noise_pred_uncond, noise_pred_text = model_output[:, 0], model_output[:, 1]
+                    model_output = noise_pred_uncond + guidance_scale * (noise_pred_text - noise_pred_uncond)
+                return model_output.reshape(parallel_len, batch_size, *per_latent_shape)
+
+            extra_step_kwargs.pop("generator", None)
+            with self.progress_bar(total=num_inference_steps) as progress_bar:
+                latents = parallel_denoise(
+                    self.scheduler,
+                    latents,
+                    model_fn,
+                    parallel=parallel,
+                    tolerance=tolerance,
+                    generator=generator,
+                    extra_step_kwargs=extra_step_kwargs,
+                    progress_bar=progress_bar,
+                    callback=callback,
+                    callback_steps=callback_steps,
+                )
+        else:
+            num_warmup_steps = len(timesteps) - num_inference_steps * self.scheduler.order
+            with self.progress_bar(total=num_inference_steps) as progress_bar:
+                for i, t in enumerate(timesteps):
+                    # expand the latents if we are doing classifier free guidance
+                    latent_model_input = torch.cat([latents] * 2) if do_classifier_free_guidance else latents
+                    latent_model_input = self.scheduler.scale_model_input(latent_model_input, t)
+
+                    # predict the noise residual
+                    noise_pred = predict_noise(latent_model_input, t, prompt_embeds, added_cond_kwargs)
+
+                    # perform guidance
+                    if do_classifier_free_guidance:
+                        noise_pred_uncond, noise_pred_text = noise_pred.chunk(2)
+                        noise_pred = noise_pred_uncond + guidance_scale * (noise_pred_text - noise_pred_uncond)
+
+                    # compute the previous noisy sample x_t -> x_t-1
+                    latents = self.scheduler.step(noise_pred, t, latents, **extra_step_kwargs).prev_sample
+
+                    # call the callback, if provided
+                    if i == len(timesteps) - 1 or ((i + 1) > num_warmup_steps and (i + 1) % self.scheduler.order == 0):
+                        progress_bar.update()
+                        if callback is not None and i % callback_steps == 0:
+                            callback(i, t, latents)
 
         if output_type == "latent":
             return AnimateDiffPipelineOutput(frames=latents)
 
         # Post-processing
-        video_tensor = self.decode_latents(latents)
+        video_tensor = self.decode_latents(latents, decode_chunk_size=decode_chunk_size)
 
         if output_type == "pt":
             video = video_tensor
@@ -1,12 +1,15 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import torch
 from torch import nn
 
 from ...models.controlnet import ControlNetModel, ControlNetOutput
+from ...models.feature_cache import FeatureCache
 from ...models.modeling_utils import ModelMixin
-from ...utils import logging
+from ...utils import is_torch_version, logging
+from ...utils.accelerate_utils import apply_forward_hook
 
 
 logger = logging.get_logger(__name__)
@@ -29,6 +32,88 @@ class MultiControlNetModel(ModelMixin):
         super().__init__()
         self.nets = nn.ModuleList(controlnets)
 
+        self.execution_mode = "sequential"
+        self._stacked_weights = None
+        self._executor = None
+        self._residual_cache = None
+
+    def set_execution_mode(self, execution_mode: str = "sequential", max_workers: Optional[int] = None):
+        r"""
+        Set how the ControlNets are run. The residuals of all the ControlNets are accumulated in place into the
+        residuals of the first one in every mode.
+
+        Args:
+            execution_mode (`str`, defaults to `"sequential"`):
+                - `"sequential"`: run the ControlNets one after another.
+                - `"batched"`: run structurally identical ControlNets as a single batched forward pass with
+                  `torch.func.vmap`. Their weights are stacked once, and every ControlNet keeps a view into the stacked
+                  weights, so no memory is duplicated. Requires PyTorch 2.0 and conditioning images of the same shape.
+                  Passes that need gradients for the weights fall back to `"sequential"`.
+                - `"parallel"`: overlap the ControlNets on separate CUDA streams, or on a thread pool of `max_workers`
+                  threads on CPU.
+            max_workers (`int`, *optional*):
+                The number of threads of the `"parallel"` mode on CPU, defaults to the number of ControlNets.
+        """
+        if execution_mode not in ("sequential", "batched", "parallel"):
+            raise ValueError(
+                f"`execution_mode` has to be one of 'sequential', 'batched' or 'parallel', but is {execution_mode}."
+            )
+
+        if execution_mode == "batched":
+            if is_torch_version("<", "2.0.0"):
+                raise ValueError("The 'batched' execution mode requires PyTorch 2.0 or higher.")
+            configs = [{k: v for k, v in net.config.items() if not k.startswith("_")} for net in self.nets]
+            if any(config != configs[0] for config in configs[1:]):
+                raise ValueError("The 'batched' execution mode requires ControlNets with identical configurations.")
+            self._stack_weights()
+        else:
+            self._stacked_weights = None
+
+        if self._executor is not None:
+            # the idle workers exit without blocking the caller
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if execution_mode == "parallel":
+            self._executor = ThreadPoolExecutor(max_workers=max_workers or len(self.nets))
+
+        self.execution_mode = execution_mode
+
+    def enable_residual_cache(self, cache_interval: int = 2):
+        r"""
+        Enables the reuse of the residuals of the ControlNets across denoising steps, see
+        [`~models.ControlNetModel.enable_residual_cache`]. The residuals of every ControlNet are cached separately, so
+        their `conditioning_scale` can still change at every step.
+
+        Args:
+            cache_interval (`int`, defaults to `2`):
+                The number of denoising steps that share the residuals, `1` recomputes them at every step.
+        """
+        self._residual_cache = FeatureCache(cache_interval)
+
+    def disable_residual_cache(self):
+        """Disables the reuse of the residuals of the ControlNets."""
+        self._residual_cache = None
+
+    def _stack_weights(self):
+        from torch.func import stack_module_state
+
+        params, buffers = stack_module_state(list(self.nets))
+        params = {name: param.detach() for name, param in params.items()}
+        # point the weights of every ControlNet at its slice of the stacked weights
+        for i, net in enumerate(self.nets):
+            for name, param in net.named_parameters():
+                param.data = params[name][i]
+            for name, buffer in net.named_buffers():
+                buffer.data = buffers[name][i]
+        self._stacked_weights = (params, buffers)
+
+    def _apply(self, fn, *args, **kwargs):
+        module = super()._apply(fn, *args, **kwargs)
+        # moving or casting the ControlNets replaces their weights by new tensors
+        if getattr(self, "_stacked_weights", None) is not None:
+            self._stack_weights()
+        return module
+
     def forward(
         self,
         sample: torch.FloatTensor,
@@ -42,36 +127,157 @@ class MultiControlNetModel(ModelMixin):
         added_cond_kwargs: Optional[Dict[str, torch.Tensor]] = None,
         cross_attention_kwargs: Optional[Dict[str, Any]] = None,
         guess_mode: bool = False,
+        controlnet_cond_embeds: Optional[List[torch.FloatTensor]] = None,
         return_dict: bool = True,
     ) -> Union[ControlNetOutput, Tuple]:
-        for i, (image, scale, controlnet) in enumerate(zip(controlnet_cond, conditioning_scale, self.nets)):
-            down_samples, mid_sample = controlnet(
-                sample=sample,
-                timestep=timestep,
-                encoder_hidden_states=encoder_hidden_states,
-                controlnet_cond=image,
-                conditioning_scale=scale,
-                class_labels=class_labels,
-                timestep_cond=timestep_cond,
-                attention_mask=attention_mask,
-                added_cond_kwargs=added_cond_kwargs,
-                cross_attention_kwargs=cross_attention_kwargs,
-                guess_mode=guess_mode,
-                return_dict=return_dict,
+        kwargs = {
+            "timestep": timestep,
+            "encoder_hidden_states": encoder_hidden_states,
+            "class_labels": class_labels,
+            "timestep_cond": timestep_cond,
+            "attention_mask": attention_mask,
+            "added_cond_kwargs": added_cond_kwargs,
+            "cross_attention_kwargs": cross_attention_kwargs,
+            "guess_mode": guess_mode,
+        }
+        if controlnet_cond_embeds is None:
+            controlnet_cond_embeds = [None] * len(self.nets)
+        if controlnet_cond is None:
+            controlnet_cond = [None] * len(self.nets)
+
+        if self._residual_cache is not None:
+            if self._residual_cache.should_refresh(timestep, sample):
+                # cache the residuals of every ControlNet before they are scaled, so that the scales can change
+                self._residual_cache.features = self._run_controlnets(
+                    sample, controlnet_cond, controlnet_cond_embeds, [1.0] * len(self.nets), return_dict, kwargs
+                )
+            outputs = [
+                ([samples * scale for samples in down_samples], mid_sample * scale)
+                for (down_samples, mid_sample), scale in zip(self._residual_cache.features, conditioning_scale)
+            ]
+        elif self._use_batched_forward(controlnet_cond, controlnet_cond_embeds):
+            down_samples, mid_sample = self._batched_forward(
+                sample, controlnet_cond, controlnet_cond_embeds, conditioning_scale, **kwargs
+            )
+            return [samples.sum(dim=0) for samples in down_samples], mid_sample.sum(dim=0)
+        else:
+            outputs = self._run_controlnets(
+                sample, controlnet_cond, controlnet_cond_embeds, conditioning_scale, return_dict, kwargs
             )
 
-            # merge samples
+        for i, (down_samples, mid_sample) in enumerate(outputs):
+            # merge samples in place into the residuals of the first ControlNet
             if i == 0:
-                down_block_res_samples, mid_block_res_sample = down_samples, mid_sample
+                down_block_res_samples, mid_block_res_sample = list(down_samples), mid_sample
             else:
-                down_block_res_samples = [
-                    samples_prev + samples_curr
-                    for samples_prev, samples_curr in zip(down_block_res_samples, down_samples)
-                ]
+                for samples_prev, samples_curr in zip(down_block_res_samples, down_samples):
+                    samples_prev += samples_curr
                 mid_block_res_sample += mid_sample
 
         return down_block_res_samples, mid_block_res_sample
 
+    def _use_batched_forward(self, controlnet_cond, controlnet_cond_embeds):
+        if self.execution_mode != "batched":
+            return False
+        if torch.is_grad_enabled() and any(param.requires_grad for param in self.nets.parameters()):
+            return False
+
+        conditions = [
+            image if embeds is None else embeds for image, embeds in zip(controlnet_cond, controlnet_cond_embeds)
+        ]
+        return all(
+            (condition.shape, embeds is None) == (conditions[0].shape, controlnet_cond_embeds[0] is None)
+            for condition, embeds in zip(conditions, controlnet_cond_embeds)
+        )
+
+    def _run_controlnets(
+        self, sample, controlnet_cond, controlnet_cond_embeds, conditioning_scale, return_dict, kwargs
+    ):
+        # returns the residuals of every ControlNet
+        if self._use_batched_forward(controlnet_cond, controlnet_cond_embeds):
+            down_samples, mid_sample = self._batched_forward(
+                sample, controlnet_cond, controlnet_cond_embeds, conditioning_scale, **kwargs
+            )
+            return list(zip(zip(*[samples.unbind(0) for samples in down_samples]), mid_sample.unbind(0)))
+
+        def run_controlnet(image, embeds, scale, controlnet):
+            return controlnet(
+                sample=sample,
+                controlnet_cond=image,
+                conditioning_scale=scale,
+                controlnet_cond_embeds=embeds,
+                return_dict=return_dict,
+                **kwargs,
+            )
+
+        args = (controlnet_cond, controlnet_cond_embeds, conditioning_scale, self.nets)
+        if self.execution_mode == "parallel" and sample.device.type == "cuda":
+            return self._stream_forward(sample.device, run_controlnet, *args)
+        elif self.execution_mode == "parallel":
+            return list(self._executor.map(run_controlnet, *args))
+        else:
+            return list(map(run_controlnet, *args))
+
+    @apply_forward_hook
+    def embed_condition(self, controlnet_cond: List[torch.FloatTensor]) -> List[torch.FloatTensor]:
+        r"""
+        Computes the conditioning embeddings of every ControlNet, see [`~models.ControlNetModel.embed_condition`].
+        """
+        return [controlnet.embed_condition(image) for image, controlnet in zip(controlnet_cond, self.nets)]
+
+    def _batched_forward(self, sample, controlnet_cond, controlnet_cond_embeds, conditioning_scale, **kwargs):
+        # returns the residuals of all the ControlNets stacked along a new first dimension
+        from torch.func import functional_call, vmap
+
+        params, buffers = self._stacked_weights
+        embedded = controlnet_cond_embeds[0] is not None
+        conditions = torch.stack(controlnet_cond_embeds if embedded else controlnet_cond)
+        # the scales of every ControlNet are either floats or tensors with one scale per sample
+        conditioning_scale = torch.stack(
+            torch.broadcast_tensors(
+                *[torch.as_tensor(scale, device=sample.device, dtype=sample.dtype) for scale in conditioning_scale]
+            )
+        )
+        condition_name = "controlnet_cond_embeds" if embedded else "controlnet_cond"
+
+        def controlnet_forward(params, buffers, condition, scale):
+            return functional_call(
+                self.nets[0],
+                (params, buffers),
+                (sample,),
+                {
+                    "controlnet_cond": None,
+                    condition_name: condition,
+                    "conditioning_scale": scale,
+                    "return_dict": False,
+                    **kwargs,
+                },
+            )
+
+        return vmap(controlnet_forward)(params, buffers, conditions, conditioning_scale)
+
+    def _stream_forward(
+        self, device, run_controlnet, controlnet_cond, controlnet_cond_embeds, conditioning_scale, nets
+    ):
+        current_stream = torch.cuda.current_stream(device)
+        streams = [torch.cuda.Stream(device) for _ in nets]
+
+        outputs = []
+        for image, embeds, scale, controlnet, stream in zip(
+            controlnet_cond, controlnet_cond_embeds, conditioning_scale, nets, streams
+        ):
+            stream.wait_stream(current_stream)
+            with torch.cuda.stream(stream):
+                outputs.append(run_controlnet(image, embeds, scale, controlnet))
+
+        for (down_samples, mid_sample), stream in zip(outputs, streams):
+            current_stream.wait_stream(stream)
+            # the residuals were allocated on the side stream but are consumed on the current one
+            for residual in [*down_samples, mid_sample]:
+                residual.record_stream(current_stream)
+
+        return outputs
+
     def save_pretrained(
         self,
         save_directory: Union[str, os.PathLike],
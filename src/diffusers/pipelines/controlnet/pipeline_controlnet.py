@@ -91,6 +91,165 @@ EXAMPLE_DOC_STRING = """
 """
 
 
+# Copied from diffusers.pipelines.stable_diffusion.pipeline_stable_diffusion_paradigms.parallel_denoise
+def parallel_denoise(
+    scheduler,
+    latents: torch.FloatTensor,
+    model_fn: Callable[[torch.FloatTensor, torch.Tensor, int], torch.FloatTensor],
+    parallel: int = 10,
+    tolerance: float = 0.1,
+    generator: Optional[Union[torch.Generator, List[torch.Generator]]] = None,
+    extra_step_kwargs: Optional[Dict[str, Any]] = None,
+    progress_bar=None,
+    callback: Optional[Callable[[int, int, torch.FloatTensor], None]] = None,
+    callback_steps: int = 1,
+    debug: bool = False,
+):
+    r"""
+    Runs the denoising loop of `scheduler` with the parallel sampling of [ParaDiGMS](https://arxiv.org/abs/2305.16317).
+
+    Picard iterations refine a window of `parallel` consecutive timesteps at once, with a single call of `model_fn`
+    for the whole window. The window then slides past the timesteps whose latents have converged.
+
+    Args:
+        scheduler ([`SchedulerMixin`]):
+            A scheduler with a `batch_step_no_noise` method, like [`DDPMParallelScheduler`] or
+            [`DDIMParallelScheduler`]. Its timesteps have to be set already.
+        latents (`torch.FloatTensor`):
+            The initial noisy latents of shape `(batch_size, ...)`.
+        model_fn (`Callable`):
+            Predicts the (guided) model output of a window. It's called with `model_fn(latents, timesteps,
+            step_index)`, where `latents` has shape `(parallel_len, batch_size, ...)`, `timesteps` holds the
+            `parallel_len` timesteps of the window and `step_index` is the index of the first one. It returns a tensor
+            of the same shape as `latents`.
+        parallel (`int`, *optional*, defaults to 10):
+            The number of timesteps evaluated in a single call of `model_fn`.
+        tolerance (`float`, *optional*, defaults to 0.1):
+            The error tolerance for sliding the window forward, as a ratio of the scheduler's noise magnitude.
+        generator (`torch.Generator` or `List[torch.Generator]`, *optional*):
+            The generator(s) for the pre-sampled noise of stochastic schedulers.
+        extra_step_kwargs (`Dict[str, Any]`, *optional*):
+            Extra kwargs of `scheduler.batch_step_no_noise`.
+        progress_bar (*optional*):
+            A progress bar over the timesteps, updated as the window slides.
+        callback (`Callable`, *optional*):
+            Called every `callback_steps` iterations with `callback(step: int, timestep: int, latents:
+            torch.FloatTensor)`, with the latents at the beginning of the window.
+        callback_steps (`int`, *optional*, defaults to 1):
+            The frequency at which the `callback` function is called.
+        debug (`bool`, *optional*, defaults to `False`):
+            Whether or not to evaluate `torch.cumsum` on the CPU, which is deterministic.
+
+    Returns:
+        `torch.FloatTensor`: The denoised latents.
+    """
+
+    def cumsum(input, dim):
+        if debug:
+            # cumsum_cuda_kernel does not have a deterministic implementation
+            # so perform cumsum on cpu for debugging purposes
+            return torch.cumsum(input.cpu().float(), dim=dim).to(input.device)
+        return torch.cumsum(input, dim=dim)
+
+    extra_step_kwargs = extra_step_kwargs or {}
+    timesteps = scheduler.timesteps
+    num_timesteps = len(timesteps)
+    batch_size = latents.shape[0]
+    parallel = min(parallel, num_timesteps)
+
+    begin_idx = 0
+    end_idx = parallel
+    latents_time_evolution_buffer = torch.stack([latents] * (num_timesteps + 1))
+
+    # We must make sure the noise of stochastic schedulers such as DDPM is sampled only once per timestep.
+    # Sampling inside the parallel denoising loop will mess this up, so we pre-sample the noise vectors outside the denoising loop.
+    noise_array = torch.zeros_like(latents_time_evolution_buffer)
+    for j in range(num_timesteps):
+        base_noise = randn_tensor(shape=latents.shape, generator=generator, device=latents.device, dtype=latents.dtype)
+        noise = (scheduler._get_variance(timesteps[j]) ** 0.5) * base_noise
+        noise_array[j] = noise.clone()
+
+    # We specify the error tolerance as a ratio of the scheduler's noise magnitude. We similarly compute the error tolerance
+    # outside of the denoising loop to avoid recomputing it at every step.
+    # We will be dividing the norm of the noise, so we store its inverse here to avoid a division at every step.
+    inverse_variance_norm = 1.0 / torch.tensor(
+        [scheduler._get_variance(timesteps[j]) for j in range(num_timesteps)] + [0]
+    ).to(noise_array.device)
+    latent_dim = noise_array[0, 0].numel()
+    inverse_variance_norm = inverse_variance_norm[:, None] / latent_dim
+
+    scaled_tolerance = tolerance**2
+
+    steps = 0
+    while begin_idx < num_timesteps:
+        # these have shape (parallel_dim, batch_size, ...)
+        # parallel_len is at most parallel, but could be less if we are at the end of the timesteps
+        # we are processing batch window of timesteps spanning [begin_idx, end_idx)
+        parallel_len = end_idx - begin_idx
+
+        block_latents = latents_time_evolution_buffer[begin_idx:end_idx]
+        block_t = timesteps[begin_idx:end_idx]
+        model_output = model_fn(block_latents, block_t, begin_idx)
+
+        block_latents_denoise = scheduler.batch_step_no_noise(
+            model_output=model_output.flatten(0, 1),
+            timesteps=block_t[:, None].repeat(1, batch_size).flatten(0, 1),
+            sample=block_latents.flatten(0, 1),
+            **extra_step_kwargs,
+        ).reshape(block_latents.shape)
+
+        # back to shape (parallel_dim, batch_size, ...)
+        # now we want to add the pre-sampled noise
+        # parallel sampling algorithm requires computing the cumulative drift from the beginning
+        # of the window, so we need to compute cumulative sum of the deltas and the pre-sampled noises.
+        delta = block_latents_denoise - block_latents
+        cumulative_delta = cumsum(delta, dim=0)
+        cumulative_noise = cumsum(noise_array[begin_idx:end_idx], dim=0)
+
+        # if we are using an ODE-like scheduler (like DDIM), we don't want to add noise
+        if scheduler._is_ode_scheduler:
+            cumulative_noise = 0
+
+        block_latents_new = latents_time_evolution_buffer[begin_idx][None,] + cumulative_delta + cumulative_noise
+        cur_error = torch.linalg.norm(
+            (block_latents_new - latents_time_evolution_buffer[begin_idx + 1 : end_idx + 1]).reshape(
+                parallel_len, batch_size, -1
+            ),
+            dim=-1,
+        ).pow(2)
+        error_ratio = cur_error * inverse_variance_norm[begin_idx + 1 : end_idx + 1]
+
+        # find the first index of the vector error_ratio that is greater than error tolerance
+        # we can shift the window for the next iteration up to this index
+        error_ratio = torch.nn.functional.pad(
+            error_ratio, (0, 0, 0, 1), value=1e9
+        )  # handle the case when everything is below ratio, by padding the end of parallel_len dimension
+        any_error_at_time = torch.max(error_ratio > scaled_tolerance, dim=1).values.int()
+        ind = torch.argmax(any_error_at_time).item()
+
+        # compute the new begin and end idxs for the window
+        new_begin_idx = begin_idx + min(1 + ind, parallel)
+        new_end_idx = min(new_begin_idx + parallel, num_timesteps)
+
+        # store the computed latents for the current window in the global buffer
+        latents_time_evolution_buffer[begin_idx + 1 : end_idx + 1] = block_latents_new
+        # initialize the new sliding window latents with the end of the current window,
+        # should be better than random initialization
+        latents_time_evolution_buffer[end_idx : new_end_idx + 1] = latents_time_evolution_buffer[end_idx][None,]
+
+        steps += 1
+
+        if progress_bar is not None:
+            progress_bar.update(new_begin_idx - begin_idx)
+        if callback is not None and steps % callback_steps == 0:
+            callback(begin_idx, timesteps[begin_idx], latents_time_evolution_buffer[begin_idx])
+
+        begin_idx = new_begin_idx
+        end_idx = new_end_idx
+
+    return latents_time_evolution_buffer[-1]
+
+
 class StableDiffusionControlNetPipeline(
     DiffusionPipeline, TextualInversionLoaderMixin, LoraLoaderMixin, IPAdapterMixin, FromSingleFileMixin
 ):
@@ -342,22 +501,29 @@ class StableDiffusionControlNetPipeline(
             else:
                 attention_mask = None
 
-            if clip_skip is None:
-                prompt_embeds = self.text_encoder(text_input_ids.to(device), attention_mask=attention_mask)
-                prompt_embeds = prompt_embeds[0]
-            else:
-                prompt_embeds = self.text_encoder(
-                    text_input_ids.to(device), attention_mask=attention_mask, output_hidden_states=True
-                )
-                # Access the `hidden_states` first, that contains a tuple of
-                # all the hidden states from the encoder layers. Then index into
-                # the tuple to access the hidden states from the desired layer.
-                prompt_embeds = prompt_embeds[-1][-(clip_skip + 1)]
-                # We also need to apply the final LayerNorm here to not mess with the
-                # representations. The `last_hidden_states` that we typically use for
-                # obtaining the final prompt representations passes through the LayerNorm
-                # layer.
-                prompt_embeds = self.text_encoder.text_model.final_layer_norm(prompt_embeds)
+            # reuse the text encoder outputs of previously seen prompts if `enable_prompt_embeds_cache` was called
+            cache_keys, prompt_embeds = self._lookup_prompt_embeds(
+                self.text_encoder, text_input_ids, clip_skip=clip_skip, lora_scale=lora_scale
+            )
+
+            if prompt_embeds is None:
+                if clip_skip is None:
+                    prompt_embeds = self.text_encoder(text_input_ids.to(device), attention_mask=attention_mask)
+                    prompt_embeds = prompt_embeds[0]
+                else:
+                    prompt_embeds = self.text_encoder(
+                        text_input_ids.to(device), attention_mask=attention_mask, output_hidden_states=True
+                    )
+                    # Access the `hidden_states` first, that contains a tuple of
+                    # all the hidden states from the encoder layers. Then index into
+                    # the tuple to access the hidden states from the desired layer.
+                    prompt_embeds = prompt_embeds[-1][-(clip_skip + 1)]
+                    # We also need to apply the final LayerNorm here to not mess with the
+                    # representations. The `last_hidden_states` that we typically use for
+                    # obtaining the final prompt representations passes through the LayerNorm
+                    # layer.
+                    prompt_embeds = self.text_encoder.text_model.final_layer_norm(prompt_embeds)
+                self._store_prompt_embeds(cache_keys, prompt_embeds)
 
         if self.text_encoder is not None:
             prompt_embeds_dtype = self.text_encoder.dtype
@@ -412,11 +578,17 @@ class StableDiffusionControlNetPipeline(
             else:
                 attention_mask = None
 
-            negative_prompt_embeds = self.text_encoder(
-                uncond_input.input_ids.to(device),
-                attention_mask=attention_mask,
+            cache_keys, negative_prompt_embeds = self._lookup_prompt_embeds(
+                self.text_encoder, uncond_input.input_ids, lora_scale=lora_scale
             )
-            negative_prompt_embeds = negative_prompt_embeds[0]
+
+            if negative_prompt_embeds is None:
+                negative_prompt_embeds = self.text_encoder(
+                    uncond_input.input_ids.to(device),
+                    attention_mask=attention_mask,
+                )
+                negative_prompt_embeds = negative_prompt_embeds[0]
+                self._store_prompt_embeds(cache_keys, negative_prompt_embeds)
 
         if do_classifier_free_guidance:
             # duplicate unconditional embeddings for each generation per prompt, using mps friendly method
@@ -705,6 +877,24 @@ class StableDiffusionControlNetPipeline(
 
         return image
 
+    def prepare_controlnet_cond_embeds(self, image, do_classifier_free_guidance=False, guess_mode=False):
+        controlnet = self.controlnet._orig_mod if is_compiled_module(self.controlnet) else self.controlnet
+        images = image if isinstance(controlnet, MultiControlNetModel) else [image]
+
+        if do_classifier_free_guidance and not guess_mode:
+            # the unconditional and the conditional batch share the conditioning image
+            images = [image_.chunk(2)[0] for image_ in images]
+
+        if isinstance(controlnet, MultiControlNetModel):
+            embeds = controlnet.embed_condition(images)
+        else:
+            embeds = [controlnet.embed_condition(images[0])]
+
+        if do_classifier_free_guidance and not guess_mode:
+            embeds = [torch.cat([embeds_] * 2) for embeds_ in embeds]
+
+        return embeds if isinstance(controlnet, MultiControlNetModel) else embeds[0]
+
     # Copied from diffusers.pipelines.stable_diffusion.pipeline_stable_diffusion.StableDiffusionPipeline.prepare_latents
     def prepare_latents(self, batch_size, num_channels_latents, height, width, dtype, device, generator, latents=None):
         shape = (batch_size, num_channels_latents, height // self.vae_scale_factor, width // self.vae_scale_factor)
@@ -751,6 +941,34 @@ class StableDiffusionControlNetPipeline(
         """Disables the FreeU mechanism if enabled."""
         self.unet.disable_freeu()
 
+    def enable_feature_cache(
+        self, cache_interval: int = 3, cache_block_id: int = 0, controlnet_cache_interval: Optional[int] = None
+    ):
+        r"""
+        Enables the reuse of the slowly changing features of the UNet and the ControlNet across denoising steps.
+
+        See [`~UNet2DConditionModel.enable_deep_cache`] and [`~ControlNetModel.enable_residual_cache`]. Larger
+        intervals are faster but lose more quality.
+
+        Args:
+            cache_interval (`int`, defaults to `3`):
+                The number of denoising steps that share the deep features of the UNet.
+            cache_block_id (`int`, defaults to `0`):
+                The index of the deepest down block of the UNet that is run at every step.
+            controlnet_cache_interval (`int`, *optional*):
+                The number of denoising steps that share the residuals of the ControlNet, defaults to
+                `cache_interval`. `1` runs the ControlNet at every step.
+        """
+        if controlnet_cache_interval is None:
+            controlnet_cache_interval = cache_interval
+        self.unet.enable_deep_cache(cache_interval=cache_interval, cache_block_id=cache_block_id)
+        self.controlnet.enable_residual_cache(cache_interval=controlnet_cache_interval)
+
+    def disable_feature_cache(self):
+        """Disables the reuse of the features of the UNet and the ControlNet if enabled."""
+        self.unet.disable_deep_cache()
+        self.controlnet.disable_residual_cache()
+
     # Copied from diffusers.pipelines.latent_consistency_models.pipeline_latent_consistency_text2img.LatentConsistencyModelPipeline.get_guidance_scale_embedding
     def get_guidance_scale_embedding(self, w, embedding_dim=512, dtype=torch.float32):
         """
@@ -831,6 +1049,8 @@ class StableDiffusionControlNetPipeline(
         clip_skip: Optional[int] = None,
         callback_on_step_end: Optional[Callable[[int, int, Dict], None]] = None,
         callback_on_step_end_tensor_inputs: List[str] = ["latents"],
+        parallel: Optional[int] = None,
+        tolerance: float = 0.1,
         **kwargs,
     ):
         r"""
@@ -916,6 +1136,18 @@ class StableDiffusionControlNetPipeline(
                 The list of tensor inputs for the `callback_on_step_end` function. The tensors specified in the list
                 will be passed as `callback_kwargs` argument. You will only be able to include variables listed in the
                 `._callback_tensor_inputs` attribute of your pipeine class.
+            parallel (`int`, *optional*):
+                The number of timesteps to denoise in parallel with [ParaDiGMS](https://arxiv.org/abs/2305.16317)
+                sampling, which evaluates a window of `parallel` timesteps in a single call of the UNet and of the
+                ControlNet. Requires a parallel scheduler like [`DDPMParallelScheduler`] or [`DDIMParallelScheduler`].
+                If not defined, the timesteps are denoised sequentially. The ControlNets run with their execution mode
+                (see [`~pipelines.controlnet.MultiControlNetModel.set_execution_mode`]) and get one conditioning scale
+                per timestep of the window. Their residual cache should be disabled, because consecutive windows don't
+                share their timesteps.
+            tolerance (`float`, *optional*, defaults to 0.1):
+                The error tolerance for sliding the window forward for parallel sampling, as a ratio of the scheduler's
+                noise magnitude. Lower tolerance usually leads to less or no degradation. Higher tolerance is faster but
+                can risk degradation of the image quality. Only used if `parallel` is defined.
 
         Examples:
 
@@ -970,6 +1202,20 @@ class StableDiffusionControlNetPipeline(
             control_guidance_end,
             callback_on_step_end_tensor_inputs,
         )
+        if parallel is not None:
+            if not hasattr(self.scheduler, "batch_step_no_noise"):
+                raise ValueError(
+                    "Parallel sampling requires a parallel scheduler like `DDPMParallelScheduler` or"
+                    f" `DDIMParallelScheduler`, but the scheduler is {self.scheduler.__class__.__name__}."
+                )
+            if callback_on_step_end is not None:
+                raise ValueError(
+                    "`callback_on_step_end` can't be used with parallel sampling, use `callback` instead."
+                )
+            if self.unet._deep_cache is not None or controlnet._residual_cache is not None:
+                raise ValueError(
+                    "The feature cache can't be used with parallel sampling, disable it with `disable_feature_cache`."
+                )
 
         self._guidance_scale = guidance_scale
         self._clip_skip = clip_skip
@@ -1099,93 +1345,227 @@ class StableDiffusionControlNetPipeline(
             ]
             controlnet_keep.append(keeps[0] if isinstance(controlnet, ControlNetModel) else keeps)
 
+        # The conditioning image doesn't change over the denoising steps, so embed it only once
+        controlnet_cond_embeds = self.prepare_controlnet_cond_embeds(
+            image, self.do_classifier_free_guidance, guess_mode
+        )
+
         # 8. Denoising loop
-        num_warmup_steps = len(timesteps) - num_inference_steps * self.scheduler.order
-        is_unet_compiled = is_compiled_module(self.unet)
-        is_controlnet_compiled = is_compiled_module(self.controlnet)
-        is_torch_higher_equal_2_1 = is_torch_version(">=", "2.1")
-        with self.progress_bar(total=num_inference_steps) as progress_bar:
-            for i, t in enumerate(timesteps):
-                # Relevant thread:
-                # https://dev-discuss.pytorch.org/t/cudagraphs-in-pytorch-2-0/1428
-                if (is_unet_compiled and is_controlnet_compiled) and is_torch_higher_equal_2_1:
-                    torch._inductor.cudagraph_mark_step_begin()
-                # expand the latents if we are doing classifier free guidance
-                latent_model_input = torch.cat([latents] * 2) if self.do_classifier_free_guidance else latents
-                latent_model_input = self.scheduler.scale_model_input(latent_model_input, t)
+        if parallel is not None:
+            images = image if isinstance(controlnet, MultiControlNetModel) else [image]
+            cond_embeds = (
+                controlnet_cond_embeds if isinstance(controlnet, MultiControlNetModel) else [controlnet_cond_embeds]
+            )
+            conditioning_scales = (
+                controlnet_conditioning_scale
+                if isinstance(controlnet_conditioning_scale, list)
+                else [controlnet_conditioning_scale]
+            )
+            # the conditioning scale of every ControlNet at every timestep, with shape (num_timesteps, num_nets)
+            cond_scales = torch.tensor(
+                [
+                    [c * s for c, s in zip(conditioning_scales, keep if isinstance(keep, list) else [keep])]
+                    for keep in controlnet_keep
+                ],
+                device=device,
+                dtype=latents.dtype,
+            )
+
+            def model_fn(block_latents, block_t, step_index):
+                # evaluate all the timesteps of the window in a single UNet and ControlNet call
+                parallel_len, batch_size = block_latents.shape[:2]
+                block_prompt_embeds = torch.cat([prompt_embeds] * parallel_len)
+                t_vec = block_t[:, None].repeat(1, batch_size)
+                if self.do_classifier_free_guidance:
+                    t_vec = t_vec.repeat(1, 2)
+
+                latent_model_input = (
+                    torch.cat([block_latents] * 2, dim=1) if self.do_classifier_free_guidance else block_latents
+                )
+                latent_model_input = self.scheduler.scale_model_input(latent_model_input, t_vec).flatten(0, 1)
 
                 # controlnet(s) inference
                 if guess_mode and self.do_classifier_free_guidance:
                     # Infer ControlNet only for the conditional batch.
-                    control_model_input = latents
-                    control_model_input = self.scheduler.scale_model_input(control_model_input, t)
-                    controlnet_prompt_embeds = prompt_embeds.chunk(2)[1]
+                    control_t = block_t[:, None].repeat(1, batch_size)
+                    control_model_input = self.scheduler.scale_model_input(block_latents, control_t).flatten(0, 1)
+                    controlnet_prompt_embeds = torch.cat([prompt_embeds.chunk(2)[1]] * parallel_len)
+                    control_t = control_t.flatten(0, 1)
                 else:
                     control_model_input = latent_model_input
-                    controlnet_prompt_embeds = prompt_embeds
+                    controlnet_prompt_embeds = block_prompt_embeds
+                    control_t = t_vec.flatten(0, 1)
 
-                if isinstance(controlnet_keep[i], list):
-                    cond_scale = [c * s for c, s in zip(controlnet_conditioning_scale, controlnet_keep[i])]
-                else:
-                    controlnet_cond_scale = controlnet_conditioning_scale
-                    if isinstance(controlnet_cond_scale, list):
-                        controlnet_cond_scale = controlnet_cond_scale[0]
-                    cond_scale = controlnet_cond_scale * controlnet_keep[i]
+                # the conditioning scale differs between the timesteps of the window, so every ControlNet gets one
+                # scale per sample
+                block_cond_scales = cond_scales[step_index : step_index + parallel_len].repeat_interleave(
+                    control_model_input.shape[0] // parallel_len, dim=0
+                )
+                block_cond_scales = [scale.view(-1, 1, 1, 1) for scale in block_cond_scales.unbind(1)]
+                block_images = [
+                    torch.cat([image_] * parallel_len) if embeds is None else None
+                    for image_, embeds in zip(images, cond_embeds)
+                ]
+                block_cond_embeds = [
+                    torch.cat([embeds] * parallel_len) if embeds is not None else None for embeds in cond_embeds
+                ]
+                if not isinstance(controlnet, MultiControlNetModel):
+                    block_cond_scales, block_images, block_cond_embeds = (
+                        block_cond_scales[0],
+                        block_images[0],
+                        block_cond_embeds[0],
+                    )
 
                 down_block_res_samples, mid_block_res_sample = self.controlnet(
                     control_model_input,
-                    t,
+                    control_t,
                     encoder_hidden_states=controlnet_prompt_embeds,
-                    controlnet_cond=image,
-                    conditioning_scale=cond_scale,
+                    controlnet_cond=block_images,
+                    conditioning_scale=block_cond_scales,
                     guess_mode=guess_mode,
+                    controlnet_cond_embeds=block_cond_embeds,
                     return_dict=False,
                 )
 
                 if guess_mode and self.do_classifier_free_guidance:
                     # Infered ControlNet only for the conditional batch.
                     # To apply the output of ControlNet to both the unconditional and conditional batches,
-                    # add 0 to the unconditional batch to keep it unchanged.
-                    down_block_res_samples = [torch.cat([torch.zeros_like(d), d]) for d in down_block_res_samples]
-                    mid_block_res_sample = torch.cat([torch.zeros_like(mid_block_res_sample), mid_block_res_sample])
+                    # add 0 to the unconditional batch of every timestep to keep it unchanged.
+                    def add_zeros(sample):
+                        sample = sample.unflatten(0, (parallel_len, batch_size))
+                        return torch.cat([torch.zeros_like(sample), sample], dim=1).flatten(0, 1)
+
+                    down_block_res_samples = [add_zeros(d) for d in down_block_res_samples]
+                    mid_block_res_sample = add_zeros(mid_block_res_sample)
+
+                block_added_cond_kwargs = None
+                if added_cond_kwargs is not None:
+                    block_added_cond_kwargs = {k: torch.cat([v] * parallel_len) for k, v in added_cond_kwargs.items()}
 
                 # predict the noise residual
-                noise_pred = self.unet(
+                model_output = self.unet(
                     latent_model_input,
-                    t,
-                    encoder_hidden_states=prompt_embeds,
-                    timestep_cond=timestep_cond,
+                    t_vec.flatten(0, 1),
+                    encoder_hidden_states=block_prompt_embeds,
+                    timestep_cond=torch.cat([timestep_cond] * parallel_len) if timestep_cond is not None else None,
                     cross_attention_kwargs=self.cross_attention_kwargs,
                     down_block_additional_residuals=down_block_res_samples,
                     mid_block_additional_residual=mid_block_res_sample,
-                    added_cond_kwargs=added_cond_kwargs,
+                    added_cond_kwargs=block_added_cond_kwargs,
                     return_dict=False,
                 )[0]
 
-                # perform guidance
+                per_latent_shape = model_output.shape[1:]
                 if self.do_classifier_free_guidance:
-                    noise_pred_uncond, noise_pred_text = noise_pred.chunk(2)
-                    noise_pred = noise_pred_uncond + self.guidance_scale * (noise_pred_text - noise_pred_uncond)
-
-                # compute the previous noisy sample x_t -> x_t-1
-                latents = self.scheduler.step(noise_pred, t, latents, **extra_step_kwargs, return_dict=False)[0]
-
-                if callback_on_step_end is not None:
-                    callback_kwargs = {}
-                    for k in callback_on_step_end_tensor_inputs:
-                        callback_kwargs[k] = locals()[k]
-                    callback_outputs = callback_on_step_end(self, i, t, callback_kwargs)
-
-                    latents = callback_outputs.pop("latents", latents)
-                    prompt_embeds = callback_outputs.pop("prompt_embeds", prompt_embeds)
-                    negative_prompt_embeds = callback_outputs.pop("negative_prompt_embeds", negative_prompt_embeds)
-
-                # call the callback, if provided
-                if i == len(timesteps) - 1 or ((i + 1) > num_warmup_steps and (i + 1) % self.scheduler.order == 0):
-                    progress_bar.update()
-                    if callback is not None and i % callback_steps == 0:
-                        step_idx = i // getattr(self.scheduler, "order", 1)
-                        callback(step_idx, t, latents)
+                    model_output = model_output.reshape(parallel_len, 2, batch_size, *per_latent_shape)
+                    noise_pred_uncond, noise_pred_text = model_output[:, 0], model_output[:, 1]
+                    model_output = noise_pred_uncond + self.guidance_scale * (noise_pred_text - noise_pred_uncond)
+                return model_output.reshape(parallel_len, batch_size, *per_latent_shape)
+
+            extra_step_kwargs.pop("generator", None)
+            with self.progress_bar(total=num_inference_steps) as progress_bar:
+                latents = parallel_denoise(
+                    self.scheduler,
+                    latents,
+                    model_fn,
+                    parallel=parallel,
+                    tolerance=tolerance,
+                    generator=generator,
+                    extra_step_kwargs=extra_step_kwargs,
+                    progress_bar=progress_bar,
+                    callback=callback,
+                    callback_steps=callback_steps or 1,
+                )
+        else:
+            num_warmup_steps = len(timesteps) - num_inference_steps * self.scheduler.order
+            is_unet_compiled = is_compiled_module(self.unet)
+            is_controlnet_compiled = is_compiled_module(self.controlnet)
+            is_torch_higher_equal_2_1 = is_torch_version(">=", "2.1")
+            with self.progress_bar(total=num_inference_steps) as progress_bar:
+                for i, t in enumerate(timesteps):
+                    # Relevant thread:
+                    # https://dev-discuss.pytorch.org/t/cudagraphs-in-pytorch-2-0/1428
+                    if (is_unet_compiled and is_controlnet_compiled) and is_torch_higher_equal_2_1:
+                        torch._inductor.cudagraph_mark_step_begin()
+                    # expand the latents if we are doing classifier free guidance
+                    latent_model_input = torch.cat([latents] * 2) if self.do_classifier_free_guidance else latents
+                    latent_model_input = self.scheduler.scale_model_input(latent_model_input, t)
+
+                    # controlnet(s) inference
+                    if guess_mode and self.do_classifier_free_guidance:
+                        # Infer ControlNet only for the conditional batch.
+                        control_model_input = latents
+                        control_model_input = self.scheduler.scale_model_input(control_model_input, t)
+                        controlnet_prompt_embeds = prompt_embeds.chunk(2)[1]
+                    else:
+                        control_model_input = latent_model_input
+                        controlnet_prompt_embeds = prompt_embeds
+
+                    if isinstance(controlnet_keep[i], list):
+                        cond_scale = [c * s for c, s in zip(controlnet_conditioning_scale, controlnet_keep[i])]
+                    else:
+                        controlnet_cond_scale = controlnet_conditioning_scale
+                        if isinstance(controlnet_cond_scale, list):
+                            controlnet_cond_scale = controlnet_cond_scale[0]
+                        cond_scale = controlnet_cond_scale * controlnet_keep[i]
+
+                    down_block_res_samples, mid_block_res_sample = self.controlnet(
+                        control_model_input,
+                        t,
+                        encoder_hidden_states=controlnet_prompt_embeds,
+                        controlnet_cond=image,
+                        controlnet_cond_embeds=controlnet_cond_embeds,
+                        conditioning_scale=cond_scale,
+                        guess_mode=guess_mode,
+                        return_dict=False,
+                    )
+
+                    if guess_mode and self.do_classifier_free_guidance:
+                        # Infered ControlNet only for the conditional batch.
+                        # To apply the output of ControlNet to both the unconditional and conditional batches,
+                        # add 0 to the unconditional batch to keep it unchanged.
+                        down_block_res_samples = [torch.cat([torch.zeros_like(d), d]) for d in down_block_res_samples]
+                        mid_block_res_sample = torch.cat(
+                            [torch.zeros_like(mid_block_res_sample), mid_block_res_sample]
+                        )
+
+                    # predict the noise residual
+                    noise_pred = self.unet(
+                        latent_model_input,
+                        t,
+                        encoder_hidden_states=prompt_embeds,
+                        timestep_cond=timestep_cond,
+                        cross_attention_kwargs=self.cross_attention_kwargs,
+                        down_block_additional_residuals=down_block_res_samples,
+                        mid_block_additional_residual=mid_block_res_sample,
+                        added_cond_kwargs=added_cond_kwargs,
+                        return_dict=False,
+                    )[0]
+
+                    # perform guidance
+                    if self.do_classifier_free_guidance:
+                        noise_pred_uncond, noise_pred_text = noise_pred.chunk(2)
+                        noise_pred = noise_pred_uncond + self.guidance_scale * (noise_pred_text - noise_pred_uncond)
+
+                    # compute the previous noisy sample x_t -> x_t-1
+                    latents = self.scheduler.step(noise_pred, t, latents, **extra_step_kwargs, return_dict=False)[0]
+
+                    if callback_on_step_end is not None:
+                        callback_kwargs = {}
+                        for k in callback_on_step_end_tensor_inputs:
+                            callback_kwargs[k] = locals()[k]
+                        callback_outputs = callback_on_step_end(self, i, t, callback_kwargs)
+
+                        latents = callback_outputs.pop("latents", latents)
+                        prompt_embeds = callback_outputs.pop("prompt_embeds", prompt_embeds)
+                        negative_prompt_embeds = callback_outputs.pop("negative_prompt_embeds", negative_prompt_embeds)
+
+                    # call the callback, if provided
+                    if i == len(timesteps) - 1 or ((i + 1) > num_warmup_steps and (i + 1) % self.scheduler.order == 0):
+                        progress_bar.update()
+                        if callback is not None and i % callback_steps == 0:
+                            step_idx = i // getattr(self.scheduler, "order", 1)
+                            callback(step_idx, t, latents)
 
         # If we do sequential model offloading, let's offload unet and controlnet
         # manually for max memory savings
@@ -373,22 +373,29 @@ class StableDiffusionControlNetImg2ImgPipeline(
             else:
                 attention_mask = None
 
-            if clip_skip is None:
-                prompt_embeds = self.text_encoder(text_input_ids.to(device), attention_mask=attention_mask)
-                prompt_embeds = prompt_embeds[0]
-            else:
-                prompt_embeds = self.text_encoder(
-                    text_input_ids.to(device), attention_mask=attention_mask, output_hidden_states=True
-                )
-                # Access the `hidden_states` first, that contains a tuple of
-                # all the hidden states from the encoder layers. Then index into
-                # the tuple to access the hidden states from the desired layer.
-                prompt_embeds = prompt_embeds[-1][-(clip_skip + 1)]
-                # We also need to apply the final LayerNorm here to not mess with the
-                # representations. The `last_hidden_states` that we typically use for
-                # obtaining the final prompt representations passes through the LayerNorm
-                # layer.
-                prompt_embeds = self.text_encoder.text_model.final_layer_norm(prompt_embeds)
+            # reuse the text encoder outputs of previously seen prompts if `enable_prompt_embeds_cache` was called
+            cache_keys, prompt_embeds = self._lookup_prompt_embeds(
+                self.text_encoder, text_input_ids, clip_skip=clip_skip, lora_scale=lora_scale
+            )
+
+            if prompt_embeds is None:
+                if clip_skip is None:
+                    prompt_embeds = self.text_encoder(text_input_ids.to(device), attention_mask=attention_mask)
+                    prompt_embeds = prompt_embeds[0]
+                else:
+                    prompt_embeds = self.text_encoder(
+                        text_input_ids.to(device), attention_mask=attention_mask, output_hidden_states=True
+                    )
+                    # Access the `hidden_states` first, that contains a tuple of
+                    # all the hidden states from the encoder layers. Then index into
+                    # the tuple to access the hidden states from the desired layer.
+                    prompt_embeds = prompt_embeds[-1][-(clip_skip + 1)]
+                    # We also need to apply the final LayerNorm here to not mess with the
+                    # representations. The `last_hidden_states` that we typically use for
+                    # obtaining the final prompt representations passes through the LayerNorm
+                    # layer.
+                    prompt_embeds = self.text_encoder.text_model.final_layer_norm(prompt_embeds)
+                self._store_prompt_embeds(cache_keys, prompt_embeds)
 
         if self.text_encoder is not None:
             prompt_embeds_dtype = self.text_encoder.dtype
@@ -443,11 +450,17 @@ class StableDiffusionControlNetImg2ImgPipeline(
             else:
                 attention_mask = None
 
-            negative_prompt_embeds = self.text_encoder(
-                uncond_input.input_ids.to(device),
-                attention_mask=attention_mask,
+            cache_keys, negative_prompt_embeds = self._lookup_prompt_embeds(
+                self.text_encoder, uncond_input.input_ids, lora_scale=lora_scale
             )
-            negative_prompt_embeds = negative_prompt_embeds[0]
+
+            if negative_prompt_embeds is None:
+                negative_prompt_embeds = self.text_encoder(
+                    uncond_input.input_ids.to(device),
+                    attention_mask=attention_mask,
+                )
+                negative_prompt_embeds = negative_prompt_embeds[0]
+                self._store_prompt_embeds(cache_keys, negative_prompt_embeds)
 
         if do_classifier_free_guidance:
             # duplicate unconditional embeddings for each generation per prompt, using mps friendly method
@@ -718,6 +731,25 @@ class StableDiffusionControlNetImg2ImgPipeline(
 
         return image
 
+    # Copied from diffusers.pipelines.controlnet.pipeline_controlnet.StableDiffusionControlNetPipeline.prepare_controlnet_cond_embeds
+    def prepare_controlnet_cond_embeds(self, image, do_classifier_free_guidance=False, guess_mode=False):
+        controlnet = self.controlnet._orig_mod if is_compiled_module(self.controlnet) else self.controlnet
+        images = image if isinstance(controlnet, MultiControlNetModel) else [image]
+
+        if do_classifier_free_guidance and not guess_mode:
+            # the unconditional and the conditional batch share the conditioning image
+            images = [image_.chunk(2)[0] for image_ in images]
+
+        if isinstance(controlnet, MultiControlNetModel):
+            embeds = controlnet.embed_condition(images)
+        else:
+            embeds = [controlnet.embed_condition(images[0])]
+
+        if do_classifier_free_guidance and not guess_mode:
+            embeds = [torch.cat([embeds_] * 2) for embeds_ in embeds]
+
+        return embeds if isinstance(controlnet, MultiControlNetModel) else embeds[0]
+
     # Copied from diffusers.pipelines.stable_diffusion.pipeline_stable_diffusion_img2img.StableDiffusionImg2ImgPipeline.get_timesteps
     def get_timesteps(self, num_inference_steps, strength, device):
         # get the original timestep using init_timestep
@@ -815,6 +847,36 @@ class StableDiffusionControlNetImg2ImgPipeline(
         """Disables the FreeU mechanism if enabled."""
         self.unet.disable_freeu()
 
+    # Copied from diffusers.pipelines.controlnet.pipeline_controlnet.StableDiffusionControlNetPipeline.enable_feature_cache
+    def enable_feature_cache(
+        self, cache_interval: int = 3, cache_block_id: int = 0, controlnet_cache_interval: Optional[int] = None
+    ):
+        r"""
+        Enables the reuse of the slowly changing features of the UNet and the ControlNet across denoising steps.
+
+        See [`~UNet2DConditionModel.enable_deep_cache`] and [`~ControlNetModel.enable_residual_cache`]. Larger
+        intervals are faster but lose more quality.
+
+        Args:
+            cache_interval (`int`, defaults to `3`):
+                The number of denoising steps that share the deep features of the UNet.
+            cache_block_id (`int`, defaults to `0`):
+                The index of the deepest down block of the UNet that is run at every step.
+            controlnet_cache_interval (`int`, *optional*):
+                The number of denoising steps that share the residuals of the ControlNet, defaults to
+                `cache_interval`. `1` runs the ControlNet at every step.
+        """
+        if controlnet_cache_interval is None:
+            controlnet_cache_interval = cache_interval
+        self.unet.enable_deep_cache(cache_interval=cache_interval, cache_block_id=cache_block_id)
+        self.controlnet.enable_residual_cache(cache_interval=controlnet_cache_interval)
+
+    # Copied from diffusers.pipelines.controlnet.pipeline_controlnet.StableDiffusionControlNetPipeline.disable_feature_cache
+    def disable_feature_cache(self):
+        """Disables the reuse of the features of the UNet and the ControlNet if enabled."""
+        self.unet.disable_deep_cache()
+        self.controlnet.disable_residual_cache()
+
     @property
     def guidance_scale(self):
         return self._guidance_scale
@@ -1116,6 +1178,11 @@ class StableDiffusionControlNetImg2ImgPipeline(
             ]
             controlnet_keep.append(keeps[0] if isinstance(controlnet, ControlNetModel) else keeps)
 
+        # The conditioning image doesn't change over the denoising steps, so embed it only once
+        controlnet_cond_embeds = self.prepare_controlnet_cond_embeds(
+            control_image, self.do_classifier_free_guidance, guess_mode
+        )
+
         # 8. Denoising loop
         num_warmup_steps = len(timesteps) - num_inference_steps * self.scheduler.order
         with self.progress_bar(total=num_inference_steps) as progress_bar:
@@ -1147,6 +1214,7 @@ class StableDiffusionControlNetImg2ImgPipeline(
                     t,
                     encoder_hidden_states=controlnet_prompt_embeds,
                     controlnet_cond=control_image,
+                    controlnet_cond_embeds=controlnet_cond_embeds,
                     conditioning_scale=cond_scale,
                     guess_mode=guess_mode,
                     return_dict=False,
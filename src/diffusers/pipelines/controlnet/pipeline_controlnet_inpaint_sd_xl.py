@@ -754,6 +754,25 @@ class StableDiffusionXLControlNetInpaintPipeline(
 
         return image
 
+    # Copied from diffusers.pipelines.controlnet.pipeline_controlnet.StableDiffusionControlNetPipeline.prepare_controlnet_cond_embeds
+    def prepare_controlnet_cond_embeds(self, image, do_classifier_free_guidance=False, guess_mode=False):
+        controlnet = self.controlnet._orig_mod if is_compiled_module(self.controlnet) else self.controlnet
+        images = image if isinstance(controlnet, MultiControlNetModel) else [image]
+
+        if do_classifier_free_guidance and not guess_mode:
+            # the unconditional and the conditional batch share the conditioning image
+            images = [image_.chunk(2)[0] for image_ in images]
+
+        if isinstance(controlnet, MultiControlNetModel):
+            embeds = controlnet.embed_condition(images)
+        else:
+            embeds = [controlnet.embed_condition(images[0])]
+
+        if do_classifier_free_guidance and not guess_mode:
+            embeds = [torch.cat([embeds_] * 2) for embeds_ in embeds]
+
+        return embeds if isinstance(controlnet, MultiControlNetModel) else embeds[0]
+
     def prepare_latents(
         self,
         batch_size,
@@ -1017,6 +1036,36 @@ class StableDiffusionXLControlNetInpaintPipeline(
         """Disables the FreeU mechanism if enabled."""
         self.unet.disable_freeu()
 
+    # Copied from diffusers.pipelines.controlnet.pipeline_controlnet.StableDiffusionControlNetPipeline.enable_feature_cache
+    def enable_feature_cache(
+        self, cache_interval: int = 3, cache_block_id: int = 0, controlnet_cache_interval: Optional[int] = None
+    ):
+        r"""
+        Enables the reuse of the slowly changing features of the UNet and the ControlNet across denoising steps.
+
+        See [`~UNet2DConditionModel.enable_deep_cache`] and [`~ControlNetModel.enable_residual_cache`]. Larger
+        intervals are faster but lose more quality.
+
+        Args:
+            cache_interval (`int`, defaults to `3`):
+                The number of denoising steps that share the deep features of the UNet.
+            cache_block_id (`int`, defaults to `0`):
+                The index of the deepest down block of the UNet that is run at every step.
+            controlnet_cache_interval (`int`, *optional*):
+                The number of denoising steps that share the residuals of the ControlNet, defaults to
+                `cache_interval`. `1` runs the ControlNet at every step.
+        """
+        if controlnet_cache_interval is None:
+            controlnet_cache_interval = cache_interval
+        self.unet.enable_deep_cache(cache_interval=cache_interval, cache_block_id=cache_block_id)
+        self.controlnet.enable_residual_cache(cache_interval=controlnet_cache_interval)
+
+    # Copied from diffusers.pipelines.controlnet.pipeline_controlnet.StableDiffusionControlNetPipeline.disable_feature_cache
+    def disable_feature_cache(self):
+        """Disables the reuse of the features of the UNet and the ControlNet if enabled."""
+        self.unet.disable_deep_cache()
+        self.controlnet.disable_residual_cache()
+
     @property
     def guidance_scale(self):
         return self._guidance_scale
@@ -1511,6 +1560,11 @@ class StableDiffusionXLControlNetInpaintPipeline(
         add_text_embeds = add_text_embeds.to(device)
         add_time_ids = add_time_ids.to(device)
 
+        # The conditioning image doesn't change over the denoising steps, so embed it only once
+        controlnet_cond_embeds = self.prepare_controlnet_cond_embeds(
+            control_image, self.do_classifier_free_guidance, guess_mode
+        )
+
         # 11. Denoising loop
         num_warmup_steps = max(len(timesteps) - num_inference_steps * self.scheduler.order, 0)
 
@@ -1577,6 +1631,7 @@ class StableDiffusionXLControlNetInpaintPipeline(
                     t,
                     encoder_hidden_states=controlnet_prompt_embeds,
                     controlnet_cond=control_image,
+                    controlnet_cond_embeds=controlnet_cond_embeds,
                     conditioning_scale=cond_scale,
                     guess_mode=guess_mode,
                     added_cond_kwargs=controlnet_added_cond_kwargs,
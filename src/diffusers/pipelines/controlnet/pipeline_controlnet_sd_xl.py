@@ -761,6 +761,25 @@ class StableDiffusionXLControlNetPipeline(
 
         return image
 
+    # Copied from diffusers.pipelines.controlnet.pipeline_controlnet.StableDiffusionControlNetPipeline.prepare_controlnet_cond_embeds
+    def prepare_controlnet_cond_embeds(self, image, do_classifier_free_guidance=False, guess_mode=False):
+        controlnet = self.controlnet._orig_mod if is_compiled_module(self.controlnet) else self.controlnet
+        images = image if isinstance(controlnet, MultiControlNetModel) else [image]
+
+        if do_classifier_free_guidance and not guess_mode:
+            # the unconditional and the conditional batch share the conditioning image
+            images = [image_.chunk(2)[0] for image_ in images]
+
+        if isinstance(controlnet, MultiControlNetModel):
+            embeds = controlnet.embed_condition(images)
+        else:
+            embeds = [controlnet.embed_condition(images[0])]
+
+        if do_classifier_free_guidance and not guess_mode:
+            embeds = [torch.cat([embeds_] * 2) for embeds_ in embeds]
+
+        return embeds if isinstance(controlnet, MultiControlNetModel) else embeds[0]
+
     # Copied from diffusers.pipelines.stable_diffusion.pipeline_stable_diffusion.StableDiffusionPipeline.prepare_latents
     def prepare_latents(self, batch_size, num_channels_latents, height, width, dtype, device, generator, latents=None):
         shape = (batch_size, num_channels_latents, height // self.vae_scale_factor, width // self.vae_scale_factor)
@@ -846,6 +865,36 @@ class StableDiffusionXLControlNetPipeline(
         """Disables the FreeU mechanism if enabled."""
         self.unet.disable_freeu()
 
+    # Copied from diffusers.pipelines.controlnet.pipeline_controlnet.StableDiffusionControlNetPipeline.enable_feature_cache
+    def enable_feature_cache(
+        self, cache_interval: int = 3, cache_block_id: int = 0, controlnet_cache_interval: Optional[int] = None
+    ):
+        r"""
+        Enables the reuse of the slowly changing features of the UNet and the ControlNet across denoising steps.
+
+        See [`~UNet2DConditionModel.enable_deep_cache`] and [`~ControlNetModel.enable_residual_cache`]. Larger
+        intervals are faster but lose more quality.
+
+        Args:
+            cache_interval (`int`, defaults to `3`):
+                The number of denoising steps that share the deep features of the UNet.
+            cache_block_id (`int`, defaults to `0`):
+                The index of the deepest down block of the UNet that is run at every step.
+            controlnet_cache_interval (`int`, *optional*):
+                The number of denoising steps that share the residuals of the ControlNet, defaults to
+                `cache_interval`. `1` runs the ControlNet at every step.
+        """
+        if controlnet_cache_interval is None:
+            controlnet_cache_interval = cache_interval
+        self.unet.enable_deep_cache(cache_interval=cache_interval, cache_block_id=cache_block_id)
+        self.controlnet.enable_residual_cache(cache_interval=controlnet_cache_interval)
+
+    # Copied from diffusers.pipelines.controlnet.pipeline_controlnet.StableDiffusionControlNetPipeline.disable_feature_cache
+    def disable_feature_cache(self):
+        """Disables the reuse of the features of the UNet and the ControlNet if enabled."""
+        self.unet.disable_deep_cache()
+        self.controlnet.disable_residual_cache()
+
     # Copied from diffusers.pipelines.latent_consistency_models.pipeline_latent_consistency_text2img.LatentConsistencyModelPipeline.get_guidance_scale_embedding
     def get_guidance_scale_embedding(self, w, embedding_dim=512, dtype=torch.float32):
         """
@@ -1289,6 +1338,11 @@ class StableDiffusionXLControlNetPipeline(
         add_text_embeds = add_text_embeds.to(device)
         add_time_ids = add_time_ids.to(device).repeat(batch_size * num_images_per_prompt, 1)
 
+        # The conditioning image doesn't change over the denoising steps, so embed it only once
+        controlnet_cond_embeds = self.prepare_controlnet_cond_embeds(
+            image, self.do_classifier_free_guidance, guess_mode
+        )
+
         # 8. Denoising loop
         num_warmup_steps = len(timesteps) - num_inference_steps * self.scheduler.order
         is_unet_compiled = is_compiled_module(self.unet)
@@ -1334,6 +1388,7 @@ class StableDiffusionXLControlNetPipeline(
                     t,
                     encoder_hidden_states=controlnet_prompt_embeds,
                     controlnet_cond=image,
+                    controlnet_cond_embeds=controlnet_cond_embeds,
                     conditioning_scale=cond_scale,
                     guess_mode=guess_mode,
                     added_cond_kwargs=controlnet_added_cond_kwargs,
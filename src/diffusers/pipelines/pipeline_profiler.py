@@ -0,0 +1,423 @@
+# Copyright 2023 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import functools
+import json
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+import torch
+
+from ..utils import is_torch_version, logging
+
+
+logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
+
+# child modules of a component that are profiled separately, in addition to the component itself
+_PROFILED_SUBMODULES = ["down_blocks", "mid_block", "up_blocks", "encoder", "decoder", "nets"]
+
+
+@dataclass
+class ProfilerEvent:
+    r"""
+    A single profiled call, as recorded by [`PipelineProfiler`].
+
+    Args:
+        name (`str`):
+            Name of the module, for example `unet.down_blocks.0`, or `scheduler.step`.
+        category (`str`):
+            One of `"component"`, `"block"`, `"attention"`, `"scheduler"` or `"step"`.
+        start (`float`):
+            Start time in seconds, relative to the start of the profiler.
+        duration (`float`):
+            Wall time in seconds.
+        step (`int`):
+            Index of the denoising step the call belongs to. Calls before the first step of a denoising loop (e.g. the
+            text encoder) belong to step 0, calls after the last one (e.g. the VAE decoder) to the following step.
+        depth (`int`):
+            Number of profiled calls the call is nested in.
+        flops (`int`):
+            Estimated number of floating point operations of the linear, convolution and attention layers.
+        output_bytes (`int`):
+            Size of the tensors returned by the call.
+        peak_memory (`int`, *optional*):
+            Peak allocated CUDA memory during the call, `None` if the pipeline doesn't run on CUDA.
+    """
+
+    name: str
+    category: str
+    start: float
+    duration: float = 0.0
+    step: int = 0
+    depth: int = 0
+    flops: int = 0
+    output_bytes: int = 0
+    peak_memory: Optional[int] = None
+    # peak CUDA memory of the children that already finished
+    _child_peak: int = field(default=0, repr=False)
+    # the module that opened the event
+    _module: Any = field(default=None, repr=False)
+
+
+def _tensor_bytes(output) -> int:
+    if torch.is_tensor(output):
+        return output.numel() * output.element_size()
+    if isinstance(output, (tuple, list)):
+        return sum(_tensor_bytes(o) for o in output)
+    if isinstance(output, dict):
+        return sum(_tensor_bytes(o) for o in output.values())
+    return 0
+
+
+def _linear_flops(module, inputs, output) -> int:
+    # one multiply and one add per weight and output position
+    if isinstance(module, torch.nn.Linear):
+        return 2 * module.in_features * output.numel()
+    kernel_size = module.weight[0].numel()
+    return 2 * kernel_size * output.numel()
+
+
+def _attention_flops(module, args, kwargs) -> int:
+    # the two batched matrix multiplications q @ k^T and attn @ v, the projections are counted as linear layers
+    hidden_states = args[0] if args else kwargs.get("hidden_states")
+    encoder_hidden_states = args[1] if len(args) > 1 else kwargs.get("encoder_hidden_states")
+    if not torch.is_tensor(hidden_states):
+        return 0
+
+    batch_size = hidden_states.shape[0]
+    query_length = hidden_states.shape[1] if hidden_states.ndim == 3 else hidden_states.shape[2:].numel()
+    key_value = encoder_hidden_states if torch.is_tensor(encoder_hidden_states) else hidden_states
+    key_length = key_value.shape[1] if key_value.ndim == 3 else key_value.shape[2:].numel()
+    inner_dim = getattr(module, "inner_dim", None) or module.to_q.out_features
+    return 4 * batch_size * query_length * key_length * inner_dim
+
+
+class PipelineProfiler:
+    r"""
+    Records the wall time, memory and estimated FLOPs of the components of a [`DiffusionPipeline`], used by
+    [`DiffusionPipeline.enable_profiling`].
+
+    Forward hooks are registered on every `torch.nn.Module` component of the pipeline, on their down, mid and up blocks,
+    on the encoder and decoder of VAEs, on the ControlNets of a `MultiControlNetModel` and, if `profile_attention=True`,
+    on every attention layer. The `step` method of the scheduler is wrapped, and every call of it ends a denoising step.
+    Nothing is registered before [`~PipelineProfiler.attach`] and everything is removed by
+    [`~PipelineProfiler.detach`], so the profiler costs nothing when it's disabled.
+
+    Args:
+        profile_attention (`bool`, *optional*, defaults to `True`):
+            Whether to record every attention layer separately.
+        estimate_flops (`bool`, *optional*, defaults to `True`):
+            Whether to estimate the FLOPs of the linear, convolution and attention layers. This registers an
+            additional hook on each of those layers.
+        synchronize (`bool`, *optional*):
+            Whether to synchronize the CUDA device before reading the time, so that the wall time includes the
+            kernels launched by a module. Defaults to `True` if the pipeline runs on CUDA.
+    """
+
+    def __init__(
+        self, profile_attention: bool = True, estimate_flops: bool = True, synchronize: Optional[bool] = None
+    ):
+        self.profile_attention = profile_attention
+        self.estimate_flops = estimate_flops
+        self.synchronize = synchronize
+        self.events: List[ProfilerEvent] = []
+
+        self._cuda = False
+        self._handles = []
+        self._wrapped_schedulers = []
+        self._stack: List[ProfilerEvent] = []
+        self._step = 0
+        self._step_start = None
+        self._t0 = time.perf_counter()
+
+    @property
+    def is_attached(self) -> bool:
+        return len(self._handles) > 0 or len(self._wrapped_schedulers) > 0
+
+    def attach(self, pipeline):
+        r"""
+        Registers the hooks on the components of `pipeline`.
+        """
+        from ..models.attention_processor import Attention
+        from ..schedulers.scheduling_utils import SchedulerMixin
+
+        if self.is_attached:
+            raise ValueError("The profiler is already attached to a pipeline, call `detach` first.")
+
+        device = pipeline._execution_device
+        self._cuda = device.type == "cuda" and torch.cuda.is_available()
+        if self.synchronize is None:
+            self.synchronize = self._cuda
+
+        for name, component in pipeline.components.items():
+            if isinstance(component, torch.nn.Module):
+                self._register(component, name, "component")
+                for submodule_name in _PROFILED_SUBMODULES:
+                    submodule = getattr(component, submodule_name, None)
+                    if isinstance(submodule, torch.nn.ModuleList):
+                        for i, block in enumerate(submodule):
+                            self._register(block, f"{name}.{submodule_name}.{i}", "block")
+                    elif isinstance(submodule, torch.nn.Module):
+                        self._register(submodule, f"{name}.{submodule_name}", "block")
+
+                for module_name, module in component.named_modules():
+                    if isinstance(module, Attention):
+                        if self.profile_attention:
+                            self._register(module, f"{name}.{module_name}", "attention")
+                        if self.estimate_flops and is_torch_version(">=", "2.0"):
+                            # the key/value states are usually passed as keyword argument
+                            self._handles.append(
+                                module.register_forward_pre_hook(self._attention_flops_hook, with_kwargs=True)
+                            )
+                    elif self.estimate_flops and isinstance(
+                        module, (torch.nn.Linear, torch.nn.Conv1d, torch.nn.Conv2d, torch.nn.Conv3d)
+                    ):
+                        self._handles.append(module.register_forward_hook(self._linear_flops_hook))
+            elif isinstance(component, SchedulerMixin):
+                self._wrap_scheduler_step(component, name)
+
+    def detach(self):
+        r"""
+        Removes all hooks. The recorded events are kept.
+        """
+        for handle in self._handles:
+            handle.remove()
+        for scheduler in self._wrapped_schedulers:
+            # removes the instance attribute, so that the method of the class is used again
+            del scheduler.step
+        self._handles = []
+        self._wrapped_schedulers = []
+        self._stack = []
+
+    def reset(self):
+        r"""
+        Clears the recorded events and restarts the step count.
+        """
+        self.events = []
+        self._stack = []
+        self._step = 0
+        self._step_start = None
+        self._t0 = time.perf_counter()
+
+    def _register(self, module: torch.nn.Module, name: str, category: str):
+        self._handles.append(module.register_forward_pre_hook(functools.partial(self._pre_hook, name, category)))
+        self._handles.append(module.register_forward_hook(self._post_hook))
+
+    def _wrap_scheduler_step(self, scheduler, name: str):
+        step = scheduler.step
+
+        @functools.wraps(step)
+        def profiled_step(*args, **kwargs):
+            with self.record(f"{name}.step", category="scheduler"):
+                output = step(*args, **kwargs)
+            self._end_step()
+            return output
+
+        scheduler.step = profiled_step
+        self._wrapped_schedulers.append(scheduler)
+
+    def _now(self) -> float:
+        if self.synchronize:
+            torch.cuda.synchronize()
+        return time.perf_counter() - self._t0
+
+    def _start(self, name: str, category: str, module: Optional[torch.nn.Module] = None):
+        start = self._now()
+        if self._step_start is None:
+            self._step_start = start
+
+        event = ProfilerEvent(name=name, category=category, start=start, step=self._step, depth=len(self._stack))
+        event._module = module
+        if self._cuda:
+            if self._stack:
+                # fold the peak so far into the parent before resetting it for the child
+                parent = self._stack[-1]
+                parent._child_peak = max(parent._child_peak, torch.cuda.max_memory_allocated())
+            torch.cuda.reset_peak_memory_stats()
+        self._stack.append(event)
+
+    def _stop(self, output=None):
+        event = self._stack.pop()
+        event.duration = self._now() - event.start
+        event.output_bytes = _tensor_bytes(output)
+        if self._cuda:
+            event.peak_memory = max(event._child_peak, torch.cuda.max_memory_allocated())
+            if self._stack:
+                self._stack[-1]._child_peak = max(self._stack[-1]._child_peak, event.peak_memory)
+        if self._stack:
+            self._stack[-1].flops += event.flops
+        self.events.append(event)
+
+    def _end_step(self):
+        if self._stack:
+            # `step` was called from within a profiled module, the denoising loop is not the outermost loop
+            return
+        start = self._step_start
+        flops = sum(event.flops for event in self.events if event.step == self._step and event.depth == 0)
+        self.events.append(
+            ProfilerEvent(
+                name=f"step_{self._step}",
+                category="step",
+                start=start,
+                duration=self._now() - start,
+                step=self._step,
+                flops=flops,
+            )
+        )
+        self._step += 1
+        self._step_start = None
+
+    def _pre_hook(self, name, category, module, args):
+        self._start(name, category, module)
+
+    def _post_hook(self, module, args, output):
+        # modules that raised in `forward` never reached this hook, drop the events they left open
+        while self._stack and self._stack[-1]._module is not module:
+            self._stack.pop()
+        if self._stack:
+            self._stop(output)
+
+    def _linear_flops_hook(self, module, args, output):
+        if self._stack and torch.is_tensor(output):
+            self._stack[-1].flops += _linear_flops(module, args, output)
+
+    def _attention_flops_hook(self, module, args, kwargs):
+        if self._stack:
+            self._stack[-1].flops += _attention_flops(module, args, kwargs)
+
+    @contextmanager
+    def record(self, name: str, category: str = "component"):
+        r"""
+        Context manager to record a custom region, for example a part of a pipeline's `__call__`.
+
+        Args:
+            name (`str`):
+                Name of the event.
+            category (`str`, *optional*, defaults to `"component"`):
+                Category of the event.
+        """
+        self._start(name, category)
+        depth = len(self._stack)
+        try:
+            yield
+        finally:
+            # pop events of modules that raised within the region
+            del self._stack[depth:]
+            self._stop()
+
+    def summary(self, group_by: str = "name") -> Dict[str, Dict[str, Any]]:
+        r"""
+        Aggregates the recorded events.
+
+        Args:
+            group_by (`str`, *optional*, defaults to `"name"`):
+                `"name"` to aggregate per module, `"step"` to aggregate the outermost events per denoising step. The
+                wall time of the denoising steps including the time between the events is available as the events of
+                category `"step"`.
+
+        Returns:
+            `Dict[str, Dict[str, Any]]`: The number of calls, total and mean wall time in seconds, estimated FLOPs,
+            output size and, on CUDA, peak memory in bytes per module or step, ordered by total wall time.
+        """
+        if group_by not in ("name", "step"):
+            raise ValueError(f"`group_by` has to be one of 'name' or 'step', but is {group_by}.")
+
+        rows = OrderedDict()
+        for event in self.events:
+            if group_by == "step":
+                if event.depth > 0 or event.category == "step":
+                    continue
+                key = f"step_{event.step}"
+            elif event.category == "step":
+                continue
+            else:
+                key = event.name
+            row = rows.setdefault(
+                key,
+                {"category": event.category, "calls": 0, "total_time": 0.0, "flops": 0, "output_bytes": 0},
+            )
+            row["calls"] += 1
+            row["total_time"] += event.duration
+            row["flops"] += event.flops
+            row["output_bytes"] = max(row["output_bytes"], event.output_bytes)
+            if event.peak_memory is not None:
+                row["peak_memory"] = max(row.get("peak_memory", 0), event.peak_memory)
+
+        for row in rows.values():
+            row["mean_time"] = row["total_time"] / row["calls"]
+        if group_by == "step":
+            return rows
+        return OrderedDict(sorted(rows.items(), key=lambda item: item[1]["total_time"], reverse=True))
+
+    def summary_table(self, group_by: str = "name", max_rows: Optional[int] = None) -> str:
+        r"""
+        Formats [`~PipelineProfiler.summary`] as a table.
+
+        Args:
+            group_by (`str`, *optional*, defaults to `"name"`):
+                `"name"` to aggregate per module, `"step"` to aggregate per denoising step.
+            max_rows (`int`, *optional*):
+                Maximum number of rows to show.
+        """
+        rows = list(self.summary(group_by=group_by).items())[:max_rows]
+        name_width = max([len("name")] + [len(name) for name, _ in rows])
+        header = (
+            f"{'name':<{name_width}}  {'calls':>6}  {'total (ms)':>11}  {'mean (ms)':>10}  {'GFLOPs':>9}  "
+            f"{'output (MB)':>11}  {'peak (MB)':>10}"
+        )
+        lines = [header, "-" * len(header)]
+        for name, row in rows:
+            peak_memory = f"{row['peak_memory'] / 2**20:.1f}" if "peak_memory" in row else "-"
+            lines.append(
+                f"{name:<{name_width}}  {row['calls']:>6}  {row['total_time'] * 1e3:>11.2f}  "
+                f"{row['mean_time'] * 1e3:>10.2f}  {row['flops'] / 1e9:>9.3f}  {row['output_bytes'] / 2**20:>11.2f}  "
+                f"{peak_memory:>10}"
+            )
+        return "\n".join(lines)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        r"""
+        Returns the recorded events in the Chrome trace event format, which can be opened in `chrome://tracing` or
+        [Perfetto](https://ui.perfetto.dev).
+        """
+        trace_events = []
+        for event in self.events:
+            args = {"step": event.step, "flops": event.flops, "output_bytes": event.output_bytes}
+            if event.peak_memory is not None:
+                args["peak_memory"] = event.peak_memory
+            trace_events.append(
+                {
+                    "name": event.name,
+                    "cat": event.category,
+                    "ph": "X",
+                    "ts": event.start * 1e6,
+                    "dur": event.duration * 1e6,
+                    "pid": os.getpid(),
+                    # denoising steps get their own row, so that they don't overlap the modules
+                    "tid": 1 if event.category == "step" else 0,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: Union[str, os.PathLike]):
+        r"""
+        Writes [`~PipelineProfiler.to_chrome_trace`] to a JSON file.
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+        logger.info(f"Chrome trace with {len(self.events)} events written to {path}.")
@@ -15,18 +15,23 @@
 # limitations under the License.
 
 import fnmatch
+import hashlib
 import importlib
 import inspect
 import os
 import re
 import sys
+import time
 import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import PIL.Image
+import safetensors.torch
 import torch
 from huggingface_hub import ModelCard, create_repo, hf_hub_download, model_info, snapshot_download
 from packaging import version
@@ -56,6 +61,7 @@ from ..utils import (
     numpy_to_pil,
 )
 from ..utils.torch_utils import is_compiled_module
+from .pipeline_profiler import PipelineProfiler
 
 
 if is_transformers_available():
@@ -405,6 +411,34 @@ def _get_pipeline_class(
     return pipeline_cls
 
 
+_PREFETCH_WEIGHT_EXTENSIONS = (".safetensors", ".bin", ".onnx", ".pb", ".msgpack")
+_PREFETCH_BUFFER_SIZE = 16 * 2**20
+
+
+def _prefetch_component_files(
+    component_folder: Union[str, os.PathLike], variant: Optional[str] = None, use_safetensors: Optional[bool] = None
+):
+    """
+    Reads the weight files of a pipeline component once so that they are in the OS page cache when the component is
+    loaded. The files are read through a fixed-size buffer, so the memory used does not depend on the file sizes.
+    """
+    if not os.path.isdir(component_folder):
+        return
+
+    weight_files = [f for f in os.listdir(component_folder) if f.endswith(_PREFETCH_WEIGHT_EXTENSIONS)]
+    if use_safetensors is not False and any(f.endswith(".safetensors") for f in weight_files):
+        weight_files = [f for f in weight_files if f.endswith(".safetensors")]
+    # variant files are named `<name>.<variant>.<extension>`, see `_add_variant`
+    variant_files = [f for f in weight_files if variant is not None and f".{variant}." in f]
+    weight_files = variant_files or [f for f in weight_files if f.count(".") == 1]
+
+    buffer = bytearray(_PREFETCH_BUFFER_SIZE)
+    for weight_file in weight_files:
+        with open(os.path.join(component_folder, weight_file), "rb", buffering=0) as f:
+            while f.readinto(buffer):
+                pass
+
+
 def load_sub_model(
     library_name: str,
     class_name: str,
@@ -426,6 +460,7 @@ def load_sub_model(
     low_cpu_mem_usage: bool,
     cached_folder: Union[str, os.PathLike],
     revision: str = None,
+    mmap: bool = False,
 ):
     """Helper method to load the module `name` from `library_name` and `class_name`"""
     # retrieve class candidates
@@ -515,6 +550,10 @@ def load_sub_model(
         else:
             loading_kwargs["low_cpu_mem_usage"] = False
 
+        # only diffusers models can assign memory-mapped checkpoint tensors without copying them
+        if mmap and is_diffusers_model:
+            loading_kwargs["mmap"] = True
+
     # check if the module is in a subdirectory
     if os.path.isdir(os.path.join(cached_folder, name)):
         loaded_sub_model = load_method(os.path.join(cached_folder, name), **loading_kwargs)
@@ -525,6 +564,124 @@ def load_sub_model(
     return loaded_sub_model
 
 
+class PromptEmbedsCache:
+    r"""
+    Least-recently-used cache for text encoder outputs, used by [`DiffusionPipeline.enable_prompt_embeds_cache`].
+
+    Entries are stored per prompt and keyed by the token ids produced by the tokenizer, the identity of the text
+    encoder, `clip_skip` and the LoRA scale applied to the text encoder. Entries can optionally be persisted to
+    `cache_dir` as one safetensors file per prompt, so that they survive across processes. Entries of text encoders
+    that were not loaded from a named checkpoint (`config._name_or_path` is empty) are only kept in memory.
+
+    <Tip warning={true}>
+
+    The cache can't detect changes to the weights of a text encoder (for example from loading or fusing LoRA weights).
+    Call [`~PromptEmbedsCache.clear`] after modifying the text encoder.
+
+    </Tip>
+
+    Args:
+        max_size (`int`, *optional*, defaults to 128):
+            The maximum number of prompt embeddings kept in memory.
+        cache_dir (`str` or `os.PathLike`, *optional*):
+            Directory of the on-disk store. If `None`, embeddings are only cached in memory.
+    """
+
+    def __init__(self, max_size: int = 128, cache_dir: Optional[Union[str, os.PathLike]] = None):
+        if max_size < 1:
+            raise ValueError(f"`max_size` has to be a positive integer but is {max_size}.")
+
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _text_encoder_identity(text_encoder) -> Tuple[str, bool]:
+        name_or_path = getattr(getattr(text_encoder, "config", None), "_name_or_path", "")
+        dtype = getattr(text_encoder, "dtype", None)
+        if name_or_path:
+            return f"{text_encoder.__class__.__name__}:{name_or_path}:{dtype}", True
+        # randomly initialized or in-memory text encoders can only be told apart within this process
+        return f"{text_encoder.__class__.__name__}@{id(text_encoder)}:{dtype}", False
+
+    def get_keys(
+        self,
+        text_encoder,
+        text_input_ids: torch.Tensor,
+        clip_skip: Optional[int] = None,
+        lora_scale: Optional[float] = None,
+    ) -> List[str]:
+        r"""
+        Returns one cache key per row of `text_input_ids`.
+        """
+        identity, persistent = self._text_encoder_identity(text_encoder)
+        prefix = "" if persistent else "local-"
+        hashes = []
+        for input_ids in text_input_ids.cpu().to(torch.int64).numpy():
+            digest = hashlib.sha256(f"{identity}|{clip_skip}|{lora_scale}|".encode())
+            digest.update(input_ids.tobytes())
+            hashes.append(prefix + digest.hexdigest())
+        return hashes
+
+    def _cache_file(self, key: str) -> Optional[str]:
+        if self.cache_dir is None or key.startswith("local-"):
+            return None
+        return os.path.join(self.cache_dir, f"{key}.safetensors")
+
+    def get(self, key: str) -> Optional[torch.Tensor]:
+        r"""
+        Returns the embeddings stored under `key`, or `None` if there is no such entry in memory or on disk.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        cache_file = self._cache_file(key)
+        if cache_file is None or not os.path.isfile(cache_file):
+            return None
+
+        embeds = safetensors.torch.load_file(cache_file)["prompt_embeds"]
+        self._add(key, embeds)
+        return embeds
+
+    def put(self, key: str, embeds: torch.Tensor):
+        r"""
+        Stores `embeds` under `key` in memory and, if a `cache_dir` is set, on disk.
+        """
+        # clone so that a row of a batch doesn't keep the whole batch alive
+        embeds = embeds.detach().clone()
+        self._add(key, embeds)
+
+        cache_file = self._cache_file(key)
+        if cache_file is not None and not os.path.isfile(cache_file):
+            # write to a temporary file first so that concurrent readers never see a partial file
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            safetensors.torch.save_file({"prompt_embeds": embeds.cpu().contiguous()}, tmp_file)
+            os.replace(tmp_file, cache_file)
+
+    def _add(self, key: str, embeds: torch.Tensor):
+        self._entries[key] = embeds
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self, disk: bool = False):
+        r"""
+        Removes all entries from memory and, if `disk=True`, from the on-disk store.
+        """
+        self._entries.clear()
+        if disk and self.cache_dir is not None:
+            for filename in os.listdir(self.cache_dir):
+                if filename.endswith(".safetensors"):
+                    os.remove(os.path.join(self.cache_dir, filename))
+
+
 class DiffusionPipeline(ConfigMixin, PushToHubMixin):
     r"""
     Base class for all pipelines.
@@ -549,6 +706,9 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
     _exclude_from_cpu_offload = []
     _load_connected_pipes = False
     _is_onnx = False
+    _prompt_embeds_cache = None
+    _component_load_times = None
+    _profiler = None
 
     def register_modules(self, **kwargs):
         # import it here to avoid circular import
@@ -1021,6 +1181,14 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
                 will never be downloaded. By default `use_onnx` defaults to the `_is_onnx` class attribute which is
                 `False` for non-ONNX pipelines and `True` for ONNX pipelines. ONNX weights include both files ending
                 with `.onnx` and `.pb`.
+            mmap (`bool`, *optional*, defaults to `False`):
+                Whether to memory-map the checkpoints of the 🤗 Diffusers models (UNet, VAE, ControlNet, ...) instead
+                of reading them. See [`~ModelMixin.from_pretrained`] for details.
+            max_workers (`int`, *optional*):
+                The maximum number of threads used to load the pipeline components concurrently. Components without
+                weights (tokenizers, schedulers, ...) are loaded on the threads, and the weight files of the models are
+                read ahead of their loading. The time spent loading each component is available in
+                [`~DiffusionPipeline.component_load_times`]. Defaults to loading the components one after the other.
             kwargs (remaining dictionary of keyword arguments, *optional*):
                 Can be used to overwrite load and saveable variables (the pipeline components of the specific pipeline
                 class). The overwritten components are passed directly to the pipelines `__init__` method. See example
@@ -1077,6 +1245,8 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
         variant = kwargs.pop("variant", None)
         use_safetensors = kwargs.pop("use_safetensors", None)
         use_onnx = kwargs.pop("use_onnx", None)
+        mmap = kwargs.pop("mmap", False)
+        max_workers = kwargs.pop("max_workers", None)
         load_connected_pipeline = kwargs.pop("load_connected_pipeline", False)
 
         # 1. Download the checkpoints and configs
@@ -1242,14 +1412,14 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
         from diffusers import pipelines
 
         # 6. Load each module in the pipeline
-        for name, (library_name, class_name) in logging.tqdm(init_dict.items(), desc="Loading pipeline components..."):
+        components_to_load = {}
+        for name, (library_name, class_name) in init_dict.items():
             # 6.1 - now that JAX/Flax is an official framework of the library, we might load from Flax names
             class_name = class_name[4:] if class_name.startswith("Flax") else class_name
 
             # 6.2 Define all importable classes
             is_pipeline_module = hasattr(pipelines, library_name)
             importable_classes = ALL_IMPORTABLE_CLASSES
-            loaded_sub_model = None
 
             # 6.3 Use passed sub model or load class_name from library_name
             if name in passed_class_obj:
@@ -1259,36 +1429,97 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
                     library_name, library, class_name, importable_classes, passed_class_obj, name, is_pipeline_module
                 )
 
-                loaded_sub_model = passed_class_obj[name]
+                init_kwargs[name] = passed_class_obj[name]
             else:
-                # load sub model
-                loaded_sub_model = load_sub_model(
-                    library_name=library_name,
-                    class_name=class_name,
-                    importable_classes=importable_classes,
-                    pipelines=pipelines,
-                    is_pipeline_module=is_pipeline_module,
-                    pipeline_class=pipeline_class,
-                    torch_dtype=torch_dtype,
-                    provider=provider,
-                    sess_options=sess_options,
-                    device_map=device_map,
-                    max_memory=max_memory,
-                    offload_folder=offload_folder,
-                    offload_state_dict=offload_state_dict,
-                    model_variants=model_variants,
-                    name=name,
-                    from_flax=from_flax,
-                    variant=variant,
-                    low_cpu_mem_usage=low_cpu_mem_usage,
-                    cached_folder=cached_folder,
-                    revision=revision,
-                )
-                logger.info(
-                    f"Loaded {name} as {class_name} from `{name}` subfolder of {pretrained_model_name_or_path}."
+                components_to_load[name] = (library_name, class_name, is_pipeline_module)
+
+        component_load_times = {}
+
+        def load_component(name):
+            library_name, class_name, is_pipeline_module = components_to_load[name]
+            start_time = time.perf_counter()
+            loaded_sub_model = load_sub_model(
+                library_name=library_name,
+                class_name=class_name,
+                importable_classes=ALL_IMPORTABLE_CLASSES,
+                pipelines=pipelines,
+                is_pipeline_module=is_pipeline_module,
+                pipeline_class=pipeline_class,
+                torch_dtype=torch_dtype,
+                provider=provider,
+                sess_options=sess_options,
+                device_map=device_map,
+                max_memory=max_memory,
+                offload_folder=offload_folder,
+                offload_state_dict=offload_state_dict,
+                model_variants=model_variants,
+                name=name,
+                from_flax=from_flax,
+                variant=variant,
+                low_cpu_mem_usage=low_cpu_mem_usage,
+                cached_folder=cached_folder,
+                revision=revision,
+                mmap=mmap,
+            )
+            component_load_times[name] = time.perf_counter() - start_time
+            logger.info(
+                f"Loaded {name} as {class_name} from `{name}` subfolder of {pretrained_model_name_or_path} in"
+                f" {component_load_times[name]:.2f}s."
+            )
+            return loaded_sub_model
+
+        # 6.4 Load the components, optionally on a thread pool. `accelerate.init_empty_weights` patches
+        # `torch.nn.Module` globally while a model is instantiated, so models are still instantiated one after the
+        # other on the main thread. The pool loads the other components (tokenizers, schedulers, ...) and reads the
+        # weight files of the models ahead of time, so that their I/O overlaps with the deserialization of the
+        # previous models. Memory is bounded by the prefetch buffer of each worker.
+        executor = None
+        futures = {}
+        prefetch_futures = {}
+        load_order = list(components_to_load)
+        if max_workers is not None and max_workers > 1 and len(components_to_load) > 1:
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+            torch_modules = []
+            for name, (library_name, class_name, is_pipeline_module) in components_to_load.items():
+                # resolving the classes imports their modules on the main thread
+                class_obj, _ = get_class_obj_and_candidates(
+                    library_name,
+                    class_name,
+                    ALL_IMPORTABLE_CLASSES,
+                    pipelines,
+                    is_pipeline_module,
+                    component_name=name,
+                    cache_dir=cached_folder,
                 )
+                if issubclass(class_obj, torch.nn.Module):
+                    torch_modules.append(name)
+                    prefetch_futures[name] = executor.submit(
+                        _prefetch_component_files, os.path.join(cached_folder, name), variant, use_safetensors
+                    )
+                else:
+                    futures[name] = executor.submit(load_component, name)
+            load_order = torch_modules + list(futures)
 
-            init_kwargs[name] = loaded_sub_model  # UNet(...), # DiffusionSchedule(...)
+        try:
+            for name in logging.tqdm(load_order, desc="Loading pipeline components..."):
+                if name in futures:
+                    init_kwargs[name] = futures[name].result()
+                else:
+                    init_kwargs[name] = load_component(name)  # UNet(...), # DiffusionSchedule(...)
+        except BaseException:
+            if executor is not None:
+                # drop the queued loads and prefetches instead of waiting for them, `shutdown(cancel_futures=True)`
+                # requires Python 3.9
+                for future in [*futures.values(), *prefetch_futures.values()]:
+                    future.cancel()
+            raise
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+                # prefetching is only an optimization, a failure is not fatal but is recorded for diagnosis
+                for name, future in prefetch_futures.items():
+                    if future.done() and not future.cancelled() and future.exception() is not None:
+                        logger.debug(f"Prefetching the weight files of {name} failed: {future.exception()!r}")
 
         if pipeline_class._load_connected_pipes and os.path.isfile(os.path.join(cached_folder, "README.md")):
             modelcard = ModelCard.load(os.path.join(cached_folder, "README.md"))
@@ -1313,6 +1544,8 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
                 "low_cpu_mem_usage": low_cpu_mem_usage,
                 "variant": variant,
                 "use_safetensors": use_safetensors,
+                "mmap": mmap,
+                "max_workers": max_workers,
             }
 
             def get_connected_passed_kwargs(prefix):
@@ -1355,6 +1588,7 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
 
         # 8. Instantiate the pipeline
         model = pipeline_class(**init_kwargs)
+        model._component_load_times = component_load_times
 
         # 9. Save where the model was instantiated from
         model.register_to_config(_name_or_path=pretrained_model_name_or_path)
@@ -1364,6 +1598,14 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
     def name_or_path(self) -> str:
         return getattr(self.config, "_name_or_path", None)
 
+    @property
+    def component_load_times(self) -> Dict[str, float]:
+        r"""
+        The time in seconds spent loading each component in [`~DiffusionPipeline.from_pretrained`]. Components that were
+        passed to `from_pretrained` are not listed.
+        """
+        return dict(self._component_load_times or {})
+
     @property
     def _execution_device(self):
         r"""
@@ -2098,3 +2340,131 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
 
         for module in modules:
             module.set_attention_slice(slice_size)
+
+    def enable_prompt_embeds_cache(self, max_size: int = 128, cache_dir: Optional[Union[str, os.PathLike]] = None):
+        r"""
+        Enable caching of text encoder outputs in `encode_prompt`. Prompts (including negative and empty
+        unconditional prompts) that were encoded before are looked up by their token ids instead of running the text
+        encoder again, so that with a fixed set of prompts the text encoder can stay offloaded.
+
+        Args:
+            max_size (`int`, *optional*, defaults to 128):
+                The maximum number of prompt embeddings kept in memory. The least recently used entries are evicted
+                first.
+            cache_dir (`str` or `os.PathLike`, *optional*):
+                Directory to additionally persist the embeddings to as safetensors files. If `None`, embeddings are
+                only cached in memory.
+
+        Examples:
+
+        ```py
+        >>> from diffusers import StableDiffusionPipeline
+
+        >>> pipe = StableDiffusionPipeline.from_pretrained("runwayml/stable-diffusion-v1-5")
+        >>> pipe.enable_prompt_embeds_cache(cache_dir="./prompt_embeds")
+
+        >>> image = pipe("a photo of an astronaut riding a horse on mars").images[0]
+        >>> # the text encoder isn't called again for the same prompt
+        >>> image = pipe("a photo of an astronaut riding a horse on mars").images[0]
+        ```
+        """
+        self._prompt_embeds_cache = PromptEmbedsCache(max_size=max_size, cache_dir=cache_dir)
+
+    def disable_prompt_embeds_cache(self):
+        r"""
+        Disable caching of text encoder outputs. If `enable_prompt_embeds_cache` was previously called, the in-memory
+        entries are dropped and the text encoder runs on every call of `encode_prompt` again.
+        """
+        self._prompt_embeds_cache = None
+
+    @property
+    def prompt_embeds_cache(self) -> Optional[PromptEmbedsCache]:
+        r"""
+        The [`PromptEmbedsCache`] used by `encode_prompt`, or `None` if prompt embedding caching is disabled.
+        """
+        return self._prompt_embeds_cache
+
+    def _lookup_prompt_embeds(
+        self,
+        text_encoder,
+        text_input_ids: torch.Tensor,
+        clip_skip: Optional[int] = None,
+        lora_scale: Optional[float] = None,
+    ) -> Tuple[Optional[List[str]], Optional[torch.Tensor]]:
+        # returns the cache keys of `text_input_ids` and the stacked cached embeddings if all of them are cached
+        if self._prompt_embeds_cache is None:
+            return None, None
+
+        keys = self._prompt_embeds_cache.get_keys(
+            text_encoder, text_input_ids, clip_skip=clip_skip, lora_scale=lora_scale
+        )
+        cached_embeds = [self._prompt_embeds_cache.get(key) for key in keys]
+        if any(embeds is None for embeds in cached_embeds):
+            return keys, None
+
+        device = cached_embeds[0].device
+        return keys, torch.stack([embeds.to(device) for embeds in cached_embeds])
+
+    def _store_prompt_embeds(self, keys: Optional[List[str]], prompt_embeds: torch.Tensor):
+        if self._prompt_embeds_cache is None or keys is None:
+            return
+
+        for key, embeds in zip(keys, prompt_embeds):
+            self._prompt_embeds_cache.put(key, embeds)
+
+    def enable_profiling(
+        self, profile_attention: bool = True, estimate_flops: bool = True, synchronize: Optional[bool] = None
+    ) -> PipelineProfiler:
+        r"""
+        Enable per-module profiling. Forward hooks are registered on the model components and their blocks, and the
+        `step` method of the scheduler is wrapped, to record the wall time, memory and estimated FLOPs of every call
+        and of every denoising step. The hooks are removed by `disable_profiling`, a pipeline without profiling
+        enabled runs without any overhead.
+
+        Args:
+            profile_attention (`bool`, *optional*, defaults to `True`):
+                Whether to record every attention layer separately.
+            estimate_flops (`bool`, *optional*, defaults to `True`):
+                Whether to estimate the FLOPs of the linear, convolution and attention layers.
+            synchronize (`bool`, *optional*):
+                Whether to synchronize the CUDA device before reading the time. Defaults to `True` if the pipeline
+                runs on CUDA.
+
+        Returns:
+            [`PipelineProfiler`]: The profiler holding the recorded events.
+
+        Examples:
+
+        ```py
+        >>> from diffusers import StableDiffusionPipeline
+
+        >>> pipe = StableDiffusionPipeline.from_pretrained("runwayml/stable-diffusion-v1-5")
+        >>> profiler = pipe.enable_profiling()
+
+        >>> image = pipe("a photo of an astronaut riding a horse on mars").images[0]
+        >>> print(profiler.summary_table(max_rows=10))
+        >>> profiler.export_chrome_trace("trace.json")
+        ```
+        """
+        self.disable_profiling()
+        self._profiler = PipelineProfiler(
+            profile_attention=profile_attention, estimate_flops=estimate_flops, synchronize=synchronize
+        )
+        self._profiler.attach(self)
+        return self._profiler
+
+    def disable_profiling(self):
+        r"""
+        Disable per-module profiling and remove all hooks registered by `enable_profiling`. The returned profiler
+        keeps the events recorded so far.
+        """
+        if self._profiler is not None:
+            self._profiler.detach()
+        self._profiler = None
+
+    @property
+    def profiler(self) -> Optional[PipelineProfiler]:
+        r"""
+        The [`PipelineProfiler`] registered by `enable_profiling`, or `None` if profiling is disabled.
+        """
+        return self._profiler
@@ -62,6 +62,164 @@ EXAMPLE_DOC_STRING = """
 """
 
 
+def parallel_denoise(
+    scheduler,
+    latents: torch.FloatTensor,
+    model_fn: Callable[[torch.FloatTensor, torch.Tensor, int], torch.FloatTensor],
+    parallel: int = 10,
+    tolerance: float = 0.1,
+    generator: Optional[Union[torch.Generator, List[torch.Generator]]] = None,
+    extra_step_kwargs: Optional[Dict[str, Any]] = None,
+    progress_bar=None,
+    callback: Optional[Callable[[int, int, torch.FloatTensor], None]] = None,
+    callback_steps: int = 1,
+    debug: bool = False,
+):
+    r"""
+    Runs the denoising loop of `scheduler` with the parallel sampling of [ParaDiGMS](https://arxiv.org/abs/2305.16317).
+
+    Picard iterations refine a window of `parallel` consecutive timesteps at once, with a single call of `model_fn`
+    for the whole window. The window then slides past the timesteps whose latents have converged.
+
+    Args:
+        scheduler ([`SchedulerMixin`]):
+            A scheduler with a `batch_step_no_noise` method, like [`DDPMParallelScheduler`] or
+            [`DDIMParallelScheduler`]. Its timesteps have to be set already.
+        latents (`torch.FloatTensor`):
+            The initial noisy latents of shape `(batch_size, ...)`.
+        model_fn (`Callable`):
+            Predicts the (guided) model output of a window. It's called with `model_fn(latents, timesteps,
+            step_index)`, where `latents` has shape `(parallel_len, batch_size, ...)`, `timesteps` holds the
+            `parallel_len` timesteps of the window and `step_index` is the index of the first one. It returns a tensor
+            of the same shape as `latents`.
+        parallel (`int`, *optional*, defaults to 10):
+            The number of timesteps evaluated in a single call of `model_fn`.
+        tolerance (`float`, *optional*, defaults to 0.1):
+            The error tolerance for sliding the window forward, as a ratio of the scheduler's noise magnitude.
+        generator (`torch.Generator` or `List[torch.Generator]`, *optional*):
+            The generator(s) for the pre-sampled noise of stochastic schedulers.
+        extra_step_kwargs (`Dict[str, Any]`, *optional*):
+            Extra kwargs of `scheduler.batch_step_no_noise`.
+        progress_bar (*optional*):
+            A progress bar over the timesteps, updated as the window slides.
+        callback (`Callable`, *optional*):
+            Called every `callback_steps` iterations with `callback(step: int, timestep: int, latents:
+            torch.FloatTensor)`, with the latents at the beginning of the window.
+        callback_steps (`int`, *optional*, defaults to 1):
+            The frequency at which the `callback` function is called.
+        debug (`bool`, *optional*, defaults to `False`):
+            Whether or not to evaluate `torch.cumsum` on the CPU, which is deterministic.
+
+    Returns:
+        `torch.FloatTensor`: The denoised latents.
+    """
+
+    def cumsum(input, dim):
+        if debug:
+            # cumsum_cuda_kernel does not have a deterministic implementation
+            # so perform cumsum on cpu for debugging purposes
+            return torch.cumsum(input.cpu().float(), dim=dim).to(input.device)
+        return torch.cumsum(input, dim=dim)
+
+    extra_step_kwargs = extra_step_kwargs or {}
+    timesteps = scheduler.timesteps
+    num_timesteps = len(timesteps)
+    batch_size = latents.shape[0]
+    parallel = min(parallel, num_timesteps)
+
+    begin_idx = 0
+    end_idx = parallel
+    latents_time_evolution_buffer = torch.stack([latents] * (num_timesteps + 1))
+
+    # We must make sure the noise of stochastic schedulers such as DDPM is sampled only once per timestep.
+    # Sampling inside the parallel denoising loop will mess this up, so we pre-sample the noise vectors outside the denoising loop.
+    noise_array = torch.zeros_like(latents_time_evolution_buffer)
+    for j in range(num_timesteps):
+        base_noise = randn_tensor(shape=latents.shape, generator=generator, device=latents.device, dtype=latents.dtype)
+        noise = (scheduler._get_variance(timesteps[j]) ** 0.5) * base_noise
+        noise_array[j] = noise.clone()
+
+    # We specify the error tolerance as a ratio of the scheduler's noise magnitude. We similarly compute the error tolerance
+    # outside of the denoising loop to avoid recomputing it at every step.
+    # We will be dividing the norm of the noise, so we store its inverse here to avoid a division at every step.
+    inverse_variance_norm = 1.0 / torch.tensor(
+        [scheduler._get_variance(timesteps[j]) for j in range(num_timesteps)] + [0]
+    ).to(noise_array.device)
+    latent_dim = noise_array[0, 0].numel()
+    inverse_variance_norm = inverse_variance_norm[:, None] / latent_dim
+
+    scaled_tolerance = tolerance**2
+
+    steps = 0
+    while begin_idx < num_timesteps:
+        # these have shape (parallel_dim, batch_size, ...)
+        # parallel_len is at most parallel, but could be less if we are at the end of the timesteps
+        # we are processing batch window of timesteps spanning [begin_idx, end_idx)
+        parallel_len = end_idx - begin_idx
+
+        block_latents = latents_time_evolution_buffer[begin_idx:end_idx]
+        block_t = timesteps[begin_idx:end_idx]
+        model_output = model_fn(block_latents, block_t, begin_idx)
+
+        block_latents_denoise = scheduler.batch_step_no_noise(
+            model_output=model_output.flatten(0, 1),
+            timesteps=block_t[:, None].repeat(1, batch_size).flatten(0, 1),
+            sample=block_latents.flatten(0, 1),
+            **extra_step_kwargs,
+        ).reshape(block_latents.shape)
+
+        # back to shape (parallel_dim, batch_size, ...)
+        # now we want to add the pre-sampled noise
+        # parallel sampling algorithm requires computing the cumulative drift from the beginning
+        # of the window, so we need to compute cumulative sum of the deltas and the pre-sampled noises.
+        delta = block_latents_denoise - block_latents
+        cumulative_delta = cumsum(delta, dim=0)
+        cumulative_noise = cumsum(noise_array[begin_idx:end_idx], dim=0)
+
+        # if we are using an ODE-like scheduler (like DDIM), we don't want to add noise
+        if scheduler._is_ode_scheduler:
+            cumulative_noise = 0
+
+        block_latents_new = latents_time_evolution_buffer[begin_idx][None,] + cumulative_delta + cumulative_noise
+        cur_error = torch.linalg.norm(
+            (block_latents_new - latents_time_evolution_buffer[begin_idx + 1 : end_idx + 1]).reshape(
+                parallel_len, batch_size, -1
+            ),
+            dim=-1,
+        ).pow(2)
+        error_ratio = cur_error * inverse_variance_norm[begin_idx + 1 : end_idx + 1]
+
+        # find the first index of the vector error_ratio that is greater than error tolerance
+        # we can shift the window for the next iteration up to this index
+        error_ratio = torch.nn.functional.pad(
+            error_ratio, (0, 0, 0, 1), value=1e9
+        )  # handle the case when everything is below ratio, by padding the end of parallel_len dimension
+        any_error_at_time = torch.max(error_ratio > scaled_tolerance, dim=1).values.int()
+        ind = torch.argmax(any_error_at_time).item()
+
+        # compute the new begin and end idxs for the window
+        new_begin_idx = begin_idx + min(1 + ind, parallel)
+        new_end_idx = min(new_begin_idx + parallel, num_timesteps)
+
+        # store the computed latents for the current window in the global buffer
+        latents_time_evolution_buffer[begin_idx + 1 : end_idx + 1] = block_latents_new
+        # initialize the new sliding window latents with the end of the current window,
+        # should be better than random initialization
+        latents_time_evolution_buffer[end_idx : new_end_idx + 1] = latents_time_evolution_buffer[end_idx][None,]
+
+        steps += 1
+
+        if progress_bar is not None:
+            progress_bar.update(new_begin_idx - begin_idx)
+        if callback is not None and steps % callback_steps == 0:
+            callback(begin_idx, timesteps[begin_idx], latents_time_evolution_buffer[begin_idx])
+
+        begin_idx = new_begin_idx
+        end_idx = new_end_idx
+
+    return latents_time_evolution_buffer[-1]
+
+
 class StableDiffusionParadigmsPipeline(
     DiffusionPipeline, TextualInversionLoaderMixin, LoraLoaderMixin, FromSingleFileMixin
 ):
@@ -303,22 +461,29 @@ class StableDiffusionParadigmsPipeline(
             else:
                 attention_mask = None
 
-            if clip_skip is None:
-                prompt_embeds = self.text_encoder(text_input_ids.to(device), attention_mask=attention_mask)
-                prompt_embeds = prompt_embeds[0]
-            else:
-                prompt_embeds = self.text_encoder(
-                    text_input_ids.to(device), attention_mask=attention_mask, output_hidden_states=True
-                )
-                # Access the `hidden_states` first, that contains a tuple of
-                # all the hidden states from the encoder layers. Then index into
-                # the tuple to access the hidden states from the desired layer.
-                prompt_embeds = prompt_embeds[-1][-(clip_skip + 1)]
-                # We also need to apply the final LayerNorm here to not mess with the
-                # representations. The `last_hidden_states` that we typically use for
-                # obtaining the final prompt representations passes through the LayerNorm
-                # layer.
-                prompt_embeds = self.text_encoder.text_model.final_layer_norm(prompt_embeds)
+            # reuse the text encoder outputs of previously seen prompts if `enable_prompt_embeds_cache` was called
+            cache_keys, prompt_embeds = self._lookup_prompt_embeds(
+                self.text_encoder, text_input_ids, clip_skip=clip_skip, lora_scale=lora_scale
+            )
+
+            if prompt_embeds is None:
+                if clip_skip is None:
+                    prompt_embeds = self.text_encoder(text_input_ids.to(device), attention_mask=attention_mask)
+                    prompt_embeds = prompt_embeds[0]
+                else:
+                    prompt_embeds = self.text_encoder(
+                        text_input_ids.to(device), attention_mask=attention_mask, output_hidden_states=True
+                    )
+                    # Access the `hidden_states` first, that contains a tuple of
+                    # all the hidden states from the encoder layers. Then index into
+                    # the tuple to access the hidden states from the desired layer.
+                    prompt_embeds = prompt_embeds[-1][-(clip_skip + 1)]
+                    # We also need to apply the final LayerNorm here to not mess with the
+                    # representations. The `last_hidden_states` that we typically use for
+                    # obtaining the final prompt representations passes through the LayerNorm
+                    # layer.
+                    prompt_embeds = self.text_encoder.text_model.final_layer_norm(prompt_embeds)
+                self._store_prompt_embeds(cache_keys, prompt_embeds)
 
         if self.text_encoder is not None:
             prompt_embeds_dtype = self.text_encoder.dtype
@@ -373,11 +538,17 @@ class StableDiffusionParadigmsPipeline(
             else:
                 attention_mask = None
 
-            negative_prompt_embeds = self.text_encoder(
-                uncond_input.input_ids.to(device),
-                attention_mask=attention_mask,
+            cache_keys, negative_prompt_embeds = self._lookup_prompt_embeds(
+                self.text_encoder, uncond_input.input_ids, lora_scale=lora_scale
             )
-            negative_prompt_embeds = negative_prompt_embeds[0]
+
+            if negative_prompt_embeds is None:
+                negative_prompt_embeds = self.text_encoder(
+                    uncond_input.input_ids.to(device),
+                    attention_mask=attention_mask,
+                )
+                negative_prompt_embeds = negative_prompt_embeds[0]
+                self._store_prompt_embeds(cache_keys, negative_prompt_embeds)
 
         if do_classifier_free_guidance:
             # duplicate unconditional embeddings for each generation per prompt, using mps friendly method
@@ -498,14 +669,6 @@ class StableDiffusionParadigmsPipeline(
         latents = latents * self.scheduler.init_noise_sigma
         return latents
 
-    def _cumsum(self, input, dim, debug=False):
-        if debug:
-            # cumsum_cuda_kernel does not have a deterministic implementation
-            # so perform cumsum on cpu for debugging purposes
-            return torch.cumsum(input.cpu().float(), dim=dim).to(input.device)
-        else:
-            return torch.cumsum(input, dim=dim)
-
     @torch.no_grad()
     @replace_example_docstring(EXAMPLE_DOC_STRING)
     def __call__(
@@ -664,138 +827,53 @@ class StableDiffusionParadigmsPipeline(
         extra_step_kwargs = self.prepare_extra_step_kwargs(generator, eta)
         extra_step_kwargs.pop("generator", None)
 
-        # # 7. Denoising loop
-        scheduler = self.scheduler
-        parallel = min(parallel, len(scheduler.timesteps))
-
-        begin_idx = 0
-        end_idx = parallel
-        latents_time_evolution_buffer = torch.stack([latents] * (len(scheduler.timesteps) + 1))
-
-        # We must make sure the noise of stochastic schedulers such as DDPM is sampled only once per timestep.
-        # Sampling inside the parallel denoising loop will mess this up, so we pre-sample the noise vectors outside the denoising loop.
-        noise_array = torch.zeros_like(latents_time_evolution_buffer)
-        for j in range(len(scheduler.timesteps)):
-            base_noise = randn_tensor(
-                shape=latents.shape, generator=generator, device=latents.device, dtype=prompt_embeds.dtype
+        # 7. Denoising loop
+        def model_fn(block_latents, block_t, step_index):
+            # block_latents has shape (parallel_len, batch_size * num_images_per_prompt, ...)
+            parallel_len, batch_size = block_latents.shape[:2]
+            block_prompt_embeds = torch.stack([prompt_embeds] * parallel_len)
+            t_vec = block_t[:, None].repeat(1, batch_size)
+            if do_classifier_free_guidance:
+                t_vec = t_vec.repeat(1, 2)
+
+            # expand the latents if we are doing classifier free guidance
+            latent_model_input = (
+                torch.cat([block_latents] * 2, dim=1) if do_classifier_free_guidance else block_latents
             )
-            noise = (self.scheduler._get_variance(scheduler.timesteps[j]) ** 0.5) * base_noise
-            noise_array[j] = noise.clone()
-
-        # We specify the error tolerance as a ratio of the scheduler's noise magnitude. We similarly compute the error tolerance
-        # outside of the denoising loop to avoid recomputing it at every step.
-        # We will be dividing the norm of the noise, so we store its inverse here to avoid a division at every step.
-        inverse_variance_norm = 1.0 / torch.tensor(
-            [scheduler._get_variance(scheduler.timesteps[j]) for j in range(len(scheduler.timesteps))] + [0]
-        ).to(noise_array.device)
-        latent_dim = noise_array[0, 0].numel()
-        inverse_variance_norm = inverse_variance_norm[:, None] / latent_dim
-
-        scaled_tolerance = tolerance**2
+            latent_model_input = self.scheduler.scale_model_input(latent_model_input, t_vec)
+
+            # if parallel_len is small, no need to use multiple GPUs
+            net = self.wrapped_unet if parallel_len > 3 else self.unet
+            # predict the noise residual, shape is now [parallel_len * 2 * batch_size, ...]
+            model_output = net(
+                latent_model_input.flatten(0, 1),
+                t_vec.flatten(0, 1),
+                encoder_hidden_states=block_prompt_embeds.flatten(0, 1),
+                cross_attention_kwargs=cross_attention_kwargs,
+                return_dict=False,
+            )[0]
+
+            per_latent_shape = model_output.shape[1:]
+            if do_classifier_free_guidance:
+                model_output = model_output.reshape(parallel_len, 2, batch_size, *per_latent_shape)
+                noise_pred_uncond, noise_pred_text = model_output[:, 0], model_output[:, 1]
+                model_output = noise_pred_uncond + guidance_scale * (noise_pred_text - noise_pred_uncond)
+            return model_output.reshape(parallel_len, batch_size, *per_latent_shape)
 
         with self.progress_bar(total=num_inference_steps) as progress_bar:
-            steps = 0
-            while begin_idx < len(scheduler.timesteps):
-                # these have shape (parallel_dim, 2*batch_size, ...)
-                # parallel_len is at most parallel, but could be less if we are at the end of the timesteps
-                # we are processing batch window of timesteps spanning [begin_idx, end_idx)
-                parallel_len = end_idx - begin_idx
-
-                block_prompt_embeds = torch.stack([prompt_embeds] * parallel_len)
-                block_latents = latents_time_evolution_buffer[begin_idx:end_idx]
-                block_t = scheduler.timesteps[begin_idx:end_idx, None].repeat(1, batch_size * num_images_per_prompt)
-                t_vec = block_t
-                if do_classifier_free_guidance:
-                    t_vec = t_vec.repeat(1, 2)
-
-                # expand the latents if we are doing classifier free guidance
-                latent_model_input = (
-                    torch.cat([block_latents] * 2, dim=1) if do_classifier_free_guidance else block_latents
-                )
-                latent_model_input = self.scheduler.scale_model_input(latent_model_input, t_vec)
-
-                # if parallel_len is small, no need to use multiple GPUs
-                net = self.wrapped_unet if parallel_len > 3 else self.unet
-                # predict the noise residual, shape is now [parallel_len * 2 * batch_size * num_images_per_prompt, ...]
-                model_output = net(
-                    latent_model_input.flatten(0, 1),
-                    t_vec.flatten(0, 1),
-                    encoder_hidden_states=block_prompt_embeds.flatten(0, 1),
-                    cross_attention_kwargs=cross_attention_kwargs,
-                    return_dict=False,
-                )[0]
-
-                per_latent_shape = model_output.shape[1:]
-                if do_classifier_free_guidance:
-                    model_output = model_output.reshape(
-                        parallel_len, 2, batch_size * num_images_per_prompt, *per_latent_shape
-                    )
-                    noise_pred_uncond, noise_pred_text = model_output[:, 0], model_output[:, 1]
-                    model_output = noise_pred_uncond + guidance_scale * (noise_pred_text - noise_pred_uncond)
-                model_output = model_output.reshape(
-                    parallel_len * batch_size * num_images_per_prompt, *per_latent_shape
-                )
-
-                block_latents_denoise = scheduler.batch_step_no_noise(
-                    model_output=model_output,
-                    timesteps=block_t.flatten(0, 1),
-                    sample=block_latents.flatten(0, 1),
-                    **extra_step_kwargs,
-                ).reshape(block_latents.shape)
-
-                # back to shape (parallel_dim, batch_size, ...)
-                # now we want to add the pre-sampled noise
-                # parallel sampling algorithm requires computing the cumulative drift from the beginning
-                # of the window, so we need to compute cumulative sum of the deltas and the pre-sampled noises.
-                delta = block_latents_denoise - block_latents
-                cumulative_delta = self._cumsum(delta, dim=0, debug=debug)
-                cumulative_noise = self._cumsum(noise_array[begin_idx:end_idx], dim=0, debug=debug)
-
-                # if we are using an ODE-like scheduler (like DDIM), we don't want to add noise
-                if scheduler._is_ode_scheduler:
-                    cumulative_noise = 0
-
-                block_latents_new = (
-                    latents_time_evolution_buffer[begin_idx][None,] + cumulative_delta + cumulative_noise
-                )
-                cur_error = torch.linalg.norm(
-                    (block_latents_new - latents_time_evolution_buffer[begin_idx + 1 : end_idx + 1]).reshape(
-                        parallel_len, batch_size * num_images_per_prompt, -1
-                    ),
-                    dim=-1,
-                ).pow(2)
-                error_ratio = cur_error * inverse_variance_norm[begin_idx + 1 : end_idx + 1]
-
-                # find the first index of the vector error_ratio that is greater than error tolerance
-                # we can shift the window for the next iteration up to this index
-                error_ratio = torch.nn.functional.pad(
-                    error_ratio, (0, 0, 0, 1), value=1e9
-                )  # handle the case when everything is below ratio, by padding the end of parallel_len dimension
-                any_error_at_time = torch.max(error_ratio > scaled_tolerance, dim=1).values.int()
-                ind = torch.argmax(any_error_at_time).item()
-
-                # compute the new begin and end idxs for the window
-                new_begin_idx = begin_idx + min(1 + ind, parallel)
-                new_end_idx = min(new_begin_idx + parallel, len(scheduler.timesteps))
-
-                # store the computed latents for the current window in the global buffer
-                latents_time_evolution_buffer[begin_idx + 1 : end_idx + 1] = block_latents_new
-                # initialize the new sliding window latents with the end of the current window,
-                # should be better than random initialization
-                latents_time_evolution_buffer[end_idx : new_end_idx + 1] = latents_time_evolution_buffer[end_idx][
-                    None,
-                ]
-
-                steps += 1
-
-                progress_bar.update(new_begin_idx - begin_idx)
-                if callback is not None and steps % callback_steps == 0:
-                    callback(begin_idx, block_t[begin_idx], latents_time_evolution_buffer[begin_idx])
-
-                begin_idx = new_begin_idx
-                end_idx = new_end_idx
-
-        latents = latents_time_evolution_buffer[-1]
+            latents = parallel_denoise(
+                self.scheduler,
+                latents,
+                model_fn,
+                parallel=parallel,
+                tolerance=tolerance,
+                generator=generator,
+                extra_step_kwargs=extra_step_kwargs,
+                progress_bar=progress_bar,
+                callback=callback,
+                callback_steps=callback_steps,
+                debug=debug,
+            )
 
         if not output_type == "latent":
             image = self.vae.decode(latents / self.vae.config.scaling_factor, return_dict=False)[0]
@@ -13,7 +13,7 @@
 # limitations under the License.
 
 import inspect
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
 
 import numpy as np
 import torch
@@ -31,7 +31,7 @@ from ...utils import (
     scale_lora_layers,
     unscale_lora_layers,
 )
-from ...utils.torch_utils import randn_tensor
+from ...utils.torch_utils import randn_tensor, tensor_to_numpy
 from ..pipeline_utils import DiffusionPipeline
 from . import TextToVideoSDPipelineOutput
 
@@ -58,6 +58,165 @@ EXAMPLE_DOC_STRING = """
 """
 
 
+# Copied from diffusers.pipelines.stable_diffusion.pipeline_stable_diffusion_paradigms.parallel_denoise
+def parallel_denoise(
+    scheduler,
+    latents: torch.FloatTensor,
+    model_fn: Callable[[torch.FloatTensor, torch.Tensor, int], torch.FloatTensor],
+    parallel: int = 10,
+    tolerance: float = 0.1,
+    generator: Optional[Union[torch.Generator, List[torch.Generator]]] = None,
+    extra_step_kwargs: Optional[Dict[str, Any]] = None,
+    progress_bar=None,
+    callback: Optional[Callable[[int, int, torch.FloatTensor], None]] = None,
+    callback_steps: int = 1,
+    debug: bool = False,
+):
+    r"""
+    Runs the denoising loop of `scheduler` with the parallel sampling of [ParaDiGMS](https://arxiv.org/abs/2305.16317).
+
+    Picard iterations refine a window of `parallel` consecutive timesteps at once, with a single call of `model_fn`
+    for the whole window. The window then slides past the timesteps whose latents have converged.
+
+    Args:
+        scheduler ([`SchedulerMixin`]):
+            A scheduler with a `batch_step_no_noise` method, like [`DDPMParallelScheduler`] or
+            [`DDIMParallelScheduler`]. Its timesteps have to be set already.
+        latents (`torch.FloatTensor`):
+            The initial noisy latents of shape `(batch_size, ...)`.
+        model_fn (`Callable`):
+            Predicts the (guided) model output of a window. It's called with `model_fn(latents, timesteps,
+            step_index)`, where `latents` has shape `(parallel_len, batch_size, ...)`, `timesteps` holds the
+            `parallel_len` timesteps of the window and `step_index` is the index of the first one. It returns a tensor
+            of the same shape as `latents`.
+        parallel (`int`, *optional*, defaults to 10):
+            The number of timesteps evaluated in a single call of `model_fn`.
+        tolerance (`float`, *optional*, defaults to 0.1):
+            The error tolerance for sliding the window forward, as a ratio of the scheduler's noise magnitude.
+        generator (`torch.Generator` or `List[torch.Generator]`, *optional*):
+            The generator(s) for the pre-sampled noise of stochastic schedulers.
+        extra_step_kwargs (`Dict[str, Any]`, *optional*):
+            Extra kwargs of `scheduler.batch_step_no_noise`.
+        progress_bar (*optional*):
+            A progress bar over the timesteps, updated as the window slides.
+        callback (`Callable`, *optional*):
+            Called every `callback_steps` iterations with `callback(step: int, timestep: int, latents:
+            torch.FloatTensor)`, with the latents at the beginning of the window.
+        callback_steps (`int`, *optional*, defaults to 1):
+            The frequency at which the `callback` function is called.
+        debug (`bool`, *optional*, defaults to `False`):
+            Whether or not to evaluate `torch.cumsum` on the CPU, which is deterministic.
+
+    Returns:
+        `torch.FloatTensor`: The denoised latents.
+    """
+
+    def cumsum(input, dim):
+        if debug:
+            # cumsum_cuda_kernel does not have a deterministic implementation
+            # so perform cumsum on cpu for debugging purposes
+            return torch.cumsum(input.cpu().float(), dim=dim).to(input.device)
+        return torch.cumsum(input, dim=dim)
+
+    extra_step_kwargs = extra_step_kwargs or {}
+    timesteps = scheduler.timesteps
+    num_timesteps = len(timesteps)
+    batch_size = latents.shape[0]
+    parallel = min(parallel, num_timesteps)
+
+    begin_idx = 0
+    end_idx = parallel
+    latents_time_evolution_buffer = torch.stack([latents] * (num_timesteps + 1))
+
+    # We must make sure the noise of stochastic schedulers such as DDPM is sampled only once per timestep.
+    # Sampling inside the parallel denoising loop will mess this up, so we pre-sample the noise vectors outside the denoising loop.
+    noise_array = torch.zeros_like(latents_time_evolution_buffer)
+    for j in range(num_timesteps):
+        base_noise = randn_tensor(shape=latents.shape, generator=generator, device=latents.device, dtype=latents.dtype)
+        noise = (scheduler._get_variance(timesteps[j]) ** 0.5) * base_noise
+        noise_array[j] = noise.clone()
+
+    # We specify the error tolerance as a ratio of the scheduler's noise magnitude. We similarly compute the error tolerance
+    # outside of the denoising loop to avoid recomputing it at every step.
+    # We will be dividing the norm of the noise, so we store its inverse here to avoid a division at every step.
+    inverse_variance_norm = 1.0 / torch.tensor(
+        [scheduler._get_variance(timesteps[j]) for j in range(num_timesteps)] + [0]
+    ).to(noise_array.device)
+    latent_dim = noise_array[0, 0].numel()
+    inverse_variance_norm = inverse_variance_norm[:, None] / latent_dim
+
+    scaled_tolerance = tolerance**2
+
+    steps = 0
+    while begin_idx < num_timesteps:
+        # these have shape (parallel_dim, batch_size, ...)
+        # parallel_len is at most parallel, but could be less if we are at the end of the timesteps
+        # we are processing batch window of timesteps spanning [begin_idx, end_idx)
+        parallel_len = end_idx - begin_idx
+
+        block_latents = latents_time_evolution_buffer[begin_idx:end_idx]
+        block_t = timesteps[begin_idx:end_idx]
+        model_output = model_fn(block_latents, block_t, begin_idx)
+
+        block_latents_denoise = scheduler.batch_step_no_noise(
+            model_output=model_output.flatten(0, 1),
+            timesteps=block_t[:, None].repeat(1, batch_size).flatten(0, 1),
+            sample=block_latents.flatten(0, 1),
+            **extra_step_kwargs,
+        ).reshape(block_latents.shape)
+
+        # back to shape (parallel_dim, batch_size, ...)
+        # now we want to add the pre-sampled noise
+        # parallel sampling algorithm requires computing the cumulative drift from the beginning
+        # of the window, so we need to compute cumulative sum of the deltas and the pre-sampled noises.
+        delta = block_latents_denoise - block_latents
+        cumulative_delta = cumsum(delta, dim=0)
+        cumulative_noise = cumsum(noise_array[begin_idx:end_idx], dim=0)
+
+        # if we are using an ODE-like scheduler (like DDIM), we don't want to add noise
+        if scheduler._is_ode_scheduler:
+            cumulative_noise = 0
+
+        block_latents_new = latents_time_evolution_buffer[begin_idx][None,] + cumulative_delta + cumulative_noise
+        cur_error = torch.linalg.norm(
+            (block_latents_new - latents_time_evolution_buffer[begin_idx + 1 : end_idx + 1]).reshape(
+                parallel_len, batch_size, -1
+            ),
+            dim=-1,
+        ).pow(2)
+        error_ratio = cur_error * inverse_variance_norm[begin_idx + 1 : end_idx + 1]
+
+        # find the first index of the vector error_ratio that is greater than error tolerance
+        # we can shift the window for the next iteration up to this index
+        error_ratio = torch.nn.functional.pad(
+            error_ratio, (0, 0, 0, 1), value=1e9
+        )  # handle the case when everything is below ratio, by padding the end of parallel_len dimension
+        any_error_at_time = torch.max(error_ratio > scaled_tolerance, dim=1).values.int()
+        ind = torch.argmax(any_error_at_time).item()
+
+        # compute the new begin and end idxs for the window
+        new_begin_idx = begin_idx + min(1 + ind, parallel)
+        new_end_idx = min(new_begin_idx + parallel, num_timesteps)
+
+        # store the computed latents for the current window in the global buffer
+        latents_time_evolution_buffer[begin_idx + 1 : end_idx + 1] = block_latents_new
+        # initialize the new sliding window latents with the end of the current window,
+        # should be better than random initialization
+        latents_time_evolution_buffer[end_idx : new_end_idx + 1] = latents_time_evolution_buffer[end_idx][None,]
+
+        steps += 1
+
+        if progress_bar is not None:
+            progress_bar.update(new_begin_idx - begin_idx)
+        if callback is not None and steps % callback_steps == 0:
+            callback(begin_idx, timesteps[begin_idx], latents_time_evolution_buffer[begin_idx])
+
+        begin_idx = new_begin_idx
+        end_idx = new_end_idx
+
+    return latents_time_evolution_buffer[-1]
+
+
 def tensor2vid(video: torch.Tensor, mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5]) -> List[np.ndarray]:
     # This code is copied from https://github.com/modelscope/modelscope/blob/1509fdb973e5871f37148a4b5e5964cafd43e64d/modelscope/pipelines/multi_modal/text_to_video_synthesis_pipeline.py#L78
     # reshape to ncfhw
@@ -71,9 +230,9 @@ def tensor2vid(video: torch.Tensor, mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5]) -
     images = video.permute(2, 3, 0, 4, 1).reshape(
         f, h, i * w, c
     )  # 1st (frames, h, batch_size, w, c) 2nd (frames, h, batch_size * w, c)
-    images = images.unbind(dim=0)  # prepare a list of indvidual (consecutive frames)
-    images = [(image.cpu().numpy() * 255).astype("uint8") for image in images]  # f h w c
-    return images
+    # quantize on device so that only a single uint8 array is copied to the host
+    images = tensor_to_numpy(images.mul(255).to(torch.uint8))
+    return list(images)  # prepare a list of indvidual (consecutive frames)
 
 
 class TextToVideoSDPipeline(DiffusionPipeline, TextualInversionLoaderMixin, LoraLoaderMixin):
@@ -275,22 +434,29 @@ class TextToVideoSDPipeline(DiffusionPipeline, TextualInversionLoaderMixin, Lora
             else:
                 attention_mask = None
 
-            if clip_skip is None:
-                prompt_embeds = self.text_encoder(text_input_ids.to(device), attention_mask=attention_mask)
-                prompt_embeds = prompt_embeds[0]
-            else:
-                prompt_embeds = self.text_encoder(
-                    text_input_ids.to(device), attention_mask=attention_mask, output_hidden_states=True
-                )
-                # Access the `hidden_states` first, that contains a tuple of
-                # all the hidden states from the encoder layers. Then index into
-                # the tuple to access the hidden states from the desired layer.
-                prompt_embeds = prompt_embeds[-1][-(clip_skip + 1)]
-                # We also need to apply the final LayerNorm here to not mess with the
-                # representations. The `last_hidden_states` that we typically use for
-                # obtaining the final prompt representations passes through the LayerNorm
-                # layer.
-                prompt_embeds = self.text_encoder.text_model.final_layer_norm(prompt_embeds)
+            # reuse the text encoder outputs of previously seen prompts if `enable_prompt_embeds_cache` was called
+            cache_keys, prompt_embeds = self._lookup_prompt_embeds(
+                self.text_encoder, text_input_ids, clip_skip=clip_skip, lora_scale=lora_scale
+            )
+
+            if prompt_embeds is None:
+                if clip_skip is None:
+                    prompt_embeds = self.text_encoder(text_input_ids.to(device), attention_mask=attention_mask)
+                    prompt_embeds = prompt_embeds[0]
+                else:
+                    prompt_embeds = self.text_encoder(
+                        text_input_ids.to(device), attention_mask=attention_mask, output_hidden_states=True
+                    )
+                    # Access the `hidden_states` first, that contains a tuple of
+                    # all the hidden states from the encoder layers. Then index into
+                    # the tuple to access the hidden states from the desired layer.
+                    prompt_embeds = prompt_embeds[-1][-(clip_skip + 1)]
+                    # We also need to apply the final LayerNorm here to not mess with the
+                    # representations. The `last_hidden_states` that we typically use for
+                    # obtaining the final prompt representations passes through the LayerNorm
+                    # layer.
+                    prompt_embeds = self.text_encoder.text_model.final_layer_norm(prompt_embeds)
+                self._store_prompt_embeds(cache_keys, prompt_embeds)
 
         if self.text_encoder is not None:
             prompt_embeds_dtype = self.text_encoder.dtype
@@ -345,11 +511,17 @@ class TextToVideoSDPipeline(DiffusionPipeline, TextualInversionLoaderMixin, Lora
             else:
                 attention_mask = None
 
-            negative_prompt_embeds = self.text_encoder(
-                uncond_input.input_ids.to(device),
-                attention_mask=attention_mask,
+            cache_keys, negative_prompt_embeds = self._lookup_prompt_embeds(
+                self.text_encoder, uncond_input.input_ids, lora_scale=lora_scale
             )
-            negative_prompt_embeds = negative_prompt_embeds[0]
+
+            if negative_prompt_embeds is None:
+                negative_prompt_embeds = self.text_encoder(
+                    uncond_input.input_ids.to(device),
+                    attention_mask=attention_mask,
+                )
+                negative_prompt_embeds = negative_prompt_embeds[0]
+                self._store_prompt_embeds(cache_keys, negative_prompt_embeds)
 
         if do_classifier_free_guidance:
             # duplicate unconditional embeddings for each generation per prompt, using mps friendly method
@@ -366,7 +538,13 @@ class TextToVideoSDPipeline(DiffusionPipeline, TextualInversionLoaderMixin, Lora
 
         return prompt_embeds, negative_prompt_embeds
 
-    def decode_latents(self, latents):
+    def decode_latents(self, latents, decode_chunk_size: Optional[int] = None):
+        if decode_chunk_size is not None:
+            video = self.prepare_video_buffer(latents)
+            for _ in self.decode_latents_streaming(latents, decode_chunk_size=decode_chunk_size, output=video):
+                pass
+            return video
+
         latents = 1 / self.vae.config.scaling_factor * latents
 
         batch_size, channels, num_frames, height, width = latents.shape
@@ -389,6 +567,65 @@ class TextToVideoSDPipeline(DiffusionPipeline, TextualInversionLoaderMixin, Lora
         video = video.float()
         return video
 
+    def prepare_video_buffer(self, latents):
+        r"""
+        Allocates the float32 `(batch_size, channels, num_frames, height, width)` tensor that the decoded frames of
+        `latents` are written into by `decode_latents_streaming`.
+        """
+        batch_size, _, num_frames, height, width = latents.shape
+        shape = (
+            batch_size,
+            self.vae.config.out_channels,
+            num_frames,
+            height * self.vae_scale_factor,
+            width * self.vae_scale_factor,
+        )
+        return torch.empty(shape, dtype=torch.float32, device=latents.device)
+
+    def decode_latents_streaming(
+        self,
+        latents: torch.FloatTensor,
+        decode_chunk_size: int = 8,
+        output: Optional[torch.FloatTensor] = None,
+    ) -> Iterator[torch.FloatTensor]:
+        r"""
+        Decodes video latents `decode_chunk_size` frames at a time so that the peak memory of the VAE decoder is
+        bounded by the chunk size instead of by the total number of frames.
+
+        Args:
+            latents (`torch.FloatTensor`):
+                Latents of shape `(batch_size, num_channels, num_frames, height, width)`.
+            decode_chunk_size (`int`, *optional*, defaults to 8):
+                The number of frames (per batch element) passed to the VAE decoder in a single call.
+            output (`torch.FloatTensor`, *optional*):
+                A preallocated buffer to write the decoded frames into. If not provided, one is created with
+                `prepare_video_buffer`.
+
+        Yields:
+            `torch.FloatTensor`:
+                The decoded frames of each chunk, in frame order, as a `(batch_size, channels, chunk_frames, height,
+                width)` view into `output`. Once the generator is exhausted `output` holds the complete video.
+        """
+        if decode_chunk_size < 1:
+            raise ValueError(f"`decode_chunk_size` has to be a positive integer but is {decode_chunk_size}.")
+
+        if output is None:
+            output = self.prepare_video_buffer(latents)
+
+        batch_size, channels, num_frames, height, width = latents.shape
+        for start in range(0, num_frames, decode_chunk_size):
+            end = min(start + decode_chunk_size, num_frames)
+            chunk = 1 / self.vae.config.scaling_factor * latents[:, :, start:end]
+            chunk = chunk.permute(0, 2, 1, 3, 4).reshape(batch_size * (end - start), channels, height, width)
+
+            image = self.vae.decode(chunk).sample
+            image = image.reshape((batch_size, end - start) + image.shape[1:]).permute(0, 2, 1, 3, 4)
+
+            # copying into the float32 buffer takes care of the upcast without an extra full-size temporary
+            frames = output[:, :, start:end]
+            frames.copy_(image)
+            yield frames
+
     # Copied from diffusers.pipelines.stable_diffusion.pipeline_stable_diffusion.StableDiffusionPipeline.prepare_extra_step_kwargs
     def prepare_extra_step_kwargs(self, generator, eta):
         # prepare extra kwargs for the scheduler step, since not all schedulers have the same signature
@@ -535,6 +772,9 @@ class TextToVideoSDPipeline(DiffusionPipeline, TextualInversionLoaderMixin, Lora
         callback_steps: int = 1,
         cross_attention_kwargs: Optional[Dict[str, Any]] = None,
         clip_skip: Optional[int] = None,
+        decode_chunk_size: Optional[int] = None,
+        parallel: Optional[int] = None,
+        tolerance: float = 0.1,
     ):
         r"""
         The call function to the pipeline for generation.
@@ -594,6 +834,18 @@ class TextToVideoSDPipeline(DiffusionPipeline, TextualInversionLoaderMixin, Lora
             clip_skip (`int`, *optional*):
                 Number of layers to be skipped from CLIP while computing the prompt embeddings. A value of 1 means that
                 the output of the pre-final layer will be used for computing the prompt embeddings.
+            decode_chunk_size (`int`, *optional*):
+                The number of frames decoded by the VAE at a time. Decoding in chunks bounds the memory of the VAE
+                decoder at the expense of some speed. If not defined, all frames are decoded in a single call.
+            parallel (`int`, *optional*):
+                The number of timesteps to denoise in parallel with [ParaDiGMS](https://arxiv.org/abs/2305.16317)
+                sampling, which evaluates a window of `parallel` timesteps in a single UNet call. Requires a parallel
+                scheduler like [`DDPMParallelScheduler`] or [`DDIMParallelScheduler`]. If not defined, the timesteps are
+                denoised sequentially.
+            tolerance (`float`, *optional*, defaults to 0.1):
+                The error tolerance for sliding the window forward for parallel sampling, as a ratio of the scheduler's
+                noise magnitude. Lower tolerance usually leads to less or no degradation. Higher tolerance is faster but
+                can risk degradation of the video quality. Only used if `parallel` is defined.
         Examples:
 
         Returns:
@@ -611,6 +863,11 @@ class TextToVideoSDPipeline(DiffusionPipeline, TextualInversionLoaderMixin, Lora
         self.check_inputs(
             prompt, height, width, callback_steps, negative_prompt, prompt_embeds, negative_prompt_embeds
         )
+        if parallel is not None and not hasattr(self.scheduler, "batch_step_no_noise"):
+            raise ValueError(
+                "Parallel sampling requires a parallel scheduler like `DDPMParallelScheduler` or"
+                f" `DDIMParallelScheduler`, but the scheduler is {self.scheduler.__class__.__name__}."
+            )
 
         # 2. Define call parameters
         if prompt is not None and isinstance(prompt, str):
@@ -669,49 +926,94 @@ class TextToVideoSDPipeline(DiffusionPipeline, TextualInversionLoaderMixin, Lora
         extra_step_kwargs = self.prepare_extra_step_kwargs(generator, eta)
 
         # 7. Denoising loop
-        num_warmup_steps = len(timesteps) - num_inference_steps * self.scheduler.order
-        with self.progress_bar(total=num_inference_steps) as progress_bar:
-            for i, t in enumerate(timesteps):
-                # expand the latents if we are doing classifier free guidance
-                latent_model_input = torch.cat([latents] * 2) if do_classifier_free_guidance else latents
-                latent_model_input = self.scheduler.scale_model_input(latent_model_input, t)
-
-                # predict the noise residual
-                noise_pred = self.unet(
-                    latent_model_input,
-                    t,
-                    encoder_hidden_states=prompt_embeds,
-                    cross_attention_kwargs=cross_attention_kwargs,
-                    return_dict=False,
-                )[0]
+        if parallel is not None:
 
-                # perform guidance
+            def model_fn(block_latents, block_t, step_index):
+                # evaluate all the timesteps of the window in a single UNet call
+                parallel_len, batch_size = block_latents.shape[:2]
+                block_prompt_embeds = torch.stack([prompt_embeds] * parallel_len)
+                t_vec = block_t[:, None].repeat(1, batch_size)
                 if do_classifier_free_guidance:
-                    noise_pred_uncond, noise_pred_text = noise_pred.chunk(2)
-                    noise_pred = noise_pred_uncond + guidance_scale * (noise_pred_text - noise_pred_uncond)
+                    t_vec = t_vec.repeat(1, 2)
 
-                # reshape latents
-                bsz, channel, frames, width, height = latents.shape
-                latents = latents.permute(0, 2, 1, 3, 4).reshape(bsz * frames, channel, width, height)
-                noise_pred = noise_pred.permute(0, 2, 1, 3, 4).reshape(bsz * frames, channel, width, height)
-
-                # compute the previous noisy sample x_t -> x_t-1
-                latents = self.scheduler.step(noise_pred, t, latents, **extra_step_kwargs).prev_sample
+                latent_model_input = (
+                    torch.cat([block_latents] * 2, dim=1) if do_classifier_free_guidance else block_latents
+                )
+                latent_model_input = self.scheduler.scale_model_input(latent_model_input, t_vec)
 
-                # reshape latents back
-                latents = latents[None, :].reshape(bsz, frames, channel, width, height).permute(0, 2, 1, 3, 4)
+                model_output = self.unet(
+                    latent_model_input.flatten(0, 1),
+                    t_vec.flatten(0, 1),
+                    encoder_hidden_states=block_prompt_embeds.flatten(0, 1),
+                    cross_attention_kwargs=cross_attention_kwargs,
+                    return_dict=False,
+                )[0]
 
-                # call the callback, if provided
-                if i == len(timesteps) - 1 or ((i + 1) > num_warmup_steps and (i + 1) % self.scheduler.order == 0):
-                    progress_bar.update()
-                    if callback is not None and i % callback_steps == 0:
-                        step_idx = i // getattr(self.scheduler, "order", 1)
-                        callback(step_idx, t, latents)
+                per_latent_shape = model_output.shape[1:]
+                if do_classifier_free_guidance:
+                    model_output = model_output.reshape(parallel_len, 2, batch_size, *per_latent_shape)
+                    noise_pred_uncond, noise_pred_text = model_output[:, 0], model_output[:, 1]
+                    model_output = noise_pred_uncond + guidance_scale * (noise_pred_text - noise_pred_uncond)
+                return model_output.reshape(parallel_len, batch_size, *per_latent_shape)
+
+            extra_step_kwargs.pop("generator", None)
+            with self.progress_bar(total=num_inference_steps) as progress_bar:
+                latents = parallel_denoise(
+                    self.scheduler,
+                    latents,
+                    model_fn,
+                    parallel=parallel,
+                    tolerance=tolerance,
+                    generator=generator,
+                    extra_step_kwargs=extra_step_kwargs,
+                    progress_bar=progress_bar,
+                    callback=callback,
+                    callback_steps=callback_steps,
+                )
+        else:
+            num_warmup_steps = len(timesteps) - num_inference_steps * self.scheduler.order
+            with self.progress_bar(total=num_inference_steps) as progress_bar:
+                for i, t in enumerate(timesteps):
+                    # expand the latents if we are doing classifier free guidance
+                    latent_model_input = torch.cat([latents] * 2) if do_classifier_free_guidance else latents
+                    latent_model_input = self.scheduler.scale_model_input(latent_model_input, t)
+
+                    # predict the noise residual
+                    noise_pred = self.unet(
+                        latent_model_input,
+                        t,
+                        encoder_hidden_states=prompt_embeds,
+                        cross_attention_kwargs=cross_attention_kwargs,
+                        return_dict=False,
+                    )[0]
+
+                    # perform guidance
+                    if do_classifier_free_guidance:
+                        noise_pred_uncond, noise_pred_text = noise_pred.chunk(2)
+                        noise_pred = noise_pred_uncond + guidance_scale * (noise_pred_text - noise_pred_uncond)
+
+                    # reshape latents
+                    bsz, channel, frames, width, height = latents.shape
+                    latents = latents.permute(0, 2, 1, 3, 4).reshape(bsz * frames, channel, width, height)
+                    noise_pred = noise_pred.permute(0, 2, 1, 3, 4).reshape(bsz * frames, channel, width, height)
+
+                    # compute the previous noisy sample x_t -> x_t-1
+                    latents = self.scheduler.step(noise_pred, t, latents, **extra_step_kwargs).prev_sample
+
+                    # reshape latents back
+                    latents = latents[None, :].reshape(bsz, frames, channel, width, height).permute(0, 2, 1, 3, 4)
+
+                    # call the callback, if provided
+                    if i == len(timesteps) - 1 or ((i + 1) > num_warmup_steps and (i + 1) % self.scheduler.order == 0):
+                        progress_bar.update()
+                        if callback is not None and i % callback_steps == 0:
+                            step_idx = i // getattr(self.scheduler, "order", 1)
+                            callback(step_idx, t, latents)
 
         if output_type == "latent":
             return TextToVideoSDPipelineOutput(frames=latents)
 
-        video_tensor = self.decode_latents(latents)
+        video_tensor = self.decode_latents(latents, decode_chunk_size=decode_chunk_size)
 
         if output_type == "pt":
             video = video_tensor
@@ -13,7 +13,7 @@
 # limitations under the License.
 
 import inspect
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
 
 import numpy as np
 import PIL.Image
@@ -32,7 +32,7 @@ from ...utils import (
     scale_lora_layers,
     unscale_lora_layers,
 )
-from ...utils.torch_utils import randn_tensor
+from ...utils.torch_utils import randn_tensor, tensor_to_numpy
 from ..pipeline_utils import DiffusionPipeline
 from . import TextToVideoSDPipelineOutput
 
@@ -79,6 +79,7 @@ EXAMPLE_DOC_STRING = """
 """
 
 
+# Copied from diffusers.pipelines.text_to_video_synthesis.pipeline_text_to_video_synth.tensor2vid
 def tensor2vid(video: torch.Tensor, mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5]) -> List[np.ndarray]:
     # This code is copied from https://github.com/modelscope/modelscope/blob/1509fdb973e5871f37148a4b5e5964cafd43e64d/modelscope/pipelines/multi_modal/text_to_video_synthesis_pipeline.py#L78
     # reshape to ncfhw
@@ -92,9 +93,9 @@ def tensor2vid(video: torch.Tensor, mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5]) -
     images = video.permute(2, 3, 0, 4, 1).reshape(
         f, h, i * w, c
     )  # 1st (frames, h, batch_size, w, c) 2nd (frames, h, batch_size * w, c)
-    images = images.unbind(dim=0)  # prepare a list of indvidual (consecutive frames)
-    images = [(image.cpu().numpy() * 255).astype("uint8") for image in images]  # f h w c
-    return images
+    # quantize on device so that only a single uint8 array is copied to the host
+    images = tensor_to_numpy(images.mul(255).to(torch.uint8))
+    return list(images)  # prepare a list of indvidual (consecutive frames)
 
 
 def preprocess_video(video):
@@ -337,22 +338,29 @@ class VideoToVideoSDPipeline(DiffusionPipeline, TextualInversionLoaderMixin, Lor
             else:
                 attention_mask = None
 
-            if clip_skip is None:
-                prompt_embeds = self.text_encoder(text_input_ids.to(device), attention_mask=attention_mask)
-                prompt_embeds = prompt_embeds[0]
-            else:
-                prompt_embeds = self.text_encoder(
-                    text_input_ids.to(device), attention_mask=attention_mask, output_hidden_states=True
-                )
-                # Access the `hidden_states` first, that contains a tuple of
-                # all the hidden states from the encoder layers. Then index into
-                # the tuple to access the hidden states from the desired layer.
-                prompt_embeds = prompt_embeds[-1][-(clip_skip + 1)]
-                # We also need to apply the final LayerNorm here to not mess with the
-                # representations. The `last_hidden_states` that we typically use for
-                # obtaining the final prompt representations passes through the LayerNorm
-                # layer.
-                prompt_embeds = self.text_encoder.text_model.final_layer_norm(prompt_embeds)
+            # reuse the text encoder outputs of previously seen prompts if `enable_prompt_embeds_cache` was called
+            cache_keys, prompt_embeds = self._lookup_prompt_embeds(
+                self.text_encoder, text_input_ids, clip_skip=clip_skip, lora_scale=lora_scale
+            )
+
+            if prompt_embeds is None:
+                if clip_skip is None:
+                    prompt_embeds = self.text_encoder(text_input_ids.to(device), attention_mask=attention_mask)
+                    prompt_embeds = prompt_embeds[0]
+                else:
+                    prompt_embeds = self.text_encoder(
+                        text_input_ids.to(device), attention_mask=attention_mask, output_hidden_states=True
+                    )
+                    # Access the `hidden_states` first, that contains a tuple of
+                    # all the hidden states from the encoder layers. Then index into
+                    # the tuple to access the hidden states from the desired layer.
+                    prompt_embeds = prompt_embeds[-1][-(clip_skip + 1)]
+                    # We also need to apply the final LayerNorm here to not mess with the
+                    # representations. The `last_hidden_states` that we typically use for
+                    # obtaining the final prompt representations passes through the LayerNorm
+                    # layer.
+                    prompt_embeds = self.text_encoder.text_model.final_layer_norm(prompt_embeds)
+                self._store_prompt_embeds(cache_keys, prompt_embeds)
 
         if self.text_encoder is not None:
             prompt_embeds_dtype = self.text_encoder.dtype
@@ -407,11 +415,17 @@ class VideoToVideoSDPipeline(DiffusionPipeline, TextualInversionLoaderMixin, Lor
             else:
                 attention_mask = None
 
-            negative_prompt_embeds = self.text_encoder(
-                uncond_input.input_ids.to(device),
-                attention_mask=attention_mask,
+            cache_keys, negative_prompt_embeds = self._lookup_prompt_embeds(
+                self.text_encoder, uncond_input.input_ids, lora_scale=lora_scale
             )
-            negative_prompt_embeds = negative_prompt_embeds[0]
+
+            if negative_prompt_embeds is None:
+                negative_prompt_embeds = self.text_encoder(
+                    uncond_input.input_ids.to(device),
+                    attention_mask=attention_mask,
+                )
+                negative_prompt_embeds = negative_prompt_embeds[0]
+                self._store_prompt_embeds(cache_keys, negative_prompt_embeds)
 
         if do_classifier_free_guidance:
             # duplicate unconditional embeddings for each generation per prompt, using mps friendly method
@@ -429,7 +443,13 @@ class VideoToVideoSDPipeline(DiffusionPipeline, TextualInversionLoaderMixin, Lor
         return prompt_embeds, negative_prompt_embeds
 
     # Copied from diffusers.pipelines.text_to_video_synthesis.pipeline_text_to_video_synth.TextToVideoSDPipeline.decode_latents
-    def decode_latents(self, latents):
+    def decode_latents(self, latents, decode_chunk_size: Optional[int] = None):
+        if decode_chunk_size is not None:
+            video = self.prepare_video_buffer(latents)
+            for _ in self.decode_latents_streaming(latents, decode_chunk_size=decode_chunk_size, output=video):
+                pass
+            return video
+
         latents = 1 / self.vae.config.scaling_factor * latents
 
         batch_size, channels, num_frames, height, width = latents.shape
@@ -452,6 +472,67 @@ class VideoToVideoSDPipeline(DiffusionPipeline, TextualInversionLoaderMixin, Lor
         video = video.float()
         return video
 
+    # Copied from diffusers.pipelines.text_to_video_synthesis.pipeline_text_to_video_synth.TextToVideoSDPipeline.prepare_video_buffer
+    def prepare_video_buffer(self, latents):
+        r"""
+        Allocates the float32 `(batch_size, channels, num_frames, height, width)` tensor that the decoded frames of
+        `latents` are written into by `decode_latents_streaming`.
+        """
+        batch_size, _, num_frames, height, width = latents.shape
+        shape = (
+            batch_size,
+            self.vae.config.out_channels,
+            num_frames,
+            height * self.vae_scale_factor,
+            width * self.vae_scale_factor,
+        )
+        return torch.empty(shape, dtype=torch.float32, device=latents.device)
+
+    # Copied from diffusers.pipelines.text_to_video_synthesis.pipeline_text_to_video_synth.TextToVideoSDPipeline.decode_latents_streaming
+    def decode_latents_streaming(
+        self,
+        latents: torch.FloatTensor,
+        decode_chunk_size: int = 8,
+        output: Optional[torch.FloatTensor] = None,
+    ) -> Iterator[torch.FloatTensor]:
+        r"""
+        Decodes video latents `decode_chunk_size` frames at a time so that the peak memory of the VAE decoder is
+        bounded by the chunk size instead of by the total number of frames.
+
+        Args:
+            latents (`torch.FloatTensor`):
+                Latents of shape `(batch_size, num_channels, num_frames, height, width)`.
+            decode_chunk_size (`int`, *optional*, defaults to 8):
+                The number of frames (per batch element) passed to the VAE decoder in a single call.
+            output (`torch.FloatTensor`, *optional*):
+                A preallocated buffer to write the decoded frames into. If not provided, one is created with
+                `prepare_video_buffer`.
+
+        Yields:
+            `torch.FloatTensor`:
+                The decoded frames of each chunk, in frame order, as a `(batch_size, channels, chunk_frames, height,
+                width)` view into `output`. Once the generator is exhausted `output` holds the complete video.
+        """
+        if decode_chunk_size < 1:
+            raise ValueError(f"`decode_chunk_size` has to be a positive integer but is {decode_chunk_size}.")
+
+        if output is None:
+            output = self.prepare_video_buffer(latents)
+
+        batch_size, channels, num_frames, height, width = latents.shape
+        for start in range(0, num_frames, decode_chunk_size):
+            end = min(start + decode_chunk_size, num_frames)
+            chunk = 1 / self.vae.config.scaling_factor * latents[:, :, start:end]
+            chunk = chunk.permute(0, 2, 1, 3, 4).reshape(batch_size * (end - start), channels, height, width)
+
+            image = self.vae.decode(chunk).sample
+            image = image.reshape((batch_size, end - start) + image.shape[1:]).permute(0, 2, 1, 3, 4)
+
+            # copying into the float32 buffer takes care of the upcast without an extra full-size temporary
+            frames = output[:, :, start:end]
+            frames.copy_(image)
+            yield frames
+
     # Copied from diffusers.pipelines.stable_diffusion.pipeline_stable_diffusion.StableDiffusionPipeline.prepare_extra_step_kwargs
     def prepare_extra_step_kwargs(self, generator, eta):
         # prepare extra kwargs for the scheduler step, since not all schedulers have the same signature
@@ -625,6 +706,7 @@ class VideoToVideoSDPipeline(DiffusionPipeline, TextualInversionLoaderMixin, Lor
         callback_steps: int = 1,
         cross_attention_kwargs: Optional[Dict[str, Any]] = None,
         clip_skip: Optional[int] = None,
+        decode_chunk_size: Optional[int] = None,
     ):
         r"""
         The call function to the pipeline for generation.
@@ -684,6 +766,9 @@ class VideoToVideoSDPipeline(DiffusionPipeline, TextualInversionLoaderMixin, Lor
             clip_skip (`int`, *optional*):
                 Number of layers to be skipped from CLIP while computing the prompt embeddings. A value of 1 means that
                 the output of the pre-final layer will be used for computing the prompt embeddings.
+            decode_chunk_size (`int`, *optional*):
+                The number of frames decoded by the VAE at a time. Decoding in chunks bounds the memory of the VAE
+                decoder at the expense of some speed. If not defined, all frames are decoded in a single call.
         Examples:
 
         Returns:
@@ -793,7 +878,7 @@ class VideoToVideoSDPipeline(DiffusionPipeline, TextualInversionLoaderMixin, Lor
         if hasattr(self, "final_offload_hook") and self.final_offload_hook is not None:
             self.unet.to("cpu")
 
-        video_tensor = self.decode_latents(latents)
+        video_tensor = self.decode_latents(latents, decode_chunk_size=decode_chunk_size)
 
         if output_type == "pt":
             video = video_tensor
@@ -31,6 +31,7 @@ from ...models.embeddings import (
     TimestepEmbedding,
     Timesteps,
 )
+from ...models.feature_cache import FeatureCache
 from ...models.transformer_2d import Transformer2DModel
 from ...models.unet_2d_condition import UNet2DConditionOutput
 from ...utils import USE_PEFT_BACKEND, is_torch_version, logging, scale_lora_layers, unscale_lora_layers
@@ -817,6 +818,8 @@ class UNetFlatConditionModel(ModelMixin, ConfigMixin):
                 positive_len=positive_len, out_dim=cross_attention_dim, feature_type=feature_type
             )
 
+        self._deep_cache = None
+
     @property
     def attn_processors(self) -> Dict[str, AttentionProcessor]:
         r"""
@@ -993,6 +996,36 @@ class UNetFlatConditionModel(ModelMixin, ConfigMixin):
                 if hasattr(upsample_block, k) or getattr(upsample_block, k, None) is not None:
                     setattr(upsample_block, k, None)
 
+    def enable_deep_cache(self, cache_interval: int = 3, cache_block_id: int = 0):
+        r"""
+        Enables the reuse of the deep features of the UNet across denoising steps, as in DeepCache
+        (https://arxiv.org/abs/2312.00858).
+
+        The high-level features computed by the deep blocks of the UNet change slowly between adjacent denoising steps.
+        Every `cache_interval` steps, a full forward pass stores the input of the up block that is the skip branch of
+        down block `cache_block_id`. The steps in between only run the down and up blocks up to `cache_block_id` and
+        reuse the stored features for the rest of the UNet.
+
+        Args:
+            cache_interval (`int`, defaults to `3`):
+                The number of denoising steps that share the deep features, `1` recomputes them at every step. Larger
+                intervals are faster but lose more quality.
+            cache_block_id (`int`, defaults to `0`):
+                The index of the deepest down block that is run at every step. Running more blocks is slower but keeps
+                more quality.
+        """
+        if not 0 <= cache_block_id < len(self.up_blocks) - 1:
+            raise ValueError(
+                f"`cache_block_id` has to be between 0 and {len(self.up_blocks) - 2}, but is {cache_block_id}."
+            )
+
+        self._deep_cache = FeatureCache(cache_interval)
+        self._deep_cache_block_id = cache_block_id
+
+    def disable_deep_cache(self):
+        """Disables the reuse of the deep features of the UNet."""
+        self._deep_cache = None
+
     def forward(
         self,
         sample: torch.FloatTensor,
@@ -1231,6 +1264,13 @@ class UNetFlatConditionModel(ModelMixin, ConfigMixin):
             encoder_hidden_states = torch.cat([encoder_hidden_states, image_embeds], dim=1)
 
         # 2. pre-process
+        # with the deep cache, only the blocks above `cache_block_id` are run at the steps that reuse the deep features
+        num_down_blocks = len(self.down_blocks)
+        first_up_block = 0
+        if self._deep_cache is not None and not self._deep_cache.should_refresh(timestep, sample):
+            num_down_blocks = self._deep_cache_block_id + 1
+            first_up_block = len(self.up_blocks) - num_down_blocks
+
         sample = self.conv_in(sample)
 
         # 2.5 GLIGEN position net
@@ -1264,7 +1304,7 @@ class UNetFlatConditionModel(ModelMixin, ConfigMixin):
             is_adapter = True
 
         down_block_res_samples = (sample,)
-        for downsample_block in self.down_blocks:
+        for downsample_block in self.down_blocks[:num_down_blocks]:
             if hasattr(downsample_block, "has_cross_attention") and downsample_block.has_cross_attention:
                 # For t2i-adapter CrossAttnDownBlockFlat
                 additional_residuals = {}
@@ -1298,8 +1338,14 @@ class UNetFlatConditionModel(ModelMixin, ConfigMixin):
 
             down_block_res_samples = new_down_block_res_samples
 
+        if first_up_block > 0:
+            # the cached features replace the deep blocks, keep the skip connections of the up blocks that are run
+            num_res_samples = sum(len(upsample_block.resnets) for upsample_block in self.up_blocks[first_up_block:])
+            down_block_res_samples = down_block_res_samples[:num_res_samples]
+            sample = self._deep_cache.features
+
         # 4. mid
-        if self.mid_block is not None:
+        if self.mid_block is not None and first_up_block == 0:
             if hasattr(self.mid_block, "has_cross_attention") and self.mid_block.has_cross_attention:
                 sample = self.mid_block(
                     sample,
@@ -1320,13 +1366,19 @@ class UNetFlatConditionModel(ModelMixin, ConfigMixin):
             ):
                 sample += down_intrablock_additional_residuals.pop(0)
 
-        if is_controlnet:
+        if is_controlnet and first_up_block == 0:
             sample = sample + mid_block_additional_residual
 
         # 5. up
         for i, upsample_block in enumerate(self.up_blocks):
+            if i < first_up_block:
+                continue
+
             is_final_block = i == len(self.up_blocks) - 1
 
+            if self._deep_cache is not None and i == len(self.up_blocks) - 1 - self._deep_cache_block_id:
+                self._deep_cache.features = sample
+
             res_samples = down_block_res_samples[-len(upsample_block.resnets) :]
             down_block_res_samples = down_block_res_samples[: -len(upsample_block.resnets)]
 
@@ -21,7 +21,7 @@ import torch
 from ..configuration_utils import ConfigMixin, register_to_config
 from ..utils import BaseOutput, logging
 from ..utils.torch_utils import randn_tensor
-from .scheduling_utils import SchedulerMixin
+from .scheduling_utils import SchedulerMixin, index_for_timesteps
 
 
 logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
@@ -283,18 +283,11 @@ class CMStochasticIterativeScheduler(SchedulerMixin, ConfigMixin):
         if isinstance(timestep, torch.Tensor):
             timestep = timestep.to(self.timesteps.device)
 
-        index_candidates = (self.timesteps == timestep).nonzero()
-
         # The sigma index that is taken for the **very** first `step`
         # is always the second index (or the last index if there is only 1)
         # This way we can ensure we don't accidentally skip a sigma in
         # case we start in the middle of the denoising schedule (e.g. for image-to-image)
-        if len(index_candidates) > 1:
-            step_index = index_candidates[1]
-        else:
-            step_index = index_candidates[0]
-
-        self._step_index = step_index.item()
+        self._step_index = index_for_timesteps(self.timesteps, timestep, occurrence=1).item()
 
     def step(
         self,
@@ -410,7 +403,7 @@ class CMStochasticIterativeScheduler(SchedulerMixin, ConfigMixin):
             schedule_timesteps = self.timesteps.to(original_samples.device)
             timesteps = timesteps.to(original_samples.device)
 
-        step_indices = [(schedule_timesteps == t).nonzero().item() for t in timesteps]
+        step_indices = index_for_timesteps(schedule_timesteps, timesteps)
 
         sigma = sigmas[step_indices].flatten()
         while len(sigma.shape) < len(original_samples.shape):
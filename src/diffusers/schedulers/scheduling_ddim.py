@@ -25,7 +25,7 @@ import torch
 from ..configuration_utils import ConfigMixin, register_to_config
 from ..utils import BaseOutput
 from ..utils.torch_utils import randn_tensor
-from .scheduling_utils import KarrasDiffusionSchedulers, SchedulerMixin
+from .scheduling_utils import KarrasDiffusionSchedulers, SchedulerBatchState, SchedulerMixin
 
 
 @dataclass
@@ -469,6 +469,128 @@ class DDIMScheduler(SchedulerMixin, ConfigMixin):
 
         return DDIMSchedulerOutput(prev_sample=prev_sample, pred_original_sample=pred_original_sample)
 
+    def batch_step(
+        self,
+        model_output: torch.FloatTensor,
+        sample: torch.FloatTensor,
+        state: SchedulerBatchState,
+        eta: float = 0.0,
+        use_clipped_model_output: bool = False,
+        generator=None,
+        variance_noise: Optional[torch.FloatTensor] = None,
+        return_dict: bool = True,
+    ) -> Union[DDIMSchedulerOutput, Tuple]:
+        """
+        Batched version of [`~DDIMScheduler.step`] where every sample follows its own schedule. The current timestep
+        of every sample is read from `state` (see [`~schedulers.scheduling_utils.SchedulerBatchState.timestep`]) and
+        `state` is advanced in place. Samples can join or leave the batch between two calls with
+        [`~schedulers.scheduling_utils.SchedulerBatchState.cat`] and
+        [`~schedulers.scheduling_utils.SchedulerBatchState.select`]. Finished samples are returned unchanged.
+
+        The step only runs tensor operations and doesn't synchronize with the device, so that a denoising loop can be
+        captured in a CUDA graph or compiled with `torch.compile(fullgraph=True)`.
+
+        Args:
+            model_output (`torch.FloatTensor`):
+                The direct output from learned diffusion model.
+            sample (`torch.FloatTensor`):
+                A current instance of a sample created by the diffusion process.
+            state ([`~schedulers.scheduling_utils.SchedulerBatchState`]):
+                The per-sample state created with [`~SchedulerMixin.init_batch_state`].
+            eta (`float`):
+                The weight of noise for added noise in diffusion step.
+            use_clipped_model_output (`bool`, defaults to `False`):
+                See [`~DDIMScheduler.step`].
+            generator (`torch.Generator` or `List[torch.Generator]`, *optional*):
+                A random number generator, or one generator per sample.
+            variance_noise (`torch.FloatTensor`):
+                Alternative to generating noise with `generator` by directly providing the noise for the variance
+                itself.
+            return_dict (`bool`, *optional*, defaults to `True`):
+                Whether or not to return a [`~schedulers.scheduling_ddim.DDIMSchedulerOutput`] or `tuple`.
+
+        Returns:
+            [`~schedulers.scheduling_utils.DDIMSchedulerOutput`] or `tuple`:
+                If return_dict is `True`, [`~schedulers.scheduling_ddim.DDIMSchedulerOutput`] is returned, otherwise a
+                tuple is returned where the first element is the sample tensor.
+        """
+        # 1. get previous step value (=t-1) of every sample
+        timestep = state.timestep
+        prev_timestep = timestep - self.config.num_train_timesteps // state.num_inference_steps
+
+        # 2. compute alphas, betas
+        # the tables are moved once, copying them in every step would break graph capture
+        self.alphas_cumprod = self.alphas_cumprod.to(sample.device)
+        self.final_alpha_cumprod = self.final_alpha_cumprod.to(sample.device)
+        broadcast_shape = (-1,) + (1,) * (sample.ndim - 1)
+        alpha_prod_t = self.alphas_cumprod[timestep].reshape(broadcast_shape)
+        alpha_prod_t_prev = torch.where(
+            prev_timestep >= 0, self.alphas_cumprod[prev_timestep.clamp(min=0)], self.final_alpha_cumprod
+        ).reshape(broadcast_shape)
+
+        beta_prod_t = 1 - alpha_prod_t
+        beta_prod_t_prev = 1 - alpha_prod_t_prev
+
+        # 3. compute predicted original sample
+        if self.config.prediction_type == "epsilon":
+            pred_original_sample = (sample - beta_prod_t ** (0.5) * model_output) / alpha_prod_t ** (0.5)
+            pred_epsilon = model_output
+        elif self.config.prediction_type == "sample":
+            pred_original_sample = model_output
+            pred_epsilon = (sample - alpha_prod_t ** (0.5) * pred_original_sample) / beta_prod_t ** (0.5)
+        elif self.config.prediction_type == "v_prediction":
+            pred_original_sample = (alpha_prod_t**0.5) * sample - (beta_prod_t**0.5) * model_output
+            pred_epsilon = (alpha_prod_t**0.5) * model_output + (beta_prod_t**0.5) * sample
+        else:
+            raise ValueError(
+                f"prediction_type given as {self.config.prediction_type} must be one of `epsilon`, `sample`, or"
+                " `v_prediction`"
+            )
+
+        # 4. Clip or threshold "predicted x_0"
+        if self.config.thresholding:
+            pred_original_sample = self._threshold_sample(pred_original_sample)
+        elif self.config.clip_sample:
+            pred_original_sample = pred_original_sample.clamp(
+                -self.config.clip_sample_range, self.config.clip_sample_range
+            )
+
+        # 5. compute variance: "sigma_t(η)" -> see formula (16)
+        variance = (beta_prod_t_prev / beta_prod_t) * (1 - alpha_prod_t / alpha_prod_t_prev)
+        std_dev_t = eta * variance ** (0.5)
+
+        if use_clipped_model_output:
+            pred_epsilon = (sample - alpha_prod_t ** (0.5) * pred_original_sample) / beta_prod_t ** (0.5)
+
+        # 6. compute "direction pointing to x_t" and x_t without "random noise" of formula (12)
+        pred_sample_direction = (1 - alpha_prod_t_prev - std_dev_t**2) ** (0.5) * pred_epsilon
+        prev_sample = alpha_prod_t_prev ** (0.5) * pred_original_sample + pred_sample_direction
+
+        if eta > 0:
+            if variance_noise is not None and generator is not None:
+                raise ValueError(
+                    "Cannot pass both generator and variance_noise. Please make sure that either `generator` or"
+                    " `variance_noise` stays `None`."
+                )
+
+            if variance_noise is None:
+                variance_noise = randn_tensor(
+                    model_output.shape, generator=generator, device=model_output.device, dtype=model_output.dtype
+                )
+            prev_sample = prev_sample + std_dev_t * variance_noise
+
+        finished = state.finished.reshape(broadcast_shape)
+        prev_sample = torch.where(finished, sample, prev_sample)
+        state.step_index = torch.minimum(state.step_index + 1, state.num_inference_steps)
+
+        prev_sample = prev_sample.to(sample.dtype)
+        pred_original_sample = pred_original_sample.to(sample.dtype)
+
+        if not return_dict:
+            return (prev_sample,)
+
+        return DDIMSchedulerOutput(prev_sample=prev_sample, pred_original_sample=pred_original_sample)
+
     # Copied from diffusers.schedulers.scheduling_ddpm.DDPMScheduler.add_noise
     def add_noise(
         self,
@@ -23,7 +23,13 @@ import torch
 from ..configuration_utils import ConfigMixin, register_to_config
 from ..utils import deprecate
 from ..utils.torch_utils import randn_tensor
-from .scheduling_utils import KarrasDiffusionSchedulers, SchedulerMixin, SchedulerOutput
+from .scheduling_utils import (
+    KarrasDiffusionSchedulers,
+    SchedulerBatchState,
+    SchedulerMixin,
+    SchedulerOutput,
+    index_for_timesteps,
+)
 
 
 # Copied from diffusers.schedulers.scheduling_ddpm.betas_for_alpha_bar
@@ -761,20 +767,11 @@ class DPMSolverMultistepScheduler(SchedulerMixin, ConfigMixin):
         if isinstance(timestep, torch.Tensor):
             timestep = timestep.to(self.timesteps.device)
 
-        index_candidates = (self.timesteps == timestep).nonzero()
-
-        if len(index_candidates) == 0:
-            step_index = len(self.timesteps) - 1
         # The sigma index that is taken for the **very** first `step`
         # is always the second index (or the last index if there is only 1)
         # This way we can ensure we don't accidentally skip a sigma in
         # case we start in the middle of the denoising schedule (e.g. for image-to-image)
-        elif len(index_candidates) > 1:
-            step_index = index_candidates[1].item()
-        else:
-            step_index = index_candidates[0].item()
-
-        self._step_index = step_index
+        self._step_index = index_for_timesteps(self.timesteps, timestep, occurrence=1, missing_to_last=True).item()
 
     def step(
         self,
@@ -852,6 +849,107 @@ class DPMSolverMultistepScheduler(SchedulerMixin, ConfigMixin):
 
         return SchedulerOutput(prev_sample=prev_sample)
 
+    def batch_step(
+        self,
+        model_output: torch.FloatTensor,
+        sample: torch.FloatTensor,
+        state: SchedulerBatchState,
+        generator=None,
+        return_dict: bool = True,
+    ) -> Union[SchedulerOutput, Tuple]:
+        """
+        Batched version of [`~DPMSolverMultistepScheduler.step`] where every sample follows its own schedule and keeps
+        its own solver history. The current timestep of every sample is read from `state` (see
+        [`~schedulers.scheduling_utils.SchedulerBatchState.timestep`]) and `state` is advanced in place. Samples can
+        join or leave the batch between two calls with [`~schedulers.scheduling_utils.SchedulerBatchState.cat`] and
+        [`~schedulers.scheduling_utils.SchedulerBatchState.select`]. Finished samples are returned unchanged.
+
+        The step only runs tensor operations and doesn't synchronize with the device, so that a denoising loop can be
+        captured in a CUDA graph or compiled with `torch.compile(fullgraph=True)`. Every solver order of the config is
+        evaluated for all samples and the order of every sample is selected afterwards.
+
+        Args:
+            model_output (`torch.FloatTensor`):
+                The direct output from learned diffusion model.
+            sample (`torch.FloatTensor`):
+                A current instance of a sample created by the diffusion process.
+            state ([`~schedulers.scheduling_utils.SchedulerBatchState`]):
+                The per-sample state created with [`~SchedulerMixin.init_batch_state`].
+            generator (`torch.Generator` or `List[torch.Generator]`, *optional*):
+                A random number generator, or one generator per sample.
+            return_dict (`bool`):
+                Whether or not to return a [`~schedulers.scheduling_utils.SchedulerOutput`] or `tuple`.
+
+        Returns:
+            [`~schedulers.scheduling_utils.SchedulerOutput`] or `tuple`:
+                If return_dict is `True`, [`~schedulers.scheduling_utils.SchedulerOutput`] is returned, otherwise a
+                tuple is returned where the first element is the sample tensor.
+        """
+        num_inference_steps = state.num_inference_steps
+        step_index = torch.minimum(state.step_index, num_inference_steps - 1)
+
+        # Same order selection as `step`, evaluated per sample
+        lower_order_final = (step_index == num_inference_steps - 1) & (
+            self.config.euler_at_final | (self.config.lower_order_final & (num_inference_steps < 15))
+        )
+        lower_order_second = (
+            (step_index == num_inference_steps - 2) & self.config.lower_order_final & (num_inference_steps < 15)
+        )
+        order = torch.full_like(step_index, self.config.solver_order)
+        order = torch.where((state.lower_order_nums < 2) | lower_order_second, order.clamp(max=2), order)
+        order = torch.where((state.lower_order_nums < 1) | lower_order_final, 1, order)
+
+        # The solver updates index `self.sigmas` with `self.step_index`. Pointing them to the flattened per-sample
+        # sigma tables and to a `(batch_size, 1, ...)` index makes every update compute all samples at once.
+        broadcast_shape = (-1,) + (1,) * (sample.ndim - 1)
+        index_offset = torch.arange(len(state), device=step_index.device) * state.sigmas.shape[1]
+        order = order.reshape(broadcast_shape)
+
+        sigmas, self.sigmas = getattr(self, "sigmas", None), state.sigmas.flatten()
+        _step_index, self._step_index = self._step_index, (index_offset + step_index).reshape(broadcast_shape)
+        try:
+            model_output = self.convert_model_output(model_output, sample=sample)
+            for i in range(self.config.solver_order - 1):
+                state.model_outputs[i] = state.model_outputs[i + 1]
+            state.model_outputs[-1] = model_output
+            # samples without enough history don't use the higher orders, zeros keep the updates computable
+            state.model_outputs = [
+                output if output is not None else torch.zeros_like(model_output) for output in state.model_outputs
+            ]
+
+            if self.config.algorithm_type in ["sde-dpmsolver", "sde-dpmsolver++"]:
+                noise = randn_tensor(
+                    model_output.shape, generator=generator, device=model_output.device, dtype=model_output.dtype
+                )
+            else:
+                noise = None
+
+            prev_sample = self.dpm_solver_first_order_update(model_output, sample=sample, noise=noise)
+            if self.config.solver_order >= 2:
+                second_order_sample = self.multistep_dpm_solver_second_order_update(
+                    state.model_outputs, sample=sample, noise=noise
+                )
+                prev_sample = torch.where(order == 2, second_order_sample, prev_sample)
+            if self.config.solver_order >= 3:
+                third_order_sample = self.multistep_dpm_solver_third_order_update(state.model_outputs, sample=sample)
+                prev_sample = torch.where(order == 3, third_order_sample, prev_sample)
+        finally:
+            self.sigmas, self._step_index = sigmas, _step_index
+
+        finished = state.finished
+        prev_sample = torch.where(finished.reshape(broadcast_shape), sample, prev_sample)
+        state.lower_order_nums = torch.where(
+            finished, state.lower_order_nums, (state.lower_order_nums + 1).clamp(max=self.config.solver_order)
+        )
+        state.step_index = torch.minimum(state.step_index + 1, num_inference_steps)
+
+        prev_sample = prev_sample.to(sample.dtype)
+
+        if not return_dict:
+            return (prev_sample,)
+
+        return SchedulerOutput(prev_sample=prev_sample)
+
     def scale_model_input(self, sample: torch.FloatTensor, *args, **kwargs) -> torch.FloatTensor:
         """
         Ensures interchangeability with schedulers that need to scale the denoising model input depending on the
@@ -883,7 +981,7 @@ class DPMSolverMultistepScheduler(SchedulerMixin, ConfigMixin):
             schedule_timesteps = self.timesteps.to(original_samples.device)
             timesteps = timesteps.to(original_samples.device)
 
-        step_indices = [(schedule_timesteps == t).nonzero().item() for t in timesteps]
+        step_indices = index_for_timesteps(schedule_timesteps, timesteps)
 
         sigma = sigmas[step_indices].flatten()
         while len(sigma.shape) < len(original_samples.shape):
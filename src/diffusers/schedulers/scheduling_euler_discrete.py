@@ -22,7 +22,7 @@ import torch
 from ..configuration_utils import ConfigMixin, register_to_config
 from ..utils import BaseOutput, logging
 from ..utils.torch_utils import randn_tensor
-from .scheduling_utils import KarrasDiffusionSchedulers, SchedulerMixin
+from .scheduling_utils import KarrasDiffusionSchedulers, SchedulerBatchState, SchedulerMixin, index_for_timesteps
 
 
 logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
@@ -315,18 +315,11 @@ class EulerDiscreteScheduler(SchedulerMixin, ConfigMixin):
         if isinstance(timestep, torch.Tensor):
             timestep = timestep.to(self.timesteps.device)
 
-        index_candidates = (self.timesteps == timestep).nonzero()
-
         # The sigma index that is taken for the **very** first `step`
         # is always the second index (or the last index if there is only 1)
         # This way we can ensure we don't accidentally skip a sigma in
         # case we start in the middle of the denoising schedule (e.g. for image-to-image)
-        if len(index_candidates) > 1:
-            step_index = index_candidates[1]
-        else:
-            step_index = index_candidates[0]
-
-        self._step_index = step_index.item()
+        self._step_index = index_for_timesteps(self.timesteps, timestep, occurrence=1).item()
 
     def step(
         self,
@@ -434,6 +427,125 @@ class EulerDiscreteScheduler(SchedulerMixin, ConfigMixin):
 
         return EulerDiscreteSchedulerOutput(prev_sample=prev_sample, pred_original_sample=pred_original_sample)
 
+    def batch_scale_model_input(self, sample: torch.FloatTensor, state: SchedulerBatchState) -> torch.FloatTensor:
+        """
+        Batched version of [`~EulerDiscreteScheduler.scale_model_input`] that scales every sample by the sigma of its
+        current step in `state`.
+
+        Args:
+            sample (`torch.FloatTensor`):
+                The input sample.
+            state ([`~schedulers.scheduling_utils.SchedulerBatchState`]):
+                The per-sample state created with [`~SchedulerMixin.init_batch_state`].
+
+        Returns:
+            `torch.FloatTensor`:
+                A scaled input sample.
+        """
+        step_index = torch.minimum(state.step_index, state.num_inference_steps - 1)
+        sigma = state.sigmas.gather(1, step_index[:, None]).reshape((-1,) + (1,) * (sample.ndim - 1))
+        return (sample / ((sigma**2 + 1) ** 0.5)).to(sample.dtype)
+
+    def batch_step(
+        self,
+        model_output: torch.FloatTensor,
+        sample: torch.FloatTensor,
+        state: SchedulerBatchState,
+        s_churn: float = 0.0,
+        s_tmin: float = 0.0,
+        s_tmax: float = float("inf"),
+        s_noise: float = 1.0,
+        generator=None,
+        return_dict: bool = True,
+    ) -> Union[EulerDiscreteSchedulerOutput, Tuple]:
+        """
+        Batched version of [`~EulerDiscreteScheduler.step`] where every sample follows its own schedule. The current
+        timestep of every sample is read from `state` (see
+        [`~schedulers.scheduling_utils.SchedulerBatchState.timestep`]) and `state` is advanced in place. The model input
+        has to be scaled with [`~EulerDiscreteScheduler.batch_scale_model_input`]. Finished samples are returned
+        unchanged.
+
+        The step only runs tensor operations and doesn't synchronize with the device, so that a denoising loop can be
+        captured in a CUDA graph or compiled with `torch.compile(fullgraph=True)`.
+
+        Args:
+            model_output (`torch.FloatTensor`):
+                The direct output from learned diffusion model.
+            sample (`torch.FloatTensor`):
+                A current instance of a sample created by the diffusion process.
+            state ([`~schedulers.scheduling_utils.SchedulerBatchState`]):
+                The per-sample state created with [`~SchedulerMixin.init_batch_state`].
+            s_churn (`float`):
+            s_tmin  (`float`):
+            s_tmax  (`float`):
+            s_noise (`float`, defaults to 1.0):
+                Scaling factor for noise added to the sample.
+            generator (`torch.Generator` or `List[torch.Generator]`, *optional*):
+                A random number generator, or one generator per sample.
+            return_dict (`bool`):
+                Whether or not to return a [`~schedulers.scheduling_euler_discrete.EulerDiscreteSchedulerOutput`] or
+                tuple.
+
+        Returns:
+            [`~schedulers.scheduling_euler_discrete.EulerDiscreteSchedulerOutput`] or `tuple`:
+                If return_dict is `True`, [`~schedulers.scheduling_euler_discrete.EulerDiscreteSchedulerOutput`] is
+                returned, otherwise a tuple is returned where the first element is the sample tensor.
+        """
+        broadcast_shape = (-1,) + (1,) * (sample.ndim - 1)
+        step_index = torch.minimum(state.step_index, state.num_inference_steps - 1)
+        sigma = state.sigmas.gather(1, step_index[:, None]).reshape(broadcast_shape)
+        sigma_next = state.sigmas.gather(1, step_index[:, None] + 1).reshape(broadcast_shape)
+
+        # `len(self.sigmas) - 1` of `step` is the number of inference steps of every sample
+        churn = (s_churn / state.num_inference_steps).clamp(max=2**0.5 - 1).reshape(broadcast_shape)
+        gamma = torch.where((s_tmin <= sigma) & (sigma <= s_tmax), churn, 0.0)
+
+        noise = randn_tensor(
+            model_output.shape, dtype=model_output.dtype, device=model_output.device, generator=generator
+        )
+
+        # upcast to avoid precision issues when computing prev_sample, the per-sample sigmas are float32
+        dtype = sample.dtype
+        sample = sample.to(torch.float32)
+
+        eps = noise * s_noise
+        sigma_hat = sigma * (gamma + 1)
+
+        # adds nothing for the samples without churn
+        churned_sample = sample + eps * (sigma_hat**2 - sigma**2) ** 0.5
+
+        # 1. compute predicted original sample (x_0) from sigma-scaled predicted noise
+        if self.config.prediction_type == "original_sample" or self.config.prediction_type == "sample":
+            pred_original_sample = model_output
+        elif self.config.prediction_type == "epsilon":
+            pred_original_sample = churned_sample - sigma_hat * model_output
+        elif self.config.prediction_type == "v_prediction":
+            # * c_out + input * c_skip
+            pred_original_sample = model_output * (-sigma / (sigma**2 + 1) ** 0.5) + (churned_sample / (sigma**2 + 1))
+        else:
+            raise ValueError(
+                f"prediction_type given as {self.config.prediction_type} must be one of `epsilon`, or `v_prediction`"
+            )
+
+        # 2. Convert to an ODE derivative
+        derivative = (churned_sample - pred_original_sample) / sigma_hat
+
+        dt = sigma_next - sigma_hat
+
+        prev_sample = churned_sample + derivative * dt
+
+        prev_sample = torch.where(state.finished.reshape(broadcast_shape), sample, prev_sample)
+        state.step_index = torch.minimum(state.step_index + 1, state.num_inference_steps)
+
+        # cast back to the dtype of the model
+        prev_sample = prev_sample.to(dtype)
+        pred_original_sample = pred_original_sample.to(dtype)
+
+        if not return_dict:
+            return (prev_sample,)
+
+        return EulerDiscreteSchedulerOutput(prev_sample=prev_sample, pred_original_sample=pred_original_sample)
+
     def add_noise(
         self,
         original_samples: torch.FloatTensor,
@@ -450,7 +562,7 @@ class EulerDiscreteScheduler(SchedulerMixin, ConfigMixin):
             schedule_timesteps = self.timesteps.to(original_samples.device)
             timesteps = timesteps.to(original_samples.device)
 
-        step_indices = [(schedule_timesteps == t).nonzero().item() for t in timesteps]
+        step_indices = index_for_timesteps(schedule_timesteps, timesteps)
 
         sigma = sigmas[step_indices].flatten()
         while len(sigma.shape) < len(original_samples.shape):
@@ -25,7 +25,7 @@ import torch
 from ..configuration_utils import ConfigMixin, register_to_config
 from ..utils import BaseOutput, logging
 from ..utils.torch_utils import randn_tensor
-from .scheduling_utils import SchedulerMixin
+from .scheduling_utils import SchedulerBatchState, SchedulerMixin, index_for_timesteps
 
 
 logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
@@ -255,18 +255,11 @@ class LCMScheduler(SchedulerMixin, ConfigMixin):
         if isinstance(timestep, torch.Tensor):
             timestep = timestep.to(self.timesteps.device)
 
-        index_candidates = (self.timesteps == timestep).nonzero()
-
         # The sigma index that is taken for the **very** first `step`
         # is always the second index (or the last index if there is only 1)
         # This way we can ensure we don't accidentally skip a sigma in
         # case we start in the middle of the denoising schedule (e.g. for image-to-image)
-        if len(index_candidates) > 1:
-            step_index = index_candidates[1]
-        else:
-            step_index = index_candidates[0]
-
-        self._step_index = step_index.item()
+        self._step_index = index_for_timesteps(self.timesteps, timestep, occurrence=1).item()
 
     @property
     def step_index(self):
@@ -498,6 +491,104 @@ class LCMScheduler(SchedulerMixin, ConfigMixin):
 
         return LCMSchedulerOutput(prev_sample=prev_sample, denoised=denoised)
 
+    def batch_step(
+        self,
+        model_output: torch.FloatTensor,
+        sample: torch.FloatTensor,
+        state: SchedulerBatchState,
+        generator=None,
+        return_dict: bool = True,
+    ) -> Union[LCMSchedulerOutput, Tuple]:
+        """
+        Batched version of [`~LCMScheduler.step`] where every sample follows its own schedule. The current timestep of
+        every sample is read from `state` (see [`~schedulers.scheduling_utils.SchedulerBatchState.timestep`]) and
+        `state` is advanced in place. Finished samples are returned unchanged.
+
+        The step only runs tensor operations and doesn't synchronize with the device, so that a denoising loop can be
+        captured in a CUDA graph or compiled with `torch.compile(fullgraph=True)`. The noise is drawn in every step and
+        only injected into the samples that aren't at their last step.
+
+        Args:
+            model_output (`torch.FloatTensor`):
+                The direct output from learned diffusion model.
+            sample (`torch.FloatTensor`):
+                A current instance of a sample created by the diffusion process.
+            state ([`~schedulers.scheduling_utils.SchedulerBatchState`]):
+                The per-sample state created with [`~SchedulerMixin.init_batch_state`].
+            generator (`torch.Generator` or `List[torch.Generator]`, *optional*):
+                A random number generator, or one generator per sample.
+            return_dict (`bool`, *optional*, defaults to `True`):
+                Whether or not to return a [`~schedulers.scheduling_lcm.LCMSchedulerOutput`] or `tuple`.
+        Returns:
+            [`~schedulers.scheduling_utils.LCMSchedulerOutput`] or `tuple`:
+                If return_dict is `True`, [`~schedulers.scheduling_lcm.LCMSchedulerOutput`] is returned, otherwise a
+                tuple is returned where the first element is the sample tensor.
+        """
+        broadcast_shape = (-1,) + (1,) * (sample.ndim - 1)
+
+        # 1. get previous step value of every sample, the last step keeps its timestep
+        timestep = state.timestep
+        step_index = torch.minimum(state.step_index, state.num_inference_steps - 1)
+        prev_step_index = torch.minimum(step_index + 1, state.num_inference_steps - 1)
+        prev_timestep = state.timesteps.gather(1, prev_step_index[:, None]).squeeze(1)
+
+        # 2. compute alphas, betas
+        # the tables are moved once, copying them in every step would break graph capture
+        self.alphas_cumprod = self.alphas_cumprod.to(sample.device)
+        self.final_alpha_cumprod = self.final_alpha_cumprod.to(sample.device)
+        alpha_prod_t = self.alphas_cumprod[timestep].reshape(broadcast_shape)
+        alpha_prod_t_prev = torch.where(
+            prev_timestep >= 0, self.alphas_cumprod[prev_timestep.clamp(min=0)], self.final_alpha_cumprod
+        ).reshape(broadcast_shape)
+
+        beta_prod_t = 1 - alpha_prod_t
+        beta_prod_t_prev = 1 - alpha_prod_t_prev
+
+        # 3. Get scalings for boundary conditions
+        c_skip, c_out = self.get_scalings_for_boundary_condition_discrete(timestep.reshape(broadcast_shape))
+
+        # 4. Compute the predicted original sample x_0 based on the model parameterization
+        if self.config.prediction_type == "epsilon":  # noise-prediction
+            predicted_original_sample = (sample - beta_prod_t.sqrt() * model_output) / alpha_prod_t.sqrt()
+        elif self.config.prediction_type == "sample":  # x-prediction
+            predicted_original_sample = model_output
+        elif self.config.prediction_type == "v_prediction":  # v-prediction
+            predicted_original_sample = alpha_prod_t.sqrt() * sample - beta_prod_t.sqrt() * model_output
+        else:
+            raise ValueError(
+                f"prediction_type given as {self.config.prediction_type} must be one of `epsilon`, `sample` or"
+                " `v_prediction` for `LCMScheduler`."
+            )
+
+        # 5. Clip or threshold "predicted x_0"
+        if self.config.thresholding:
+            predicted_original_sample = self._threshold_sample(predicted_original_sample)
+        elif self.config.clip_sample:
+            predicted_original_sample = predicted_original_sample.clamp(
+                -self.config.clip_sample_range, self.config.clip_sample_range
+            )
+
+        # 6. Denoise model output using boundary conditions
+        denoised = c_out * predicted_original_sample + c_skip * sample
+
+        # 7. Sample and inject noise z ~ N(0, I) for MultiStep Inference
+        noise = randn_tensor(model_output.shape, generator=generator, device=model_output.device, dtype=denoised.dtype)
+        prev_sample = alpha_prod_t_prev.sqrt() * denoised + beta_prod_t_prev.sqrt() * noise
+        last_step = (step_index == state.num_inference_steps - 1).reshape(broadcast_shape)
+        prev_sample = torch.where(last_step, denoised, prev_sample)
+
+        prev_sample = torch.where(state.finished.reshape(broadcast_shape), sample, prev_sample)
+        state.step_index = torch.minimum(state.step_index + 1, state.num_inference_steps)
+
+        # the per-sample alphas are float32, cast back to the dtype of the sample
+        prev_sample = prev_sample.to(sample.dtype)
+        denoised = denoised.to(sample.dtype)
+
+        if not return_dict:
+            return (prev_sample, denoised)
+
+        return LCMSchedulerOutput(prev_sample=prev_sample, denoised=denoised)
+
     # Copied from diffusers.schedulers.scheduling_ddpm.DDPMScheduler.add_noise
     def add_noise(
         self,
@@ -15,7 +15,7 @@ import importlib
 import os
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional, Union
+from typing import List, Optional, Union
 
 import torch
 
@@ -60,6 +60,168 @@ class SchedulerOutput(BaseOutput):
     prev_sample: torch.FloatTensor
 
 
+def index_for_timesteps(
+    schedule_timesteps: torch.Tensor,
+    timesteps: Union[float, torch.Tensor],
+    occurrence: int = 0,
+    missing_to_last: bool = False,
+) -> torch.LongTensor:
+    """
+    Maps timesteps to their indices in a schedule without synchronizing with the device, so that it can be used for
+    large batches of timesteps in `add_noise`.
+
+    Args:
+        schedule_timesteps (`torch.Tensor` of shape `(num_inference_steps,)`):
+            The timestep schedule of the scheduler.
+        timesteps (`float` or `torch.Tensor`):
+            The timesteps to look up, on the device of `schedule_timesteps`.
+        occurrence (`int`, defaults to 0):
+            Which occurrence to pick for timesteps that appear several times in the schedule, like the repeated
+            timesteps of second order schedulers. Timesteps with fewer occurrences are mapped to their last one.
+        missing_to_last (`bool`, defaults to `False`):
+            Whether to map timesteps that are not in the schedule to its last index instead of failing. Without it,
+            a missing timestep raises a `ValueError` on CPU. On other devices the check is an asynchronous device
+            assertion that fails at a later kernel launch, so that the lookup doesn't wait for the device.
+
+    Returns:
+        `torch.LongTensor`: The indices of `timesteps` in `schedule_timesteps`, with the shape of `timesteps`.
+    """
+    timesteps = torch.as_tensor(timesteps, device=schedule_timesteps.device)
+    matches = schedule_timesteps == timesteps.reshape(-1, 1)
+
+    # rank of every match among the matches of its timestep
+    ranks = matches.cumsum(dim=1)
+    num_matches = ranks[:, -1:]
+    target = num_matches.clamp(max=occurrence + 1)
+    indices = (matches & (ranks == target)).int().argmax(dim=1)
+
+    found = num_matches[:, 0] > 0
+    if missing_to_last:
+        indices = torch.where(found, indices, len(schedule_timesteps) - 1)
+    elif found.device.type == "cpu":
+        if not found.all():
+            raise ValueError(
+                f"The timesteps {timesteps.flatten()[~found].tolist()} are not in the schedule of the scheduler."
+            )
+    else:
+        torch._assert_async(found.all())
+    return indices.reshape(timesteps.shape)
+
+
+def _pad_rows(rows: List[torch.Tensor]) -> torch.Tensor:
+    # right-pads 1D tables with their last value so they can be stacked into a `(batch_size, max_len)` tensor
+    max_len = max(len(row) for row in rows)
+    return torch.stack([torch.cat([row, row[-1:].expand(max_len - len(row))]) for row in rows])
+
+
+@dataclass
+class SchedulerBatchState:
+    """
+    Per-sample state of a batched denoising loop, used by the `batch_step` method of schedulers that support it. Every
+    sample of the batch carries its own schedule and position in it, so that one `batch_step` call advances samples
+    that are at different timesteps or that use a different number of inference steps.
+
+    Args:
+        timesteps (`torch.LongTensor` of shape `(batch_size, max_num_inference_steps)`):
+            The timestep schedule of every sample, right-padded with the last timestep.
+        num_inference_steps (`torch.LongTensor` of shape `(batch_size,)`):
+            The number of inference steps of every sample.
+        step_index (`torch.LongTensor` of shape `(batch_size,)`):
+            The index of the next step of every sample in its schedule.
+        sigmas (`torch.FloatTensor` of shape `(batch_size, max_num_inference_steps + 1)`, *optional*):
+            The sigma table of every sample, right-padded with the last sigma. Only set for sigma-based schedulers.
+        lower_order_nums (`torch.LongTensor` of shape `(batch_size,)`):
+            The number of previous model outputs stored for every sample, capped at the solver order.
+        model_outputs (`List[torch.FloatTensor]`):
+            The solver history of multistep schedulers. Every entry is either `None` or a tensor with the batch size as
+            first dimension.
+    """
+
+    timesteps: torch.LongTensor
+    num_inference_steps: torch.LongTensor
+    step_index: torch.LongTensor
+    sigmas: Optional[torch.FloatTensor] = None
+    lower_order_nums: Optional[torch.LongTensor] = None
+    model_outputs: Optional[List[Optional[torch.FloatTensor]]] = None
+
+    def __post_init__(self):
+        if self.lower_order_nums is None:
+            self.lower_order_nums = torch.zeros_like(self.step_index)
+        if self.model_outputs is None:
+            self.model_outputs = []
+
+    def __len__(self):
+        return self.step_index.shape[0]
+
+    @property
+    def timestep(self) -> torch.LongTensor:
+        """
+        The current timestep of every sample, to be passed to the denoising model. Finished samples report their last
+        timestep.
+        """
+        index = torch.minimum(self.step_index, self.num_inference_steps - 1)
+        return self.timesteps.gather(1, index[:, None]).squeeze(1)
+
+    @property
+    def finished(self) -> torch.BoolTensor:
+        """
+        A boolean mask of the samples that went through their whole schedule.
+        """
+        return self.step_index >= self.num_inference_steps
+
+    def select(self, index: Union[torch.Tensor, List[int], slice]) -> "SchedulerBatchState":
+        """
+        Returns the state of a subset of the batch, for example `state.select(~state.finished)` to drop the finished
+        samples. The same `index` should be applied to the latents.
+        """
+        return SchedulerBatchState(
+            timesteps=self.timesteps[index],
+            num_inference_steps=self.num_inference_steps[index],
+            step_index=self.step_index[index],
+            sigmas=self.sigmas[index] if self.sigmas is not None else None,
+            lower_order_nums=self.lower_order_nums[index],
+            model_outputs=[output[index] if output is not None else None for output in self.model_outputs],
+        )
+
+    @classmethod
+    def cat(cls, states: List["SchedulerBatchState"]) -> "SchedulerBatchState":
+        """
+        Concatenates the states of several batches along the batch dimension, for example to add new requests to a
+        running batch. The latents should be concatenated in the same order.
+        """
+        if len(states) == 1:
+            return states[0]
+
+        history_length = max(len(state.model_outputs) for state in states)
+        model_outputs = []
+        for i in range(history_length):
+            outputs = [state.model_outputs[i] if i < len(state.model_outputs) else None for state in states]
+            reference = next((output for output in outputs if output is not None), None)
+            if reference is None:
+                model_outputs.append(None)
+                continue
+            # samples without history are not read before they have one, zeros only keep the shapes aligned
+            outputs = [
+                output if output is not None else reference.new_zeros((len(state),) + tuple(reference.shape[1:]))
+                for output, state in zip(outputs, states)
+            ]
+            model_outputs.append(torch.cat(outputs))
+
+        timesteps = _pad_rows([row for state in states for row in state.timesteps])
+        sigmas = None
+        if all(state.sigmas is not None for state in states):
+            sigmas = _pad_rows([row for state in states for row in state.sigmas])
+
+        return cls(
+            timesteps=timesteps,
+            num_inference_steps=torch.cat([state.num_inference_steps for state in states]),
+            step_index=torch.cat([state.step_index for state in states]),
+            sigmas=sigmas,
+            lower_order_nums=torch.cat([state.lower_order_nums for state in states]),
+            model_outputs=model_outputs,
+        )
+
+
 class SchedulerMixin(PushToHubMixin):
     """
     Base class for all schedulers.
@@ -163,6 +325,50 @@ class SchedulerMixin(PushToHubMixin):
         """
         self.save_config(save_directory=save_directory, push_to_hub=push_to_hub, **kwargs)
 
+    def init_batch_state(
+        self, num_inference_steps: Union[int, List[int]], device: Union[str, torch.device] = None
+    ) -> SchedulerBatchState:
+        """
+        Creates the per-sample state consumed by `batch_step`. The scheduler itself is not modified, so the regular
+        `set_timesteps`/`step` loop can still be used with the same instance.
+
+        Args:
+            num_inference_steps (`int` or `List[int]`):
+                The number of inference steps of every sample of the batch. A single `int` creates the state of one
+                sample.
+            device (`str` or `torch.device`, *optional*):
+                The device the schedules are moved to. Should be the device of the latents.
+
+        Returns:
+            [`~schedulers.scheduling_utils.SchedulerBatchState`]:
+                The state of a batch whose samples are all at their first step. Use
+                [`~schedulers.scheduling_utils.SchedulerBatchState.cat`] to add it to a running batch.
+        """
+        if not hasattr(self, "batch_step"):
+            raise NotImplementedError(f"{self.__class__.__name__} does not support batched steps.")
+
+        if isinstance(num_inference_steps, int):
+            num_inference_steps = [num_inference_steps]
+
+        schedules = {}
+        for steps in set(num_inference_steps):
+            scheduler = self.__class__.from_config(self.config)
+            scheduler.set_timesteps(steps, device=device)
+            schedules[steps] = scheduler
+
+        timesteps = [schedules[steps].timesteps.to(device) for steps in num_inference_steps]
+        sigmas = None
+        if getattr(schedules[num_inference_steps[0]], "sigmas", None) is not None:
+            sigmas = _pad_rows([schedules[steps].sigmas.to(device) for steps in num_inference_steps])
+
+        return SchedulerBatchState(
+            timesteps=_pad_rows(timesteps),
+            num_inference_steps=torch.tensor([len(t) for t in timesteps], device=device),
+            step_index=torch.zeros(len(num_inference_steps), dtype=torch.long, device=device),
+            sigmas=sigmas,
+            model_outputs=[None] * self.config.get("solver_order", 0),
+        )
+
     @property
     def compatibles(self):
         """
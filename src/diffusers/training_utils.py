@@ -1,12 +1,15 @@
 import contextlib
 import copy
+import json
+import os
 import random
-from typing import Any, Dict, Iterable, Optional, Union
+from typing import Any, Dict, Iterable, List, Optional, Union
 
 import numpy as np
 import torch
 
 from .models import UNet2DConditionModel
+from .models.vae import DiagonalGaussianDistribution
 from .utils import deprecate, is_transformers_available
 
 
@@ -72,6 +75,167 @@ def unet_lora_state_dict(unet: UNet2DConditionModel) -> Dict[str, torch.Tensor]:
     return lora_state_dict
 
 
+LATENTS_CACHE_INDEX_NAME = "latents_cache_index.json"
+
+
+class LatentsCacheWriter:
+    """
+    Writes precomputed training inputs (for example VAE latent distribution parameters and text encoder hidden states)
+    to a directory of sharded `.npy` files that can be memory-mapped by [`CachedLatentsDataset`].
+
+    Args:
+        output_dir (`str` or `os.PathLike`):
+            The directory to write the shards and the index file to.
+        shard_size (`int`, *optional*, defaults to 4096):
+            The number of samples per shard.
+        metadata (`dict`, *optional*):
+            JSON-serializable metadata stored in the index file, for example the `scaling_factor` of the VAE.
+    """
+
+    def __init__(self, output_dir: Union[str, os.PathLike], shard_size: int = 4096, metadata: Optional[dict] = None):
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        self.metadata = metadata or {}
+        self.shards = []
+        self.arrays = None
+        self._buffer = {}
+        self._num_buffered = 0
+
+        os.makedirs(output_dir, exist_ok=True)
+
+    def add(self, **arrays: Union[np.ndarray, torch.Tensor]):
+        """
+        Adds a batch of samples. All arrays need to have the same batch size along their first dimension and the same
+        names and per-sample shapes as the first batch.
+        """
+        arrays = {
+            name: array.detach().cpu().numpy() if isinstance(array, torch.Tensor) else np.asarray(array)
+            for name, array in arrays.items()
+        }
+        batch_sizes = {array.shape[0] for array in arrays.values()}
+        if len(batch_sizes) != 1:
+            raise ValueError(f"All arrays need to have the same batch size, but got {batch_sizes}.")
+
+        if self.arrays is None:
+            self.arrays = {
+                name: {"shape": list(array.shape[1:]), "dtype": array.dtype.name} for name, array in arrays.items()
+            }
+            self._buffer = {name: [] for name in arrays}
+        elif set(arrays) != set(self.arrays):
+            raise ValueError(f"Expected arrays {sorted(self.arrays)} but got {sorted(arrays)}.")
+
+        batch_size = batch_sizes.pop()
+        start = 0
+        while start < batch_size:
+            end = min(batch_size, start + self.shard_size - self._num_buffered)
+            for name, array in arrays.items():
+                self._buffer[name].append(array[start:end])
+            self._num_buffered += end - start
+            start = end
+
+            if self._num_buffered == self.shard_size:
+                self._write_shard()
+
+    def _write_shard(self):
+        if self._num_buffered == 0:
+            return
+
+        shard_index = len(self.shards)
+        files = {}
+        for name, chunks in self._buffer.items():
+            files[name] = f"{name}-{shard_index:05d}.npy"
+            np.save(
+                os.path.join(self.output_dir, files[name]), np.concatenate(chunks).astype(self.arrays[name]["dtype"])
+            )
+            chunks.clear()
+
+        self.shards.append({"num_samples": self._num_buffered, "files": files})
+        self._num_buffered = 0
+
+    def close(self):
+        """
+        Writes the remaining samples and the index file.
+        """
+        self._write_shard()
+        index = {
+            "num_samples": sum(shard["num_samples"] for shard in self.shards),
+            "arrays": self.arrays or {},
+            "shards": self.shards,
+            "metadata": self.metadata,
+        }
+        with open(os.path.join(self.output_dir, LATENTS_CACHE_INDEX_NAME), "w") as f:
+            json.dump(index, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CachedLatentsDataset(torch.utils.data.Dataset):
+    """
+    Dataset over the output of [`LatentsCacheWriter`]. Shards are memory-mapped, so only the samples that are accessed
+    are read from disk.
+
+    If the cache contains `latent_mean` and `latent_logvar`, a latent is sampled from the corresponding
+    [`~models.vae.DiagonalGaussianDistribution`] every time a sample is accessed, so that training sees the same noise
+    as when encoding the images with the VAE on the fly. The sample is returned as `latents` in place of the two
+    parameter arrays. All other arrays are returned as they are.
+
+    Args:
+        cache_dir (`str` or `os.PathLike`):
+            The directory written by [`LatentsCacheWriter`].
+        sample_posterior (`bool`, *optional*, defaults to `True`):
+            Whether to sample the latents. If `False`, the mean of the distribution is returned instead.
+    """
+
+    def __init__(self, cache_dir: Union[str, os.PathLike], sample_posterior: bool = True):
+        with open(os.path.join(cache_dir, LATENTS_CACHE_INDEX_NAME)) as f:
+            index = json.load(f)
+
+        self.cache_dir = cache_dir
+        self.sample_posterior = sample_posterior
+        self.metadata = index["metadata"]
+        self.array_names = list(index["arrays"])
+        self._shards = [
+            {
+                name: np.load(os.path.join(cache_dir, filename), mmap_mode="r")
+                for name, filename in shard["files"].items()
+            }
+            for shard in index["shards"]
+        ]
+        self._shard_offsets = np.cumsum([0] + [shard["num_samples"] for shard in index["shards"]])
+
+    def __len__(self) -> int:
+        return int(self._shard_offsets[-1])
+
+    def __getitem__(self, index: int) -> Dict[str, torch.Tensor]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Index {index} is out of range for a dataset of {len(self)} samples.")
+
+        shard_index = int(np.searchsorted(self._shard_offsets, index, side="right")) - 1
+        shard = self._shards[shard_index]
+        local_index = index - self._shard_offsets[shard_index]
+        # copy out of the read-only memory map
+        example = {name: torch.from_numpy(np.array(array[local_index])) for name, array in shard.items()}
+
+        if "latent_mean" in example and "latent_logvar" in example:
+            mean = example.pop("latent_mean")
+            logvar = example.pop("latent_logvar")
+            posterior = DiagonalGaussianDistribution(torch.cat([mean, logvar])[None])
+            latents = posterior.sample() if self.sample_posterior else posterior.mode()
+            example["latents"] = latents[0]
+
+        return example
+
+
+# Number of elements copied to the host per chunk when the EMA weights live on a different device than the model.
+_EMA_PIPELINE_CHUNK_NUMEL = 2**24
+
+
 # Adapted from torch-ema https://github.com/fadel/pytorch_ema/blob/master/torch_ema/ema.py#L14
 class EMAModel:
     """
@@ -89,6 +253,8 @@ class EMAModel:
         power: Union[float, int] = 2 / 3,
         model_cls: Optional[Any] = None,
         model_config: Dict[str, Any] = None,
+        foreach: bool = False,
+        update_every: int = 1,
         **kwargs,
     ):
         """
@@ -101,6 +267,12 @@ class EMAModel:
             inv_gamma (float):
                 Inverse multiplicative factor of EMA warmup. Default: 1. Only used if `use_ema_warmup` is True.
             power (float): Exponential factor of EMA warmup. Default: 2/3. Only used if `use_ema_warmup` is True.
+            foreach (bool): Use the multi-tensor `torch._foreach` kernels to update all parameters sharing a device
+                and dtype at once instead of looping over them. If the EMA weights are kept on another device than
+                the model (e.g. after `to("cpu")`), the parameters are copied over asynchronously in chunks so that
+                the transfer of a chunk overlaps with the update of the previous one.
+            update_every (int): Only update the EMA weights every `update_every` calls to `step()`. The decay is
+                raised to the power of `update_every` so that the averaging horizon in optimization steps is kept.
             device (Optional[Union[str, torch.device]]): The device to store the EMA weights on. If None, the EMA
                         weights will be stored on CPU.
 
@@ -156,6 +328,13 @@ class EMAModel:
         self.optimization_step = 0
         self.cur_decay_value = None  # set in `step()`
 
+        if update_every < 1:
+            raise ValueError(f"`update_every` has to be a positive integer but is {update_every}.")
+        self.foreach = foreach
+        self.update_every = update_every
+        # host buffers the model parameters are staged into when the EMA weights live on another device
+        self._staging_buffers = {}
+
         self.model_cls = model_cls
         self.model_config = model_config
 
@@ -222,8 +401,12 @@ class EMAModel:
 
         self.optimization_step += 1
 
-        # Compute the decay factor for the exponential moving average.
-        decay = self.get_decay(self.optimization_step)
+        if self.optimization_step % self.update_every != 0:
+            return
+
+        # Compute the decay factor for the exponential moving average. Skipping `update_every - 1` steps is
+        # compensated by applying the per-step decay `update_every` times at once.
+        decay = self.get_decay(self.optimization_step) ** self.update_every
         self.cur_decay_value = decay
         one_minus_decay = 1 - decay
 
@@ -231,16 +414,82 @@ class EMAModel:
         if is_transformers_available() and transformers.deepspeed.is_deepspeed_zero3_enabled():
             import deepspeed
 
+        if self.foreach:
+            if is_transformers_available() and transformers.deepspeed.is_deepspeed_zero3_enabled():
+                context_manager = deepspeed.zero.GatheredParameters(parameters, modifier_rank=None)
+
+            with context_manager():
+                self._foreach_step(parameters, one_minus_decay)
+            return
+
         for s_param, param in zip(self.shadow_params, parameters):
             if is_transformers_available() and transformers.deepspeed.is_deepspeed_zero3_enabled():
                 context_manager = deepspeed.zero.GatheredParameters(param, modifier_rank=None)
 
             with context_manager():
+                if param.device != s_param.device:
+                    param = param.to(s_param.device)
+
                 if param.requires_grad:
                     s_param.sub_(one_minus_decay * (s_param - param))
                 else:
                     s_param.copy_(param)
 
+    def _foreach_step(self, parameters: List[torch.nn.Parameter], one_minus_decay: float):
+        # group the parameters into buckets that can be updated by a single multi-tensor kernel
+        buckets = {}
+        for idx, (s_param, param) in enumerate(zip(self.shadow_params, parameters)):
+            if not param.requires_grad:
+                s_param.copy_(param)
+                continue
+            key = (s_param.device, s_param.dtype, param.device)
+            buckets.setdefault(key, []).append(idx)
+
+        for (device, dtype, param_device), indices in buckets.items():
+            if param_device == device:
+                s_params = [self.shadow_params[idx] for idx in indices]
+                params = [parameters[idx].to(dtype) for idx in indices]
+                torch._foreach_lerp_(s_params, params, one_minus_decay)
+                continue
+
+            # The EMA weights live on another device than the model (typically CPU vs. GPU). Copy the parameters in
+            # chunks with non-blocking transfers and update a chunk as soon as its copy has landed, so that the
+            # update of one chunk overlaps with the transfer of the next one.
+            pending = []
+            for chunk in self._chunk_indices(indices):
+                staged = [self._get_staging_buffer(idx).copy_(parameters[idx], non_blocking=True) for idx in chunk]
+                event = None
+                if param_device.type == "cuda":
+                    event = torch.cuda.Event()
+                    event.record(torch.cuda.current_stream(param_device))
+                pending.append((chunk, staged, event))
+
+            for chunk, staged, event in pending:
+                if event is not None:
+                    event.synchronize()
+                torch._foreach_lerp_([self.shadow_params[idx] for idx in chunk], staged, one_minus_decay)
+
+    def _chunk_indices(self, indices: List[int]) -> List[List[int]]:
+        chunks, chunk, chunk_numel = [], [], 0
+        for idx in indices:
+            chunk.append(idx)
+            chunk_numel += self.shadow_params[idx].numel()
+            if chunk_numel >= _EMA_PIPELINE_CHUNK_NUMEL:
+                chunks.append(chunk)
+                chunk, chunk_numel = [], 0
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def _get_staging_buffer(self, idx: int) -> torch.Tensor:
+        s_param = self.shadow_params[idx]
+        buffer = self._staging_buffers.get(idx)
+        if buffer is None or buffer.shape != s_param.shape or buffer.dtype != s_param.dtype:
+            pin_memory = s_param.device.type == "cpu" and torch.cuda.is_available()
+            buffer = torch.empty_like(s_param, pin_memory=pin_memory)
+            self._staging_buffers[idx] = buffer
+        return buffer
+
     def copy_to(self, parameters: Iterable[torch.nn.Parameter]) -> None:
         """
         Copy current averaged parameters into given collection of parameters.
@@ -265,6 +514,14 @@ class EMAModel:
             p.to(device=device, dtype=dtype) if p.is_floating_point() else p.to(device=device)
             for p in self.shadow_params
         ]
+        self._staging_buffers = {}
+
+    def pin_memory(self) -> None:
+        r"""
+        Move the internal buffers of the ExponentialMovingAverage to pinned memory. Useful for non-blocking transfers
+        when the EMA weights are kept on the CPU while the model is trained on the GPU.
+        """
+        self.shadow_params = [p.pin_memory() for p in self.shadow_params]
 
     def state_dict(self) -> dict:
         r"""
@@ -282,6 +539,7 @@ class EMAModel:
             "use_ema_warmup": self.use_ema_warmup,
             "inv_gamma": self.inv_gamma,
             "power": self.power,
+            "update_every": self.update_every,
             "shadow_params": self.shadow_params,
         }
 
@@ -351,9 +609,14 @@ class EMAModel:
         if not isinstance(self.power, (float, int)):
             raise ValueError("Invalid power")
 
+        self.update_every = state_dict.get("update_every", self.update_every)
+        if not isinstance(self.update_every, int) or self.update_every < 1:
+            raise ValueError("Invalid update_every")
+
         shadow_params = state_dict.get("shadow_params", None)
         if shadow_params is not None:
             self.shadow_params = shadow_params
+            self._staging_buffers = {}
             if not isinstance(self.shadow_params, list):
                 raise ValueError("shadow_params must be a list")
             if not all(isinstance(p, torch.Tensor) for p in self.shadow_params):
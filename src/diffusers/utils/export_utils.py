@@ -1,9 +1,11 @@
 import io
+import queue
 import random
 import struct
 import tempfile
+import threading
 from contextlib import contextmanager
-from typing import List
+from typing import Callable, Iterable, List, Optional, Tuple, Union
 
 import numpy as np
 import PIL.Image
@@ -115,18 +117,250 @@ def export_to_obj(mesh, output_obj_path: str = None):
         f.writelines("\n".join(combined_data))
 
 
-def export_to_video(video_frames: List[np.ndarray], output_video_path: str = None) -> str:
-    if is_opencv_available():
-        import cv2
-    else:
-        raise ImportError(BACKENDS_MAPPING["opencv"][1].format("export_to_video"))
-    if output_video_path is None:
-        output_video_path = tempfile.NamedTemporaryFile(suffix=".mp4").name
-
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    h, w, c = video_frames[0].shape
-    video_writer = cv2.VideoWriter(output_video_path, fourcc, fps=8, frameSize=(w, h))
-    for i in range(len(video_frames)):
-        img = cv2.cvtColor(video_frames[i], cv2.COLOR_RGB2BGR)
-        video_writer.write(img)
-    return output_video_path
+class OpenCVVideoEncoder:
+    r"""
+    Video encoder backed by `cv2.VideoWriter`. Frames are passed as RGB `uint8` arrays of shape `(height, width, 3)`.
+
+    Custom encoders can be passed to [`VideoExporter`] and [`export_to_video`] as long as they follow the same
+    interface: a constructor taking `(output_video_path, fps, frame_size, codec)` and `write(frame)` / `close()`
+    methods.
+
+    Args:
+        output_video_path (`str`):
+            The path of the video file to write.
+        fps (`float`):
+            The frame rate of the video.
+        frame_size (`Tuple[int, int]`):
+            The `(height, width)` of the frames.
+        codec (`str`, *optional*, defaults to `"mp4v"`):
+            The four character code of the codec.
+    """
+
+    def __init__(self, output_video_path: str, fps: float, frame_size: Tuple[int, int], codec: str = "mp4v"):
+        if is_opencv_available():
+            import cv2
+        else:
+            raise ImportError(BACKENDS_MAPPING["opencv"][1].format("OpenCVVideoEncoder"))
+
+        self._cv2 = cv2
+        height, width = frame_size
+        fourcc = cv2.VideoWriter_fourcc(*codec)
+        self.video_writer = cv2.VideoWriter(output_video_path, fourcc, fps=fps, frameSize=(width, height))
+        if not self.video_writer.isOpened():
+            raise ValueError(f"Could not open a video writer for {output_video_path} with codec {codec}.")
+
+    def write(self, frame: np.ndarray):
+        self.video_writer.write(self._cv2.cvtColor(frame, self._cv2.COLOR_RGB2BGR))
+
+    def close(self):
+        self.video_writer.release()
+
+
+VIDEO_ENCODERS = {"opencv": OpenCVVideoEncoder}
+
+_END_OF_STREAM = object()
+
+
+def _frame_to_uint8(frame: Union[np.ndarray, PIL.Image.Image]) -> np.ndarray:
+    if isinstance(frame, PIL.Image.Image):
+        return np.asarray(frame.convert("RGB"))
+    if frame.dtype != np.uint8:
+        # float frames are expected in the [0, 1] range, as returned by the pipelines with `output_type="np"`
+        frame = (np.clip(frame, 0, 1) * 255).round().astype(np.uint8)
+    return frame
+
+
+class VideoExporter:
+    r"""
+    Streaming video exporter. Frames can be written as soon as they are decoded, either by calling
+    [`~VideoExporter.write`] directly, by passing the exporter as a callback or by consuming an iterator with
+    [`~VideoExporter.write_from`]. Encoding happens on a background thread, so that the caller can keep decoding the
+    next frames while the previous ones are encoded. At most `max_queued_frames` frames are buffered.
+
+    With `grid=(rows, cols)`, every written item is a group of `rows * cols` views of the same timestep (e.g. the
+    cameras of a multiview rig) that is tiled into a single video frame. Each view is copied exactly once, straight
+    into the tiled frame.
+
+    Args:
+        output_video_path (`str`, *optional*):
+            The path of the video file to write. Defaults to a temporary `.mp4` file.
+        fps (`float`, *optional*, defaults to 8):
+            The frame rate of the video.
+        codec (`str`, *optional*, defaults to `"mp4v"`):
+            The four character code of the codec passed to the encoder.
+        encoder (`str` or `Callable`, *optional*, defaults to `"opencv"`):
+            Either the name of a registered encoder in `VIDEO_ENCODERS` or a factory following the interface of
+            [`OpenCVVideoEncoder`].
+        grid (`Tuple[int, int]`, *optional*):
+            The `(rows, cols)` layout used to tile multiview frames. Views are placed in row-major order.
+        background (`bool`, *optional*, defaults to `True`):
+            Whether to encode on a background thread. If `False`, frames are encoded in `write`.
+        max_queued_frames (`int`, *optional*, defaults to 32):
+            The maximum number of frames waiting to be encoded before `write` blocks.
+
+    Examples:
+        ```py
+        >>> from diffusers.utils import VideoExporter
+
+        >>> with VideoExporter("rollout.mp4", fps=12, grid=(2, 3)) as exporter:
+        ...     for chunk in pipe.decode_latents_streaming(latents, decode_chunk_size=4):
+        ...         # (batch_size, channels, frames, height, width) -> (frames, views, height, width, channels)
+        ...         chunk = (chunk / 2 + 0.5).clamp(0, 1).permute(2, 0, 3, 4, 1).cpu().numpy()
+        ...         exporter.write(chunk)
+        ```
+    """
+
+    def __init__(
+        self,
+        output_video_path: Optional[str] = None,
+        fps: float = 8,
+        codec: str = "mp4v",
+        encoder: Union[str, Callable] = "opencv",
+        grid: Optional[Tuple[int, int]] = None,
+        background: bool = True,
+        max_queued_frames: int = 32,
+    ):
+        if output_video_path is None:
+            output_video_path = tempfile.NamedTemporaryFile(suffix=".mp4").name
+        if isinstance(encoder, str):
+            if encoder not in VIDEO_ENCODERS:
+                raise ValueError(f"Unknown encoder {encoder}, choose one of {list(VIDEO_ENCODERS.keys())}.")
+            encoder = VIDEO_ENCODERS[encoder]
+
+        self.output_video_path = output_video_path
+        self.fps = fps
+        self.codec = codec
+        self.encoder_cls = encoder
+        self.grid = grid
+        self.background = background
+        self.max_queued_frames = max_queued_frames
+
+        self._encoder = None
+        self._queue = None
+        self._thread = None
+        self._error = None
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __call__(self, frames):
+        self.write(frames)
+
+    def write(self, frames: Union[np.ndarray, PIL.Image.Image, List[Union[np.ndarray, PIL.Image.Image]]]):
+        r"""
+        Writes one or several frames.
+
+        Args:
+            frames (`np.ndarray`, `PIL.Image.Image` or `List`):
+                Without `grid`, a single `(height, width, channels)` frame, a `(num_frames, height, width, channels)`
+                array or a list of frames. With `grid`, a `(num_views, height, width, channels)` group of views, a
+                `(num_frames, num_views, height, width, channels)` array or a list of groups. Float frames are
+                expected in the `[0, 1]` range.
+        """
+        if self._closed:
+            raise RuntimeError("Cannot write to a `VideoExporter` that has been closed.")
+
+        for frame in self._split_frames(frames):
+            frame = self._tile(frame) if self.grid is not None else _frame_to_uint8(frame)
+            if self._encoder is None:
+                self._open(frame.shape[:2])
+
+            self._raise_if_failed()
+            if self._thread is not None:
+                self._queue.put(frame)
+            else:
+                self._encoder.write(frame)
+
+    def write_from(self, frames: Iterable) -> str:
+        r"""
+        Writes all the frames of an iterable, e.g. a generator yielding decoded chunks, and closes the exporter.
+        """
+        for chunk in frames:
+            self.write(chunk)
+        return self.close()
+
+    def close(self) -> str:
+        r"""
+        Waits for the pending frames to be encoded, releases the encoder and returns the path of the video.
+        """
+        if self._closed:
+            return self.output_video_path
+        self._closed = True
+
+        if self._thread is not None:
+            self._queue.put(_END_OF_STREAM)
+            self._thread.join()
+        if self._encoder is not None:
+            self._encoder.close()
+        self._raise_if_failed()
+        return self.output_video_path
+
+    def _split_frames(self, frames):
+        frame_ndim = 4 if self.grid is not None else 3
+        if isinstance(frames, PIL.Image.Image):
+            return [frames]
+        if isinstance(frames, np.ndarray):
+            return [frames] if frames.ndim == frame_ndim else frames
+        if self.grid is not None and len(frames) > 0 and np.ndim(frames[0]) == 3:
+            # a list of single views is one group of views
+            return [frames]
+        return frames
+
+    def _tile(self, views) -> np.ndarray:
+        rows, cols = self.grid
+        if len(views) != rows * cols:
+            raise ValueError(f"Expected {rows * cols} views for a grid of {self.grid}, but got {len(views)}.")
+
+        tiled = None
+        for idx, view in enumerate(views):
+            view = _frame_to_uint8(view)
+            height, width = view.shape[:2]
+            if tiled is None:
+                tiled = np.empty((rows * height, cols * width) + view.shape[2:], dtype=np.uint8)
+            row, col = divmod(idx, cols)
+            tiled[row * height : (row + 1) * height, col * width : (col + 1) * width] = view
+        return tiled
+
+    def _open(self, frame_size):
+        self._encoder = self.encoder_cls(self.output_video_path, fps=self.fps, frame_size=frame_size, codec=self.codec)
+        if self.background:
+            self._queue = queue.Queue(maxsize=self.max_queued_frames)
+            self._thread = threading.Thread(target=self._encode_loop, daemon=True)
+            self._thread.start()
+
+    def _encode_loop(self):
+        while True:
+            frame = self._queue.get()
+            if frame is _END_OF_STREAM:
+                break
+            if self._error is not None:
+                # keep draining the queue so that `write` never blocks after a failure
+                continue
+            try:
+                self._encoder.write(frame)
+            except Exception as e:
+                self._error = e
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise RuntimeError(f"Encoding {self.output_video_path} failed.") from self._error
+
+
+def export_to_video(
+    video_frames: Union[List[np.ndarray], List[PIL.Image.Image], Iterable],
+    output_video_path: str = None,
+    fps: float = 8,
+    codec: str = "mp4v",
+    encoder: Union[str, Callable] = "opencv",
+    grid: Optional[Tuple[int, int]] = None,
+) -> str:
+    r"""
+    Exports frames to a video file. See [`VideoExporter`] for the accepted frame formats and for writing frames while
+    they are being generated.
+    """
+    exporter = VideoExporter(output_video_path, fps=fps, codec=codec, encoder=encoder, grid=grid, background=False)
+    return exporter.write_from(video_frames)
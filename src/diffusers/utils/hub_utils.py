@@ -53,10 +53,7 @@ from .constants import (
 )
 from .import_utils import (
     ENV_VARS_TRUE_VALUES,
-    _flax_version,
-    _jax_version,
-    _onnxruntime_version,
-    _torch_version,
+    _get_package_version,
     is_flax_available,
     is_onnx_available,
     is_torch_available,
@@ -82,12 +79,12 @@ def http_user_agent(user_agent: Union[Dict, str, None] = None) -> str:
     if DISABLE_TELEMETRY or HF_HUB_OFFLINE:
         return ua + "; telemetry/off"
     if is_torch_available():
-        ua += f"; torch/{_torch_version}"
+        ua += f"; torch/{_get_package_version('torch')}"
     if is_flax_available():
-        ua += f"; jax/{_jax_version}"
-        ua += f"; flax/{_flax_version}"
+        ua += f"; jax/{_get_package_version('jax')}"
+        ua += f"; flax/{_get_package_version('flax')}"
     if is_onnx_available():
-        ua += f"; onnxruntime/{_onnxruntime_version}"
+        ua += f"; onnxruntime/{_get_package_version('onnxruntime')}"
     # CI will set this value to True
     if os.environ.get("DIFFUSERS_IS_CI", "").upper() in ENV_VARS_TRUE_VALUES:
         ua += "; is_ci/true"
@@ -19,9 +19,10 @@ import operator as op
 import os
 import sys
 from collections import OrderedDict
+from functools import lru_cache
 from itertools import chain
 from types import ModuleType
-from typing import Any, Union
+from typing import Any, Optional, Union
 
 from huggingface_hub.utils import is_jinja_available  # noqa: F401
 from packaging import version
@@ -51,330 +52,215 @@ DIFFUSERS_SLOW_IMPORT = DIFFUSERS_SLOW_IMPORT in ENV_VARS_TRUE_VALUES
 
 STR_OPERATION_TO_FUNC = {">": op.gt, ">=": op.ge, "==": op.eq, "!=": op.ne, "<=": op.le, "<": op.lt}
 
-_torch_version = "N/A"
-if USE_TORCH in ENV_VARS_TRUE_AND_AUTO_VALUES and USE_TF not in ENV_VARS_TRUE_VALUES:
-    _torch_available = importlib.util.find_spec("torch") is not None
-    if _torch_available:
-        try:
-            _torch_version = importlib_metadata.version("torch")
-            logger.info(f"PyTorch version {_torch_version} available.")
-        except importlib_metadata.PackageNotFoundError:
-            _torch_available = False
-else:
-    logger.info("Disabling PyTorch because USE_TORCH is set")
-    _torch_available = False
-
-_torch_xla_available = importlib.util.find_spec("torch_xla") is not None
-if _torch_xla_available:
-    try:
-        _torch_xla_version = importlib_metadata.version("torch_xla")
-        logger.info(f"PyTorch XLA version {_torch_xla_version} available.")
-    except ImportError:
-        _torch_xla_available = False
-
-_jax_version = "N/A"
-_flax_version = "N/A"
-if USE_JAX in ENV_VARS_TRUE_AND_AUTO_VALUES:
-    _flax_available = importlib.util.find_spec("jax") is not None and importlib.util.find_spec("flax") is not None
-    if _flax_available:
-        try:
-            _jax_version = importlib_metadata.version("jax")
-            _flax_version = importlib_metadata.version("flax")
-            logger.info(f"JAX version {_jax_version}, Flax version {_flax_version} available.")
-        except importlib_metadata.PackageNotFoundError:
-            _flax_available = False
-else:
-    _flax_available = False
-
-if USE_SAFETENSORS in ENV_VARS_TRUE_AND_AUTO_VALUES:
-    _safetensors_available = importlib.util.find_spec("safetensors") is not None
-    if _safetensors_available:
-        try:
-            _safetensors_version = importlib_metadata.version("safetensors")
-            logger.info(f"Safetensors version {_safetensors_version} available.")
-        except importlib_metadata.PackageNotFoundError:
-            _safetensors_available = False
-else:
-    logger.info("Disabling Safetensors because USE_TF is set")
-    _safetensors_available = False
-
-_transformers_available = importlib.util.find_spec("transformers") is not None
-try:
-    _transformers_version = importlib_metadata.version("transformers")
-    logger.debug(f"Successfully imported transformers version {_transformers_version}")
-except importlib_metadata.PackageNotFoundError:
-    _transformers_available = False
-
-
-_inflect_available = importlib.util.find_spec("inflect") is not None
-try:
-    _inflect_version = importlib_metadata.version("inflect")
-    logger.debug(f"Successfully imported inflect version {_inflect_version}")
-except importlib_metadata.PackageNotFoundError:
-    _inflect_available = False
-
+# The optional dependencies are probed lazily, on the first call of their `is_*_available` function, and the result
+# is memoized, so that `import diffusers` doesn't pay for the dependencies it never uses. Every backend maps to the
+# module that has to be importable, if any, and to the distributions that can provide it, by order of preference.
+_BACKEND_PACKAGES = {
+    "torch": ("torch", ("torch",)),
+    "torch_xla": ("torch_xla", ("torch_xla",)),
+    "jax": ("jax", ("jax",)),
+    "flax": ("flax", ("flax",)),
+    "safetensors": ("safetensors", ("safetensors",)),
+    "transformers": ("transformers", ("transformers",)),
+    "inflect": ("inflect", ("inflect",)),
+    "unidecode": ("unidecode", ("unidecode",)),
+    # For the metadata, we have to look for both onnxruntime and onnxruntime-gpu
+    "onnxruntime": (
+        "onnxruntime",
+        (
+            "onnxruntime",
+            "onnxruntime-gpu",
+            "ort_nightly_gpu",
+            "onnxruntime-directml",
+            "onnxruntime-openvino",
+            "ort_nightly_directml",
+            "onnxruntime-rocm",
+            "onnxruntime-training",
+        ),
+    ),
+    # (sayakpaul): importlib.util.find_spec("opencv-python") returns None even when it's installed.
+    "opencv": (
+        None,
+        (
+            "opencv-python",
+            "opencv-contrib-python",
+            "opencv-python-headless",
+            "opencv-contrib-python-headless",
+        ),
+    ),
+    "scipy": ("scipy", ("scipy",)),
+    "librosa": ("librosa", ("librosa",)),
+    "accelerate": ("accelerate", ("accelerate",)),
+    "xformers": ("xformers", ("xformers",)),
+    "k_diffusion": ("k_diffusion", ("k_diffusion",)),
+    "note_seq": ("note_seq", ("note_seq",)),
+    "wandb": ("wandb", ("wandb",)),
+    "omegaconf": ("omegaconf", ("omegaconf",)),
+    "tensorboard": ("tensorboard", ("tensorboard",)),
+    "compel": ("compel", ("compel",)),
+    "ftfy": ("ftfy", ("ftfy",)),
+    # importlib metadata under different name
+    "bs4": ("bs4", ("beautifulsoup4",)),
+    "torchsde": ("torchsde", ("torchsde",)),
+    "invisible_watermark": ("imwatermark", ("invisible-watermark",)),
+    "peft": ("peft", ("peft",)),
+}
 
-_unidecode_available = importlib.util.find_spec("unidecode") is not None
-try:
-    _unidecode_version = importlib_metadata.version("unidecode")
-    logger.debug(f"Successfully imported unidecode version {_unidecode_version}")
-except importlib_metadata.PackageNotFoundError:
-    _unidecode_available = False
 
+@lru_cache(maxsize=None)
+def _get_package_version(backend: str) -> Optional[str]:
+    """
+    Returns the installed version of an optional dependency, or `None` if it's not installed. Only the import system
+    and the package metadata are queried, the dependency itself is never imported.
+    """
+    module_name, distribution_names = _BACKEND_PACKAGES[backend]
+    if module_name is not None and importlib.util.find_spec(module_name) is None:
+        return None
 
-_onnxruntime_version = "N/A"
-_onnx_available = importlib.util.find_spec("onnxruntime") is not None
-if _onnx_available:
-    candidates = (
-        "onnxruntime",
-        "onnxruntime-gpu",
-        "ort_nightly_gpu",
-        "onnxruntime-directml",
-        "onnxruntime-openvino",
-        "ort_nightly_directml",
-        "onnxruntime-rocm",
-        "onnxruntime-training",
-    )
-    _onnxruntime_version = None
-    # For the metadata, we have to look for both onnxruntime and onnxruntime-gpu
-    for pkg in candidates:
+    for distribution_name in distribution_names:
         try:
-            _onnxruntime_version = importlib_metadata.version(pkg)
-            break
+            package_version = importlib_metadata.version(distribution_name)
         except importlib_metadata.PackageNotFoundError:
-            pass
-    _onnx_available = _onnxruntime_version is not None
-    if _onnx_available:
-        logger.debug(f"Successfully imported onnxruntime version {_onnxruntime_version}")
-
-# (sayakpaul): importlib.util.find_spec("opencv-python") returns None even when it's installed.
-# _opencv_available = importlib.util.find_spec("opencv-python") is not None
-try:
-    candidates = (
-        "opencv-python",
-        "opencv-contrib-python",
-        "opencv-python-headless",
-        "opencv-contrib-python-headless",
-    )
-    _opencv_version = None
-    for pkg in candidates:
-        try:
-            _opencv_version = importlib_metadata.version(pkg)
-            break
-        except importlib_metadata.PackageNotFoundError:
-            pass
-    _opencv_available = _opencv_version is not None
-    if _opencv_available:
-        logger.debug(f"Successfully imported cv2 version {_opencv_version}")
-except importlib_metadata.PackageNotFoundError:
-    _opencv_available = False
-
-_scipy_available = importlib.util.find_spec("scipy") is not None
-try:
-    _scipy_version = importlib_metadata.version("scipy")
-    logger.debug(f"Successfully imported scipy version {_scipy_version}")
-except importlib_metadata.PackageNotFoundError:
-    _scipy_available = False
-
-_librosa_available = importlib.util.find_spec("librosa") is not None
-try:
-    _librosa_version = importlib_metadata.version("librosa")
-    logger.debug(f"Successfully imported librosa version {_librosa_version}")
-except importlib_metadata.PackageNotFoundError:
-    _librosa_available = False
-
-_accelerate_available = importlib.util.find_spec("accelerate") is not None
-try:
-    _accelerate_version = importlib_metadata.version("accelerate")
-    logger.debug(f"Successfully imported accelerate version {_accelerate_version}")
-except importlib_metadata.PackageNotFoundError:
-    _accelerate_available = False
-
-_xformers_available = importlib.util.find_spec("xformers") is not None
-try:
-    _xformers_version = importlib_metadata.version("xformers")
-    if _torch_available:
-        _torch_version = importlib_metadata.version("torch")
-        if version.Version(_torch_version) < version.Version("1.12"):
-            raise ValueError("xformers is installed in your environment and requires PyTorch >= 1.12")
-
-    logger.debug(f"Successfully imported xformers version {_xformers_version}")
-except importlib_metadata.PackageNotFoundError:
-    _xformers_available = False
-
-_k_diffusion_available = importlib.util.find_spec("k_diffusion") is not None
-try:
-    _k_diffusion_version = importlib_metadata.version("k_diffusion")
-    logger.debug(f"Successfully imported k-diffusion version {_k_diffusion_version}")
-except importlib_metadata.PackageNotFoundError:
-    _k_diffusion_available = False
-
-_note_seq_available = importlib.util.find_spec("note_seq") is not None
-try:
-    _note_seq_version = importlib_metadata.version("note_seq")
-    logger.debug(f"Successfully imported note-seq version {_note_seq_version}")
-except importlib_metadata.PackageNotFoundError:
-    _note_seq_available = False
-
-_wandb_available = importlib.util.find_spec("wandb") is not None
-try:
-    _wandb_version = importlib_metadata.version("wandb")
-    logger.debug(f"Successfully imported wandb version {_wandb_version }")
-except importlib_metadata.PackageNotFoundError:
-    _wandb_available = False
-
-_omegaconf_available = importlib.util.find_spec("omegaconf") is not None
-try:
-    _omegaconf_version = importlib_metadata.version("omegaconf")
-    logger.debug(f"Successfully imported omegaconf version {_omegaconf_version}")
-except importlib_metadata.PackageNotFoundError:
-    _omegaconf_available = False
-
-_tensorboard_available = importlib.util.find_spec("tensorboard")
-try:
-    _tensorboard_version = importlib_metadata.version("tensorboard")
-    logger.debug(f"Successfully imported tensorboard version {_tensorboard_version}")
-except importlib_metadata.PackageNotFoundError:
-    _tensorboard_available = False
-
-
-_compel_available = importlib.util.find_spec("compel")
-try:
-    _compel_version = importlib_metadata.version("compel")
-    logger.debug(f"Successfully imported compel version {_compel_version}")
-except importlib_metadata.PackageNotFoundError:
-    _compel_available = False
-
-
-_ftfy_available = importlib.util.find_spec("ftfy") is not None
-try:
-    _ftfy_version = importlib_metadata.version("ftfy")
-    logger.debug(f"Successfully imported ftfy version {_ftfy_version}")
-except importlib_metadata.PackageNotFoundError:
-    _ftfy_available = False
-
-
-_bs4_available = importlib.util.find_spec("bs4") is not None
-try:
-    # importlib metadata under different name
-    _bs4_version = importlib_metadata.version("beautifulsoup4")
-    logger.debug(f"Successfully imported ftfy version {_bs4_version}")
-except importlib_metadata.PackageNotFoundError:
-    _bs4_available = False
-
-_torchsde_available = importlib.util.find_spec("torchsde") is not None
-try:
-    _torchsde_version = importlib_metadata.version("torchsde")
-    logger.debug(f"Successfully imported torchsde version {_torchsde_version}")
-except importlib_metadata.PackageNotFoundError:
-    _torchsde_available = False
-
-_invisible_watermark_available = importlib.util.find_spec("imwatermark") is not None
-try:
-    _invisible_watermark_version = importlib_metadata.version("invisible-watermark")
-    logger.debug(f"Successfully imported invisible-watermark version {_invisible_watermark_version}")
-except importlib_metadata.PackageNotFoundError:
-    _invisible_watermark_available = False
-
-
-_peft_available = importlib.util.find_spec("peft") is not None
-try:
-    _peft_version = importlib_metadata.version("peft")
-    logger.debug(f"Successfully imported peft version {_peft_version}")
-except importlib_metadata.PackageNotFoundError:
-    _peft_available = False
+            continue
+        logger.debug(f"Successfully imported {backend} version {package_version}")
+        return package_version
+    return None
+
+
+def _is_package_available(backend: str) -> bool:
+    return _get_package_version(backend) is not None
 
 
 def is_torch_available():
-    return _torch_available
+    if USE_TORCH not in ENV_VARS_TRUE_AND_AUTO_VALUES or USE_TF in ENV_VARS_TRUE_VALUES:
+        return False
+    return _is_package_available("torch")
 
 
 def is_torch_xla_available():
-    return _torch_xla_available
+    return _is_package_available("torch_xla")
 
 
 def is_flax_available():
-    return _flax_available
+    if USE_JAX not in ENV_VARS_TRUE_AND_AUTO_VALUES:
+        return False
+    return _is_package_available("jax") and _is_package_available("flax")
+
+
+def is_safetensors_available():
+    if USE_SAFETENSORS not in ENV_VARS_TRUE_AND_AUTO_VALUES:
+        return False
+    return _is_package_available("safetensors")
 
 
 def is_transformers_available():
-    return _transformers_available
+    return _is_package_available("transformers")
 
 
 def is_inflect_available():
-    return _inflect_available
+    return _is_package_available("inflect")
 
 
 def is_unidecode_available():
-    return _unidecode_available
+    return _is_package_available("unidecode")
 
 
 def is_onnx_available():
-    return _onnx_available
+    return _is_package_available("onnxruntime")
 
 
 def is_opencv_available():
-    return _opencv_available
+    return _is_package_available("opencv")
 
 
 def is_scipy_available():
-    return _scipy_available
+    return _is_package_available("scipy")
 
 
 def is_librosa_available():
-    return _librosa_available
+    return _is_package_available("librosa")
 
 
 def is_xformers_available():
-    return _xformers_available
+    if not _is_package_available("xformers"):
+        return False
+    if is_torch_available() and version.Version(_get_package_version("torch")) < version.Version("1.12"):
+        raise ValueError("xformers is installed in your environment and requires PyTorch >= 1.12")
+    return True
 
 
 def is_accelerate_available():
-    return _accelerate_available
+    return _is_package_available("accelerate")
 
 
 def is_k_diffusion_available():
-    return _k_diffusion_available
+    return _is_package_available("k_diffusion")
 
 
 def is_note_seq_available():
-    return _note_seq_available
+    return _is_package_available("note_seq")
 
 
 def is_wandb_available():
-    return _wandb_available
+    return _is_package_available("wandb")
 
 
 def is_omegaconf_available():
-    return _omegaconf_available
+    return _is_package_available("omegaconf")
 
 
 def is_tensorboard_available():
-    return _tensorboard_available
+    return _is_package_available("tensorboard")
 
 
 def is_compel_available():
-    return _compel_available
+    return _is_package_available("compel")
 
 
 def is_ftfy_available():
-    return _ftfy_available
+    return _is_package_available("ftfy")
 
 
 def is_bs4_available():
-    return _bs4_available
+    return _is_package_available("bs4")
 
 
 def is_torchsde_available():
-    return _torchsde_available
+    return _is_package_available("torchsde")
 
 
 def is_invisible_watermark_available():
-    return _invisible_watermark_available
+    return _is_package_available("invisible_watermark")
 
 
 def is_peft_available():
-    return _peft_available
+    return _is_package_available("peft")
+
+
+_BACKEND_AVAILABILITY = {
+    "torch": is_torch_available,
+    "jax": is_flax_available,
+    "flax": is_flax_available,
+    "safetensors": is_safetensors_available,
+    "onnx": is_onnx_available,
+}
+
+
+def __getattr__(name: str) -> Any:
+    # The `_{backend}_available` and `_{backend}_version` module attributes that used to be computed at import time
+    # are resolved on access.
+    if name.startswith("_") and name.endswith("_available"):
+        backend = name[1 : -len("_available")]
+        if backend in _BACKEND_AVAILABILITY:
+            return _BACKEND_AVAILABILITY[backend]()
+        if backend in _BACKEND_PACKAGES:
+            return _is_package_available(backend)
+    elif name.startswith("_") and name.endswith("_version"):
+        backend = name[1 : -len("_version")]
+        if backend in _BACKEND_PACKAGES:
+            available = _BACKEND_AVAILABILITY.get(backend, lambda: True)()
+            return (_get_package_version(backend) if available else None) or "N/A"
+    raise AttributeError(f"module {__name__} has no attribute {name}")
 
 
 # docstyle-ignore
@@ -589,7 +475,8 @@ def is_torch_version(operation: str, version: str):
         version (`str`):
             A string version of PyTorch
     """
-    return compare_versions(parse(_torch_version), operation, version)
+    torch_version = _get_package_version("torch") if is_torch_available() else None
+    return compare_versions(parse(torch_version or "N/A"), operation, version)
 
 
 def is_transformers_version(operation: str, version: str):
@@ -601,9 +488,9 @@ def is_transformers_version(operation: str, version: str):
         version (`str`):
             A version string
     """
-    if not _transformers_available:
+    if not is_transformers_available():
         return False
-    return compare_versions(parse(_transformers_version), operation, version)
+    return compare_versions(parse(_get_package_version("transformers")), operation, version)
 
 
 def is_accelerate_version(operation: str, version: str):
@@ -615,9 +502,9 @@ def is_accelerate_version(operation: str, version: str):
         version (`str`):
             A version string
     """
-    if not _accelerate_available:
+    if not is_accelerate_available():
         return False
-    return compare_versions(parse(_accelerate_version), operation, version)
+    return compare_versions(parse(_get_package_version("accelerate")), operation, version)
 
 
 def is_k_diffusion_version(operation: str, version: str):
@@ -629,9 +516,9 @@ def is_k_diffusion_version(operation: str, version: str):
         version (`str`):
             A version string
     """
-    if not _k_diffusion_available:
+    if not is_k_diffusion_available():
         return False
-    return compare_versions(parse(_k_diffusion_version), operation, version)
+    return compare_versions(parse(_get_package_version("k_diffusion")), operation, version)
 
 
 def get_objects_from_module(module):
@@ -20,17 +20,14 @@ from typing import Optional
 
 from packaging import version
 
-from .import_utils import is_peft_available, is_torch_available
-
-
-if is_torch_available():
-    import torch
+from .import_utils import is_peft_available
 
 
 def recurse_remove_peft_layers(model):
     r"""
     Recursively replace all instances of `LoraLayer` with corresponding new layers in `model`.
     """
+    import torch
     from peft.tuners.tuners_utils import BaseTunerLayer
 
     has_base_layer_pattern = False
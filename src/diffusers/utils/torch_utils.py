@@ -16,6 +16,8 @@ PyTorch utilities: Utilities related to PyTorch
 """
 from typing import List, Optional, Tuple, Union
 
+import numpy as np
+
 from . import logging
 from .import_utils import is_torch_available, is_torch_version
 
@@ -69,7 +71,13 @@ def randn_tensor(
     if isinstance(generator, list) and len(generator) == 1:
         generator = generator[0]
 
-    if isinstance(generator, list):
+    if isinstance(generator, list) and layout == torch.strided:
+        # fill the batch in place instead of concatenating per-sample tensors to avoid a second allocation
+        latents = torch.empty(shape, device=rand_device, dtype=dtype)
+        for i in range(batch_size):
+            torch.randn(latents[i : i + 1].shape, generator=generator[i], out=latents[i : i + 1])
+        latents = latents.to(device)
+    elif isinstance(generator, list):
         shape = (1,) + shape[1:]
         latents = [
             torch.randn(shape, generator=generator[i], device=rand_device, dtype=dtype, layout=layout)
@@ -82,6 +90,134 @@ def randn_tensor(
     return latents
 
 
+# Philox4x32-10 constants, see "Parallel Random Numbers: As Easy as 1, 2, 3" (Salmon et al., 2011)
+_PHILOX_M0 = 0xD2511F53
+_PHILOX_M1 = 0xCD9E8D57
+_PHILOX_W0 = 0x9E3779B9
+_PHILOX_W1 = 0xBB67AE85
+_PHILOX_ROUNDS = 10
+_UINT32_MASK = 0xFFFFFFFF
+
+
+def _mulhilo32(a: "torch.Tensor", b: int) -> Tuple["torch.Tensor", "torch.Tensor"]:
+    # 32 x 32 -> 64 bit product of int64 tensors holding uint32 values, split over 16-bit limbs of `b` so that no
+    # intermediate overflows int64.
+    p0 = a * (b & 0xFFFF)
+    p1 = a * (b >> 16)
+    t = p0 + ((p1 & 0xFFFF) << 16)
+    return (p1 >> 16) + (t >> 32), t & _UINT32_MASK
+
+
+def _philox4x32(counters: List["torch.Tensor"], key: List["torch.Tensor"]) -> List["torch.Tensor"]:
+    c0, c1, c2, c3 = counters
+    k0, k1 = key
+    for _ in range(_PHILOX_ROUNDS):
+        hi0, lo0 = _mulhilo32(c0, _PHILOX_M0)
+        hi1, lo1 = _mulhilo32(c2, _PHILOX_M1)
+        c0, c1, c2, c3 = hi1 ^ c1 ^ k0, lo1, hi0 ^ c3 ^ k1, lo0
+        k0 = (k0 + _PHILOX_W0) & _UINT32_MASK
+        k1 = (k1 + _PHILOX_W1) & _UINT32_MASK
+    return [c0, c1, c2, c3]
+
+
+def seeded_randn_tensor(
+    shape: Union[Tuple, List],
+    seeds: Union[int, List[int]],
+    device: Optional["torch.device"] = None,
+    dtype: Optional["torch.dtype"] = None,
+):
+    """Creates a batch of normally distributed random tensors in a single vectorized call on `device`, where every
+    sample along the first dimension is drawn from its own counter-based (Philox4x32-10) random stream.
+
+    Unlike [`randn_tensor`] with a list of generators, there is no per-sample loop and no intermediate CPU tensor. The
+    noise of a sample only depends on its key, so it is bit-identical on a given device regardless of the size or
+    composition of the batch it is generated in.
+
+    Args:
+        shape (`Tuple` or `List`):
+            The shape of the tensor to create. The first dimension is the batch dimension.
+        seeds (`int` or `List[int]`):
+            If an `int`, sample `i` of the batch is keyed by `(seeds, i)`. If a list of length `shape[0]`, sample `i`
+            is keyed by `(seeds[i], 0)`. Seeds must be non-negative integers below `2**64`.
+        device (`torch.device`, *optional*):
+            The device the tensor is created on. Defaults to the CPU.
+        dtype (`torch.dtype`, *optional*):
+            The dtype of the tensor. The noise is always computed in float32 and cast afterwards.
+    """
+    device = torch.device(device) if device is not None else torch.device("cpu")
+    dtype = dtype or torch.float32
+    batch_size = shape[0]
+
+    if isinstance(seeds, int):
+        sample_seeds = [seeds] * batch_size
+        subsequences = list(range(batch_size))
+    else:
+        if len(seeds) != batch_size:
+            raise ValueError(
+                f"You have passed a list of seeds of length {len(seeds)}, but requested an effective batch"
+                f" size of {batch_size}. Make sure the batch size matches the length of the seeds."
+            )
+        sample_seeds = list(seeds)
+        subsequences = [0] * batch_size
+
+    if any(seed < 0 or seed >= 2**64 for seed in sample_seeds):
+        raise ValueError(f"Seeds have to be integers in the range [0, 2**64), but got {sample_seeds}.")
+
+    numel = 1
+    for dim in shape[1:]:
+        numel *= dim
+    # every Philox call yields four 32-bit integers which are turned into four normal samples
+    num_counters = (numel + 3) // 4
+
+    k0 = torch.tensor([seed & _UINT32_MASK for seed in sample_seeds], dtype=torch.int64, device=device)[:, None]
+    k1 = torch.tensor([seed >> 32 for seed in sample_seeds], dtype=torch.int64, device=device)[:, None]
+    c2 = torch.tensor(subsequences, dtype=torch.int64, device=device)[:, None]
+
+    counter = torch.arange(num_counters, dtype=torch.int64, device=device)[None, :]
+    c0 = (counter & _UINT32_MASK).expand(batch_size, -1)
+    c1 = (counter >> 32).expand(batch_size, -1)
+    c2 = (c2 & _UINT32_MASK).expand(batch_size, num_counters)
+    c3 = torch.zeros_like(c0)
+
+    x0, x1, x2, x3 = _philox4x32([c0, c1, c2, c3], [k0, k1])
+
+    def to_uniform(x):
+        # top 24 bits -> float32 in the open interval (0, 1)
+        return ((x >> 8).to(torch.float32) + 0.5) * (1.0 / 2**24)
+
+    # Box-Muller transform, each pair of uniforms gives two independent normal samples
+    radius_a = torch.sqrt(-2.0 * torch.log(to_uniform(x0)))
+    theta_a = (2.0 * torch.pi) * to_uniform(x1)
+    radius_b = torch.sqrt(-2.0 * torch.log(to_uniform(x2)))
+    theta_b = (2.0 * torch.pi) * to_uniform(x3)
+
+    noise = torch.stack(
+        [
+            radius_a * torch.cos(theta_a),
+            radius_a * torch.sin(theta_a),
+            radius_b * torch.cos(theta_b),
+            radius_b * torch.sin(theta_b),
+        ],
+        dim=-1,
+    )
+    noise = noise.reshape(batch_size, num_counters * 4)[:, :numel]
+
+    return noise.reshape(shape).to(dtype)
+
+
+def tensor_to_numpy(tensor: "torch.Tensor") -> np.ndarray:
+    """
+    Copies a tensor to a NumPy array with a single device-to-host transfer. CUDA tensors are copied into page-locked
+    (pinned) host memory, which is considerably faster than a copy into pageable memory.
+    """
+    tensor = tensor.detach()
+    if tensor.device.type == "cuda":
+        host_tensor = torch.empty(tensor.shape, dtype=tensor.dtype, pin_memory=True)
+        host_tensor.copy_(tensor)
+        return host_tensor.numpy()
+    return tensor.cpu().numpy()
+
+
 def is_compiled_module(module) -> bool:
     """Check whether the module was compiled with torch.compile()"""
     if is_torch_version("<", "2.0.0") or not hasattr(torch, "_dynamo"):
@@ -51,7 +51,14 @@ from diffusers.models.attention_processor import (
     LoRAXFormersAttnProcessor,
     XFormersAttnProcessor,
 )
-from diffusers.models.lora import PatchedLoraProjection, text_encoder_attn_modules
+from diffusers.models.lora import (
+    LoRACompatibleConv,
+    LoRACompatibleLinear,
+    LoRAConv2dLayer,
+    LoRALinearLayer,
+    PatchedLoraProjection,
+    text_encoder_attn_modules,
+)
 from diffusers.utils.import_utils import is_xformers_available
 from diffusers.utils.testing_utils import (
     deprecate_after_peft_backend,
@@ -169,6 +176,33 @@ def create_lora_3d_layers(model, mock_weights: bool = True):
     return lora_attn_procs
 
 
+def create_lora_compatible_state_dict(model, rank=4, network_alpha=None):
+    state_dict = {}
+    network_alphas = {}
+    for name, module in model.named_modules():
+        if isinstance(module, LoRACompatibleLinear):
+            lora_layer = LoRALinearLayer(module.in_features, module.out_features, rank=rank)
+        elif isinstance(module, LoRACompatibleConv):
+            lora_layer = LoRAConv2dLayer(
+                module.in_channels,
+                module.out_channels,
+                rank=rank,
+                kernel_size=module.kernel_size,
+                stride=module.stride,
+                padding=module.padding,
+            )
+        else:
+            continue
+
+        with torch.no_grad():
+            lora_layer.up.weight.normal_(std=0.1)
+        state_dict.update({f"{name}.lora.{k}": v for k, v in lora_layer.state_dict().items()})
+        if network_alpha is not None:
+            network_alphas[f"{name}.alpha"] = network_alpha
+
+    return state_dict, network_alphas
+
+
 def set_lora_weights(lora_attn_parameters, randn_weight=False, var=1.0):
     with torch.no_grad():
         for parameter in lora_attn_parameters:
@@ -607,6 +641,35 @@ class LoraLoaderMixinTests(unittest.TestCase):
             orig_image_slice, orig_image_slice_two, atol=1e-3
         ), "Unloading LoRA parameters should lead to results similar to what was obtained with the pipeline without any LoRA parameters."
 
+    def test_batched_lora_weights(self):
+        pipeline_components, _ = self.get_dummy_components()
+        _, _, pipeline_inputs = self.get_dummy_inputs(with_generator=False)
+        sd_pipe = StableDiffusionPipeline(**pipeline_components)
+
+        lora_a, _ = create_lora_compatible_state_dict(sd_pipe.unet)
+        lora_b, _ = create_lora_compatible_state_dict(sd_pipe.unet)
+        lora_a = {f"unet.{k}": v for k, v in lora_a.items()}
+        lora_b = {f"unet.{k}": v for k, v in lora_b.items()}
+
+        original_images = sd_pipe(**pipeline_inputs, generator=torch.manual_seed(0)).images
+        sd_pipe.load_lora_weights(dict(lora_a))
+        images_a = sd_pipe(**pipeline_inputs, generator=torch.manual_seed(0)).images
+        sd_pipe.unload_lora_weights()
+        sd_pipe.load_lora_weights(dict(lora_b))
+        images_b = sd_pipe(**pipeline_inputs, generator=torch.manual_seed(0)).images
+        sd_pipe.unload_lora_weights()
+
+        sd_pipe.load_batched_lora_weights({"a": lora_a, "b": lora_b})
+        sd_pipe.set_batched_lora_adapters(["b", None, "a"])
+        pipeline_inputs["prompt"] = [pipeline_inputs["prompt"]] * 3
+        generator = [torch.Generator().manual_seed(0) for _ in range(3)]
+        images = sd_pipe(**pipeline_inputs, generator=generator).images
+
+        assert not np.allclose(images_a, images_b, atol=1e-3)
+        assert np.allclose(images[0], images_b[0], atol=1e-4)
+        assert np.allclose(images[1], original_images[0], atol=1e-4)
+        assert np.allclose(images[2], images_a[0], atol=1e-4)
+
     @unittest.skipIf(torch_device != "cuda", "This test is supposed to run on GPU")
     def test_lora_unet_attn_processors_with_xformers(self):
         with tempfile.TemporaryDirectory() as tmpdirname:
@@ -1609,6 +1672,45 @@ class UNet2DConditionLoRAModelTests(unittest.TestCase):
         assert max_diff_new_sample < expected_max_diff
         assert max_diff_old_sample < expected_max_diff
 
+    def test_batched_lora(self):
+        init_dict, inputs_dict = self.prepare_init_args_and_inputs_for_common()
+
+        init_dict["attention_head_dim"] = (8, 16)
+
+        torch.manual_seed(0)
+        model = self.model_class(**init_dict)
+        model.to(torch_device)
+
+        lora_a, _ = create_lora_compatible_state_dict(model, rank=4)
+        lora_b, network_alphas_b = create_lora_compatible_state_dict(model, rank=8, network_alpha=4)
+
+        with torch.no_grad():
+            base_sample = model(**inputs_dict).sample
+            model.load_attn_procs(dict(lora_a))
+            sample_a = model(**inputs_dict, cross_attention_kwargs={"scale": 0.5}).sample
+            model.load_attn_procs(dict(lora_b), network_alphas=network_alphas_b)
+            sample_b = model(**inputs_dict, cross_attention_kwargs={"scale": 0.5}).sample
+
+        model.load_batched_lora_weights({"a": lora_a, "b": lora_b}, network_alphas={"b": network_alphas_b})
+        model.set_batched_lora_adapters(["a", None, "b", "a"])
+
+        with torch.no_grad():
+            sample = model(**inputs_dict, cross_attention_kwargs={"scale": 0.5}).sample
+
+        expected_sample = torch.stack([sample_a[0], base_sample[1], sample_b[2], sample_a[3]])
+        assert (sample_a - sample_b).abs().max() > 1e-3
+        assert (sample - expected_sample).abs().max() < 1e-4
+
+        model.set_batched_lora_adapters(None)
+        with torch.no_grad():
+            sample = model(**inputs_dict, cross_attention_kwargs={"scale": 0.5}).sample
+        assert (sample - base_sample).abs().max() < 1e-4
+
+        with self.assertRaises(ValueError):
+            model.set_batched_lora_adapters(["a", "c", "b", "a"])
+        with self.assertRaises(ValueError):
+            model.fuse_lora()
+
     @unittest.skipIf(
         torch_device != "cuda" or not is_xformers_available(),
         reason="XFormers attention is only available with CUDA and `xformers` installed",
@@ -5,7 +5,7 @@ import numpy as np
 import torch
 
 from diffusers import DiffusionPipeline
-from diffusers.models.attention_processor import Attention, AttnAddedKVProcessor
+from diffusers.models.attention_processor import Attention, AttnAddedKVProcessor, AttnProcessor, ChunkedAttnProcessor
 
 
 class AttnAddedKVProcessorTests(unittest.TestCase):
@@ -78,6 +78,65 @@ class AttnAddedKVProcessorTests(unittest.TestCase):
         self.assertTrue((only_cross_attn_out != self_and_cross_attn_out).all())
 
 
+class ChunkedAttnProcessorTests(unittest.TestCase):
+    def test_matches_attn_processor(self):
+        torch.manual_seed(0)
+        attn = Attention(query_dim=16, cross_attention_dim=12, heads=2, dim_head=8)
+        hidden_states = torch.randn(2, 37, 16)
+        encoder_hidden_states = torch.randn(2, 11, 12)
+        attention_mask = torch.randn(2, 37, 11)
+
+        processors = [
+            ChunkedAttnProcessor(),
+            ChunkedAttnProcessor(query_chunk_size=5, key_chunk_size=3),
+            ChunkedAttnProcessor(max_chunk_elements=64),
+        ]
+
+        with torch.no_grad():
+            attn.set_processor(AttnProcessor())
+            expected = attn(hidden_states, encoder_hidden_states, attention_mask)
+
+            for processor in processors:
+                attn.set_processor(processor)
+                output = attn(hidden_states, encoder_hidden_states, attention_mask)
+                self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+
+    def test_get_chunk_sizes(self):
+        processor = ChunkedAttnProcessor(max_chunk_elements=2**10)
+
+        self.assertEqual(processor.get_chunk_sizes(batch_size=4, query_length=100, key_length=16), (16, 16))
+        self.assertEqual(processor.get_chunk_sizes(batch_size=4, query_length=8, key_length=16), (8, 16))
+        self.assertEqual(processor.get_chunk_sizes(batch_size=2**11, query_length=8, key_length=16), (1, 16))
+
+        processor = ChunkedAttnProcessor(query_chunk_size=3, key_chunk_size=64)
+        self.assertEqual(processor.get_chunk_sizes(batch_size=4, query_length=100, key_length=16), (3, 16))
+
+
+class FrameSharedAttentionTests(unittest.TestCase):
+    def test_matches_repeated_encoder_hidden_states(self):
+        torch.manual_seed(0)
+        batch_size, num_frames = 2, 3
+        hidden_states = torch.randn(batch_size * num_frames, 7, 16)
+        encoder_hidden_states = torch.randn(batch_size, 5, 12)
+        repeated_encoder_hidden_states = encoder_hidden_states.repeat_interleave(num_frames, dim=0)
+
+        for processor in [AttnProcessor(), ChunkedAttnProcessor(query_chunk_size=4)]:
+            attn = Attention(query_dim=16, cross_attention_dim=12, heads=2, dim_head=8, processor=processor)
+            with torch.no_grad():
+                expected = attn(hidden_states, repeated_encoder_hidden_states)
+                output = attn(hidden_states, encoder_hidden_states)
+            self.assertEqual(output.shape, expected.shape)
+            self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+
+        # attention with a group norm over the frames can't fold them into the sequence
+        attn = Attention(query_dim=16, cross_attention_dim=12, heads=2, dim_head=8, norm_num_groups=4)
+        hidden_states = torch.randn(batch_size * num_frames, 16, 4, 4)
+        with torch.no_grad():
+            expected = attn(hidden_states, repeated_encoder_hidden_states)
+            output = attn(hidden_states, encoder_hidden_states)
+        self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+
+
 class DeprecatedAttentionBlockTests(unittest.TestCase):
     def test_conversion_when_using_device_map(self):
         pipe = DiffusionPipeline.from_pretrained("hf-internal-testing/tiny-stable-diffusion-pipe", safety_checker=None)
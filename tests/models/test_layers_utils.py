@@ -23,8 +23,10 @@ from torch import nn
 from diffusers.models.attention import GEGLU, AdaLayerNorm, ApproximateGELU
 from diffusers.models.embeddings import get_timestep_embedding
 from diffusers.models.lora import LoRACompatibleLinear
-from diffusers.models.resnet import Downsample2D, ResnetBlock2D, Upsample2D
+from diffusers.models.normalization import group_norm_frames
+from diffusers.models.resnet import Downsample2D, ResnetBlock2D, TemporalConvLayer, Upsample2D
 from diffusers.models.transformer_2d import Transformer2DModel
+from diffusers.models.transformer_temporal import TransformerTemporalModel
 from diffusers.utils.testing_utils import torch_device
 
 
@@ -311,6 +313,17 @@ class ResnetBlock2DTests(unittest.TestCase):
         )
         assert torch.allclose(output_slice.flatten(), expected_slice, atol=1e-3)
 
+    def test_resnet_shared_temb(self):
+        torch.manual_seed(0)
+        sample = torch.randn(6, 32, 16, 16).to(torch_device)
+        temb = torch.randn(2, 128).to(torch_device)
+        resnet_block = ResnetBlock2D(in_channels=32, temb_channels=128).to(torch_device)
+        with torch.no_grad():
+            expected = resnet_block(sample, temb.repeat_interleave(3, dim=0))
+            output_tensor = resnet_block(sample, temb)
+
+        assert torch.allclose(output_tensor, expected, atol=1e-5)
+
 
 class Transformer2DModelTests(unittest.TestCase):
     def test_spatial_transformer_default(self):
@@ -528,3 +541,55 @@ class Transformer2DModelTests(unittest.TestCase):
         assert spatial_transformer_block.transformer_blocks[0].attn1.to_q.bias is not None
         assert spatial_transformer_block.transformer_blocks[0].attn1.to_k.bias is not None
         assert spatial_transformer_block.transformer_blocks[0].attn1.to_v.bias is not None
+
+
+class TemporalLayoutTests(unittest.TestCase):
+    def test_group_norm_frames(self):
+        torch.manual_seed(0)
+        batch_size, num_frames = 2, 3
+        norm = nn.GroupNorm(4, 16).to(torch_device)
+        nn.init.normal_(norm.weight)
+        nn.init.normal_(norm.bias)
+        hidden_states = torch.randn(batch_size * num_frames, 16, 5, 6).to(torch_device) * 2 + 1
+
+        video = hidden_states.reshape(batch_size, num_frames, 16, 5, 6)
+        expected = norm(video.permute(0, 2, 1, 3, 4)).permute(0, 2, 1, 3, 4)
+        for dims in [(0, 2, 1, 3, 4), (0, 3, 4, 1, 2)]:
+            with torch.no_grad():
+                output = group_norm_frames(hidden_states, num_frames, norm, dims=dims)
+            assert output.is_contiguous()
+            assert torch.allclose(output, expected.permute(dims), atol=1e-5)
+
+    def test_group_norm_frames_large_offset(self):
+        torch.manual_seed(0)
+        num_frames = 4
+        norm = nn.GroupNorm(4, 16).to(torch_device)
+        for offset in [100.0, 1000.0]:
+            hidden_states = (torch.randn(2 * num_frames, 16, 8, 8) * 0.1 + offset).to(torch_device)
+
+            video = hidden_states.reshape(2, num_frames, 16, 8, 8)
+            expected = norm(video.permute(0, 2, 1, 3, 4)).permute(0, 2, 1, 3, 4)
+            with torch.no_grad():
+                output = group_norm_frames(hidden_states, num_frames, norm, dims=(0, 3, 4, 1, 2))
+            assert torch.allclose(output, expected.permute(0, 3, 4, 1, 2), atol=1e-3), f"offset {offset}"
+
+    def test_temporal_blocks_match_autograd_path(self):
+        # with gradients the blocks fall back to the permuted built-in group norm
+        torch.manual_seed(0)
+        hidden_states = torch.randn(2 * 4, 32, 4, 4).to(torch_device)
+        temporal_conv = TemporalConvLayer(32, 32, norm_num_groups=8).to(torch_device)
+        nn.init.normal_(temporal_conv.conv4[-1].weight, std=0.02)
+        temporal_transformer = TransformerTemporalModel(
+            num_attention_heads=2, attention_head_dim=16, in_channels=32, norm_num_groups=8
+        ).to(torch_device)
+
+        for forward in [
+            lambda x: temporal_conv(x, num_frames=4),
+            lambda x: temporal_transformer(x, num_frames=4).sample,
+        ]:
+            expected = forward(hidden_states)
+            with torch.no_grad():
+                output = forward(hidden_states)
+            assert output.shape == hidden_states.shape
+            assert output.is_contiguous()
+            assert torch.allclose(output, expected, atol=1e-5)
@@ -14,6 +14,8 @@
 # limitations under the License.
 
 import inspect
+import json
+import os
 import tempfile
 import traceback
 import unittest
@@ -23,12 +25,14 @@ from typing import Dict, List, Tuple
 
 import numpy as np
 import requests_mock
+import safetensors.torch
 import torch
 from huggingface_hub import delete_repo
 from requests.exceptions import HTTPError
 
 from diffusers.models import UNet2DConditionModel
 from diffusers.models.attention_processor import AttnProcessor, AttnProcessor2_0, XFormersAttnProcessor
+from diffusers.models.modeling_utils import load_state_dict
 from diffusers.training_utils import EMAModel
 from diffusers.utils import is_xformers_available, logging
 from diffusers.utils.testing_utils import (
@@ -159,6 +163,34 @@ class ModelUtilsTest(unittest.TestCase):
 
         assert model.config.in_channels == 9
 
+    def test_load_state_dict_mmap(self):
+        state_dict = {
+            "weight": torch.randn(4, 8),
+            "half": torch.randn(3, 5).half(),
+            "index": torch.arange(6).reshape(2, 3),
+        }
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            checkpoint_file = os.path.join(tmpdirname, "model.safetensors")
+            safetensors.torch.save_file(state_dict, checkpoint_file)
+
+            loaded = load_state_dict(checkpoint_file, mmap=True)
+            assert loaded.keys() == state_dict.keys()
+            for name, tensor in state_dict.items():
+                assert loaded[name].dtype == tensor.dtype
+                assert torch.equal(loaded[name], tensor)
+
+            # the tensors are views of a single mapping of the file, at the offsets stored in the header
+            with open(checkpoint_file, "rb") as f:
+                header_size = int.from_bytes(f.read(8), "little")
+                header = json.loads(f.read(header_size))
+            for name in state_dict:
+                expected = header[name]["data_offsets"][0] - header["weight"]["data_offsets"][0]
+                assert loaded[name].data_ptr() - loaded["weight"].data_ptr() == expected
+
+            # in-place updates are private to the process and never written back to the checkpoint
+            loaded["weight"].add_(1.0)
+            assert torch.equal(safetensors.torch.load_file(checkpoint_file)["weight"], state_dict["weight"])
+
 
 class UNetTesterMixin:
     def test_forward_signature(self):
@@ -452,6 +484,23 @@ class ModelTesterMixin:
                 new_model = self.model_class.from_pretrained(tmpdirname, low_cpu_mem_usage=False, torch_dtype=dtype)
                 assert new_model.dtype == dtype
 
+    def test_from_save_pretrained_mmap(self):
+        init_dict, inputs_dict = self.prepare_init_args_and_inputs_for_common()
+        model = self.model_class(**init_dict)
+        model.eval()
+
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            model.save_pretrained(tmpdirname, safe_serialization=False)
+            new_model = self.model_class.from_pretrained(tmpdirname, mmap=True)
+
+            state_dict, new_state_dict = model.state_dict(), new_model.state_dict()
+            assert state_dict.keys() == new_state_dict.keys()
+            for name in state_dict:
+                assert torch.equal(state_dict[name], new_state_dict[name]), f"{name} differs"
+
+            with self.assertRaises(ValueError):
+                self.model_class.from_pretrained(tmpdirname, mmap=True, low_cpu_mem_usage=False)
+
     def test_determinism(self, expected_max_diff=1e-5):
         if self.forward_requires_fresh_args:
             model = self.model_class(**self.init_dict)
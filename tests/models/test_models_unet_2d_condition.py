@@ -724,6 +724,41 @@ class UNet2DConditionModelTests(ModelTesterMixin, UNetTesterMixin, unittest.Test
         assert not sample2.allclose(sample3, atol=1e-4, rtol=1e-4)
         assert sample2.allclose(sample4, atol=1e-4, rtol=1e-4)
 
+    def test_deep_cache(self):
+        init_dict, inputs_dict = self.prepare_init_args_and_inputs_for_common()
+        model = self.model_class(**init_dict)
+        model.to(torch_device)
+
+        mid_block_calls = []
+        model.mid_block.register_forward_hook(lambda *args: mid_block_calls.append(1))
+
+        def run(timestep):
+            with torch.no_grad():
+                return model(**{**inputs_dict, "timestep": torch.tensor([timestep]).to(torch_device)}).sample
+
+        sample_10 = run(10)
+        sample_9 = run(9)
+
+        model.enable_deep_cache(cache_interval=2, cache_block_id=0)
+        mid_block_calls.clear()
+        # the second and the fourth steps reuse the deep features of the previous step, the timesteps repeat so that
+        # the reused features are the ones the full UNet would compute
+        samples = [run(10), run(10), run(9), run(9)]
+        assert len(mid_block_calls) == 2
+        for sample, expected_sample in zip(samples, [sample_10, sample_10, sample_9, sample_9]):
+            assert (sample - expected_sample).abs().max() < 1e-4
+
+        # a larger timestep starts a new denoising loop
+        mid_block_calls.clear()
+        run(10)
+        assert len(mid_block_calls) == 1
+
+        model.disable_deep_cache()
+        assert (run(9) - sample_9).abs().max() < 1e-4
+
+        with self.assertRaises(ValueError):
+            model.enable_deep_cache(cache_block_id=len(model.up_blocks) - 1)
+
 
 @slow
 class UNet2DConditionModelIntegrationTests(unittest.TestCase):
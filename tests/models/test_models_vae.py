@@ -128,6 +128,46 @@ class AutoencoderKLTests(ModelTesterMixin, UNetTesterMixin, unittest.TestCase):
         for name, param in named_params.items():
             self.assertTrue(torch_all_close(param.grad.data, named_params_2[name].grad.data, atol=5e-5))
 
+    def test_tiling_batched_tiles(self):
+        init_dict, _ = self.prepare_init_args_and_inputs_for_common()
+        init_dict["sample_size"] = 16
+        model = self.model_class(**init_dict).to(torch_device).eval()
+
+        image = floats_tensor((2, 3, 40, 56)).to(torch_device)
+        latents = floats_tensor((2, 4, 20, 28)).to(torch_device)
+
+        with torch.no_grad():
+            model.enable_tiling()
+            encoded = model.encode(image).latent_dist.mean
+            decoded = model.decode(latents).sample
+
+            model.enable_tiling(tile_batch_size=None)
+            encoded_batched = model.encode(image).latent_dist.mean
+            decoded_batched = model.decode(latents).sample
+
+            model.enable_tiling(tile_batch_size=3)
+            decoded_partially_batched = model.decode(latents).sample
+
+        self.assertEqual(encoded.shape, (2, 4, 20, 28))
+        self.assertEqual(decoded.shape, (2, 3, 40, 56))
+        self.assertTrue(torch_all_close(encoded, encoded_batched, atol=1e-5))
+        self.assertTrue(torch_all_close(decoded, decoded_batched, atol=1e-5))
+        self.assertTrue(torch_all_close(decoded, decoded_partially_batched, atol=1e-5))
+
+    def test_video_latents(self):
+        init_dict, _ = self.prepare_init_args_and_inputs_for_common()
+        model = self.model_class(**init_dict).to(torch_device).eval()
+
+        video = floats_tensor((2, 3, 3, 32, 32)).to(torch_device)
+        with torch.no_grad():
+            latents = model.encode(video).latent_dist.mode()
+            decoded = model.decode(latents).sample
+            decoded_frame = model.decode(latents[:, :, 1]).sample
+
+        self.assertEqual(latents.shape, (2, 4, 3, 16, 16))
+        self.assertEqual(decoded.shape, (2, 3, 3, 32, 32))
+        self.assertTrue(torch_all_close(decoded[:, :, 1], decoded_frame, atol=1e-5))
+
     def test_from_pretrained_hub(self):
         model, loading_info = AutoencoderKL.from_pretrained("fusing/autoencoder-kl-dummy", output_loading_info=True)
         self.assertIsNotNone(model)
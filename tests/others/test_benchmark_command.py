@@ -0,0 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from argparse import ArgumentParser
+
+from diffusers.commands.benchmark import BenchmarkCommand, compare_benchmarks, run_benchmarks
+
+
+class BenchmarkCommandTester(unittest.TestCase):
+    def test_run_benchmarks(self):
+        results = run_benchmarks(
+            name_filter="DDIMScheduler|vae_decode",
+            batch_sizes=[1, 2],
+            num_inference_steps=2,
+            num_runs=2,
+            num_warmup_runs=0,
+        )
+
+        self.assertEqual(len(results["results"]), 4)
+        for name, result in results["results"].items():
+            self.assertIn(result["benchmark"], name)
+            self.assertGreater(result["wall_time_median"], 0)
+            self.assertGreater(result["peak_rss_mb"], 0)
+            self.assertGreater(result["num_allocations"], 0)
+        self.assertEqual(
+            {result["params"]["batch_size"] for result in results["results"].values()},
+            {1, 2},
+        )
+        # the results are written to JSON
+        json.dumps(results)
+
+    def test_compare_benchmarks(self):
+        def run(wall_time, allocated_mb):
+            result = {"wall_time_median": wall_time, "peak_rss_increase_mb": 10.0, "allocated_mb": allocated_mb}
+            return {"metadata": {}, "results": {"unet": result, "vae": dict(result)}}
+
+        baseline = run(wall_time=1.0, allocated_mb=100.0)
+        rows = compare_benchmarks(baseline, run(wall_time=1.05, allocated_mb=150.0), threshold=0.1)
+        regressions = {(row["name"], row["metric"]) for row in rows if row["regression"]}
+
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(regressions, {("unet", "allocated_mb"), ("vae", "allocated_mb")})
+
+        # increases below the noise floor of a metric are not regressions
+        rows = compare_benchmarks(run(wall_time=1e-5, allocated_mb=0.0), run(wall_time=2e-5, allocated_mb=0.01))
+        self.assertFalse(any(row["regression"] for row in rows))
+
+    def test_cli_compare(self):
+        parser = ArgumentParser()
+        BenchmarkCommand.register_subcommand(parser.add_subparsers())
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = []
+            for wall_time in [1.0, 2.0]:
+                paths.append(os.path.join(tmpdir, f"{wall_time}.json"))
+                with open(paths[-1], "w") as f:
+                    json.dump({"metadata": {}, "results": {"unet": {"wall_time_median": wall_time}}}, f)
+
+            args = parser.parse_args(["benchmark", "--compare", paths[1], paths[0]])
+            args.func(args).run()
+
+            args = parser.parse_args(["benchmark", "--compare", paths[0], paths[1]])
+            with self.assertRaises(SystemExit):
+                args.func(args).run()
+
+    def test_cli_does_not_import_torch(self):
+        # the commands that don't need torch shouldn't pay for its import
+        code = "import sys; import diffusers.commands.diffusers_cli; assert 'torch' not in sys.modules"
+        subprocess.run([sys.executable, "-c", code], check=True)
@@ -12,7 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import importlib.metadata as importlib_metadata
 import inspect
+import json
+import subprocess
+import sys
 import unittest
 from importlib import import_module
 
@@ -48,3 +52,35 @@ class DependencyTester(unittest.TestCase):
             if hasattr(diffusers.pipelines, cls_name):
                 pipeline_folder_module = ".".join(str(cls_module.__module__).split(".")[:3])
                 _ = import_module(pipeline_folder_module, str(cls_name))
+
+    def test_lazy_backend_probing(self):
+        # run in a fresh interpreter, the backends of this one have already been probed by the other tests
+        code = (
+            "import importlib.util, json, sys\n"
+            "probed = []\n"
+            "find_spec = importlib.util.find_spec\n"
+            "importlib.util.find_spec = lambda name, *args: probed.append(name) or find_spec(name, *args)\n"
+            "import diffusers\n"
+            "print(json.dumps({'probed': probed, 'torch_imported': 'torch' in sys.modules}))\n"
+        )
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+
+        # `import diffusers` only probes the backends its lazy import structure depends on
+        for backend in ["wandb", "tensorboard", "omegaconf", "compel", "xformers", "bs4", "ftfy"]:
+            assert backend not in result["probed"], f"{backend} was probed by `import diffusers`"
+        assert not result["torch_imported"]
+
+    def test_backend_probing_is_memoized(self):
+        from diffusers.utils import import_utils
+
+        import_utils.is_torch_available()
+        cache_info = import_utils._get_package_version.cache_info()
+        import_utils.is_torch_available()
+        assert import_utils._get_package_version.cache_info().hits == cache_info.hits + 1
+        assert import_utils._get_package_version.cache_info().misses == cache_info.misses
+
+        # the module attributes of the eager probing are still resolved
+        assert import_utils._torch_available == import_utils.is_torch_available()
+        if import_utils.is_torch_available():
+            assert import_utils._torch_version == importlib_metadata.version("torch")
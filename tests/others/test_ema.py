@@ -157,3 +157,88 @@ class EMAModelTests(unittest.TestCase):
         output_loaded = loaded_unet(noisy_latents, timesteps, encoder_hidden_states).sample
 
         assert torch.allclose(output, output_loaded, atol=1e-4)
+
+
+class EMAModelTestsForeach(EMAModelTests):
+    def get_models(self, decay=0.9999):
+        unet = UNet2DConditionModel.from_pretrained(self.model_id, subfolder="unet")
+        unet = unet.to(torch_device)
+        ema_unet = EMAModel(
+            unet.parameters(), decay=decay, model_cls=UNet2DConditionModel, model_config=unet.config, foreach=True
+        )
+        return unet, ema_unet
+
+
+class EMAModelUpdateModesTests(unittest.TestCase):
+    def get_model(self):
+        torch.manual_seed(0)
+        model = torch.nn.Sequential(torch.nn.Linear(8, 16), torch.nn.GroupNorm(2, 16), torch.nn.Linear(16, 4))
+        # frozen parameters are copied instead of averaged
+        model[1].weight.requires_grad_(False)
+        return model.to(torch_device)
+
+    def simulate_backprop(self, model):
+        with torch.no_grad():
+            for param in model.parameters():
+                param.add_(torch.randn_like(param))
+
+    def test_foreach_matches_loop(self):
+        model = self.get_model()
+        ema_loop = EMAModel(model.parameters(), decay=0.9)
+        ema_foreach = EMAModel(model.parameters(), decay=0.9, foreach=True)
+
+        for _ in range(5):
+            self.simulate_backprop(model)
+            ema_loop.step(model.parameters())
+            ema_foreach.step(model.parameters())
+
+        for loop_param, foreach_param in zip(ema_loop.shadow_params, ema_foreach.shadow_params):
+            assert torch.allclose(loop_param, foreach_param, atol=1e-6)
+
+    def test_foreach_with_offloaded_ema_weights(self):
+        model = self.get_model()
+        ema_model = EMAModel(model.parameters(), decay=0.9)
+        ema_offloaded = EMAModel(model.parameters(), decay=0.9, foreach=True)
+        ema_offloaded.to("cpu")
+
+        for _ in range(3):
+            self.simulate_backprop(model)
+            ema_model.step(model.parameters())
+            ema_offloaded.step(model.parameters())
+
+        for param, offloaded_param in zip(ema_model.shadow_params, ema_offloaded.shadow_params):
+            assert offloaded_param.device.type == "cpu"
+            assert torch.allclose(param.cpu(), offloaded_param, atol=1e-6)
+
+    def test_update_every(self):
+        model = self.get_model()
+        ema_model = EMAModel(model.parameters(), decay=0.9, update_every=2)
+
+        self.simulate_backprop(model)
+        ema_model.step(model.parameters())
+        assert ema_model.optimization_step == 1
+        assert ema_model.cur_decay_value is None
+        for s_param, param in zip(ema_model.shadow_params, model.parameters()):
+            if param.requires_grad:
+                assert not torch.allclose(s_param, param)
+
+        for _ in range(3):
+            ema_model.step(model.parameters())
+        assert ema_model.optimization_step == 4
+        assert ema_model.cur_decay_value == ema_model.get_decay(4) ** 2
+
+        state_dict = ema_model.state_dict()
+        assert state_dict["update_every"] == 2
+
+    def test_update_every_invalid(self):
+        model = self.get_model()
+        with self.assertRaises(ValueError):
+            EMAModel(model.parameters(), update_every=0)
+
+    def test_positional_model_cls(self):
+        # the arguments added after `power` must not shift the positional `model_cls` and `model_config`
+        model = self.get_model()
+        ema_model = EMAModel(model.parameters(), 0.9, 0.0, 0, False, 1.0, 2 / 3, torch.nn.Linear, {"in_features": 4})
+        assert ema_model.model_cls is torch.nn.Linear
+        assert ema_model.model_config == {"in_features": 4}
+        assert not ema_model.foreach
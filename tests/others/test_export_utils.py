@@ -0,0 +1,99 @@
+# coding=utf-8
+# Copyright 2023 HuggingFace Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import numpy as np
+import PIL.Image
+
+from diffusers.utils import VideoExporter, export_to_video
+from diffusers.utils.import_utils import is_opencv_available
+
+
+class InMemoryEncoder:
+    videos = {}
+
+    def __init__(self, output_video_path, fps, frame_size, codec):
+        self.frames = []
+        self.frame_size = frame_size
+        self.videos[output_video_path] = self
+
+    def write(self, frame):
+        assert frame.shape[:2] == self.frame_size
+        self.frames.append(frame)
+
+    def close(self):
+        self.closed = True
+
+
+class FailingEncoder(InMemoryEncoder):
+    def write(self, frame):
+        raise OSError("disk full")
+
+
+class VideoExporterTests(unittest.TestCase):
+    def test_streaming_chunks(self):
+        def decoded_chunks():
+            for _ in range(3):
+                yield np.random.rand(4, 8, 12, 3).astype(np.float32)
+
+        exporter = VideoExporter("chunks.mp4", encoder=InMemoryEncoder)
+        exporter.write_from(decoded_chunks())
+
+        encoder = InMemoryEncoder.videos["chunks.mp4"]
+        assert encoder.closed
+        assert len(encoder.frames) == 12
+        assert all(frame.dtype == np.uint8 and frame.shape == (8, 12, 3) for frame in encoder.frames)
+
+    def test_callback(self):
+        with VideoExporter("callback.mp4", encoder=InMemoryEncoder, background=False) as exporter:
+            for _ in range(5):
+                exporter(PIL.Image.new("RGB", (12, 8)))
+
+        assert len(InMemoryEncoder.videos["callback.mp4"].frames) == 5
+
+    def test_grid(self):
+        views = np.stack([np.full((2, 8, 12, 3), fill_value=idx, dtype=np.uint8) for idx in range(6)], axis=1)
+        export_to_video(views, "grid.mp4", encoder=InMemoryEncoder, grid=(2, 3))
+
+        frames = InMemoryEncoder.videos["grid.mp4"].frames
+        assert len(frames) == 2
+        assert frames[0].shape == (16, 36, 3)
+        assert frames[0][0, 0, 0] == 0 and frames[0][0, 12, 0] == 1 and frames[0][8, 0, 0] == 3
+        assert frames[0][15, 35, 0] == 5
+
+    def test_grid_wrong_number_of_views(self):
+        exporter = VideoExporter("wrong_grid.mp4", encoder=InMemoryEncoder, grid=(2, 2))
+        with self.assertRaises(ValueError):
+            exporter.write(np.zeros((3, 8, 8, 3), dtype=np.uint8))
+
+    def test_encoder_failure(self):
+        exporter = VideoExporter("failure.mp4", encoder=FailingEncoder)
+        exporter.write(np.zeros((2, 8, 8, 3), dtype=np.uint8))
+        with self.assertRaises(RuntimeError):
+            exporter.close()
+
+    @unittest.skipIf(not is_opencv_available(), reason="Video export requires `opencv-python`.")
+    def test_export_to_video_opencv(self):
+        import cv2
+
+        frames = [np.random.randint(0, 255, (32, 48, 3), dtype=np.uint8) for _ in range(6)]
+        video_path = export_to_video(frames, fps=12)
+
+        capture = cv2.VideoCapture(video_path)
+        assert capture.get(cv2.CAP_PROP_FRAME_COUNT) == 6
+        assert capture.get(cv2.CAP_PROP_FPS) == 12
+        assert capture.get(cv2.CAP_PROP_FRAME_WIDTH) == 48
+        capture.release()
@@ -308,3 +308,22 @@ class ImageProcessorTest(unittest.TestCase):
         assert (
             out_np.shape == exp_np_shape
         ), f"resized image output shape '{out_np.shape}' didn't match expected shape '{exp_np_shape}'."
+
+    def test_vae_image_processor_postprocess_video(self):
+        image_processor = VaeImageProcessor(do_resize=False, do_normalize=True)
+        video = torch.randn(2, 3, 4, 8, 8)
+
+        out_np = image_processor.postprocess_video(video, output_type="np")
+        assert out_np.shape == (2, 4, 8, 8, 3)
+        for batch_idx in range(video.shape[0]):
+            expected = image_processor.postprocess(video[batch_idx].permute(1, 0, 2, 3), output_type="np")
+            assert np.abs(out_np[batch_idx] - expected).max() < 1e-6
+
+        out_pil = image_processor.postprocess_video(video, output_type="pil")
+        assert len(out_pil) == 2
+        for batch_idx in range(video.shape[0]):
+            expected = image_processor.postprocess(video[batch_idx].permute(1, 0, 2, 3), output_type="pil")
+            assert len(out_pil[batch_idx]) == len(expected)
+            for frame, expected_frame in zip(out_pil[batch_idx], expected):
+                assert isinstance(frame, PIL.Image.Image)
+                assert np.array_equal(np.array(frame), np.array(expected_frame))
@@ -0,0 +1,64 @@
+# coding=utf-8
+# Copyright 2023 HuggingFace Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import torch
+
+from diffusers.utils.testing_utils import torch_device
+from diffusers.utils.torch_utils import _philox4x32, randn_tensor, seeded_randn_tensor
+
+
+class RandnTensorTests(unittest.TestCase):
+    def test_generator_list_matches_per_sample_randn(self):
+        shape = (3, 4, 8, 8)
+        generator = [torch.Generator("cpu").manual_seed(i) for i in range(3)]
+        latents = randn_tensor(shape, generator=generator, device=torch.device("cpu"))
+
+        expected = torch.cat([torch.randn((1, 4, 8, 8), generator=torch.manual_seed(i)) for i in range(3)])
+        self.assertTrue(torch.equal(latents, expected))
+
+    def test_philox_known_answer(self):
+        # known answer test from the Random123 reference implementation
+        zeros = [torch.tensor([0])] * 4
+        output = _philox4x32(zeros, zeros[:2])
+        self.assertEqual([x.item() for x in output], [0x6627E8D5, 0xE169C58D, 0xBC57AC4C, 0x9B00DBD8])
+
+    def test_seeded_randn_tensor_independent_of_batch(self):
+        latents = seeded_randn_tensor((4, 4, 8, 8), seeds=[1, 2, 3, 2**63 + 5], device=torch_device)
+        sub_batch = seeded_randn_tensor((2, 4, 8, 8), seeds=[3, 1], device=torch_device)
+
+        self.assertTrue(torch.equal(latents[2], sub_batch[0]))
+        self.assertTrue(torch.equal(latents[0], sub_batch[1]))
+        self.assertFalse(torch.equal(latents[0], latents[1]))
+
+    def test_seeded_randn_tensor_single_seed(self):
+        latents = seeded_randn_tensor((5, 3, 7), seeds=9, device=torch_device)
+        prefix = seeded_randn_tensor((2, 3, 7), seeds=9, device=torch_device)
+
+        self.assertTrue(torch.equal(latents[:2], prefix))
+        self.assertFalse(torch.equal(latents[0], latents[1]))
+
+    def test_seeded_randn_tensor_statistics(self):
+        latents = seeded_randn_tensor((2, 250_000), seeds=0, dtype=torch.float16, device=torch_device)
+
+        self.assertEqual(latents.dtype, torch.float16)
+        self.assertEqual(latents.device.type, torch.device(torch_device).type)
+        self.assertLess(abs(latents.float().mean().item()), 1e-2)
+        self.assertLess(abs(latents.float().std().item() - 1.0), 1e-2)
+
+    def test_seeded_randn_tensor_wrong_number_of_seeds(self):
+        with self.assertRaises(ValueError):
+            seeded_randn_tensor((3, 4), seeds=[0, 1])
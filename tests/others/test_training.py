@@ -13,12 +13,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
+import os
+import tempfile
 import unittest
 
+import numpy as np
 import torch
 
 from diffusers import DDIMScheduler, DDPMScheduler, UNet2DModel
-from diffusers.training_utils import set_seed
+from diffusers.training_utils import (
+    LATENTS_CACHE_INDEX_NAME,
+    CachedLatentsDataset,
+    LatentsCacheWriter,
+    set_seed,
+)
 from diffusers.utils.testing_utils import slow
 
 
@@ -84,3 +93,58 @@ class TrainingTests(unittest.TestCase):
 
         self.assertTrue(torch.allclose(ddpm_noisy_images, ddim_noisy_images, atol=1e-5))
         self.assertTrue(torch.allclose(ddpm_noise_pred, ddim_noise_pred, atol=1e-5))
+
+
+class CachedLatentsTests(unittest.TestCase):
+    def write_cache(self, cache_dir, num_samples=10, shard_size=4):
+        rng = np.random.default_rng(0)
+        arrays = {
+            "latent_mean": rng.standard_normal((num_samples, 4, 8, 8)).astype(np.float32),
+            "latent_logvar": np.full((num_samples, 4, 8, 8), -2.0, dtype=np.float32),
+            "prompt_embeds": rng.standard_normal((num_samples, 7, 16)).astype(np.float16),
+        }
+        with LatentsCacheWriter(cache_dir, shard_size=shard_size, metadata={"scaling_factor": 0.18215}) as writer:
+            # batches that don't line up with the shard boundaries
+            for start in range(0, num_samples, 3):
+                writer.add(**{name: array[start : start + 3] for name, array in arrays.items()})
+        return arrays
+
+    def test_writer_shards(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.write_cache(tmpdir)
+
+            with open(os.path.join(tmpdir, LATENTS_CACHE_INDEX_NAME)) as f:
+                index = json.load(f)
+
+            self.assertEqual(index["num_samples"], 10)
+            self.assertEqual([shard["num_samples"] for shard in index["shards"]], [4, 4, 2])
+            self.assertEqual(index["arrays"]["prompt_embeds"], {"shape": [7, 16], "dtype": "float16"})
+            self.assertEqual(index["metadata"], {"scaling_factor": 0.18215})
+
+    def test_dataset(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            arrays = self.write_cache(tmpdir)
+
+            dataset = CachedLatentsDataset(tmpdir, sample_posterior=False)
+            self.assertEqual(len(dataset), 10)
+            self.assertEqual(dataset.metadata["scaling_factor"], 0.18215)
+
+            for index in [0, 3, 4, 9, -1]:
+                example = dataset[index]
+                self.assertEqual(set(example), {"latents", "prompt_embeds"})
+                self.assertTrue(np.array_equal(example["latents"].numpy(), arrays["latent_mean"][index]))
+                self.assertTrue(np.array_equal(example["prompt_embeds"].numpy(), arrays["prompt_embeds"][index]))
+
+            with self.assertRaises(IndexError):
+                dataset[10]
+
+            # sampled latents are drawn around the mean with a standard deviation of exp(0.5 * logvar)
+            dataset = CachedLatentsDataset(tmpdir)
+            torch.manual_seed(0)
+            latents = dataset[5]["latents"]
+            std = (latents.numpy() - arrays["latent_mean"][5]).std()
+            self.assertAlmostEqual(std, float(np.exp(-1.0)), delta=0.05)
+
+            batch = next(iter(torch.utils.data.DataLoader(dataset, batch_size=4)))
+            self.assertEqual(batch["latents"].shape, (4, 4, 8, 8))
+            self.assertEqual(batch["prompt_embeds"].dtype, torch.float16)
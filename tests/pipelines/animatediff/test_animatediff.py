@@ -9,11 +9,13 @@ import diffusers
 from diffusers import (
     AnimateDiffPipeline,
     AutoencoderKL,
+    DDIMParallelScheduler,
     DDIMScheduler,
     MotionAdapter,
     UNet2DConditionModel,
     UNetMotionModel,
 )
+from diffusers.pipelines.animatediff.pipeline_animatediff import get_context_weights, get_context_windows
 from diffusers.utils import logging
 from diffusers.utils.testing_utils import numpy_cosine_similarity_distance, require_torch_gpu, slow, torch_device
 
@@ -233,6 +235,66 @@ class AnimateDiffPipelineFastTests(PipelineTesterMixin, unittest.TestCase):
         inputs["prompt_embeds"] = torch.randn((1, 4, 32), device=torch_device)
         pipe(**inputs)
 
+    def test_parallel_sampling(self):
+        components = self.get_dummy_components()
+        components["scheduler"] = DDIMParallelScheduler.from_config(components["scheduler"].config)
+        pipe = self.pipeline_class(**components)
+        pipe.set_progress_bar_config(disable=None)
+        pipe.to(torch_device)
+
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["num_inference_steps"] = 6
+        frames = pipe(**inputs).frames
+
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["num_inference_steps"] = 6
+        inputs["parallel"] = 3
+        inputs["tolerance"] = 1e-4
+        frames_parallel = pipe(**inputs).frames
+
+        self.assertEqual(frames_parallel.shape, frames.shape)
+        self.assertLess(np.abs(to_np(frames_parallel) - to_np(frames)).max(), 1e-4)
+
+    def test_context_windows(self):
+        components = self.get_dummy_components()
+        pipe = self.pipeline_class(**components)
+        pipe.set_progress_bar_config(disable=None)
+        pipe.to(torch_device)
+
+        inputs = self.get_dummy_inputs(torch_device)
+        frames = pipe(**inputs, num_frames=12).frames
+
+        # a window covering all frames is the same as no windows
+        inputs = self.get_dummy_inputs(torch_device)
+        frames_single_window = pipe(**inputs, num_frames=12, context_frames=16).frames
+        self.assertLess(np.abs(to_np(frames_single_window) - to_np(frames)).max(), 1e-5)
+
+        # batching the windows doesn't change the result
+        inputs = self.get_dummy_inputs(torch_device)
+        frames_windows = pipe(**inputs, num_frames=12, context_frames=8, context_overlap=4).frames
+        inputs = self.get_dummy_inputs(torch_device)
+        frames_batched_windows = pipe(
+            **inputs, num_frames=12, context_frames=8, context_overlap=4, context_batch_size=2
+        ).frames
+
+        self.assertEqual(frames_windows.shape, frames.shape)
+        self.assertLess(np.abs(to_np(frames_batched_windows) - to_np(frames_windows)).max(), 1e-4)
+
+
+class ContextWindowTests(unittest.TestCase):
+    def test_get_context_windows(self):
+        self.assertEqual(get_context_windows(4, 16, 4), [[0, 1, 2, 3]])
+        self.assertEqual(get_context_windows(8, 4, 2), [[0, 1, 2, 3], [2, 3, 4, 5], [4, 5, 6, 7]])
+        # the last window is aligned to the last frame
+        self.assertEqual(get_context_windows(9, 4, 1), [[0, 1, 2, 3], [3, 4, 5, 6], [5, 6, 7, 8]])
+
+        with self.assertRaises(ValueError):
+            get_context_windows(8, 4, 4)
+
+    def test_get_context_weights(self):
+        self.assertEqual(get_context_weights(5, "pyramid").tolist(), [1, 2, 3, 2, 1])
+        self.assertEqual(get_context_weights(4, "flat").tolist(), [1, 1, 1, 1])
+
 
 @slow
 @require_torch_gpu
@@ -17,6 +17,7 @@ import gc
 import tempfile
 import traceback
 import unittest
+import unittest.mock as mock
 
 import numpy as np
 import torch
@@ -25,6 +26,7 @@ from transformers import CLIPTextConfig, CLIPTextModel, CLIPTokenizer
 from diffusers import (
     AutoencoderKL,
     ControlNetModel,
+    DDIMParallelScheduler,
     DDIMScheduler,
     EulerDiscreteScheduler,
     LCMScheduler,
@@ -32,7 +34,12 @@ from diffusers import (
     UNet2DConditionModel,
 )
 from diffusers.pipelines.controlnet.pipeline_controlnet import MultiControlNetModel
-from diffusers.utils.import_utils import is_xformers_available
+from diffusers.utils.import_utils import (
+    is_accelerate_available,
+    is_accelerate_version,
+    is_torch_version,
+    is_xformers_available,
+)
 from diffusers.utils.testing_utils import (
     enable_full_determinism,
     load_image,
@@ -246,6 +253,113 @@ class ControlNetPipelineFastTests(
 
         assert np.abs(image_slice.flatten() - expected_slice).max() < 1e-2
 
+    def test_controlnet_cond_embeds(self):
+        controlnet = self.get_dummy_components()["controlnet"].to(torch_device)
+
+        generator = torch.Generator().manual_seed(0)
+        sample = torch.randn((2, 4, 32, 32), generator=generator).to(torch_device)
+        encoder_hidden_states = torch.randn((2, 77, 32), generator=generator).to(torch_device)
+        controlnet_cond = torch.randn((2, 3, 64, 64), generator=generator).to(torch_device)
+
+        with torch.no_grad():
+            down_samples, mid_sample = controlnet(
+                sample, 10, encoder_hidden_states, controlnet_cond=controlnet_cond, return_dict=False
+            )
+            controlnet_cond_embeds = controlnet.embed_condition(controlnet_cond)
+            down_samples_2, mid_sample_2 = controlnet(
+                sample,
+                10,
+                encoder_hidden_states,
+                controlnet_cond=None,
+                controlnet_cond_embeds=controlnet_cond_embeds,
+                return_dict=False,
+            )
+
+        for down_sample, down_sample_2 in zip(down_samples, down_samples_2):
+            assert torch.allclose(down_sample, down_sample_2, atol=1e-5)
+        assert torch.allclose(mid_sample, mid_sample_2, atol=1e-5)
+
+    @unittest.skipIf(
+        not is_accelerate_available() or is_accelerate_version("<", "0.17.0"),
+        reason="CPU offload hooks require `accelerate v0.17.0` or higher",
+    )
+    def test_controlnet_embed_condition_offload_hook(self):
+        from accelerate import cpu_offload_with_hook
+
+        controlnet = self.get_dummy_components()["controlnet"]
+        cpu_offload_with_hook(controlnet, torch_device)
+        controlnet_cond = torch.randn((1, 3, 64, 64), generator=torch.Generator().manual_seed(0))
+
+        # the condition is embedded on the execution device, as in the forward of the ControlNet
+        with mock.patch.object(controlnet._hf_hook, "pre_forward", wraps=controlnet._hf_hook.pre_forward) as hook:
+            controlnet.embed_condition(controlnet_cond.to(torch_device))
+        hook.assert_called_once_with(controlnet)
+
+    def test_feature_cache(self):
+        components = self.get_dummy_components()
+        pipe = self.pipeline_class(**components)
+        pipe.to(torch_device)
+        pipe.set_progress_bar_config(disable=None)
+
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["num_inference_steps"] = 4
+        output = pipe(**inputs)[0]
+
+        # an interval of 1 recomputes all the features at every step
+        pipe.enable_feature_cache(cache_interval=1)
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["num_inference_steps"] = 4
+        output_interval_1 = pipe(**inputs)[0]
+
+        pipe.enable_feature_cache(cache_interval=2)
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["num_inference_steps"] = 4
+        output_interval_2 = pipe(**inputs)[0]
+
+        pipe.disable_feature_cache()
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["num_inference_steps"] = 4
+        output_disabled = pipe(**inputs)[0]
+
+        assert np.abs(output_interval_1 - output).max() < 1e-4
+        assert output_interval_2.shape == output.shape
+        assert np.abs(output_interval_2 - output).max() > 1e-4
+        assert np.abs(output_disabled - output).max() < 1e-4
+
+    def test_parallel_sampling(self):
+        components = self.get_dummy_components()
+        components["scheduler"] = DDIMParallelScheduler.from_config(components["scheduler"].config)
+        # the zero convolutions of the dummy ControlNet would hide its residuals
+        torch.manual_seed(0)
+        for module in [components["controlnet"].controlnet_down_blocks, components["controlnet"].controlnet_mid_block]:
+            for param in module.parameters():
+                torch.nn.init.normal_(param)
+        pipe = self.pipeline_class(**components)
+        pipe.to(torch_device)
+        pipe.set_progress_bar_config(disable=None)
+
+        for guess_mode in [False, True]:
+            inputs = self.get_dummy_inputs(torch_device)
+            inputs["num_inference_steps"] = 6
+            inputs["guess_mode"] = guess_mode
+            inputs["control_guidance_end"] = 0.5
+            output = pipe(**inputs)[0]
+
+            inputs = self.get_dummy_inputs(torch_device)
+            inputs["num_inference_steps"] = 6
+            inputs["guess_mode"] = guess_mode
+            inputs["control_guidance_end"] = 0.5
+            inputs["parallel"] = 4
+            inputs["tolerance"] = 1e-4
+            output_parallel = pipe(**inputs)[0]
+
+            assert output_parallel.shape == output.shape
+            assert np.abs(output_parallel - output).max() < 1e-4
+
+        pipe.enable_feature_cache()
+        with self.assertRaises(ValueError):
+            pipe(**inputs)
+
 
 class StableDiffusionMultiControlNetPipelineFastTests(
     PipelineTesterMixin, PipelineKarrasSchedulerTesterMixin, unittest.TestCase
@@ -411,6 +525,107 @@ class StableDiffusionMultiControlNetPipelineFastTests(
         assert np.sum(np.abs(output_1 - output_3)) > 1e-3
         assert np.sum(np.abs(output_1 - output_4)) > 1e-3
 
+    @require_torch_2
+    def test_controlnet_execution_modes(self):
+        components = self.get_dummy_components()
+        pipe = self.pipeline_class(**components)
+        pipe.to(torch_device)
+        pipe.set_progress_bar_config(disable=None)
+
+        output_sequential = pipe(**self.get_dummy_inputs(torch_device))[0]
+
+        pipe.controlnet.set_execution_mode("batched")
+        # moving the pipeline has to keep the stacked weights in sync
+        pipe.to(torch_device)
+        output_batched = pipe(**self.get_dummy_inputs(torch_device))[0]
+
+        pipe.controlnet.set_execution_mode("parallel")
+        output_parallel = pipe(**self.get_dummy_inputs(torch_device))[0]
+        executor = pipe.controlnet._executor
+
+        pipe.controlnet.set_execution_mode("sequential")
+        output_sequential_2 = pipe(**self.get_dummy_inputs(torch_device))[0]
+
+        # the thread pool of the parallel mode is shut down when switching modes
+        with self.assertRaises(RuntimeError):
+            executor.submit(print)
+
+        assert np.abs(output_batched - output_sequential).max() < 1e-4
+        assert np.abs(output_parallel - output_sequential).max() < 1e-4
+        assert np.abs(output_sequential_2 - output_sequential).max() < 1e-4
+
+        with self.assertRaises(ValueError):
+            pipe.controlnet.set_execution_mode("async")
+
+    @require_torch_2
+    def test_controlnet_residual_cache(self):
+        components = self.get_dummy_components()
+        pipe = self.pipeline_class(**components)
+        pipe.to(torch_device)
+        pipe.set_progress_bar_config(disable=None)
+
+        pipe.controlnet.enable_residual_cache(cache_interval=2)
+        outputs = {}
+        for execution_mode in ["sequential", "batched", "parallel"]:
+            pipe.controlnet.set_execution_mode(execution_mode)
+            inputs = self.get_dummy_inputs(torch_device)
+            inputs["num_inference_steps"] = 4
+            outputs[execution_mode] = pipe(**inputs)[0]
+        pipe.controlnet.set_execution_mode("sequential")
+
+        pipe.controlnet.disable_residual_cache()
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["num_inference_steps"] = 4
+        output = pipe(**inputs)[0]
+
+        assert np.abs(outputs["batched"] - outputs["sequential"]).max() < 1e-4
+        assert np.abs(outputs["parallel"] - outputs["sequential"]).max() < 1e-4
+        assert np.abs(outputs["sequential"] - output).max() > 1e-4
+
+    def test_parallel_sampling(self):
+        components = self.get_dummy_components()
+        components["scheduler"] = DDIMParallelScheduler.from_config(components["scheduler"].config)
+        # the zero convolutions of the dummy ControlNets would hide their residuals
+        torch.manual_seed(0)
+        for controlnet in components["controlnet"].nets:
+            for module in [controlnet.controlnet_down_blocks, controlnet.controlnet_mid_block]:
+                for param in module.parameters():
+                    torch.nn.init.normal_(param)
+        pipe = self.pipeline_class(**components)
+        pipe.to(torch_device)
+        pipe.set_progress_bar_config(disable=None)
+
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["num_inference_steps"] = 6
+        inputs["control_guidance_start"] = [0.0, 0.3]
+        inputs["control_guidance_end"] = [0.5, 1.0]
+        output = pipe(**inputs)[0]
+
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["num_inference_steps"] = 6
+        inputs["control_guidance_start"] = [0.0, 0.3]
+        inputs["control_guidance_end"] = [0.5, 1.0]
+        inputs["parallel"] = 4
+        inputs["tolerance"] = 1e-4
+        output_parallel = pipe(**inputs)[0]
+
+        assert output_parallel.shape == output.shape
+        assert np.abs(output_parallel - output).max() < 1e-4
+
+        # the windows go through the execution mode of the ControlNets
+        if is_torch_version(">=", "2.0.0"):
+            pipe.controlnet.set_execution_mode("batched")
+            inputs = self.get_dummy_inputs(torch_device)
+            inputs["num_inference_steps"] = 6
+            inputs["control_guidance_start"] = [0.0, 0.3]
+            inputs["control_guidance_end"] = [0.5, 1.0]
+            inputs["parallel"] = 4
+            inputs["tolerance"] = 1e-4
+            output_parallel_batched = pipe(**inputs)[0]
+            pipe.controlnet.set_execution_mode("sequential")
+
+            assert np.abs(output_parallel_batched - output_parallel).max() < 1e-4
+
     def test_attention_slicing_forward_pass(self):
         return self._test_attention_slicing_forward_pass(expected_max_diff=2e-3)
 
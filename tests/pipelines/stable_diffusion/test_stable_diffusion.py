@@ -335,6 +335,70 @@ class StableDiffusionPipelineFastTests(
 
         assert np.abs(image_slice_1.flatten() - image_slice_2.flatten()).max() < 1e-4
 
+    def test_stable_diffusion_prompt_embeds_cache(self):
+        components = self.get_dummy_components()
+        sd_pipe = StableDiffusionPipeline(**components)
+        sd_pipe = sd_pipe.to(torch_device)
+        sd_pipe.set_progress_bar_config(disable=None)
+
+        num_text_encoder_calls = []
+        sd_pipe.text_encoder.register_forward_hook(lambda *args: num_text_encoder_calls.append(1))
+
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["negative_prompt"] = "blurry"
+        image_slice_1 = sd_pipe(**inputs).images[0, -3:, -3:, -1]
+        self.assertEqual(len(num_text_encoder_calls), 2)
+
+        sd_pipe.enable_prompt_embeds_cache(max_size=4)
+
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["negative_prompt"] = "blurry"
+        sd_pipe(**inputs)
+        self.assertEqual(len(num_text_encoder_calls), 4)
+        self.assertEqual(len(sd_pipe.prompt_embeds_cache), 2)
+
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["negative_prompt"] = "blurry"
+        image_slice_2 = sd_pipe(**inputs).images[0, -3:, -3:, -1]
+        self.assertEqual(len(num_text_encoder_calls), 4)
+
+        assert np.abs(image_slice_1.flatten() - image_slice_2.flatten()).max() < 1e-4
+
+        # a different `clip_skip` is a different cache entry
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["negative_prompt"] = "blurry"
+        sd_pipe(**inputs, clip_skip=1)
+        self.assertEqual(len(num_text_encoder_calls), 5)
+
+        sd_pipe.disable_prompt_embeds_cache()
+        self.assertIsNone(sd_pipe.prompt_embeds_cache)
+
+    def test_stable_diffusion_prompt_embeds_cache_on_disk(self):
+        components = self.get_dummy_components()
+        components["text_encoder"].config._name_or_path = "dummy-text-encoder"
+        sd_pipe = StableDiffusionPipeline(**components)
+        sd_pipe = sd_pipe.to(torch_device)
+        sd_pipe.set_progress_bar_config(disable=None)
+
+        num_text_encoder_calls = []
+        sd_pipe.text_encoder.register_forward_hook(lambda *args: num_text_encoder_calls.append(1))
+
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            sd_pipe.enable_prompt_embeds_cache(cache_dir=tmpdirname)
+            image_slice_1 = sd_pipe(**self.get_dummy_inputs(torch_device)).images[0, -3:, -3:, -1]
+            self.assertEqual(len(num_text_encoder_calls), 2)
+
+            # a new cache with an empty memory store reads the embeddings back from disk
+            sd_pipe.enable_prompt_embeds_cache(cache_dir=tmpdirname)
+            image_slice_2 = sd_pipe(**self.get_dummy_inputs(torch_device)).images[0, -3:, -3:, -1]
+            self.assertEqual(len(num_text_encoder_calls), 2)
+
+            sd_pipe.prompt_embeds_cache.clear(disk=True)
+            sd_pipe(**self.get_dummy_inputs(torch_device))
+            self.assertEqual(len(num_text_encoder_calls), 4)
+
+        assert np.abs(image_slice_1.flatten() - image_slice_2.flatten()).max() < 1e-4
+
     def test_stable_diffusion_ddim_factor_8(self):
         device = "cpu"  # ensure determinism for the device-dependent torch.Generator
 
@@ -1370,6 +1370,59 @@ class PipelineFastTests(unittest.TestCase):
             assert pipeline.scheduler is not None
             assert pipeline.feature_extractor is not None
 
+    def test_from_pretrained_mmap(self):
+        unet = self.dummy_uncond_unet()
+        pipeline = DDPMPipeline(unet=unet, scheduler=DDPMScheduler())
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            pipeline.save_pretrained(tmpdirname)
+            new_pipeline = DDPMPipeline.from_pretrained(tmpdirname, mmap=True)
+
+            generator = torch.Generator(device="cpu").manual_seed(0)
+            image = pipeline(generator=generator, num_inference_steps=2, output_type="np").images
+            generator = torch.Generator(device="cpu").manual_seed(0)
+            new_image = new_pipeline(generator=generator, num_inference_steps=2, output_type="np").images
+
+        assert np.abs(image - new_image).max() < 1e-5
+
+    def test_from_pretrained_max_workers(self):
+        unet = self.dummy_uncond_unet()
+        pipeline = DDPMPipeline(unet=unet, scheduler=DDPMScheduler())
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            pipeline.save_pretrained(tmpdirname)
+            new_pipeline = DDPMPipeline.from_pretrained(tmpdirname, max_workers=2)
+            passed_unet_pipeline = DDPMPipeline.from_pretrained(tmpdirname, unet=unet, max_workers=2)
+
+        assert set(new_pipeline.component_load_times) == {"unet", "scheduler"}
+        assert all(load_time >= 0 for load_time in new_pipeline.component_load_times.values())
+        assert set(passed_unet_pipeline.component_load_times) == {"scheduler"}
+        assert pipeline.component_load_times == {}
+
+        generator = torch.Generator(device="cpu").manual_seed(0)
+        image = pipeline(generator=generator, num_inference_steps=2, output_type="np").images
+        generator = torch.Generator(device="cpu").manual_seed(0)
+        new_image = new_pipeline(generator=generator, num_inference_steps=2, output_type="np").images
+
+        assert np.abs(image - new_image).max() < 1e-5
+
+    def test_from_pretrained_max_workers_prefetch_error(self):
+        unet = self.dummy_uncond_unet()
+        pipeline = DDPMPipeline(unet=unet, scheduler=DDPMScheduler())
+        logger = logging.get_logger("diffusers.pipelines.pipeline_utils")
+        logger.setLevel(logging.DEBUG)
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            pipeline.save_pretrained(tmpdirname)
+            with mock.patch(
+                "diffusers.pipelines.pipeline_utils._prefetch_component_files", side_effect=OSError("disk error")
+            ):
+                with CaptureLogger(logger) as cap_logger:
+                    new_pipeline = DDPMPipeline.from_pretrained(tmpdirname, max_workers=2)
+        logger.setLevel(logging.INFO)
+
+        # a failed prefetch does not prevent the component from loading
+        assert new_pipeline.unet is not None
+        assert "Prefetching the weight files of unet failed" in cap_logger.out
+        assert "disk error" in cap_logger.out
+
     def test_no_pytorch_download_when_doing_safetensors(self):
         # by default we don't download
         with tempfile.TemporaryDirectory() as tmpdirname:
@@ -1620,6 +1673,42 @@ class PipelineFastTests(unittest.TestCase):
         sd.maybe_free_model_hooks()
         assert sd._offload_gpu_id == 5
 
+    def test_profiling(self):
+        unet = self.dummy_uncond_unet()
+        pipe = DDIMPipeline(unet=unet, scheduler=DDIMScheduler())
+        pipe.to(torch_device)
+        pipe.set_progress_bar_config(disable=True)
+
+        generator = torch.Generator(device="cpu").manual_seed(0)
+        expected_image = pipe(generator=generator, num_inference_steps=2, output_type="np").images
+
+        profiler = pipe.enable_profiling()
+        generator = torch.Generator(device="cpu").manual_seed(0)
+        image = pipe(generator=generator, num_inference_steps=2, output_type="np").images
+        assert np.abs(image - expected_image).max() < 1e-5
+
+        summary = profiler.summary()
+        assert summary["unet"]["calls"] == 2
+        assert summary["scheduler.step"]["calls"] == 2
+        assert summary["unet.down_blocks.1"]["calls"] == 2
+        assert summary["unet"]["flops"] >= summary["unet.down_blocks.1"]["flops"] > 0
+        assert any(row["category"] == "attention" for row in summary.values())
+        assert list(profiler.summary(group_by="step")) == ["step_0", "step_1"]
+        assert "unet.mid_block" in profiler.summary_table()
+
+        trace = profiler.to_chrome_trace()
+        assert len(trace["traceEvents"]) == len(profiler.events)
+        assert sum(event["cat"] == "step" for event in trace["traceEvents"]) == 2
+
+        # no hooks are left after disabling
+        pipe.disable_profiling()
+        assert pipe.profiler is None
+        assert len(unet._forward_hooks) == 0 and len(unet._forward_pre_hooks) == 0
+        assert "step" not in pipe.scheduler.__dict__
+        num_events = len(profiler.events)
+        pipe(num_inference_steps=2, output_type="np")
+        assert len(profiler.events) == num_events
+
 
 @slow
 @require_torch_gpu
@@ -21,6 +21,7 @@ from transformers import CLIPTextConfig, CLIPTextModel, CLIPTokenizer
 
 from diffusers import (
     AutoencoderKL,
+    DDIMParallelScheduler,
     DDIMScheduler,
     TextToVideoSDPipeline,
     UNet3DConditionModel,
@@ -148,6 +149,65 @@ class TextToVideoSDPipelineFastTests(PipelineTesterMixin, unittest.TestCase):
 
         assert np.abs(image_slice.flatten() - expected_slice).max() < 1e-2
 
+    def test_text_to_video_decode_chunk_size(self):
+        device = "cpu"  # ensure determinism for the device-dependent torch.Generator
+        components = self.get_dummy_components()
+        sd_pipe = TextToVideoSDPipeline(**components)
+        sd_pipe = sd_pipe.to(device)
+        sd_pipe.set_progress_bar_config(disable=None)
+
+        inputs = self.get_dummy_inputs(device)
+        inputs["num_frames"] = 5
+        frames = sd_pipe(**inputs).frames
+
+        inputs = self.get_dummy_inputs(device)
+        inputs["num_frames"] = 5
+        inputs["decode_chunk_size"] = 2
+        frames_chunked = sd_pipe(**inputs).frames
+
+        assert frames_chunked.shape == frames.shape
+        assert np.abs(frames_chunked.cpu().numpy() - frames.cpu().numpy()).max() < 1e-4
+
+    def test_text_to_video_parallel(self):
+        device = "cpu"  # ensure determinism for the device-dependent torch.Generator
+        components = self.get_dummy_components()
+        components["scheduler"] = DDIMParallelScheduler.from_config(components["scheduler"].config)
+        sd_pipe = TextToVideoSDPipeline(**components)
+        sd_pipe = sd_pipe.to(device)
+        sd_pipe.set_progress_bar_config(disable=None)
+
+        inputs = self.get_dummy_inputs(device)
+        inputs["num_inference_steps"] = 6
+        frames = sd_pipe(**inputs).frames
+
+        inputs = self.get_dummy_inputs(device)
+        inputs["num_inference_steps"] = 6
+        inputs["parallel"] = 3
+        inputs["tolerance"] = 1e-4
+        frames_parallel = sd_pipe(**inputs).frames
+
+        assert frames_parallel.shape == frames.shape
+        assert np.abs(frames_parallel.cpu().numpy() - frames.cpu().numpy()).max() < 1e-4
+
+        components["scheduler"] = DDIMScheduler.from_config(components["scheduler"].config)
+        sd_pipe = TextToVideoSDPipeline(**components)
+        with self.assertRaises(ValueError):
+            sd_pipe(**inputs)
+
+    def test_decode_latents_streaming(self):
+        components = self.get_dummy_components()
+        sd_pipe = TextToVideoSDPipeline(**components)
+
+        latents = torch.randn((2, 4, 5, 16, 16), generator=torch.manual_seed(0))
+        video = sd_pipe.prepare_video_buffer(latents)
+        with torch.no_grad():
+            chunks = list(sd_pipe.decode_latents_streaming(latents, decode_chunk_size=2, output=video))
+            expected_video = sd_pipe.decode_latents(latents)
+
+        assert [chunk.shape[2] for chunk in chunks] == [2, 2, 1]
+        assert all(chunk.data_ptr() == video[:, :, 2 * i].data_ptr() for i, chunk in enumerate(chunks))
+        assert np.abs(video.numpy() - expected_video.numpy()).max() < 1e-4
+
     @unittest.skipIf(torch_device != "cuda", reason="Feature isn't heavily used. Test in CUDA environment only.")
     def test_attention_slicing_forward_pass(self):
         self._test_attention_slicing_forward_pass(test_mean_pixel_difference=False, expected_max_diff=3e-3)
@@ -1,6 +1,6 @@
 import torch
 
-from diffusers import DDIMScheduler
+from diffusers import DDIMScheduler, SchedulerBatchState
 
 from .test_schedulers import SchedulerCommonTest
 
@@ -174,3 +174,37 @@ class DDIMSchedulerTest(SchedulerCommonTest):
 
         assert abs(result_sum.item() - 354.5418) < 1e-2, f" expected result sum 218.4379, but get {result_sum}"
         assert abs(result_mean.item() - 0.4616) < 1e-3, f" expected result mean 0.2844, but get {result_mean}"
+
+    def test_batch_step_matches_step(self):
+        scheduler_class = self.scheduler_classes[0]
+        scheduler_config = self.get_scheduler_config()
+        model = self.dummy_model()
+        samples = self.dummy_sample_deter[:2]
+        num_inference_steps = [10, 7]
+
+        expected = []
+        for sample, steps in zip(samples, num_inference_steps):
+            scheduler = scheduler_class(**scheduler_config)
+            scheduler.set_timesteps(steps)
+            sample = sample[None]
+            for t in scheduler.timesteps:
+                sample = scheduler.step(model(sample, t), t, sample).prev_sample
+            expected.append(sample)
+
+        # the second sample joins the batch after three steps of the first one, both finish together
+        scheduler = scheduler_class(**scheduler_config)
+        state = scheduler.init_batch_state(num_inference_steps[0])
+        sample = samples[:1]
+        for i in range(num_inference_steps[0]):
+            if i == 3:
+                state = SchedulerBatchState.cat([state, scheduler.init_batch_state(num_inference_steps[1])])
+                sample = torch.cat([sample, samples[1:]])
+            sample = scheduler.batch_step(model(sample, state.timestep), sample, state).prev_sample
+
+        assert state.finished.all()
+        assert torch.allclose(sample[:1], expected[0], atol=1e-6)
+        assert torch.allclose(sample[1:], expected[1], atol=1e-6)
+
+        # finished samples are left unchanged
+        assert torch.equal(scheduler.batch_step(sample, sample, state).prev_sample, sample)
+        assert torch.equal(state.step_index, state.num_inference_steps)
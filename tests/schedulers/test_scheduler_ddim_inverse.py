@@ -98,6 +98,9 @@ class DDIMInverseSchedulerTest(SchedulerCommonTest):
     def test_add_noise_device(self):
         pass
 
+    def test_add_noise_batch(self):
+        pass
+
     def test_full_loop_no_noise(self):
         sample = self.full_loop()
 
@@ -6,8 +6,10 @@ from diffusers import (
     DEISMultistepScheduler,
     DPMSolverMultistepScheduler,
     DPMSolverSinglestepScheduler,
+    SchedulerBatchState,
     UniPCMultistepScheduler,
 )
+from diffusers.utils.testing_utils import require_torch_2
 
 from .test_schedulers import SchedulerCommonTest
 
@@ -311,3 +313,68 @@ class DPMSolverMultistepSchedulerTest(SchedulerCommonTest):
 
             scheduler.set_timesteps(scheduler.config.num_train_timesteps)
             assert len(scheduler.timesteps) == scheduler.num_inference_steps
+
+    def test_batch_step_matches_step(self):
+        for config in [
+            {"solver_order": 2},
+            {"solver_order": 3, "lower_order_final": True},
+            {"solver_order": 2, "algorithm_type": "dpmsolver", "solver_type": "heun"},
+            {"solver_order": 3, "use_karras_sigmas": True, "euler_at_final": True},
+            {"solver_order": 2, "prediction_type": "v_prediction", "thresholding": True},
+        ]:
+            scheduler_config = self.get_scheduler_config(**config)
+            model = self.dummy_model()
+            samples = self.dummy_sample_deter[:3]
+            num_inference_steps = [10, 25, 7]
+
+            expected = []
+            for sample, steps in zip(samples, num_inference_steps):
+                scheduler = DPMSolverMultistepScheduler(**scheduler_config)
+                scheduler.set_timesteps(steps)
+                sample = sample[None]
+                for t in scheduler.timesteps:
+                    sample = scheduler.step(model(sample, t), t, sample).prev_sample
+                expected.append(sample)
+
+            # samples join the running batch at different steps and leave it as soon as they are done
+            scheduler = DPMSolverMultistepScheduler(**scheduler_config)
+            state = scheduler.init_batch_state(num_inference_steps[0])
+            sample, ids, outputs = samples[:1], [0], {}
+            for i in range(30):
+                if i in (3, 5):
+                    new_id = 1 if i == 3 else 2
+                    state = SchedulerBatchState.cat([state, scheduler.init_batch_state(num_inference_steps[new_id])])
+                    sample = torch.cat([sample, samples[new_id : new_id + 1]])
+                    ids.append(new_id)
+                sample = scheduler.batch_step(model(sample, state.timestep), sample, state).prev_sample
+
+                for j in state.finished.nonzero().flatten().tolist():
+                    outputs[ids[j]] = sample[j : j + 1]
+                keep = ~state.finished
+                ids = [idx for idx, k in zip(ids, keep.tolist()) if k]
+                state, sample = state.select(keep), sample[keep]
+                if len(state) == 0:
+                    break
+
+            for idx in range(3):
+                assert torch.allclose(outputs[idx], expected[idx], atol=1e-5), f"sample {idx} differs for {config}"
+
+    @require_torch_2
+    def test_batch_step_fullgraph(self):
+        scheduler = DPMSolverMultistepScheduler(**self.get_scheduler_config(solver_order=3))
+        model = self.dummy_model()
+        samples = self.dummy_sample_deter[:2]
+
+        def denoise_step(sample, state):
+            return scheduler.batch_step(model(sample, state.timestep), sample, state).prev_sample
+
+        # the whole loop runs without graph breaks and matches the eager steps
+        compiled_step = torch.compile(denoise_step, fullgraph=True, backend="aot_eager")
+        state, compiled_state = scheduler.init_batch_state([10, 7]), scheduler.init_batch_state([10, 7])
+        sample, compiled_sample = samples, samples
+        for _ in range(12):
+            sample = denoise_step(sample, state)
+            compiled_sample = compiled_step(compiled_sample, compiled_state)
+
+        assert compiled_state.finished.all()
+        assert torch.allclose(compiled_sample, sample, atol=1e-5)
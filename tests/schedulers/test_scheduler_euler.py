@@ -1,6 +1,6 @@
 import torch
 
-from diffusers import EulerDiscreteScheduler
+from diffusers import EulerDiscreteScheduler, SchedulerBatchState
 from diffusers.utils.testing_utils import torch_device
 
 from .test_schedulers import SchedulerCommonTest
@@ -177,3 +177,66 @@ class EulerDiscreteSchedulerTest(SchedulerCommonTest):
 
         assert abs(result_sum.item() - 57062.9297) < 1e-2, f" expected result sum 57062.9297, but get {result_sum}"
         assert abs(result_mean.item() - 74.3007) < 1e-3, f" expected result mean 74.3007, but get {result_mean}"
+
+    def test_add_noise_timesteps_not_in_schedule(self):
+        scheduler = EulerDiscreteScheduler(**self.get_scheduler_config())
+        scheduler.set_timesteps(10)
+
+        sample = self.dummy_sample_deter[:2]
+        with self.assertRaises(ValueError):
+            scheduler.add_noise(sample, torch.randn_like(sample), torch.tensor([500, 981]))
+
+    def test_step_timestep_not_in_schedule(self):
+        scheduler = EulerDiscreteScheduler(**self.get_scheduler_config())
+        scheduler.set_timesteps(10)
+
+        sample = self.dummy_sample_deter
+        with self.assertRaises(ValueError):
+            scheduler.scale_model_input(sample, 500)
+
+    def test_batch_step_matches_step(self):
+        for config in [{}, {"use_karras_sigmas": True, "prediction_type": "v_prediction"}]:
+            scheduler_config = self.get_scheduler_config(**config)
+            model = self.dummy_model()
+            samples = self.dummy_sample_deter[:2]
+            num_inference_steps = [10, 7]
+            step_kwargs = {"s_churn": 1.0, "s_tmin": 0.5, "s_tmax": 5.0}
+
+            expected = []
+            for i, (sample, steps) in enumerate(zip(samples, num_inference_steps)):
+                scheduler = EulerDiscreteScheduler(**scheduler_config)
+                scheduler.set_timesteps(steps)
+                sample, generator = sample[None], torch.manual_seed(i)
+                for t in scheduler.timesteps:
+                    model_output = model(scheduler.scale_model_input(sample, t), t)
+                    sample = scheduler.step(model_output, t, sample, generator=generator, **step_kwargs).prev_sample
+                expected.append(sample)
+
+            # the second sample joins the batch after three steps of the first one
+            scheduler = EulerDiscreteScheduler(**scheduler_config)
+            state = scheduler.init_batch_state(num_inference_steps[0])
+            sample, generators = samples[:1], [torch.manual_seed(0)]
+            for i in range(num_inference_steps[0]):
+                if i == 3:
+                    state = SchedulerBatchState.cat([state, scheduler.init_batch_state(num_inference_steps[1])])
+                    sample, generators = (
+                        torch.cat([sample, samples[1:]]),
+                        generators + [torch.Generator().manual_seed(1)],
+                    )
+                model_output = model(scheduler.batch_scale_model_input(sample, state), state.timestep)
+                sample = scheduler.batch_step(
+                    model_output, sample, state, generator=generators, **step_kwargs
+                ).prev_sample
+
+            assert state.finished.all()
+            assert torch.allclose(sample[:1], expected[0], atol=1e-5), f"sample 0 differs for {config}"
+            assert torch.allclose(sample[1:], expected[1], atol=1e-5), f"sample 1 differs for {config}"
+
+            # half-precision samples keep their dtype
+            state = scheduler.init_batch_state(num_inference_steps[0])
+            sample = samples.half()
+            model_input = scheduler.batch_scale_model_input(sample, state)
+            output = scheduler.batch_step(model(model_input, state.timestep), sample, state, **step_kwargs)
+            assert model_input.dtype == torch.float16
+            assert output.prev_sample.dtype == torch.float16
+            assert output.pred_original_sample.dtype == torch.float16
@@ -3,7 +3,7 @@ from typing import Dict, List, Tuple
 
 import torch
 
-from diffusers import LCMScheduler
+from diffusers import LCMScheduler, SchedulerBatchState
 from diffusers.utils.testing_utils import torch_device
 
 from .test_schedulers import SchedulerCommonTest
@@ -223,6 +223,42 @@ class LCMSchedulerTest(SchedulerCommonTest):
 
         return sample
 
+    def test_batch_step_matches_step(self):
+        scheduler_config = self.get_scheduler_config()
+        model = self.dummy_model()
+        samples = self.dummy_sample_deter[:2]
+        num_inference_steps = [4, 1]
+
+        expected = []
+        for i, (sample, steps) in enumerate(zip(samples, num_inference_steps)):
+            scheduler = LCMScheduler(**scheduler_config)
+            scheduler.set_timesteps(steps)
+            sample, generator = sample[None], torch.manual_seed(i)
+            for t in scheduler.timesteps:
+                sample = scheduler.step(model(sample, t), t, sample, generator).prev_sample
+            expected.append(sample)
+
+        # the one-step sample joins the batch at the second step of the first one and then stays unchanged
+        scheduler = LCMScheduler(**scheduler_config)
+        state = scheduler.init_batch_state(num_inference_steps[0])
+        sample, generators = samples[:1], [torch.manual_seed(0)]
+        for i in range(num_inference_steps[0]):
+            if i == 1:
+                state = SchedulerBatchState.cat([state, scheduler.init_batch_state(num_inference_steps[1])])
+                sample, generators = torch.cat([sample, samples[1:]]), generators + [torch.Generator().manual_seed(1)]
+            sample = scheduler.batch_step(model(sample, state.timestep), sample, state, generators).prev_sample
+
+        assert state.finished.all()
+        assert torch.allclose(sample[:1], expected[0], atol=1e-5)
+        assert torch.allclose(sample[1:], expected[1], atol=1e-5)
+
+        # half-precision samples keep their dtype
+        state = scheduler.init_batch_state(num_inference_steps[0])
+        sample = samples.half()
+        output = scheduler.batch_step(model(sample, state.timestep), sample, state)
+        assert output.prev_sample.dtype == torch.float16
+        assert output.denoised.dtype == torch.float16
+
     def test_full_loop_onestep(self):
         sample = self.full_loop(num_inference_steps=1)
 
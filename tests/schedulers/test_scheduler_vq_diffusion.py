@@ -54,3 +54,6 @@ class VQDiffusionSchedulerTest(SchedulerCommonTest):
 
     def test_add_noise_device(self):
         pass
+
+    def test_add_noise_batch(self):
+        pass
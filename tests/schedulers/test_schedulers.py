@@ -39,7 +39,7 @@ from diffusers import (
     logging,
 )
 from diffusers.configuration_utils import ConfigMixin, register_to_config
-from diffusers.schedulers.scheduling_utils import SchedulerMixin
+from diffusers.schedulers.scheduling_utils import SchedulerMixin, index_for_timesteps
 from diffusers.utils.testing_utils import CaptureLogger, torch_device
 
 from ..others.test_utils import TOKEN, USER, is_staging_test
@@ -248,6 +248,24 @@ class SchedulerBaseTests(unittest.TestCase):
         pipe.scheduler = UniPCMultistepScheduler.from_config(pipe.scheduler.config)
         assert pipe.scheduler.config.solver_type == "bh2"
 
+    def test_index_for_timesteps(self):
+        schedule_timesteps = torch.tensor([999, 800, 800, 600, 400, 400, 200, 0])
+        timesteps = torch.tensor([999, 800, 400, 0])
+
+        indices = index_for_timesteps(schedule_timesteps, timesteps)
+        self.assertEqual(indices.tolist(), [0, 1, 4, 7])
+
+        indices = index_for_timesteps(schedule_timesteps, timesteps, occurrence=1)
+        self.assertEqual(indices.tolist(), [0, 2, 5, 7])
+
+        self.assertEqual(index_for_timesteps(schedule_timesteps, 600).item(), 3)
+
+        # timesteps that are not in the schedule
+        with self.assertRaises(ValueError):
+            index_for_timesteps(schedule_timesteps, torch.tensor([800, 500]))
+        indices = index_for_timesteps(schedule_timesteps, torch.tensor([800, 500]), missing_to_last=True)
+        self.assertEqual(indices.tolist(), [1, 7])
+
 
 class SchedulerCommonTest(unittest.TestCase):
     scheduler_classes = ()
@@ -660,6 +678,23 @@ class SchedulerCommonTest(unittest.TestCase):
             noised = scheduler.add_noise(scaled_sample, noise, t)
             self.assertEqual(noised.shape, scaled_sample.shape)
 
+    def test_add_noise_batch(self):
+        for scheduler_class in self.scheduler_classes:
+            if scheduler_class == IPNDMScheduler:
+                continue
+            scheduler_config = self.get_scheduler_config()
+            scheduler = scheduler_class(**scheduler_config)
+            scheduler.set_timesteps(10)
+
+            timesteps = scheduler.timesteps[:4]
+            sample = self.dummy_sample[:1].repeat(len(timesteps), *([1] * (self.dummy_sample.ndim - 1)))
+            noise = torch.randn_like(sample)
+            noised = scheduler.add_noise(sample, noise, timesteps)
+
+            for i, t in enumerate(timesteps):
+                noised_single = scheduler.add_noise(sample[i : i + 1], noise[i : i + 1], t[None])
+                self.assertTrue(torch.allclose(noised[i : i + 1], noised_single))
+
     def test_deprecated_kwargs(self):
         for scheduler_class in self.scheduler_classes:
             has_kwarg_in_model_class = "kwargs" in inspect.signature(scheduler_class.__init__).parameters